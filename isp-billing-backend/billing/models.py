@@ -3,6 +3,7 @@ from django.core.validators import MinValueValidator
 from decimal import Decimal
 from subscription.models import Subscription
 from accounts.models import User
+from utils.sequences import next_document_number
 
 
 class Bill(models.Model):
@@ -109,23 +110,9 @@ class Bill(models.Model):
         """
         if not self.bill_number:
             # Generate bill number: BILL-YYYY-MM-XXXX
-            from django.utils import timezone
-            year = self.billing_year
-            month = self.billing_month
-            
-            # Get last bill number for this month
-            last_bill = Bill.objects.filter(
-                bill_number__startswith=f'BILL-{year}-{month:02d}-'
-            ).order_by('-bill_number').first()
-            
-            if last_bill:
-                # Extract number and increment
-                last_number = int(last_bill.bill_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.bill_number = f'BILL-{year}-{month:02d}-{new_number:04d}'
+            self.bill_number = next_document_number(
+                Bill, 'bill_number', f'BILL-{self.billing_year}-{self.billing_month:02d}-'
+            )
         
         # Ensure all amounts are Decimal type
         from decimal import Decimal
@@ -256,20 +243,7 @@ class Payment(models.Model):
             # Generate payment number: PAY-YYYY-XXXX
             from django.utils import timezone
             year = timezone.now().year
-            
-            # Get last payment number for this year
-            last_payment = Payment.objects.filter(
-                payment_number__startswith=f'PAY-{year}-'
-            ).order_by('-payment_number').first()
-            
-            if last_payment:
-                # Extract number and increment
-                last_number = int(last_payment.payment_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.payment_number = f'PAY-{year}-{new_number:04d}'
+            self.payment_number = next_document_number(Payment, 'payment_number', f'PAY-{year}-')
         
         super().save(*args, **kwargs)
         
@@ -331,20 +305,7 @@ class Invoice(models.Model):
             # Generate invoice number: INV-YYYY-XXXX
             from django.utils import timezone
             year = timezone.now().year
-            
-            # Get last invoice number for this year
-            last_invoice = Invoice.objects.filter(
-                invoice_number__startswith=f'INV-{year}-'
-            ).order_by('-invoice_number').first()
-            
-            if last_invoice:
-                # Extract number and increment
-                last_number = int(last_invoice.invoice_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.invoice_number = f'INV-{year}-{new_number:04d}'
+            self.invoice_number = next_document_number(Invoice, 'invoice_number', f'INV-{year}-')
         
         super().save(*args, **kwargs)
 
@@ -427,18 +388,7 @@ class AdvancePayment(models.Model):
         if not self.advance_number:
             from django.utils import timezone
             year = timezone.now().year
-            
-            last_advance = AdvancePayment.objects.filter(
-                advance_number__startswith=f'ADV-{year}-'
-            ).order_by('-advance_number').first()
-            
-            if last_advance:
-                last_number = int(last_advance.advance_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.advance_number = f'ADV-{year}-{new_number:04d}'
+            self.advance_number = next_document_number(AdvancePayment, 'advance_number', f'ADV-{year}-')
         
         # Calculate remaining balance (if not manually set)
         if self.remaining_balance is None:
@@ -645,17 +595,6 @@ class Refund(models.Model):
         if not self.refund_number:
             from django.utils import timezone
             year = timezone.now().year
-            
-            last_refund = Refund.objects.filter(
-                refund_number__startswith=f'REF-{year}-'
-            ).order_by('-refund_number').first()
-            
-            if last_refund:
-                last_number = int(last_refund.refund_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.refund_number = f'REF-{year}-{new_number:04d}'
+            self.refund_number = next_document_number(Refund, 'refund_number', f'REF-{year}-')
         
         super().save(*args, **kwargs)
@@ -0,0 +1,304 @@
+"""
+Billing services shared by the API views and the scheduler jobs
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from mikrotik.outbox import enqueue_commands
+from subscription.models import Subscription, SubscriptionHistory
+from utils.sequences import document_numbers
+from .models import Bill, Payment, AdvancePayment
+
+logger = logging.getLogger(__name__)
+
+# Number of bills inserted (and advance-adjusted) per transaction
+BILL_GENERATION_CHUNK_SIZE = 500
+
+# Number of subscriptions suspended per transaction by the expiry job
+SUSPENSION_CHUNK_SIZE = 500
+
+# Bill statuses that leave a month unpaid
+UNPAID_BILL_STATUSES = ('pending', 'partial', 'overdue')
+
+
+def generate_monthly_bills(year, month, generated_by=None, chunk_size=BILL_GENERATION_CHUNK_SIZE):
+    """
+    Generate bills for all active subscriptions for the given month.
+
+    The whole month is processed as a set: one query for the bills that
+    already exist, one joined query for the active subscriptions, then
+    bulk inserts in chunks. Remaining advance balances are applied to the
+    new bills in the same chunk transaction (FIFO, oldest advance first).
+
+    Returns a summary dict describing what was done.
+    """
+    summary = {
+        'year': year,
+        'month': month,
+        'active_count': 0,
+        'generated_count': 0,
+        'skipped_count': 0,
+        'free_count': 0,
+        'advance_adjusted_count': 0,
+        'advance_adjusted_amount': Decimal('0.00'),
+        'errors': [],
+    }
+
+    existing = set(
+        Bill.objects.filter(
+            billing_year=year, billing_month=month
+        ).values_list('subscription_id', flat=True)
+    )
+
+    active_subscriptions = Subscription.objects.filter(status='active').values_list(
+        'id', 'customer_id', 'customer__billing_type', 'package__price'
+    ).order_by('id')
+
+    candidates = []
+    for sub_id, customer_id, billing_type, price in active_subscriptions:
+        summary['active_count'] += 1
+        if sub_id in existing:
+            summary['skipped_count'] += 1
+            continue
+        # Free customers are never billed
+        if billing_type == 'free':
+            summary['free_count'] += 1
+            continue
+        candidates.append((sub_id, customer_id, price))
+
+    billing_date = timezone.now().date()
+
+    for start in range(0, len(candidates), chunk_size):
+        chunk = candidates[start:start + chunk_size]
+        try:
+            with transaction.atomic():
+                bills = _create_bills(chunk, year, month, billing_date, generated_by)
+                adjusted_count, adjusted_amount = _apply_advance_balances(bills, generated_by)
+        except Exception as e:
+            logger.error(
+                f"Error generating bills for subscriptions {chunk[0][0]}-{chunk[-1][0]}: {e}"
+            )
+            summary['errors'].append(f"Subs {chunk[0][0]}-{chunk[-1][0]}: {str(e)}")
+            continue
+
+        summary['generated_count'] += len(bills)
+        # Rows dropped by the unique (subscription, month, year) key were
+        # created concurrently by another run
+        summary['skipped_count'] += len(chunk) - len(bills)
+        summary['advance_adjusted_count'] += adjusted_count
+        summary['advance_adjusted_amount'] += adjusted_amount
+
+    logger.info(
+        f"Monthly bills {month:02d}/{year}: generated {summary['generated_count']}, "
+        f"skipped {summary['skipped_count']}, free {summary['free_count']}, "
+        f"advance adjusted {summary['advance_adjusted_count']}"
+    )
+    return summary
+
+
+def _create_bills(chunk, year, month, billing_date, generated_by):
+    """
+    Bulk insert bills for a chunk of (subscription_id, customer_id, price)
+    and return the bills that were actually inserted.
+    """
+    bill_numbers = document_numbers(Bill, 'bill_number', f'BILL-{year}-{month:02d}-', count=len(chunk))
+
+    bills = []
+    customer_by_subscription = {}
+    for bill_number, (sub_id, customer_id, price) in zip(bill_numbers, chunk):
+        amount = Decimal(str(price)) if price else Decimal('0.00')
+        customer_by_subscription[sub_id] = customer_id
+        bills.append(Bill(
+            bill_number=bill_number,
+            subscription_id=sub_id,
+            billing_month=month,
+            billing_year=year,
+            billing_date=billing_date,
+            package_price=amount,
+            total_amount=amount,
+            due_amount=amount,
+            paid_amount=Decimal('0.00'),
+            status='paid' if amount <= 0 else 'pending',
+            is_auto_generated=True,
+            generated_by=generated_by,
+        ))
+
+    Bill.objects.bulk_create(bills, ignore_conflicts=True)
+
+    # ignore_conflicts does not return primary keys, so read back the rows
+    # that belong to this run
+    created = list(Bill.objects.filter(
+        billing_year=year,
+        billing_month=month,
+        subscription_id__in=customer_by_subscription.keys(),
+        bill_number__in=[bill.bill_number for bill in bills],
+    ))
+    for bill in created:
+        bill.customer_id = customer_by_subscription[bill.subscription_id]
+    return created
+
+
+def _apply_advance_balances(bills, received_by):
+    """
+    Deduct remaining advance balances from freshly generated bills.
+    Returns (number of payments created, total amount deducted).
+    """
+    due_bills = [bill for bill in bills if bill.due_amount > 0]
+    if not due_bills:
+        return 0, Decimal('0.00')
+
+    advances_by_customer = defaultdict(list)
+    advances = AdvancePayment.objects.filter(
+        customer_id__in={bill.customer_id for bill in due_bills},
+        remaining_balance__gt=0
+    ).order_by('created_at')  # FIFO: Use oldest advance first
+    for advance in advances:
+        advances_by_customer[advance.customer_id].append(advance)
+
+    if not advances_by_customer:
+        return 0, Decimal('0.00')
+
+    now = timezone.now()
+    payments = []
+    touched_bills = []
+    touched_advances = {}
+
+    for bill in due_bills:
+        for advance in advances_by_customer.get(bill.customer_id, []):
+            if bill.due_amount <= 0:
+                break
+            if advance.remaining_balance <= 0:
+                continue
+
+            deduct_amount = min(bill.due_amount, advance.remaining_balance)
+
+            payments.append(Payment(
+                bill=bill,
+                amount=deduct_amount,
+                payment_method='adjustment_from_advance',
+                payment_date=now,
+                advance_payment=advance,
+                status='completed',
+                notes=f'Auto-deducted from Advance {advance.advance_number}',
+                received_by=received_by,
+            ))
+
+            # Same arithmetic as Payment.save() / Bill.save()
+            bill.paid_amount += deduct_amount
+            bill.due_amount = bill.total_amount - bill.paid_amount
+            bill.status = 'paid' if bill.paid_amount >= bill.total_amount else 'partial'
+            bill.updated_at = now
+
+            advance.used_amount += deduct_amount
+            advance.remaining_balance -= deduct_amount
+            advance.updated_at = now
+            touched_advances[advance.pk] = advance
+
+        if bill.paid_amount > 0:
+            touched_bills.append(bill)
+
+    if not payments:
+        return 0, Decimal('0.00')
+
+    payment_numbers = document_numbers(Payment, 'payment_number', f'PAY-{now.year}-', count=len(payments))
+    for payment_number, payment in zip(payment_numbers, payments):
+        payment.payment_number = payment_number
+
+    # Payment.save() is bypassed on purpose: bills are updated here in bulk
+    Payment.objects.bulk_create(payments)
+    Bill.objects.bulk_update(touched_bills, ['paid_amount', 'due_amount', 'status', 'updated_at'])
+    AdvancePayment.objects.bulk_update(
+        list(touched_advances.values()), ['used_amount', 'remaining_balance', 'updated_at']
+    )
+
+    return len(payments), sum((payment.amount for payment in payments), Decimal('0.00'))
+
+
+def suspend_overdue_subscriptions(today=None, chunk_size=SUSPENSION_CHUNK_SIZE):
+    """
+    Suspend active subscriptions whose billing day has passed with an
+    unpaid bill for the month. Subscriptions without a bill for the month
+    (bill generation off or not run yet) are never suspended.
+
+    Candidates come from one semi-join query driven by the
+    (status, billing_day) index. Each chunk is re-checked under row locks,
+    suspended with one UPDATE, gets its SubscriptionHistory rows in bulk
+    and queues disable_user commands; the MikroTik worker sends those as
+    one bulk disable per router session. Suspended rows drop out of the
+    candidate set, so re-runs on the same day find (almost) nothing.
+
+    Returns a summary dict.
+    """
+    today = today or timezone.localdate()
+    summary = {'candidates': 0, 'suspended_count': 0, 'queued_count': 0, 'errors': []}
+
+    overdue = _overdue_subscriptions(today)
+    candidate_ids = list(overdue.values_list('id', flat=True).order_by('id'))
+    summary['candidates'] = len(candidate_ids)
+
+    for start in range(0, len(candidate_ids), chunk_size):
+        chunk = candidate_ids[start:start + chunk_size]
+        try:
+            with transaction.atomic():
+                # A payment may have landed since the candidate query
+                subscriptions = list(
+                    overdue.filter(pk__in=chunk).select_for_update(of=('self',))
+                    .only('id', 'router_id', 'mikrotik_username', 'billing_day')
+                )
+                if not subscriptions:
+                    continue
+                Subscription.objects.filter(pk__in=[s.pk for s in subscriptions]).update(
+                    status='suspended', updated_at=timezone.now()
+                )
+                SubscriptionHistory.objects.bulk_create([
+                    SubscriptionHistory(
+                        subscription=subscription,
+                        action='suspended',
+                        old_value={'status': 'active'},
+                        new_value={'status': 'suspended'},
+                        notes=f'Auto-suspended: unpaid bill for {today.month:02d}/{today.year} '
+                              f'after billing day {subscription.billing_day}',
+                    )
+                    for subscription in subscriptions
+                ])
+                commands = enqueue_commands(subscriptions, 'disable_user')
+        except Exception as e:
+            logger.error(f"Error suspending subscriptions {chunk[0]}-{chunk[-1]}: {e}")
+            summary['errors'].append(f"Subs {chunk[0]}-{chunk[-1]}: {str(e)}")
+            continue
+
+        summary['suspended_count'] += len(subscriptions)
+        summary['queued_count'] += len(commands)
+
+    if summary['candidates']:
+        logger.info(
+            f"Expiry enforcement {today}: suspended {summary['suspended_count']} subscriptions, "
+            f"queued {summary['queued_count']} router disables"
+        )
+    return summary
+
+
+def _overdue_subscriptions(today):
+    """
+    Active, billable subscriptions past their billing day with an unpaid bill this month
+    """
+    unpaid_bills = Bill.objects.filter(
+        subscription=OuterRef('pk'),
+        billing_year=today.year,
+        billing_month=today.month,
+        status__in=UNPAID_BILL_STATUSES
+    )
+    return Subscription.objects.filter(
+        status='active',
+        billing_day__lt=today.day
+    ).exclude(
+        customer__billing_type='free'
+    ).exclude(
+        # Billing has not started yet
+        billing_start_month__gt=today.replace(day=1)
+    ).filter(Exists(unpaid_bills))
@@ -1,3 +1,190 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from customers.models import Customer
+from mikrotik.models import MikroTikCommand, MikroTikRouter, Package
+from schedule import jobs
+from subscription.models import Subscription, SubscriptionHistory
+from . import services as billing_services
+from .models import AdvancePayment, Bill, Payment
+from .services import generate_monthly_bills, suspend_overdue_subscriptions
+
+TODAY = date(2026, 10, 17)
+
+
+@pytest.fixture
+def package():
+    return Package.objects.create(name='10M', price=Decimal('500'))
+
+
+@pytest.fixture
+def router():
+    return MikroTikRouter.objects.create(name='r1', ip_address='192.0.2.1', username='admin', password='admin')
+
+
+def make_subscription(package, router=None, billing_type='personal', billing_day=5, **fields):
+    customer = Customer.objects.create(
+        name='Customer', phone='+8801711000000', address='Dhaka', billing_type=billing_type
+    )
+    return Subscription.objects.create(
+        customer=customer, package=package, router=router,
+        start_date=date(2026, 1, 1), billing_day=billing_day, **fields
+    )
+
+
+def make_advance(subscription, amount):
+    return AdvancePayment.objects.create(
+        customer=subscription.customer, amount=Decimal(amount), payment_method='cash', payment_date=timezone.now()
+    )
+
+
+def make_bill(subscription, paid=Decimal('0'), year=TODAY.year, month=TODAY.month):
+    return Bill.objects.create(
+        subscription=subscription, billing_year=year, billing_month=month,
+        billing_date=date(year, month, 1), package_price=Decimal('500'), paid_amount=paid
+    )
+
+
+# ==================== Monthly Bills ====================
+
+@pytest.fixture
+def billing_setup(package):
+    subscriptions = {
+        'full': make_subscription(package),
+        'partial': make_subscription(package),
+        'fifo': make_subscription(package),
+        'free': make_subscription(package, billing_type='free'),
+        'existing': make_subscription(package),
+        'suspended': make_subscription(package, status='suspended'),
+        'plain': make_subscription(package),
+    }
+    make_advance(subscriptions['full'], '700')
+    make_advance(subscriptions['partial'], '200')
+    make_advance(subscriptions['fifo'], '100')
+    make_advance(subscriptions['fifo'], '600')
+    return subscriptions
+
+
+def bill_state(subscription, year, month):
+    bill = Bill.objects.get(subscription=subscription, billing_year=year, billing_month=month)
+    return bill.status, bill.paid_amount, bill.due_amount
+
+
+@pytest.mark.django_db
+def test_generate_monthly_bills_applies_advances_and_skips_existing(billing_setup):
+    subs = billing_setup
+    existing = make_bill(subs['existing'], year=2026, month=3)
+
+    summary = generate_monthly_bills(2026, 3)
+
+    assert {key: summary[key] for key in (
+        'active_count', 'generated_count', 'skipped_count', 'free_count',
+        'advance_adjusted_count', 'advance_adjusted_amount', 'errors'
+    )} == {
+        'active_count': 6, 'generated_count': 4, 'skipped_count': 1, 'free_count': 1,
+        'advance_adjusted_count': 4, 'advance_adjusted_amount': Decimal('1200.00'), 'errors': [],
+    }
+    assert not Bill.objects.filter(subscription__in=[subs['free'], subs['suspended']]).exists()
+    assert Bill.objects.get(subscription=subs['existing'], billing_year=2026, billing_month=3) == existing
+
+    assert bill_state(subs['full'], 2026, 3) == ('paid', Decimal('500.00'), Decimal('0.00'))
+    assert bill_state(subs['partial'], 2026, 3) == ('partial', Decimal('200.00'), Decimal('300.00'))
+    assert bill_state(subs['fifo'], 2026, 3) == ('paid', Decimal('500.00'), Decimal('0.00'))
+    assert bill_state(subs['plain'], 2026, 3) == ('pending', Decimal('0.00'), Decimal('500.00'))
+
+    advances = {
+        (advance.customer_id, advance.amount): (advance.used_amount, advance.remaining_balance)
+        for advance in AdvancePayment.objects.all()
+    }
+    assert advances[(subs['full'].customer_id, Decimal('700.00'))] == (Decimal('500.00'), Decimal('200.00'))
+    assert advances[(subs['partial'].customer_id, Decimal('200.00'))] == (Decimal('200.00'), Decimal('0.00'))
+    # Oldest advance first
+    assert advances[(subs['fifo'].customer_id, Decimal('100.00'))] == (Decimal('100.00'), Decimal('0.00'))
+    assert advances[(subs['fifo'].customer_id, Decimal('600.00'))] == (Decimal('400.00'), Decimal('200.00'))
+
+    payments = Payment.objects.filter(payment_method='adjustment_from_advance')
+    assert sorted(payments.values_list('amount', flat=True)) == [
+        Decimal('100.00'), Decimal('200.00'), Decimal('400.00'), Decimal('500.00')
+    ]
+    assert len(set(payments.values_list('payment_number', flat=True))) == 4
+
+    # A re-run skips every (subscription, month, year) that has a bill
+    summary = generate_monthly_bills(2026, 3)
+    assert (summary['generated_count'], summary['skipped_count'], summary['advance_adjusted_count']) == (0, 5, 0)
+    assert Bill.objects.count() == 5
+    assert payments.count() == 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('runner', ['api', 'job'])
+def test_monthly_bills_view_and_job_report_the_same_summary(billing_setup, monkeypatch, runner):
+    today = date.today()
+    summaries = []
+    generate = billing_services.generate_monthly_bills
+
+    def recording_generate(*args, **kwargs):
+        summaries.append(generate(*args, **kwargs))
+        return summaries[-1]
+
+    if runner == 'api':
+        monkeypatch.setattr('billing.views.generate_monthly_bills', recording_generate)
+        user = User.objects.create_user(username='manager', password='x', role='manager')
+        client = APIClient(HTTP_HOST='localhost')
+        client.force_authenticate(user)
+        response = client.post(
+            '/api/bills/generate-monthly/', {'year': today.year, 'month': today.month}, format='json'
+        )
+        assert response.status_code == 200
+        for key in ('generated_count', 'skipped_count', 'free_count', 'advance_adjusted_count', 'errors'):
+            assert response.json()[key] == summaries[0][key]
+    else:
+        monkeypatch.setattr(billing_services, 'generate_monthly_bills', recording_generate)
+        jobs.generate_monthly_bills()
+
+    summary = summaries[0]
+    assert (summary['year'], summary['month']) == (today.year, today.month)
+    assert (
+        summary['generated_count'], summary['skipped_count'], summary['free_count'],
+        summary['advance_adjusted_count'], summary['advance_adjusted_amount']
+    ) == (5, 0, 1, 4, Decimal('1200.00'))
+
+
+# ==================== Expiry Enforcement ====================
+
+@pytest.mark.django_db
+def test_suspend_overdue_subscriptions(package, router):
+    unpaid = make_subscription(package, router)
+    make_bill(unpaid)
+    partial = make_subscription(package, router)
+    make_bill(partial, paid=Decimal('200'))
+    paid = make_subscription(package, router)
+    make_bill(paid, paid=Decimal('500'))
+    # No bill this month: bill generation is off or has not run yet
+    no_bill = make_subscription(package, router)
+    make_bill(no_bill, month=TODAY.month - 1)
+    free = make_subscription(package, router, billing_type='free')
+    make_bill(free)
+    not_started = make_subscription(package, router, billing_start_month=date(2026, 11, 1))
+    make_bill(not_started)
+    not_due = make_subscription(package, router, billing_day=TODAY.day)
+    make_bill(not_due)
+
+    summary = suspend_overdue_subscriptions(today=TODAY)
+
+    assert summary == {'candidates': 2, 'suspended_count': 2, 'queued_count': 2, 'errors': []}
+    suspended = set(Subscription.objects.filter(status='suspended').values_list('pk', flat=True))
+    assert suspended == {unpaid.pk, partial.pk}
+    assert set(MikroTikCommand.objects.values_list('subscription_id', 'action')) == {
+        (unpaid.pk, 'disable_user'), (partial.pk, 'disable_user')
+    }
+    assert SubscriptionHistory.objects.filter(action='suspended').count() == 2
+
+    # A second run on the same day finds nothing new
+    summary = suspend_overdue_subscriptions(today=TODAY)
+    assert summary['candidates'] == summary['suspended_count'] == 0
+    assert MikroTikCommand.objects.count() == 2
@@ -16,8 +16,8 @@ from .serializers import (
     InvoiceSerializer, AdvancePaymentSerializer, AdvancePaymentCreateSerializer,
     DiscountSerializer, RefundSerializer, RefundCreateSerializer
 )
+from .services import generate_monthly_bills
 from utils.permissions import IsAdminOrManager, IsAdmin
-from subscription.models import Subscription
 
 
 
@@ -133,80 +133,18 @@ class GenerateMonthlyBillsView(APIView):
         except ValueError:
             return Response({'error': 'Invalid year or month'}, status=status.HTTP_400_BAD_REQUEST)
             
-        active_subscriptions = Subscription.objects.filter(status='active')
-        generated_count = 0
-        skipped_count = 0
-        errors = []
-        
-        for sub in active_subscriptions:
-            try:
-                # Check if bill exists
-                if Bill.objects.filter(subscription=sub, billing_year=year, billing_month=month).exists():
-                    skipped_count += 1
-                    continue
-                
-                # Skip if customer billing type is free
-                if sub.customer.billing_type == 'free':
-                    skipped_count += 1
-                    continue
-                    
-                amount = sub.package.price
-
-                bill = Bill.objects.create(
-                    subscription=sub,
-                    billing_month=month,
-                    billing_year=year,
-                    billing_date=timezone.now().date(),
-                    package_price=amount,
-                    total_amount=amount,
-                    due_amount=amount,
-                    paid_amount=0,
-                    status='pending',
-                    is_auto_generated=True,
-                    generated_by=request.user
-                )
-
-                # Check for Advance Payment and Auto-Deduct
-                valid_advances = AdvancePayment.objects.filter(
-                    customer=sub.customer, 
-                    remaining_balance__gt=0
-                ).order_by('created_at') # FIFO: Use oldest advance first
-
-                for advance in valid_advances:
-                    if bill.due_amount <= 0:
-                        break
-                    
-                    deduct_amount = min(bill.due_amount, advance.remaining_balance)
-                    
-                    # Create Payment Linked to Advance
-                    Payment.objects.create(
-                        bill=bill,
-                        amount=deduct_amount,
-                        payment_method='adjustment_from_advance',
-                        payment_date=timezone.now(),
-                        advance_payment=advance,
-                        status='completed',
-                        notes=f'Auto-deducted from Advance {advance.advance_number}',
-                        received_by=request.user
-                    )
-                    
-                    # Update Advance Balance
-                    advance.used_amount += deduct_amount
-                    advance.remaining_balance -= deduct_amount
-                    advance.save()
-                    
-                    # Refresh bill to update due amount for next iteration check (though bill.save called in Payment signal/save)
-                    bill.refresh_from_db()
-
-                generated_count += 1
-            except Exception as e:
-                errors.append(f"Sub {sub.id}: {str(e)}")
+        if not 1 <= month <= 12:
+            return Response({'error': 'Invalid year or month'}, status=status.HTTP_400_BAD_REQUEST)
+            
+        summary = generate_monthly_bills(year, month, generated_by=request.user)
             
         return Response({
-            'message': f'Generated {generated_count} bills, skipped {skipped_count} existing bills.',
-            'generated_count': generated_count,
-            'skipped_count': skipped_count,
-            'errors': errors
+            'message': f"Generated {summary['generated_count']} bills, skipped {summary['skipped_count']} existing bills.",
+            'generated_count': summary['generated_count'],
+            'skipped_count': summary['skipped_count'],
+            'free_count': summary['free_count'],
+            'advance_adjusted_count': summary['advance_adjusted_count'],
+            'errors': summary['errors']
         })
 
 
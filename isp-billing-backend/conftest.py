@@ -0,0 +1,26 @@
+import pytest
+from django.conf import settings
+
+from mikrotik.pool import get_pool
+from mikrotik.simulator import run_simulator
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix, tmp_path_factory):
+    # Tests with threads need a file database: threads on in-memory SQLite
+    # share one cache and fail with "database table is locked"
+    database = settings.DATABASES['default']
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('TEST', {})['NAME'] = str(tmp_path_factory.mktemp('db') / 'test.sqlite3')
+
+
+@pytest.fixture
+def routeros_simulator():
+    """
+    A running RouterOS API simulator (see mikrotik/simulator.py); point a
+    MikroTikRouter at it with simulator.router_kwargs()
+    """
+    with run_simulator() as simulator:
+        yield simulator
+    # Pooled sessions are keyed by router id, which the next test may reuse
+    get_pool().close_all()
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_connectiontype_code_connectiontype_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['static_ip'], name='customers_static__a4a369_idx'),
+        ),
+    ]
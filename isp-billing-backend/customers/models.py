@@ -1,6 +1,7 @@
 from django.db import models
 from phonenumber_field.modelfields import PhoneNumberField
 from accounts.models import User
+from utils.sequences import next_document_number
 
 
 class Zone(models.Model):
@@ -164,6 +165,7 @@ class Customer(models.Model):
             models.Index(fields=['phone']),
             models.Index(fields=['status']),
             models.Index(fields=['zone']),
+            models.Index(fields=['static_ip']),
         ]
     
     def __str__(self):
@@ -177,20 +179,7 @@ class Customer(models.Model):
             # Generate customer ID: ISP-YYYY-XXXX
             from django.utils import timezone
             year = timezone.now().year
-            
-            # Get last customer ID for this year
-            last_customer = Customer.objects.filter(
-                customer_id__startswith=f'ISP-{year}-'
-            ).order_by('-customer_id').first()
-            
-            if last_customer:
-                # Extract number and increment
-                last_number = int(last_customer.customer_id.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-            
-            self.customer_id = f'ISP-{year}-{new_number:04d}'
+            self.customer_id = next_document_number(Customer, 'customer_id', f'ISP-{year}-')
         
         super().save(*args, **kwargs)
     
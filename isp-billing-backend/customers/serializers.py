@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Zone, Customer, ConnectionType
+from mikrotik.ip_pools import address_in_use
 
 
 class ConnectionTypeSerializer(serializers.ModelSerializer):
@@ -86,6 +87,16 @@ class CustomerCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("A customer with this phone number already exists.")
         return value
     
+    def validate_static_ip(self, value):
+        """
+        Reject addresses already used by another customer or session
+        """
+        if value:
+            in_use = address_in_use(value)
+            if in_use:
+                raise serializers.ValidationError(f"This IP is already in use ({in_use}).")
+        return value
+    
     def validate(self, attrs):
         """
         Custom validation
@@ -135,6 +146,16 @@ class CustomerUpdateSerializer(serializers.ModelSerializer):
         if Customer.objects.exclude(pk=customer.pk).filter(phone=value).exists():
             raise serializers.ValidationError("A customer with this phone number already exists.")
         return value
+    
+    def validate_static_ip(self, value):
+        """
+        Reject addresses already used by another customer or session
+        """
+        if value and value != self.instance.static_ip:
+            in_use = address_in_use(value, customer=self.instance)
+            if in_use:
+                raise serializers.ValidationError(f"This IP is already in use ({in_use}).")
+        return value
 
 
 class CustomerListSerializer(serializers.ModelSerializer):
@@ -246,6 +246,72 @@ SPECTACULAR_SETTINGS = {
 
 
 
+# MikroTik API Configuration
+# Authenticated sessions are pooled per router in each process
+MIKROTIK_POOL_MAX_SESSIONS = int(os.getenv('MIKROTIK_POOL_MAX_SESSIONS', '2'))
+MIKROTIK_POOL_IDLE_TIMEOUT = int(os.getenv('MIKROTIK_POOL_IDLE_TIMEOUT', '300'))  # seconds
+MIKROTIK_POOL_HEALTH_CHECK_INTERVAL = int(os.getenv('MIKROTIK_POOL_HEALTH_CHECK_INTERVAL', '30'))  # seconds
+MIKROTIK_POOL_ACQUIRE_TIMEOUT = int(os.getenv('MIKROTIK_POOL_ACQUIRE_TIMEOUT', '30'))  # seconds
+# Deadlines for a single router connection: TCP connect + login, then each reply
+MIKROTIK_CONNECT_TIMEOUT = float(os.getenv('MIKROTIK_CONNECT_TIMEOUT', '3'))  # seconds
+MIKROTIK_READ_TIMEOUT = float(os.getenv('MIKROTIK_READ_TIMEOUT', '10'))  # seconds
+# Bulk commands in flight per session before waiting for replies (routers can override)
+MIKROTIK_PIPELINE_WINDOW = int(os.getenv('MIKROTIK_PIPELINE_WINDOW', '32'))
+# Circuit breaker: open after N consecutive failures, probe again after the reset timeout
+MIKROTIK_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('MIKROTIK_CIRCUIT_FAILURE_THRESHOLD', '3'))
+MIKROTIK_CIRCUIT_RESET_TIMEOUT = int(os.getenv('MIKROTIK_CIRCUIT_RESET_TIMEOUT', '30'))  # seconds
+# Minimum seconds between router is_online/last_connected_at writes
+MIKROTIK_STATUS_UPDATE_INTERVAL = int(os.getenv('MIKROTIK_STATUS_UPDATE_INTERVAL', '60'))
+# Multi-router calls run in parallel; each router must answer within the deadline
+MIKROTIK_FANOUT_MAX_WORKERS = int(os.getenv('MIKROTIK_FANOUT_MAX_WORKERS', '8'))
+MIKROTIK_ROUTER_DEADLINE = float(os.getenv('MIKROTIK_ROUTER_DEADLINE', '5'))  # seconds
+# Active sessions are polled into mikrotik.LiveSession; views read that snapshot
+MIKROTIK_SESSION_POLL_INTERVAL = int(os.getenv('MIKROTIK_SESSION_POLL_INTERVAL', '30'))  # seconds
+MIKROTIK_SESSION_STALE_AFTER = int(os.getenv('MIKROTIK_SESSION_STALE_AFTER', str(MIKROTIK_SESSION_POLL_INTERVAL * 3)))  # seconds
+# Session listener (listen_active_sessions)
+MIKROTIK_LISTEN_HEARTBEAT_INTERVAL = float(os.getenv('MIKROTIK_LISTEN_HEARTBEAT_INTERVAL', '10'))  # seconds
+MIKROTIK_LISTEN_FLUSH_INTERVAL = float(os.getenv('MIKROTIK_LISTEN_FLUSH_INTERVAL', '1'))  # seconds
+MIKROTIK_LISTEN_MAX_BACKOFF = float(os.getenv('MIKROTIK_LISTEN_MAX_BACKOFF', '60'))  # seconds
+MIKROTIK_LISTEN_ROUTER_REFRESH = float(os.getenv('MIKROTIK_LISTEN_ROUTER_REFRESH', '60'))  # seconds
+# In-process IP/MAC -> subscriber index used by the address lookup API, rebuilt when older than this
+MIKROTIK_ADDRESS_INDEX_TTL = float(os.getenv('MIKROTIK_ADDRESS_INDEX_TTL', '30'))  # seconds
+# Reconciliation downloads whole secret tables, so it gets a longer deadline per router
+MIKROTIK_RECONCILE_TIMEOUT = float(os.getenv('MIKROTIK_RECONCILE_TIMEOUT', '90'))  # seconds
+# Deadline per router for periodic collectors (usage counters, ...)
+MIKROTIK_COLLECT_TIMEOUT = float(os.getenv('MIKROTIK_COLLECT_TIMEOUT', '60'))  # seconds
+# Health monitor (probe_router_health job)
+MIKROTIK_HEALTH_PROBE_TIMEOUT = float(os.getenv('MIKROTIK_HEALTH_PROBE_TIMEOUT', '15'))  # seconds
+MIKROTIK_HEALTH_RETENTION_DAYS = int(os.getenv('MIKROTIK_HEALTH_RETENTION_DAYS', '30'))
+# Deadline per router for bulk package profile pushes
+MIKROTIK_PROFILE_PUSH_TIMEOUT = float(os.getenv('MIKROTIK_PROFILE_PUSH_TIMEOUT', '60'))  # seconds
+# Script provisioning: upload over FTP, then /import on the router
+MIKROTIK_FTP_PORT = int(os.getenv('MIKROTIK_FTP_PORT', '21'))
+MIKROTIK_PROVISION_TIMEOUT = float(os.getenv('MIKROTIK_PROVISION_TIMEOUT', '900'))  # seconds
+# Config backups (backup_router_configs job): /export downloaded over FTP
+MIKROTIK_BACKUP_TIMEOUT = float(os.getenv('MIKROTIK_BACKUP_TIMEOUT', '300'))  # seconds
+MIKROTIK_BACKUP_MAX_DELTA_CHAIN = int(os.getenv('MIKROTIK_BACKUP_MAX_DELTA_CHAIN', '30'))  # deltas before a full copy
+# Router commands are queued in mikrotik.MikroTikCommand and sent by run_mikrotik_worker
+MIKROTIK_OUTBOX_BATCH_SIZE = int(os.getenv('MIKROTIK_OUTBOX_BATCH_SIZE', '500'))
+MIKROTIK_OUTBOX_POLL_INTERVAL = float(os.getenv('MIKROTIK_OUTBOX_POLL_INTERVAL', '2'))  # seconds
+MIKROTIK_OUTBOX_TIMEOUT = float(os.getenv('MIKROTIK_OUTBOX_TIMEOUT', '120'))  # seconds per router batch
+MIKROTIK_OUTBOX_MAX_ATTEMPTS = int(os.getenv('MIKROTIK_OUTBOX_MAX_ATTEMPTS', '8'))
+MIKROTIK_OUTBOX_RETRY_DELAY = int(os.getenv('MIKROTIK_OUTBOX_RETRY_DELAY', '10'))  # seconds, doubled per attempt
+MIKROTIK_OUTBOX_MAX_RETRY_DELAY = int(os.getenv('MIKROTIK_OUTBOX_MAX_RETRY_DELAY', '900'))  # seconds
+# Claims older than this are taken to belong to a dead worker and are put back; keep it far above the slowest batch
+MIKROTIK_OUTBOX_RELEASE_AFTER = float(os.getenv('MIKROTIK_OUTBOX_RELEASE_AFTER', '1800'))  # seconds
+# Sync log retention (0 disables a limit)
+MIKROTIK_SYNC_LOG_RETENTION_DAYS = int(os.getenv('MIKROTIK_SYNC_LOG_RETENTION_DAYS', '90'))
+MIKROTIK_SYNC_LOG_MAX_ROWS = int(os.getenv('MIKROTIK_SYNC_LOG_MAX_ROWS', '0'))
+MIKROTIK_SYNC_LOG_SUMMARIZE = os.getenv('MIKROTIK_SYNC_LOG_SUMMARIZE', '1') == '1'  # keep per-day counts of pruned rows
+MIKROTIK_SYNC_LOG_COMPRESS_THRESHOLD = int(os.getenv('MIKROTIK_SYNC_LOG_COMPRESS_THRESHOLD', '2048'))  # bytes
+MIKROTIK_SYNC_LOG_BATCH_SIZE = int(os.getenv('MIKROTIK_SYNC_LOG_BATCH_SIZE', '5000'))
+# Long-running API work is queued as mikrotik.RouterJob and run by run_router_jobs;
+# a running job whose heartbeat is older than the timeout belongs to a dead worker
+MIKROTIK_JOB_POLL_INTERVAL = float(os.getenv('MIKROTIK_JOB_POLL_INTERVAL', '2'))  # seconds
+MIKROTIK_JOB_HEARTBEAT_INTERVAL = float(os.getenv('MIKROTIK_JOB_HEARTBEAT_INTERVAL', '10'))  # seconds
+MIKROTIK_JOB_HEARTBEAT_TIMEOUT = float(os.getenv('MIKROTIK_JOB_HEARTBEAT_TIMEOUT', '120'))  # seconds
+
+
 # CORS Configuration
 if DEBUG:
     # Local testing only
@@ -0,0 +1,220 @@
+"""
+Reverse lookup: which subscriber is behind an IP or MAC address.
+
+Current owners come from an in-process hash index (address -> owners)
+built from the live session snapshot, Subscription.framed_ip_address /
+mac_address and Customer.static_ip. It is rebuilt at most every
+MIKROTIK_ADDRESS_INDEX_TTL seconds, so a lookup is a dict access.
+
+Past owners come from AddressLease: one row per PPP session, opened and
+closed together with the session's start/stop events. "Who had
+10.20.30.40 at 2026-09-01 14:05" is a seek on (ip_address, started_at).
+"""
+import ipaddress
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from customers.models import Customer
+from subscription.models import Subscription
+from .models import AddressLease, LiveSession
+
+logger = logging.getLogger(__name__)
+
+MAC_DIGITS = re.compile(r'[^0-9A-Fa-f]')
+
+
+def normalize_ip(value):
+    """
+    Canonical text form of an IP address, or None if it is not one
+    """
+    try:
+        return str(ipaddress.ip_address(str(value).strip()))
+    except ValueError:
+        return None
+
+
+def normalize_mac(value):
+    """
+    MAC address as AA:BB:CC:DD:EE:FF (RouterOS caller-id format), or None
+    """
+    digits = MAC_DIGITS.sub('', str(value or ''))
+    if len(digits) != 12:
+        return None
+    digits = digits.upper()
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+class AddressIndex:
+    """
+    In-memory {ip: owners} and {mac: owners} maps. Each owner is a dict
+    with source, subscription_id, customer_id and username.
+    """
+
+    def __init__(self):
+        self.ips = {}
+        self.macs = {}
+        self.built_at = None
+        self._lock = threading.Lock()
+
+    def lookup(self, ip=None, mac=None):
+        self._ensure_fresh()
+        if ip is not None:
+            owners = self.ips.get(normalize_ip(ip), ())
+        else:
+            owners = self.macs.get(normalize_mac(mac), ())
+        return [dict(owner) for owner in owners]
+
+    def invalidate(self):
+        self.built_at = None
+
+    def _ensure_fresh(self):
+        if self.built_at is not None and time.monotonic() - self.built_at < settings.MIKROTIK_ADDRESS_INDEX_TTL:
+            return
+        with self._lock:
+            if self.built_at is not None and time.monotonic() - self.built_at < settings.MIKROTIK_ADDRESS_INDEX_TTL:
+                return
+            self.ips, self.macs = build_index()
+            self.built_at = time.monotonic()
+
+    @property
+    def age(self):
+        return None if self.built_at is None else time.monotonic() - self.built_at
+
+
+def build_index():
+    """
+    Build the ip and mac maps from the database (one query per source)
+    """
+    ips = defaultdict(list)
+    macs = defaultdict(list)
+
+    subscriptions = {
+        row['mikrotik_username']: row
+        for row in Subscription.objects.exclude(status='cancelled').values(
+            'id', 'customer_id', 'mikrotik_username', 'framed_ip_address', 'mac_address'
+        )
+    }
+
+    def add(source, ip, mac, username, subscription_id, customer_id, router_id=None):
+        owner = {
+            'source': source,
+            'subscription_id': subscription_id,
+            'customer_id': customer_id,
+            'username': username,
+            'router_id': router_id,
+        }
+        ip = normalize_ip(ip) if ip else None
+        mac = normalize_mac(mac) if mac else None
+        if ip:
+            ips[ip].append(owner)
+        if mac:
+            macs[mac].append(owner)
+
+    for session in LiveSession.objects.values('router_id', 'username', 'ip_address', 'mac_address'):
+        subscription = subscriptions.get(session['username'], {})
+        add(
+            'live_session', session['ip_address'], session['mac_address'], session['username'],
+            subscription.get('id'), subscription.get('customer_id'), session['router_id']
+        )
+
+    for subscription in subscriptions.values():
+        if subscription['framed_ip_address'] or subscription['mac_address']:
+            add(
+                'subscription', subscription['framed_ip_address'], subscription['mac_address'],
+                subscription['mikrotik_username'], subscription['id'], subscription['customer_id']
+            )
+
+    subscription_by_customer = {}
+    for subscription in subscriptions.values():
+        subscription_by_customer.setdefault(subscription['customer_id'], subscription)
+    for customer_id, static_ip, mac_address in Customer.objects.filter(
+        Q(static_ip__isnull=False) | Q(mac_address__isnull=False)
+    ).values_list('id', 'static_ip', 'mac_address'):
+        subscription = subscription_by_customer.get(customer_id, {})
+        add(
+            'customer', static_ip, mac_address, subscription.get('mikrotik_username'),
+            subscription.get('id'), customer_id
+        )
+
+    logger.debug(f"Address index built: {len(ips)} IPs, {len(macs)} MACs")
+    return dict(ips), dict(macs)
+
+
+address_index = AddressIndex()
+
+
+def with_customers(rows):
+    """
+    Add customer code and name to owner/lease dicts (one query)
+    """
+    customers = {
+        row['id']: row
+        for row in Customer.objects.filter(
+            pk__in={row['customer_id'] for row in rows if row.get('customer_id')}
+        ).values('id', 'customer_id', 'name', 'phone')
+    }
+    for row in rows:
+        customer = customers.get(row.get('customer_id'), {})
+        row['customer_code'] = customer.get('customer_id')
+        row['customer_name'] = customer.get('name')
+        row['customer_phone'] = str(customer['phone']) if customer.get('phone') else None
+    return rows
+
+
+def lookup_history(ip=None, mac=None, at=None, limit=20):
+    """
+    Leases of an address, newest first; with `at`, only the leases that
+    were open at that moment
+    """
+    if ip is not None:
+        leases = AddressLease.objects.filter(ip_address=normalize_ip(ip))
+    else:
+        leases = AddressLease.objects.filter(mac_address=normalize_mac(mac))
+
+    if at is not None:
+        leases = leases.filter(started_at__lte=at).filter(Q(ended_at__isnull=True) | Q(ended_at__gt=at))
+
+    return with_customers(list(
+        leases.order_by('-started_at').values(
+            'router_id', 'subscription_id', 'username', 'session_id',
+            'ip_address', 'mac_address', 'started_at', 'ended_at',
+            router_name=F('router__name'), customer_id=F('subscription__customer_id'),
+        )[:limit]
+    ))
+
+
+def record_leases(router, events):
+    """
+    Open a lease per session start and close the open leases of users
+    with a stop. Call in the transaction that stores the events.
+    """
+    stops = [event for event in events if event.event == 'stop']
+    starts = [event for event in events if event.event == 'start']
+
+    if stops:
+        # All stops of one snapshot diff share the detection time
+        ended_at = max(event.occurred_at for event in stops)
+        AddressLease.objects.filter(
+            router=router,
+            username__in={event.username for event in stops},
+            ended_at__isnull=True
+        ).update(ended_at=ended_at)
+
+    AddressLease.objects.bulk_create([
+        AddressLease(
+            router=router,
+            subscription_id=event.subscription_id,
+            username=event.username,
+            session_id=event.session_id,
+            ip_address=event.ip_address,
+            mac_address=normalize_mac(event.mac_address),
+            started_at=event.occurred_at,
+        )
+        for event in starts
+    ], batch_size=1000)
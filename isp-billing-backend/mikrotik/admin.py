@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Package, MikroTikRouter, MikroTikQueueProfile, MikroTikSyncLog
+from .models import Package, MikroTikRouter, MikroTikQueueProfile, MikroTikSyncLog, MikroTikSyncLogSummary
+from utils.pagination import EstimatedCountPaginator
 
 
 @admin.register(Package)
@@ -95,23 +96,42 @@ class MikroTikSyncLogAdmin(admin.ModelAdmin):
     ordering = ['-created_at']
     readonly_fields = [
         'router', 'action', 'status', 'entity_type', 'entity_id',
-        'request_data', 'response_data', 'error_message', 'created_at'
+        'request_payload', 'response_payload', 'error_message', 'created_at'
     ]
+    # The table can hold millions of rows
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         ('Log Information', {
             'fields': ('router', 'action', 'status', 'entity_type', 'entity_id')
         }),
         ('Details', {
-            'fields': ('request_data', 'response_data', 'error_message')
+            'fields': ('request_payload', 'response_payload', 'error_message')
         }),
         ('Timestamp', {
             'fields': ('created_at',)
         }),
     )
     
+    @admin.display(description='Request data')
+    def request_payload(self, obj):
+        return obj.get_request_data()
+    
+    @admin.display(description='Response data')
+    def response_payload(self, obj):
+        return obj.get_response_data()
+    
     def has_add_permission(self, request):
         return False
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(MikroTikSyncLogSummary)
+class MikroTikSyncLogSummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'router', 'action', 'status', 'count']
+    list_filter = ['action', 'status', 'router', 'date']
+    ordering = ['-date']
+    readonly_fields = ['date', 'router', 'action', 'status', 'count', 'updated_at']
@@ -0,0 +1,288 @@
+"""
+Router configuration backups.
+
+The backup_router_configs job pulls /export from all active routers in
+parallel (fetch_from_routers): each router writes its export to a file,
+which is downloaded over FTP and removed again. RouterOS 7 leaves
+passwords and secrets out of an export unless show-sensitive is given;
+RouterOS 6 always includes them and does not know the flag. Backups
+requested from the API run as a RouterJob (backup_job).
+
+Snapshots are content-addressed. The export is normalized (RouterOS puts
+the export time in its first line) and hashed, and ConfigBlob rows are
+keyed by that SHA-256:
+
+- an unchanged configuration stores nothing new; only last_seen_at of the
+  router's latest RouterConfigBackup moves
+- identical configurations of different routers share one blob
+- a changed configuration is stored as a zlib-compressed line delta
+  against the router's previous version (ranges of base lines to copy plus
+  inserted lines), or whole when the delta is not smaller or the delta
+  chain reached MIKROTIK_BACKUP_MAX_DELTA_CHAIN
+"""
+import difflib
+import ftplib
+import hashlib
+import json
+import logging
+import re
+import zlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import circuit
+from .jobs import JobFailed
+from .models import ConfigBlob, MikroTikRouter, RouterConfigBackup
+from .pool import RouterSession
+from .services import fetch_from_routers
+
+logger = logging.getLogger(__name__)
+
+# RouterOS appends .rsc to the export file name
+EXPORT_FILE_NAME = 'isp-billing-backup'
+
+# First line of an export, e.g. "# 2026-10-17 03:00:02 by RouterOS 7.15.3"
+EXPORT_HEADER = re.compile(r'^# .* by RouterOS\b')
+
+
+def normalize_export(text):
+    """
+    Export text without the timestamp header, with \\n line endings
+    """
+    lines = [line.rstrip('\r') for line in text.splitlines()]
+    if lines and EXPORT_HEADER.match(lines[0]):
+        lines = lines[1:]
+    return _join(lines)
+
+
+def config_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def encode_delta(base_lines, lines):
+    """
+    Line delta from base_lines to lines: a list of [start, end] ranges of
+    base lines to copy and strings to insert.
+    Returns (ops, added_lines, removed_lines).
+    """
+    ops = []
+    added = removed = 0
+    matcher = difflib.SequenceMatcher(None, base_lines, lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+            continue
+        if tag in ('replace', 'insert'):
+            ops.extend(lines[j1:j2])
+            added += j2 - j1
+        if tag in ('replace', 'delete'):
+            removed += i2 - i1
+    return ops, added, removed
+
+
+def apply_delta(base_lines, ops):
+    lines = []
+    for op in ops:
+        if isinstance(op, str):
+            lines.append(op)
+        else:
+            lines.extend(base_lines[op[0]:op[1]])
+    return lines
+
+
+def config_text(blob):
+    """
+    Full configuration text of a blob, applying its delta chain
+    """
+    chain = []
+    while blob.base_id:
+        chain.append(blob)
+        blob = blob.base
+    text = zlib.decompress(bytes(blob.data)).decode('utf-8')
+    if not chain:
+        return text
+
+    lines = text.splitlines()
+    for delta in reversed(chain):
+        lines = apply_delta(lines, json.loads(zlib.decompress(bytes(delta.data))))
+    return _join(lines)
+
+
+def store_config(router, text, seen_at=None):
+    """
+    Store an export of a router. Returns (backup, changed): an unchanged
+    configuration only moves last_seen_at of the latest backup.
+    """
+    seen_at = seen_at or timezone.now()
+    text = normalize_export(text)
+    sha256 = config_hash(text)
+
+    previous = RouterConfigBackup.objects.filter(router=router).select_related('blob').order_by('-created_at').first()
+    if previous is not None and previous.blob.sha256 == sha256:
+        RouterConfigBackup.objects.filter(pk=previous.pk).update(last_seen_at=seen_at)
+        previous.last_seen_at = seen_at
+        return previous, False
+
+    lines = text.splitlines()
+    ops, added, removed = None, len(lines), 0
+    if previous is not None:
+        ops, added, removed = encode_delta(config_text(previous.blob).splitlines(), lines)
+
+    blob = ConfigBlob.objects.filter(sha256=sha256).first()
+    if blob is None:
+        blob = _create_blob(sha256, text, previous.blob if previous is not None else None, ops)
+
+    backup = RouterConfigBackup.objects.create(
+        router=router,
+        blob=blob,
+        created_at=seen_at,
+        last_seen_at=seen_at,
+        lines=len(lines),
+        added_lines=added,
+        removed_lines=removed,
+    )
+    return backup, True
+
+
+def diff_backups(old, new, context=3):
+    """
+    Unified diff between two backups as a list of lines
+    """
+    return list(difflib.unified_diff(
+        config_text(old.blob).splitlines(),
+        config_text(new.blob).splitlines(),
+        fromfile=f'{old.router.name} {old.created_at.isoformat()}',
+        tofile=f'{new.router.name} {new.created_at.isoformat()}',
+        n=context,
+        lineterm=''
+    ))
+
+
+def export_router_config(router):
+    """
+    Run /export on the router into a file, download it over FTP and remove
+    it again. Uses its own session with the backup deadline.
+    """
+    file_name = f'{EXPORT_FILE_NAME}.rsc'
+    session = RouterSession(
+        router,
+        connect_timeout=settings.MIKROTIK_CONNECT_TIMEOUT,
+        read_timeout=settings.MIKROTIK_BACKUP_TIMEOUT
+    )
+    try:
+        resource = session.api.get_resource('/system/resource').get()
+        arguments = {'file': EXPORT_FILE_NAME}
+        if resource and routeros_major_version(resource[0].get('version')) >= 7:
+            arguments['show-sensitive'] = ''
+        session.api.get_resource('/').call('export', arguments)
+        contents = download_file(router, file_name)
+        file_resource = session.api.get_resource('/file')
+        for export_file in file_resource.call('print', {'.proplist': '.id'}, {'name': file_name}):
+            file_resource.remove(id=export_file['id'])
+    finally:
+        session.close()
+    return contents.decode('utf-8', errors='replace')
+
+
+def routeros_major_version(version):
+    """
+    Major version of a /system/resource version string, e.g. 7 for
+    "7.15.3 (stable)" (0 when unknown)
+    """
+    match = re.match(r'\s*(\d+)', version or '')
+    return int(match.group(1)) if match else 0
+
+
+def download_file(router, file_name):
+    """
+    Download a file from the router's FTP server. Returns bytes.
+    """
+    chunks = []
+    ftp = ftplib.FTP(timeout=settings.MIKROTIK_BACKUP_TIMEOUT)
+    try:
+        ftp.connect(str(router.ip_address), settings.MIKROTIK_FTP_PORT)
+        ftp.login(router.username, router.password)
+        ftp.retrbinary(f'RETR {file_name}', chunks.append)
+        ftp.quit()
+    finally:
+        ftp.close()
+    return b''.join(chunks)
+
+
+def backup_router(service):
+    """
+    Back up one router (fetch_from_routers worker). Returns a result dict.
+    """
+    router = service.router
+    if not circuit.allow_request(router):
+        raise ConnectionError(f"Circuit open for {router.name}")
+
+    backup, changed = store_config(router, export_router_config(router))
+    return {'backup_id': backup.pk, 'changed': changed, 'size': backup.blob.size}
+
+
+def backup_routers(routers=None):
+    """
+    Back up all active routers concurrently. Returns a summary dict.
+    """
+    if routers is None:
+        routers = MikroTikRouter.objects.filter(status='active')
+    routers = {router.pk: router for router in routers}
+
+    results, errors = fetch_from_routers(
+        routers.values(), backup_router, timeout=settings.MIKROTIK_BACKUP_TIMEOUT
+    )
+
+    summary = {
+        'routers': len(routers),
+        'changed': sum(1 for result in results.values() if result['changed']),
+        'unchanged': sum(1 for result in results.values() if not result['changed']),
+        'errors': {routers[router_id].name: message for router_id, message in errors.items()},
+    }
+    logger.info(
+        f"Config backup: {summary['changed']} changed, {summary['unchanged']} unchanged, "
+        f"{len(summary['errors'])} failed of {summary['routers']} routers"
+    )
+    return summary
+
+
+def backup_job(job):
+    """
+    RouterJob handler: back up the job's router (see mikrotik/jobs.py)
+    """
+    summary = backup_routers([job.router])
+    if summary['errors']:
+        raise JobFailed(summary['errors'][job.router.name], result=summary)
+    latest = RouterConfigBackup.objects.filter(router=job.router).order_by('-created_at').first()
+    return dict(summary, backup_id=latest.pk)
+
+
+def _create_blob(sha256, text, base, ops):
+    """
+    Store a new configuration whole or as a delta against base, whichever
+    is smaller (bounded delta chains keep reads cheap)
+    """
+    data = zlib.compress(text.encode('utf-8'))
+    if base is not None and ops is not None and base.depth < settings.MIKROTIK_BACKUP_MAX_DELTA_CHAIN:
+        delta = zlib.compress(json.dumps(ops, separators=(',', ':')).encode('utf-8'))
+        if len(delta) < len(data):
+            data = delta
+        else:
+            base = None
+    else:
+        base = None
+
+    # Another router may store the same configuration concurrently
+    blob, _ = ConfigBlob.objects.get_or_create(sha256=sha256, defaults={
+        'base': base,
+        'data': data,
+        'size': len(text.encode('utf-8')),
+        'stored_size': len(data),
+        'depth': base.depth + 1 if base is not None else 0,
+    })
+    return blob
+
+
+def _join(lines):
+    return '\n'.join(lines) + '\n' if lines else ''
@@ -0,0 +1,122 @@
+"""
+Per-router circuit breaker.
+
+State lives on the MikroTikRouter row so every gunicorn worker, the
+scheduler and the MikroTik worker share it:
+
+- closed: calls go through; consecutive connection failures are counted
+- open: calls fail fast until circuit_retry_at
+- half_open: one caller (whoever wins the conditional UPDATE) probes the
+  router; success closes the circuit, failure opens it again
+
+Checks use the state already loaded on the router instance, so a closed
+circuit costs no query. The row is only read again when the retry time
+of an open circuit has come (to pick up a close or probe by another
+process) and after a failure that did not open the circuit here.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import MikroTikRouter
+
+logger = logging.getLogger(__name__)
+
+
+def allow_request(router):
+    """
+    Decide whether a call to router may go out, from the router's loaded
+    circuit state. Only an open circuit whose retry time has come goes to
+    the database, to refresh the state and claim the half-open probe.
+    """
+    if router.circuit_state == 'closed':
+        return True
+
+    now = timezone.now()
+    if router.circuit_retry_at and router.circuit_retry_at > now:
+        return False
+
+    # Another process may have closed the circuit or started probing
+    if not _refresh(router):
+        return True
+    if router.circuit_state == 'closed':
+        return True
+    if router.circuit_retry_at and router.circuit_retry_at > now:
+        return False
+
+    # Retry time reached: only one caller gets to probe
+    claimed = MikroTikRouter.objects.filter(
+        pk=router.pk,
+        circuit_state__in=('open', 'half_open'),
+        circuit_retry_at__lte=now
+    ).update(
+        circuit_state='half_open',
+        circuit_retry_at=now + timedelta(seconds=settings.MIKROTIK_CIRCUIT_RESET_TIMEOUT)
+    )
+    if claimed:
+        router.circuit_state = 'half_open'
+        logger.info(f"Circuit half-open for router {router.name}, probing")
+    return bool(claimed)
+
+
+def record_success(router):
+    """
+    Close the circuit after a successful connection
+    """
+    if router.circuit_state == 'closed' and not router.circuit_failures:
+        return
+
+    MikroTikRouter.objects.filter(pk=router.pk).update(
+        circuit_state='closed', circuit_failures=0, circuit_opened_at=None, circuit_retry_at=None
+    )
+    if router.circuit_state != 'closed':
+        logger.info(f"Circuit closed for router {router.name}")
+    router.circuit_state = 'closed'
+    router.circuit_failures = 0
+    router.circuit_opened_at = None
+    router.circuit_retry_at = None
+
+
+def record_failure(router):
+    """
+    Count a connection failure; open the circuit once the threshold is
+    reached or when a half-open probe fails.
+    """
+    now = timezone.now()
+    retry_at = now + timedelta(seconds=settings.MIKROTIK_CIRCUIT_RESET_TIMEOUT)
+
+    MikroTikRouter.objects.filter(pk=router.pk).update(circuit_failures=F('circuit_failures') + 1)
+    opened = MikroTikRouter.objects.filter(pk=router.pk).filter(
+        Q(circuit_state='half_open')
+        | Q(circuit_state='closed', circuit_failures__gte=settings.MIKROTIK_CIRCUIT_FAILURE_THRESHOLD)
+    ).update(
+        circuit_state='open', circuit_opened_at=now, circuit_retry_at=retry_at, is_online=False
+    )
+
+    router.circuit_failures += 1
+    if opened:
+        logger.warning(
+            f"Circuit opened for router {router.name}; failing fast until {retry_at:%H:%M:%S}"
+        )
+        router.circuit_state = 'open'
+        router.circuit_opened_at = now
+        router.circuit_retry_at = retry_at
+        router.is_online = False
+    else:
+        # The loaded state may be stale (e.g. opened by another process)
+        _refresh(router)
+
+
+def _refresh(router):
+    # Re-read the circuit fields of router; False when the row is gone
+    row = MikroTikRouter.objects.filter(pk=router.pk).values(
+        'circuit_state', 'circuit_failures', 'circuit_opened_at', 'circuit_retry_at'
+    ).first()
+    if row is None:
+        return False
+    for field, value in row.items():
+        setattr(router, field, value)
+    return True
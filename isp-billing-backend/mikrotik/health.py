@@ -0,0 +1,171 @@
+"""
+Router health monitor.
+
+The probe_router_health job probes every router in parallel and stores one
+RouterHealthSample per router:
+
+- connect_ms: TCP connect time to the API port (fresh socket, no login)
+- rtt_ms: round trip of a /system/resource print over the pooled session
+- cpu_load, memory_used, uptime from /system/resource
+
+is_online/last_connected_at on the router are refreshed from the result,
+and the router list reads the latest sample from the table instead of
+contacting the routers.
+"""
+import logging
+import re
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from routeros_api.exceptions import RouterOsApiConnectionError
+
+from .models import MikroTikRouter, RouterHealthSample
+from .services import fetch_from_routers
+
+logger = logging.getLogger(__name__)
+
+# Sample fields exposed as health_<field> annotations on router querysets
+LATEST_FIELDS = ('sampled_at', 'is_online', 'connect_ms', 'rtt_ms', 'cpu_load', 'memory_used', 'uptime', 'error')
+
+UPTIME_UNITS = {'w': 604800, 'd': 86400, 'h': 3600, 'm': 60, 's': 1}
+
+
+def probe_routers(routers=None):
+    """
+    Probe routers concurrently and store one sample each.
+    Returns the list of samples.
+    """
+    if routers is None:
+        routers = MikroTikRouter.objects.filter(status='active')
+    routers = list(routers)
+    if not routers:
+        return []
+
+    results, errors = fetch_from_routers(routers, probe_router, timeout=settings.MIKROTIK_HEALTH_PROBE_TIMEOUT)
+
+    now = timezone.now()
+    samples = []
+    for router in routers:
+        if router.pk in results:
+            sample = results[router.pk]
+        else:
+            sample = RouterHealthSample(router=router, is_online=False, error=errors.get(router.pk, '')[:255])
+        sample.sampled_at = now
+        samples.append(sample)
+
+    online = [sample.router_id for sample in samples if sample.is_online]
+    offline = [sample.router_id for sample in samples if not sample.is_online]
+
+    with transaction.atomic():
+        RouterHealthSample.objects.bulk_create(samples)
+        MikroTikRouter.objects.filter(pk__in=online).update(is_online=True, last_connected_at=now)
+        MikroTikRouter.objects.filter(pk__in=offline, is_online=True).update(is_online=False)
+
+    logger.info(f"Health probe: {len(online)}/{len(samples)} routers online")
+    return samples
+
+
+def probe_router(service):
+    """
+    Probe one router. Returns an unsaved RouterHealthSample.
+    """
+    router = service.router
+    sample = RouterHealthSample(router=router, is_online=False)
+
+    try:
+        sample.connect_ms = _tcp_connect_ms(router)
+    except OSError as e:
+        sample.error = f"API port unreachable: {e}"[:255]
+        return sample
+
+    if not service.connect():
+        sample.error = 'Circuit open' if router.circuit_state == 'open' else 'API login failed'
+        return sample
+
+    try:
+        started = time.monotonic()
+        resource = service.api.get_resource('/system/resource').call(
+            'print', {'.proplist': 'cpu-load,free-memory,total-memory,uptime'}
+        )
+        sample.rtt_ms = round((time.monotonic() - started) * 1000, 2)
+    except RouterOsApiConnectionError as e:
+        sample.error = str(e)[:255]
+        return sample
+    finally:
+        service.disconnect()
+
+    sample.is_online = True
+    if resource:
+        resource = resource[0]
+        sample.cpu_load = _int_or_none(resource.get('cpu-load'))
+        total_memory = _int_or_none(resource.get('total-memory'))
+        free_memory = _int_or_none(resource.get('free-memory'))
+        if total_memory and free_memory is not None:
+            sample.memory_used = round((total_memory - free_memory) * 100 / total_memory)
+        sample.uptime = parse_uptime(resource.get('uptime'))
+    return sample
+
+
+def with_latest_health(queryset):
+    """
+    Annotate a router queryset with its latest sample as health_<field>
+    """
+    latest = RouterHealthSample.objects.filter(router=OuterRef('pk')).order_by('-sampled_at')
+    return queryset.annotate(**{
+        f'health_{field}': Subquery(latest.values(field)[:1]) for field in LATEST_FIELDS
+    })
+
+
+def latest_health(router):
+    """
+    Latest health of a router as a dict (None if never probed).
+    Uses the health_* annotations when the router came from with_latest_health().
+    """
+    if hasattr(router, 'health_sampled_at'):
+        if router.health_sampled_at is None:
+            return None
+        return {field: getattr(router, f'health_{field}') for field in LATEST_FIELDS}
+
+    return RouterHealthSample.objects.filter(router=router).order_by('-sampled_at').values(*LATEST_FIELDS).first()
+
+
+def prune_health_samples(retention_days=None):
+    """
+    Delete samples older than the retention period
+    """
+    retention_days = settings.MIKROTIK_HEALTH_RETENTION_DAYS if retention_days is None else retention_days
+    if not retention_days:
+        return 0
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = RouterHealthSample.objects.filter(sampled_at__lt=cutoff).delete()
+    return deleted
+
+
+def parse_uptime(value):
+    """
+    RouterOS uptime like '1w2d3h4m5s' in seconds
+    """
+    if not value:
+        return None
+    parts = re.findall(r'(\d+)([wdhms])', value)
+    if not parts:
+        return None
+    return sum(int(amount) * UPTIME_UNITS[unit] for amount, unit in parts)
+
+
+def _tcp_connect_ms(router):
+    started = time.monotonic()
+    with socket.create_connection((str(router.ip_address), router.api_port), timeout=settings.MIKROTIK_CONNECT_TIMEOUT):
+        return round((time.monotonic() - started) * 1000, 2)
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,471 @@
+"""
+Static IP pools.
+
+An IPPool covers one IPv4 CIDR. IPAllocation rows are the source of truth;
+the pool caches its free addresses as sorted, non-overlapping
+[first, last] host offset ranges (IPPool.free_ranges):
+
+- next free address: start of the first range, O(1)
+- allocate/release a specific address: bisect into the ranges
+- a /16 with scattered allocations stays a short list, unlike a row per
+  address
+
+Pools are changed under a row lock (select_for_update), so concurrent
+allocations never hand out the same address; the unique address on
+IPAllocation backs that up. Customer.static_ip is kept in step with the
+customer's allocation.
+
+Before an address is handed out it is checked against Customer.static_ip
+and the live session snapshot; addresses found in use are adopted (owned
+by that customer) or reserved instead of being allocated twice.
+"""
+import ipaddress
+import logging
+from bisect import bisect_right
+
+from django.db import transaction
+
+from customers.models import Customer
+from subscription.models import Subscription
+from .models import IPPool, IPAllocation, LiveSession
+
+logger = logging.getLogger(__name__)
+
+# Largest pool accepted (a /16)
+MAX_POOL_SIZE = 65536
+
+
+class PoolError(Exception):
+    """
+    Invalid pool or allocation request
+    """
+
+
+class FreeRanges:
+    """
+    Sorted list of free [first, last] offsets (inclusive)
+    """
+
+    def __init__(self, ranges=None):
+        self.ranges = [list(r) for r in ranges or []]
+
+    def __len__(self):
+        return sum(last - first + 1 for first, last in self.ranges)
+
+    def first(self):
+        return self.ranges[0][0] if self.ranges else None
+
+    def contains(self, offset):
+        index = bisect_right(self.ranges, [offset, float('inf')]) - 1
+        return index >= 0 and self.ranges[index][0] <= offset <= self.ranges[index][1]
+
+    def take(self, offset):
+        """
+        Remove one offset; returns False if it was not free
+        """
+        index = bisect_right(self.ranges, [offset, float('inf')]) - 1
+        if index < 0:
+            return False
+        first, last = self.ranges[index]
+        if not first <= offset <= last:
+            return False
+
+        if first == last:
+            del self.ranges[index]
+        elif offset == first:
+            self.ranges[index][0] += 1
+        elif offset == last:
+            self.ranges[index][1] -= 1
+        else:
+            self.ranges[index:index + 1] = [[first, offset - 1], [offset + 1, last]]
+        return True
+
+    def give(self, offset):
+        """
+        Add one offset back; returns False if it was already free
+        """
+        index = bisect_right(self.ranges, [offset, float('inf')])
+        previous = self.ranges[index - 1] if index > 0 else None
+        following = self.ranges[index] if index < len(self.ranges) else None
+
+        if previous and previous[1] >= offset:
+            return False
+        joins_previous = previous is not None and previous[1] == offset - 1
+        joins_following = following is not None and following[0] == offset + 1
+
+        if joins_previous and joins_following:
+            previous[1] = following[1]
+            del self.ranges[index]
+        elif joins_previous:
+            previous[1] = offset
+        elif joins_following:
+            following[0] = offset
+        else:
+            self.ranges.insert(index, [offset, offset])
+        return True
+
+
+def parse_network(value):
+    """
+    Validate and normalise a pool CIDR. Raises PoolError.
+    """
+    try:
+        network = ipaddress.ip_network(str(value).strip(), strict=False)
+    except ValueError as e:
+        raise PoolError(f"Invalid network: {e}")
+    if network.version != 4:
+        raise PoolError("Only IPv4 pools are supported")
+    if network.num_addresses > MAX_POOL_SIZE:
+        raise PoolError(f"Pool is larger than {MAX_POOL_SIZE} addresses")
+    return network
+
+
+def find_overlapping_pool(network, exclude=None):
+    """
+    Existing pool whose network overlaps `network`, if any
+    """
+    pools = IPPool.objects.all()
+    if exclude is not None:
+        pools = pools.exclude(pk=exclude.pk)
+    for pool in pools.only('id', 'name', 'network'):
+        if ipaddress.ip_network(pool.network).overlaps(network):
+            return pool
+    return None
+
+
+def usable_offsets(pool):
+    """
+    (first, last) host offsets of the pool, without network and broadcast
+    """
+    network = ipaddress.ip_network(pool.network)
+    if network.prefixlen >= 31:
+        return 0, network.num_addresses - 1
+    return 1, network.num_addresses - 2
+
+
+def offset_of(pool, address):
+    """
+    Host offset of an address, or None if it lies outside the pool
+    """
+    network = ipaddress.ip_network(pool.network)
+    try:
+        address = ipaddress.ip_address(str(address))
+    except ValueError:
+        return None
+    if address.version != 4 or address not in network:
+        return None
+    return int(address) - int(network.network_address)
+
+
+def address_at(pool, offset):
+    return str(ipaddress.ip_network(pool.network).network_address + offset)
+
+
+def next_free_address(pool):
+    """
+    Next address allocate_addresses() would try (without allocating it)
+    """
+    offset = FreeRanges(pool.free_ranges).first()
+    return None if offset is None else address_at(pool, offset)
+
+
+def rebuild_pool(pool):
+    """
+    Recompute the free ranges from the allocations. Customers whose
+    static_ip lies in the pool without an allocation are adopted.
+    Returns the number of adopted addresses.
+    """
+    with transaction.atomic():
+        pool = IPPool.objects.select_for_update().get(pk=pool.pk)
+        first, last = usable_offsets(pool)
+
+        taken = {
+            offset_of(pool, address)
+            for address in IPAllocation.objects.filter(pool=pool).values_list('address', flat=True)
+        }
+        adopted = []
+        for customer_id, static_ip in _customer_static_ips():
+            offset = offset_of(pool, static_ip)
+            if offset is None or offset in taken:
+                continue
+            taken.add(offset)
+            adopted.append(IPAllocation(
+                pool=pool, address=str(static_ip), customer_id=customer_id, note='Adopted from customer static IP'
+            ))
+        IPAllocation.objects.bulk_create(adopted, ignore_conflicts=True)
+
+        gateway = offset_of(pool, pool.gateway) if pool.gateway else None
+        ranges = FreeRanges([[first, last]] if first <= last else [])
+        for offset in taken | {gateway}:
+            if offset is not None:
+                ranges.take(offset)
+
+        pool.free_ranges = ranges.ranges
+        pool.size = last - first + 1 - (1 if gateway is not None and first <= gateway <= last else 0)
+        pool.free_count = len(ranges)
+        pool.save(update_fields=['free_ranges', 'size', 'free_count', 'updated_at'])
+
+    if adopted:
+        logger.info(f"Pool {pool.name}: adopted {len(adopted)} existing static IPs")
+    return len(adopted)
+
+
+def allocate_addresses(pool, customers):
+    """
+    Give each customer the next free address of the pool (customers that
+    already hold an address in the pool keep it). Conflicting addresses
+    found on the way are adopted or reserved and skipped.
+
+    Returns {customer_id: address}. Raises PoolError when the pool runs out.
+    """
+    customers = list(customers)
+    if not customers:
+        return {}
+
+    with transaction.atomic():
+        pool = IPPool.objects.select_for_update().get(pk=pool.pk)
+        ranges = FreeRanges(pool.free_ranges)
+
+        result = dict(
+            IPAllocation.objects.filter(pool=pool, customer__in=customers).values_list('customer_id', 'address')
+        )
+        pending = [customer for customer in customers if customer.pk not in result]
+        held_elsewhere = dict(
+            IPAllocation.objects.filter(customer__in=pending).exclude(pool=pool).values_list('customer_id', 'address')
+        )
+        if held_elsewhere:
+            customer_id, address = next(iter(held_elsewhere.items()))
+            raise PoolError(f"Customer {customer_id} already holds {address} in another pool")
+
+        allocations, extra = [], []
+
+        # Customers whose current static IP is a free address of the pool keep it
+        for customer in list(pending):
+            offset = offset_of(pool, customer.static_ip) if customer.static_ip else None
+            if offset is not None and ranges.take(offset):
+                pending.remove(customer)
+                allocations.append(IPAllocation(pool=pool, address=address_at(pool, offset), customer=customer))
+                result[customer.pk] = address_at(pool, offset)
+
+        while pending:
+            if not ranges.ranges:
+                raise PoolError(f"Pool {pool.name} has no free addresses left")
+
+            # Candidates for this round, checked for conflicts in one go
+            candidates = []
+            for first, last in ranges.ranges:
+                candidates.extend(range(first, min(last, first + len(pending) - len(candidates) - 1) + 1))
+                if len(candidates) >= len(pending):
+                    break
+            addresses = {offset: address_at(pool, offset) for offset in candidates}
+            conflicts = _conflicting_addresses(addresses.values())
+
+            for offset, address in addresses.items():
+                ranges.take(offset)
+                owner = conflicts.get(address)
+                if owner is not None:
+                    extra.append(_conflict_allocation(pool, address, owner))
+                    continue
+                customer = pending.pop(0)
+                allocations.append(IPAllocation(pool=pool, address=address, customer=customer))
+                result[customer.pk] = address
+
+        IPAllocation.objects.bulk_create(extra + allocations)
+        for allocation in allocations:
+            allocation.customer.static_ip = allocation.address
+        Customer.objects.bulk_update([a.customer for a in allocations], ['static_ip'])
+
+        pool.free_ranges = ranges.ranges
+        pool.free_count = len(ranges)
+        pool.save(update_fields=['free_ranges', 'free_count', 'updated_at'])
+
+    if extra:
+        logger.warning(f"Pool {pool.name}: skipped {len(extra)} addresses already in use")
+    return result
+
+
+def allocate_address(pool, customer, address=None):
+    """
+    Allocate one address to a customer: the given one or the next free.
+    Raises PoolError on conflicts.
+    """
+    if address is None:
+        return allocate_addresses(pool, [customer])[customer.pk]
+
+    with transaction.atomic():
+        pool = IPPool.objects.select_for_update().get(pk=pool.pk)
+        offset = offset_of(pool, address)
+        if offset is None:
+            raise PoolError(f"{address} is not in pool {pool.network}")
+        address = address_at(pool, offset)
+
+        existing = IPAllocation.objects.filter(customer=customer).first()
+        if existing is not None:
+            if existing.address == address:
+                return address
+            raise PoolError(f"Customer already holds {existing.address}")
+
+        ranges = FreeRanges(pool.free_ranges)
+        if not ranges.take(offset):
+            raise PoolError(f"{address} is not free")
+        owner = _conflicting_addresses([address]).get(address)
+        if owner is not None and not _owned_by(owner, customer):
+            raise PoolError(f"{address} is in use by {_describe(owner)}")
+
+        IPAllocation.objects.create(pool=pool, address=address, customer=customer)
+        Customer.objects.filter(pk=customer.pk).update(static_ip=address)
+        customer.static_ip = address
+
+        pool.free_ranges = ranges.ranges
+        pool.free_count = len(ranges)
+        pool.save(update_fields=['free_ranges', 'free_count', 'updated_at'])
+    return address
+
+
+def release_addresses(pool, addresses=None, customers=None):
+    """
+    Return addresses (or the addresses of customers) to the pool and clear
+    the matching Customer.static_ip. Returns the released addresses.
+    """
+    with transaction.atomic():
+        pool = IPPool.objects.select_for_update().get(pk=pool.pk)
+        allocations = IPAllocation.objects.filter(pool=pool)
+        if addresses is not None:
+            allocations = allocations.filter(address__in=[str(address) for address in addresses])
+        if customers is not None:
+            allocations = allocations.filter(customer__in=customers)
+        allocations = list(allocations.values_list('id', 'address', 'customer_id'))
+        if not allocations:
+            return []
+
+        ranges = FreeRanges(pool.free_ranges)
+        for _, address, _ in allocations:
+            ranges.give(offset_of(pool, address))
+
+        IPAllocation.objects.filter(pk__in=[pk for pk, _, _ in allocations]).delete()
+        Customer.objects.filter(
+            pk__in=[customer_id for _, _, customer_id in allocations if customer_id],
+            static_ip__in=[address for _, address, _ in allocations]
+        ).update(static_ip=None)
+
+        pool.free_ranges = ranges.ranges
+        pool.free_count = len(ranges)
+        pool.save(update_fields=['free_ranges', 'free_count', 'updated_at'])
+
+    return [address for _, address, _ in allocations]
+
+
+def find_conflicts(pool):
+    """
+    Inconsistencies between the pool, Customer.static_ip and live sessions
+    """
+    conflicts = []
+    allocations = {
+        address: customer_id
+        for address, customer_id in IPAllocation.objects.filter(pool=pool).values_list('address', 'customer_id')
+    }
+
+    holders = {}
+    for customer_id, static_ip in _customer_static_ips():
+        if offset_of(pool, static_ip) is None:
+            continue
+        static_ip = str(static_ip)
+        holders.setdefault(static_ip, []).append(customer_id)
+
+    for address, customer_ids in holders.items():
+        if len(customer_ids) > 1:
+            conflicts.append({'address': address, 'type': 'duplicate_static_ip', 'customers': customer_ids})
+        owner = allocations.get(address)
+        for customer_id in customer_ids:
+            if owner != customer_id:
+                conflicts.append({
+                    'address': address, 'type': 'not_allocated' if address not in allocations else 'other_owner',
+                    'customer': customer_id, 'allocated_to': owner
+                })
+
+    for address, customer_id in allocations.items():
+        if customer_id and customer_id not in holders.get(address, []):
+            conflicts.append({'address': address, 'type': 'static_ip_mismatch', 'customer': customer_id})
+
+    sessions = LiveSession.objects.filter(ip_address__isnull=False)
+    if pool.router_id:
+        sessions = sessions.filter(router_id=pool.router_id)
+    in_pool = [
+        (username, str(address))
+        for username, address in sessions.values_list('username', 'ip_address')
+        if offset_of(pool, address) is not None
+    ]
+    customer_by_username = dict(
+        Subscription.objects.filter(mikrotik_username__in=[username for username, _ in in_pool])
+        .values_list('mikrotik_username', 'customer_id')
+    )
+    for username, address in in_pool:
+        customer_id = customer_by_username.get(username)
+        if address not in allocations or allocations[address] not in (customer_id, None):
+            conflicts.append({
+                'address': address, 'type': 'live_session', 'username': username,
+                'customer': customer_id, 'allocated_to': allocations.get(address)
+            })
+
+    return conflicts
+
+
+def address_in_use(address, customer=None):
+    """
+    Who else uses an address (pool allocation, another customer's static
+    IP or a live session of another customer), as text; None if nobody
+    """
+    address = str(address)
+    allocation = IPAllocation.objects.filter(address=address).select_related('customer').first()
+    if allocation is not None and (allocation.customer_id is None or customer is None or allocation.customer_id != customer.pk):
+        return f"allocated to {allocation.customer or 'a reservation'} in pool #{allocation.pool_id}"
+
+    others = Customer.objects.filter(static_ip=address)
+    if customer is not None and customer.pk:
+        others = others.exclude(pk=customer.pk)
+    other = others.first()
+    if other is not None:
+        return f"static IP of {other}"
+
+    owner = _conflicting_addresses([address]).get(address)
+    if owner is not None and owner[0] == 'session' and (customer is None or not _owned_by(owner, customer)):
+        return _describe(owner)
+    return None
+
+
+def _customer_static_ips():
+    return Customer.objects.filter(static_ip__isnull=False).values_list('id', 'static_ip')
+
+
+def _conflicting_addresses(addresses):
+    """
+    Addresses already used outside the pool bookkeeping:
+    {address: ('customer', id) | ('session', username)}
+    """
+    addresses = [str(address) for address in addresses]
+    owners = {}
+    for username, address in LiveSession.objects.filter(ip_address__in=addresses).values_list('username', 'ip_address'):
+        owners[str(address)] = ('session', username)
+    # A customer's own static IP wins over the session it shows up in
+    for customer_id, address in Customer.objects.filter(static_ip__in=addresses).values_list('id', 'static_ip'):
+        owners[str(address)] = ('customer', customer_id)
+    return owners
+
+
+def _conflict_allocation(pool, address, owner):
+    kind, value = owner
+    if kind == 'customer':
+        return IPAllocation(pool=pool, address=address, customer_id=value, note='Adopted from customer static IP')
+    return IPAllocation(pool=pool, address=address, note=f'Reserved: in use by session {value}')
+
+
+def _owned_by(owner, customer):
+    kind, value = owner
+    if kind == 'customer':
+        return value == customer.pk
+    return Subscription.objects.filter(mikrotik_username=value, customer=customer).exists()
+
+
+def _describe(owner):
+    kind, value = owner
+    return f"customer #{value}" if kind == 'customer' else f"session {value}"
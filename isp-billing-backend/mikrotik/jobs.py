@@ -0,0 +1,191 @@
+"""
+Background jobs for long-running router work.
+
+Router work started from the API, such as provisioning a router, an
+on-demand config backup, a reconciliation that applies changes or a bulk
+package or router migration, can take far longer than an HTTP request
+may (gunicorn kills a worker after 120 seconds). Views queue a RouterJob
+with enqueue_job() and answer 202 with its id; the job worker
+(run_router_jobs) runs the jobs one at a time:
+
+- jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+  workers can share the queue
+- while a job runs, a heartbeat thread refreshes heartbeat_at; a running
+  job whose heartbeat is older than MIKROTIK_JOB_HEARTBEAT_TIMEOUT belongs
+  to a dead worker and is queued again (resumable kinds) or failed
+- the handler's return value is stored in result, and callers poll
+  /api/jobs/<id>/
+
+Handlers are referenced by dotted path, so apps that depend on mikrotik
+can register theirs without import cycles.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import RouterJob
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {
+    'provision': 'mikrotik.provisioning.provision_job',
+    'config_backup': 'mikrotik.backups.backup_job',
+    'reconcile': 'mikrotik.reconciliation.reconcile_job',
+    'package_migration': 'subscription.package_migration.package_migration_job',
+    'router_migration': 'subscription.router_migration.router_migration_job',
+}
+
+# Kinds that continue where they stopped, so the job of a dead worker is queued again
+RESUMABLE_KINDS = ('package_migration', 'router_migration')
+
+
+class JobFailed(Exception):
+    """
+    Raised by a handler whose work ran but did not succeed; the partial
+    result is stored along with the error
+    """
+
+    def __init__(self, message, result=None):
+        super().__init__(message)
+        self.result = result
+
+
+def new_worker_id():
+    """
+    Identifier of a worker process, stored on the rows it claims
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def enqueue_job(kind, router=None, params=None, created_by=None):
+    """
+    Queue a job for the job worker. Returns the RouterJob.
+    """
+    return RouterJob.objects.create(kind=kind, router=router, params=params or {}, created_by=created_by)
+
+
+def find_active_job(kind, router=None, **params):
+    """
+    Pending or running job of a kind for the same router and params, if any
+    """
+    jobs = RouterJob.objects.filter(kind=kind, status__in=('pending', 'running'))
+    if router is not None:
+        jobs = jobs.filter(router=router)
+    for key, value in params.items():
+        jobs = jobs.filter(**{f'params__{key}': value})
+    return jobs.order_by('id').first()
+
+
+def run_next_job(worker_id):
+    """
+    Claim the oldest pending job and run it to the end. Returns the job, or
+    None when the queue is empty.
+    """
+    release_dead_jobs()
+    job = _claim_job(worker_id)
+    if job is None:
+        return None
+
+    run_job(job, worker_id)
+    return job
+
+
+def run_job(job, worker_id):
+    """
+    Run a claimed job with a heartbeat and store its outcome
+    """
+    heartbeat = _Heartbeat(job.pk, worker_id)
+    heartbeat.start()
+    try:
+        handler = import_string(JOB_HANDLERS[job.kind])
+        job.result, job.error = handler(job), None
+    except JobFailed as e:
+        job.result, job.error = e.result, str(e)
+    except Exception as e:
+        logger.exception(f"Router job #{job.pk} ({job.kind}) failed: {e}")
+        job.result, job.error = None, str(e)
+    finally:
+        heartbeat.stop()
+
+    job.status = 'failed' if job.error else 'completed'
+    job.finished_at = timezone.now()
+    # A job released as dead in the meantime belongs to someone else now
+    stored = RouterJob.objects.filter(pk=job.pk, worker_id=worker_id, status='running').update(
+        status=job.status, result=job.result, error=job.error, finished_at=job.finished_at
+    )
+    if not stored:
+        logger.warning(f"Router job #{job.pk} was released before it finished; outcome dropped")
+    logger.info(f"Router job #{job.pk} ({job.kind}) {job.status}")
+    return job
+
+
+def release_dead_jobs():
+    """
+    Handle running jobs whose worker stopped sending heartbeats: resumable
+    kinds are queued again, the others are failed
+    """
+    now = timezone.now()
+    dead = RouterJob.objects.filter(
+        status='running',
+        heartbeat_at__lt=now - timedelta(seconds=settings.MIKROTIK_JOB_HEARTBEAT_TIMEOUT)
+    )
+    requeued = dead.filter(kind__in=RESUMABLE_KINDS).update(status='pending', worker_id=None)
+    failed = dead.exclude(kind__in=RESUMABLE_KINDS).update(
+        status='failed', error='Worker stopped while the job was running', finished_at=now
+    )
+    if requeued or failed:
+        logger.warning(f"Released router jobs of dead workers: {requeued} queued again, {failed} failed")
+
+
+def _claim_job(worker_id):
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            RouterJob.objects.select_for_update(skip_locked=True)
+            .filter(status='pending').order_by('id').first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.worker_id = worker_id
+        job.heartbeat_at = now
+        job.started_at = job.started_at or now
+        job.error = None
+        job.save(update_fields=['status', 'worker_id', 'heartbeat_at', 'started_at', 'error'])
+    return job
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Refreshes heartbeat_at of a running job on its own connection
+    """
+
+    def __init__(self, job_id, worker_id):
+        super().__init__(name=f'router-job-{job_id}-heartbeat', daemon=True)
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(settings.MIKROTIK_JOB_HEARTBEAT_INTERVAL):
+                try:
+                    RouterJob.objects.filter(
+                        pk=self.job_id, worker_id=self.worker_id, status='running'
+                    ).update(heartbeat_at=timezone.now())
+                except Exception as e:
+                    logger.warning(f"Heartbeat of router job #{self.job_id} failed: {e}")
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
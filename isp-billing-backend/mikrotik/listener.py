@@ -0,0 +1,382 @@
+"""
+Event-driven session tracking with the RouterOS API listen command.
+
+One asyncio process follows /ppp/active on every active router over a
+single persistent API connection per router:
+
+- on connect it starts `/ppp/active/listen` and takes a full `print`; the
+  print replaces the router's LiveSession snapshot (full resync) and
+  changes that arrive meanwhile are applied on top
+- afterwards only the deltas streamed by listen are applied, batched
+  every MIKROTIK_LISTEN_FLUSH_INTERVAL seconds
+- a heartbeat command keeps the stream honest; if it breaks (no reply,
+  connection lost, trap) the router is reconnected with backoff and
+  resynced from a fresh print
+- routers whose RouterOS has no listen support are resynced by print on
+  the same connection every MIKROTIK_SESSION_POLL_INTERVAL seconds
+
+Routers with a live stream get their sessions_refreshed_at bumped on each
+heartbeat round, so the polling job skips them.
+
+Database work runs in worker threads (asyncio.to_thread); the event loop
+only does network I/O, so hundreds of routers fit in one process.
+"""
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from routeros_api.base_api import encode_length
+
+from . import circuit
+from .live_sessions import apply_session_changes, mark_sessions_current, store_router_sessions
+from .models import MikroTikRouter
+
+logger = logging.getLogger(__name__)
+
+LISTEN_TAG = 'listen'
+RESYNC_TAG = 'resync'
+HEARTBEAT_TAG = 'heartbeat'
+
+
+class ListenerError(Exception):
+    """
+    The router refused a command or the stream is out of sync
+    """
+
+
+class RouterOSStream:
+    """
+    Minimal asyncio RouterOS API connection: plain-text login and tagged
+    sentences, enough to run listen/print/cancel concurrently
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, router, timeout):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(str(router.ip_address), router.api_port), timeout
+        )
+        stream = cls(reader, writer)
+        try:
+            await stream.send('/login', {'name': router.username, 'password': router.password})
+            reply, attributes, _ = await asyncio.wait_for(stream.read_sentence(), timeout)
+            if reply == '!trap':
+                raise ListenerError(f"Login failed: {attributes.get('message')}")
+            if reply != '!done':
+                raise ListenerError(f"Unexpected login reply {reply}")
+        except BaseException:
+            stream.close()
+            raise
+        return stream
+
+    async def send(self, command, attributes=None, tag=None):
+        words = [command]
+        words.extend(f'={key}={value}' for key, value in (attributes or {}).items())
+        if tag is not None:
+            words.append(f'.tag={tag}')
+        self.writer.write(
+            b''.join(encode_length(len(word)) + word for word in (w.encode() for w in words)) + encode_length(0)
+        )
+        await self.writer.drain()
+
+    async def read_sentence(self):
+        """
+        Next reply as (reply_type, attributes, tag)
+        """
+        words = []
+        while True:
+            length = await self._read_length()
+            if length == 0:
+                break
+            words.append((await self.reader.readexactly(length)).decode('utf-8', 'replace'))
+        if not words:
+            return await self.read_sentence()
+
+        attributes = {}
+        tag = None
+        for word in words[1:]:
+            if word.startswith('.tag='):
+                tag = word[len('.tag='):]
+            elif word.startswith('='):
+                key, _, value = word[1:].partition('=')
+                # Same key names as routeros_api (.id -> id)
+                attributes[key[1:] if key in ('.id', '.dead') else key] = value
+        return words[0], attributes, tag
+
+    async def _read_length(self):
+        first = (await self.reader.readexactly(1))[0]
+        if first < 0x80:
+            return first
+        if first < 0xC0:
+            extra, value = 1, first & 0x3F
+        elif first < 0xE0:
+            extra, value = 2, first & 0x1F
+        elif first < 0xF0:
+            extra, value = 3, first & 0x0F
+        elif first == 0xF0:
+            extra, value = 4, 0
+        else:
+            raise ListenerError("Malformed length")
+        for byte in await self.reader.readexactly(extra):
+            value = (value << 8) + byte
+        return value
+
+    def close(self):
+        try:
+            self.writer.close()
+        except Exception:
+            pass
+
+
+class RouterFollower:
+    """
+    Keeps one router's LiveSession snapshot current from its listen stream
+    """
+
+    def __init__(self, router):
+        self.router = router
+        self.active = {}        # .id -> current /ppp/active row
+        self.touched = set()    # usernames changed since the last flush
+        self.synced = False
+        self.last_heartbeat = None
+        self.failures = 0
+
+    @property
+    def is_live(self):
+        """
+        Stream synced and the last heartbeat answered recently
+        """
+        return (
+            self.synced
+            and self.last_heartbeat is not None
+            and time.monotonic() - self.last_heartbeat < settings.MIKROTIK_LISTEN_HEARTBEAT_INTERVAL * 2
+        )
+
+    async def run(self):
+        while True:
+            stream = None
+            try:
+                if not await _in_thread(circuit.allow_request, self.router):
+                    await asyncio.sleep(settings.MIKROTIK_CIRCUIT_RESET_TIMEOUT)
+                    continue
+                stream = await RouterOSStream.open(self.router, settings.MIKROTIK_CONNECT_TIMEOUT)
+                await _in_thread(circuit.record_success, self.router)
+                self.failures = 0
+                await self._follow(stream)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.warning(f"Session stream for {self.router.name} broke: {e or type(e).__name__}")
+                if isinstance(e, (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError)):
+                    await _in_thread(circuit.record_failure, self.router)
+            finally:
+                self.synced = False
+                if stream is not None:
+                    stream.close()
+
+            backoff = min(2 ** self.failures, settings.MIKROTIK_LISTEN_MAX_BACKOFF)
+            await asyncio.sleep(backoff)
+
+    async def _follow(self, stream):
+        """
+        Start listen + full print, then apply deltas until the stream breaks
+        """
+        self.active = {}
+        self.touched = set()
+        snapshot = []
+        buffered = []
+        polling = False
+
+        await stream.send('/ppp/active/listen', tag=LISTEN_TAG)
+        await stream.send('/ppp/active/print', tag=RESYNC_TAG)
+        self.last_heartbeat = time.monotonic()
+
+        tasks = [
+            asyncio.create_task(self._heartbeat(stream)),
+            asyncio.create_task(self._flush_periodically()),
+        ]
+        try:
+            silence = settings.MIKROTIK_LISTEN_HEARTBEAT_INTERVAL + settings.MIKROTIK_READ_TIMEOUT
+            while True:
+                reply, attributes, tag = await asyncio.wait_for(stream.read_sentence(), silence)
+
+                if tag == HEARTBEAT_TAG:
+                    if reply == '!done':
+                        self.last_heartbeat = time.monotonic()
+                elif tag == RESYNC_TAG:
+                    if reply == '!re':
+                        snapshot.append(attributes)
+                    elif reply == '!trap':
+                        raise ListenerError(f"print failed: {attributes.get('message')}")
+                    elif reply == '!done':
+                        await self._resync(snapshot, buffered)
+                        snapshot, buffered = [], []
+                        if polling:
+                            tasks.append(asyncio.create_task(self._poll_later(stream)))
+                elif tag == LISTEN_TAG:
+                    if reply == '!re':
+                        if self.synced:
+                            self._apply(attributes)
+                        else:
+                            buffered.append(attributes)
+                    elif reply == '!trap' and not polling:
+                        # No listen on this RouterOS: resync by print instead
+                        logger.info(f"{self.router.name} does not support listen, polling instead")
+                        polling = True
+                        if self.synced:
+                            tasks.append(asyncio.create_task(self._poll_later(stream)))
+                    elif reply == '!done' and not polling:
+                        raise ListenerError("listen ended")
+                elif reply == '!fatal':
+                    raise ListenerError(f"fatal: {attributes}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _resync(self, rows, buffered):
+        """
+        Replace the snapshot with a full print (plus listen events received meanwhile)
+        """
+        self.active = {row['id']: row for row in rows if row.get('id')}
+        for attributes in buffered:
+            self._apply(attributes)
+        self.touched = set()
+
+        count = await _in_thread(store_router_sessions, self.router, list(self.active.values()))
+        self.synced = True
+        logger.info(f"Resynced {count} sessions from {self.router.name}")
+
+    def _apply(self, attributes):
+        """
+        Apply one listen event to the in-memory session map
+        """
+        session_id = attributes.get('id')
+        if not session_id:
+            return
+
+        if attributes.get('dead') in ('yes', 'true'):
+            row = self.active.pop(session_id, None)
+            if row is not None and row.get('name'):
+                self.touched.add(row['name'])
+            return
+
+        row = self.active.setdefault(session_id, {})
+        row.update(attributes)
+        if row.get('name'):
+            self.touched.add(row['name'])
+
+    async def flush(self):
+        """
+        Write the sessions changed since the last flush
+        """
+        if not self.synced or not self.touched:
+            return
+        touched, self.touched = self.touched, set()
+        current = {row['name']: row for row in self.active.values() if row.get('name') in touched}
+        try:
+            await _in_thread(apply_session_changes, self.router, list(current.values()), touched - set(current))
+        except Exception as e:
+            # Keep the changes for the next flush
+            self.touched |= touched
+            logger.error(f"Error applying session changes for {self.router.name}: {e}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(settings.MIKROTIK_LISTEN_FLUSH_INTERVAL)
+            await self.flush()
+
+    async def _heartbeat(self, stream):
+        while True:
+            await asyncio.sleep(settings.MIKROTIK_LISTEN_HEARTBEAT_INTERVAL)
+            await stream.send('/system/identity/print', tag=HEARTBEAT_TAG)
+
+    async def _poll_later(self, stream):
+        await asyncio.sleep(settings.MIKROTIK_SESSION_POLL_INTERVAL)
+        await stream.send('/ppp/active/print', tag=RESYNC_TAG)
+
+
+class SessionListener:
+    """
+    Runs a RouterFollower per active router and keeps the set of routers
+    in line with the database
+    """
+
+    def __init__(self, router_ids=None):
+        self.router_ids = router_ids
+        self.followers = {}
+        self.tasks = {}
+
+    async def run(self):
+        last_refresh = 0
+        try:
+            while True:
+                if time.monotonic() - last_refresh >= settings.MIKROTIK_LISTEN_ROUTER_REFRESH:
+                    await self._refresh_routers()
+                    last_refresh = time.monotonic()
+
+                live = [router_id for router_id, follower in self.followers.items() if follower.is_live]
+                if live:
+                    await _in_thread(mark_sessions_current, live)
+
+                await asyncio.sleep(settings.MIKROTIK_LISTEN_HEARTBEAT_INTERVAL)
+        finally:
+            await self._stop(list(self.tasks))
+
+    async def _refresh_routers(self):
+        routers = {router.pk: router for router in await _in_thread(self._load_routers)}
+
+        # Stop followers for removed routers or changed connection details
+        stale = [
+            router_id for router_id, follower in self.followers.items()
+            if router_id not in routers or _endpoint(routers[router_id]) != _endpoint(follower.router)
+        ]
+        await self._stop(stale)
+
+        for router_id, router in routers.items():
+            if router_id not in self.followers:
+                follower = RouterFollower(router)
+                self.followers[router_id] = follower
+                self.tasks[router_id] = asyncio.create_task(follower.run(), name=f'session-listener-{router.name}')
+
+        logger.info(f"Session listener following {len(self.followers)} routers")
+
+    async def _stop(self, router_ids):
+        tasks = [self.tasks.pop(router_id) for router_id in router_ids if router_id in self.tasks]
+        for router_id in router_ids:
+            follower = self.followers.pop(router_id, None)
+            if follower is not None:
+                await follower.flush()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _load_routers(self):
+        routers = MikroTikRouter.objects.filter(status='active')
+        if self.router_ids:
+            routers = routers.filter(pk__in=self.router_ids)
+        return list(routers)
+
+
+def run_session_listener(router_ids=None):
+    """
+    Blocking entry point (used by the listen_active_sessions command)
+    """
+    asyncio.run(SessionListener(router_ids).run())
+
+
+async def _in_thread(func, *args):
+    def call():
+        close_old_connections()
+        return func(*args)
+    return await asyncio.to_thread(call)
+
+
+def _endpoint(router):
+    return (str(router.ip_address), router.api_port, router.username, router.password)
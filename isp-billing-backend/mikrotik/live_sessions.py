@@ -0,0 +1,251 @@
+"""
+Active PPP session snapshot: polled from routers in the background and
+read by the API views.
+
+Each poll is diffed against the router's previous snapshot to derive
+SessionEvent rows: a new username (or a new session id for the same
+username) is a start, a username that disappeared is a stop. The same
+events open and close AddressLease rows (address_index.py).
+
+The session listener (listener.py) keeps the same snapshot current from
+/ppp/active listen streams; polling then only covers routers whose
+snapshot it has not refreshed recently.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from subscription.models import Subscription
+from .address_index import record_leases
+from .health import parse_uptime
+from .models import MikroTikRouter, LiveSession, SessionEvent
+from .services import fetch_from_routers
+
+logger = logging.getLogger(__name__)
+
+
+def poll_active_sessions(routers=None, only_stale=False):
+    """
+    Refresh the LiveSession snapshot for all active routers (in parallel).
+    Routers that fail keep their previous snapshot, which then goes stale.
+    With only_stale, routers refreshed within the last half poll interval
+    (e.g. by the session listener) are skipped.
+    Returns a summary dict.
+    """
+    if routers is None:
+        routers = MikroTikRouter.objects.filter(status='active')
+        if only_stale:
+            fresh_since = timezone.now() - timedelta(seconds=settings.MIKROTIK_SESSION_POLL_INTERVAL / 2)
+            routers = routers.exclude(sessions_refreshed_at__gte=fresh_since)
+    routers = {router.pk: router for router in routers}
+
+    results, errors = fetch_from_routers(
+        routers.values(),
+        lambda service: service.get_active_connections(raise_errors=True)
+    )
+
+    summary = {'routers': len(routers), 'refreshed': 0, 'sessions': 0, 'errors': {}}
+    for router_id, connections in results.items():
+        try:
+            summary['sessions'] += store_router_sessions(routers[router_id], connections)
+            summary['refreshed'] += 1
+        except Exception as e:
+            logger.error(f"Error storing sessions for router {routers[router_id].name}: {e}")
+            errors[router_id] = str(e)
+
+    for router_id, message in errors.items():
+        summary['errors'][routers[router_id].name] = message
+
+    logger.info(
+        f"Session poll: {summary['refreshed']}/{summary['routers']} routers refreshed, "
+        f"{summary['sessions']} active sessions"
+    )
+    return summary
+
+
+def store_router_sessions(router, connections, refreshed_at=None):
+    """
+    Replace the snapshot for one router with the given /ppp/active rows
+    and record session start/stop events against the previous snapshot.
+    Returns the number of sessions stored.
+    """
+    refreshed_at = refreshed_at or timezone.now()
+    previous = {session.username: session for session in LiveSession.objects.filter(router=router)}
+    sessions = _build_sessions(router, connections, refreshed_at)
+    events = diff_sessions(router, previous, sessions, refreshed_at)
+
+    with transaction.atomic():
+        LiveSession.objects.bulk_create(
+            sessions.values(),
+            update_conflicts=True,
+            unique_fields=['router', 'username'],
+            update_fields=['session_id', 'service', 'ip_address', 'mac_address', 'uptime', 'refreshed_at'],
+            batch_size=1000,
+        )
+        # Anything not refreshed in this pass has disconnected
+        LiveSession.objects.filter(router=router, refreshed_at__lt=refreshed_at).delete()
+        MikroTikRouter.objects.filter(pk=router.pk).update(sessions_refreshed_at=refreshed_at)
+        SessionEvent.objects.bulk_create(events, batch_size=1000)
+        record_leases(router, events)
+
+    return len(sessions)
+
+
+def apply_session_changes(router, connections, removed, refreshed_at=None):
+    """
+    Apply incremental changes to one router's snapshot: `connections` are
+    the current /ppp/active rows of users whose session changed, `removed`
+    the usernames that disconnected. Records session events as well.
+    """
+    refreshed_at = refreshed_at or timezone.now()
+    sessions = _build_sessions(router, connections, refreshed_at)
+    removed = set(removed) - set(sessions)
+    previous = {
+        session.username: session
+        for session in LiveSession.objects.filter(router=router, username__in=set(sessions) | removed)
+    }
+    events = diff_sessions(router, previous, sessions, refreshed_at)
+
+    with transaction.atomic():
+        LiveSession.objects.bulk_create(
+            sessions.values(),
+            update_conflicts=True,
+            unique_fields=['router', 'username'],
+            update_fields=['session_id', 'service', 'ip_address', 'mac_address', 'uptime', 'refreshed_at'],
+            batch_size=1000,
+        )
+        LiveSession.objects.filter(router=router, username__in=removed).delete()
+        MikroTikRouter.objects.filter(pk=router.pk).update(sessions_refreshed_at=refreshed_at)
+        SessionEvent.objects.bulk_create(events, batch_size=1000)
+        record_leases(router, events)
+
+    return len(events)
+
+
+def mark_sessions_current(router_ids, refreshed_at=None):
+    """
+    Record that the snapshot of these routers is up to date (their change
+    streams are alive) without rewriting any session
+    """
+    MikroTikRouter.objects.filter(pk__in=router_ids).update(
+        sessions_refreshed_at=refreshed_at or timezone.now()
+    )
+
+
+def _build_sessions(router, connections, refreshed_at):
+    """
+    {username: LiveSession} from /ppp/active rows
+    """
+    sessions = {}
+    for conn in connections:
+        username = conn.get('name')
+        if not username:
+            continue
+        sessions[username] = LiveSession(
+            router=router,
+            username=username,
+            session_id=conn.get('id'),
+            service=conn.get('service'),
+            ip_address=conn.get('address') or None,
+            mac_address=conn.get('caller-id') or None,
+            uptime=conn.get('uptime'),
+            refreshed_at=refreshed_at,
+        )
+    return sessions
+
+
+def diff_sessions(router, previous, current, detected_at):
+    """
+    Session events between two snapshots ({username: LiveSession}).
+    Returns unsaved SessionEvent objects.
+    """
+    events = []
+    for username, session in previous.items():
+        new_session = current.get(username)
+        if new_session is None or new_session.session_id != session.session_id:
+            events.append(_event(router, session, 'stop', detected_at))
+
+    for username, session in current.items():
+        old_session = previous.get(username)
+        if old_session is None or old_session.session_id != session.session_id:
+            uptime = parse_uptime(session.uptime)
+            started_at = detected_at - timedelta(seconds=uptime) if uptime is not None else detected_at
+            events.append(_event(router, session, 'start', started_at))
+
+    if not events:
+        return events
+
+    # Link events to subscriptions (and their customer's zone)
+    subscriptions = {
+        row['mikrotik_username']: row
+        for row in Subscription.objects.filter(
+            mikrotik_username__in={event.username for event in events}
+        ).values('id', 'mikrotik_username', 'customer__zone_id')
+    }
+    for event in events:
+        subscription = subscriptions.get(event.username)
+        if subscription:
+            event.subscription_id = subscription['id']
+            event.zone_id = subscription['customer__zone_id']
+    return events
+
+
+def _event(router, session, event, occurred_at):
+    return SessionEvent(
+        router=router,
+        username=session.username,
+        event=event,
+        occurred_at=occurred_at,
+        session_id=session.session_id,
+        ip_address=session.ip_address,
+        mac_address=session.mac_address,
+        uptime=parse_uptime(session.uptime),
+    )
+
+
+def get_live_status(usernames, router_ids=()):
+    """
+    Read live status for the given usernames from the snapshot.
+
+    Returns (status_by_username, refreshed_at_by_router_id). A username
+    missing from the first dict is offline as of its router's snapshot.
+    """
+    usernames = [username for username in usernames if username]
+
+    sessions = list(LiveSession.objects.filter(username__in=usernames))
+
+    refreshed_at_by_router = dict(
+        MikroTikRouter.objects.filter(
+            pk__in=set(router_ids) | {session.router_id for session in sessions}
+        ).values_list('id', 'sessions_refreshed_at')
+    )
+
+    status_by_username = {}
+    for session in sessions:
+        # The listener only rewrites sessions that change; the router's
+        # timestamp tells how current its snapshot is
+        refreshed_at = max(
+            filter(None, (session.refreshed_at, refreshed_at_by_router.get(session.router_id)))
+        )
+        status_by_username[session.username] = {
+            'online': True,
+            'ip_address': session.ip_address,
+            'mac_address': session.mac_address,
+            'uptime': session.uptime,
+            'refreshed_at': refreshed_at,
+            'stale': is_stale(refreshed_at),
+        }
+
+    return status_by_username, refreshed_at_by_router
+
+
+def is_stale(refreshed_at):
+    """
+    True if a snapshot taken at refreshed_at is too old to trust
+    """
+    if refreshed_at is None:
+        return True
+    return timezone.now() - refreshed_at > timedelta(seconds=settings.MIKROTIK_SESSION_STALE_AFTER)
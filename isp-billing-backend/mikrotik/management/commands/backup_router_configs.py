@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mikrotik.backups import backup_routers
+from mikrotik.models import MikroTikRouter
+
+
+class Command(BaseCommand):
+    help = 'Back up the configuration (/export) of all active routers (or a subset) in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--router',
+            type=int,
+            action='append',
+            dest='router_ids',
+            help='Router id to back up (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        routers = None
+        if options['router_ids']:
+            routers = list(MikroTikRouter.objects.filter(pk__in=options['router_ids']))
+            if not routers:
+                raise CommandError('No matching routers')
+
+        summary = backup_routers(routers)
+        self.stdout.write(
+            f"{summary['changed']} changed, {summary['unchanged']} unchanged "
+            f"of {summary['routers']} routers"
+        )
+        for router_name, error in summary['errors'].items():
+            self.stderr.write(f"{router_name}: {error}")
+        if summary['errors']:
+            raise CommandError(f"{len(summary['errors'])} routers failed")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from mikrotik.listener import run_session_listener
+
+
+class Command(BaseCommand):
+    help = 'Follow /ppp/active on all active routers (listen streams) into the live session snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--router',
+            type=int,
+            action='append',
+            dest='router_ids',
+            help='Router id to follow (repeatable, default: all active routers)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Session listener started')
+        try:
+            run_session_listener(options['router_ids'])
+        except KeyboardInterrupt:
+            self.stdout.write('Session listener stopped')
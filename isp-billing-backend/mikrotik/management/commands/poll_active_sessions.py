@@ -0,0 +1,48 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mikrotik.live_sessions import poll_active_sessions
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Poll /ppp/active on all active routers into the live session snapshot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.MIKROTIK_SESSION_POLL_INTERVAL,
+            help='Seconds between polls (default: MIKROTIK_SESSION_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Poll once and exit'
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+
+        while True:
+            started = time.monotonic()
+            close_old_connections()
+            try:
+                summary = poll_active_sessions()
+                self.stdout.write(
+                    f"Refreshed {summary['refreshed']}/{summary['routers']} routers, "
+                    f"{summary['sessions']} active sessions"
+                )
+                for router_name, error in summary['errors'].items():
+                    self.stderr.write(f"{router_name}: {error}")
+            except Exception as e:
+                logger.exception(f"Session poll failed: {e}")
+
+            if options['once']:
+                break
+            time.sleep(max(0, interval - (time.monotonic() - started)))
@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mikrotik.models import MikroTikRouter
+from mikrotik.provisioning import provision_router, render_router_script
+
+
+class Command(BaseCommand):
+    help = 'Provision all PPP profiles and secrets of a router through a generated .rsc script and /import'
+
+    def add_arguments(self, parser):
+        parser.add_argument('router_id', type=int, help='Router to provision')
+        parser.add_argument(
+            '--output',
+            help='Only write the script to this file (- for stdout) for a manual import'
+        )
+        parser.add_argument(
+            '--no-upload',
+            action='store_true',
+            help='Skip the FTP upload; import and verify a script already on the router'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            router = MikroTikRouter.objects.get(pk=options['router_id'])
+        except MikroTikRouter.DoesNotExist:
+            raise CommandError(f"Router {options['router_id']} not found")
+
+        if options['output']:
+            self._write_script(router, options['output'])
+            return
+
+        report = provision_router(router, upload=not options['no_upload'])
+        if report['error']:
+            raise CommandError(report['error'])
+
+        counts = ', '.join(f"{issue}={count}" for issue, count in report['summary'].items() if count)
+        self.stdout.write(
+            f"{router.name}: {report['secrets']} secrets and {report['profiles']} profiles "
+            f"({report['bytes'] or 0} bytes) uploaded in {report['upload_seconds'] or 0}s, "
+            f"imported in {report['import_seconds']}s"
+        )
+        self.stdout.write(
+            f"Verification: {report['differences']} differences" + (f" ({counts})" if counts else '')
+        )
+
+    def _write_script(self, router, path):
+        stats = {}
+        started = time.monotonic()
+        lines = render_router_script(router, stats=stats)
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line)
+            return
+
+        with open(path, 'w', encoding='utf-8', newline='\r\n') as script:
+            for line in lines:
+                script.write(line + '\n')
+        self.stderr.write(
+            f"Wrote {stats['secrets']} secrets and {stats['profiles']} profiles to {path} "
+            f"in {time.monotonic() - started:.1f}s"
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from mikrotik.sync_log_retention import compress_sync_log_payloads, prune_sync_logs
+
+
+class Command(BaseCommand):
+    help = 'Apply MikroTik sync log retention (age/row limits) and compress large payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            help='Delete rows older than this many days (default: MIKROTIK_SYNC_LOG_RETENTION_DAYS, 0 = no limit)'
+        )
+        parser.add_argument(
+            '--max-rows',
+            type=int,
+            help='Keep at most this many rows (default: MIKROTIK_SYNC_LOG_MAX_ROWS, 0 = no limit)'
+        )
+        parser.add_argument(
+            '--no-summary',
+            action='store_true',
+            help='Delete without adding the rows to the daily summaries'
+        )
+        parser.add_argument(
+            '--skip-compress',
+            action='store_true',
+            help='Only delete, do not compress payloads'
+        )
+
+    def handle(self, *args, **options):
+        result = prune_sync_logs(
+            retention_days=options['retention_days'],
+            max_rows=options['max_rows'],
+            summarize=False if options['no_summary'] else None
+        )
+        self.stdout.write(
+            f"Deleted {result['deleted_by_age']} rows by age, {result['deleted_by_count']} by row limit"
+        )
+
+        if not options['skip_compress']:
+            # Whole table, unlike the daily job which only looks at the last week
+            compressed = compress_sync_log_payloads()
+            self.stdout.write(f"Compressed payloads of {compressed} rows")
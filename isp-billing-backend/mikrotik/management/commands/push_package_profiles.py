@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customers.models import Zone
+from mikrotik.models import MikroTikRouter, Package
+from mikrotik.profiles import push_packages
+
+
+class Command(BaseCommand):
+    help = 'Push package PPP profiles to all active routers (or a zone/router subset) in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--package',
+            type=int,
+            action='append',
+            dest='package_ids',
+            help='Package id to push (repeatable)'
+        )
+        parser.add_argument(
+            '--all-packages',
+            action='store_true',
+            help='Push every active package that has a profile name'
+        )
+        parser.add_argument(
+            '--zone',
+            type=int,
+            help='Only push to the active routers of this zone'
+        )
+        parser.add_argument(
+            '--router',
+            type=int,
+            action='append',
+            dest='router_ids',
+            help='Router id to push to (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        if options['all_packages']:
+            packages = Package.objects.filter(status='active', mikrotik_profile_name__isnull=False)
+        elif options['package_ids']:
+            packages = Package.objects.filter(pk__in=options['package_ids'])
+        else:
+            raise CommandError('Give --package or --all-packages')
+
+        if options['zone'] and options['router_ids']:
+            raise CommandError('Use either --zone or --router, not both')
+
+        zone = None
+        if options['zone']:
+            try:
+                zone = Zone.objects.get(pk=options['zone'])
+            except Zone.DoesNotExist:
+                raise CommandError(f"Zone {options['zone']} not found")
+
+        routers = None
+        if options['router_ids']:
+            routers = MikroTikRouter.objects.filter(pk__in=options['router_ids'])
+
+        matrix = push_packages(packages, routers=routers, zone=zone)
+
+        for package in matrix['skipped_packages']:
+            self.stderr.write(f"Skipped {package['name']}: {package['reason']}")
+
+        names = {package['id']: package['profile'] for package in matrix['packages']}
+        for row in matrix['routers']:
+            title = f"{row['router_name']} (#{row['router_id']})"
+            if row['error']:
+                self.stderr.write(f"{title}: {row['error']}")
+                continue
+            results = ', '.join(
+                f"{names[package_id]}={result['status']}" for package_id, result in row['results'].items()
+            )
+            self.stdout.write(f"{title}: {results}")
+            for package_id, result in row['results'].items():
+                if result.get('error'):
+                    self.stderr.write(f"  {names[package_id]}: {result['error']}")
+
+        self.stdout.write(', '.join(f"{key} {count}" for key, count in matrix['summary'].items()))
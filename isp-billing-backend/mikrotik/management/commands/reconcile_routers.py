@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mikrotik.models import MikroTikRouter
+from mikrotik.reconciliation import reconcile_routers
+
+
+class Command(BaseCommand):
+    help = 'Diff PPP secrets on routers against subscriptions (dry run unless --apply)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--router',
+            type=int,
+            action='append',
+            dest='router_ids',
+            help='Router id to reconcile (repeatable, default: all active routers)'
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Push the differences to the routers'
+        )
+        parser.add_argument(
+            '--remove-orphans',
+            action='store_true',
+            help='With --apply, also remove PPPoE secrets we created that no longer have a subscription'
+        )
+        parser.add_argument(
+            '--details',
+            action='store_true',
+            help='List every difference, not just the counts'
+        )
+
+    def handle(self, *args, **options):
+        if options['remove_orphans'] and not options['apply']:
+            raise CommandError('--remove-orphans requires --apply')
+
+        routers = MikroTikRouter.objects.filter(status='active')
+        if options['router_ids']:
+            routers = MikroTikRouter.objects.filter(pk__in=options['router_ids'])
+
+        reports = reconcile_routers(
+            routers, apply=options['apply'], remove_orphans=options['remove_orphans']
+        )
+
+        for report in reports:
+            title = f"{report['router_name']} (#{report['router_id']})"
+            if report['error']:
+                self.stderr.write(f"{title}: {report['error']}")
+                if not report['applied']:
+                    continue
+
+            counts = ', '.join(f"{issue}={count}" for issue, count in report['summary'].items() if count)
+            self.stdout.write(f"{title}: {len(report['changes'])} differences" + (f" ({counts})" if counts else ''))
+
+            if options['details']:
+                for change in report['changes']:
+                    self.stdout.write(
+                        f"  {change['issue']:<16} {change['username']}: "
+                        f"expected {change['expected']!r}, found {change['actual']!r}"
+                    )
+
+            applied = report['applied']
+            if applied:
+                self.stdout.write(
+                    f"  applied: created {applied['created']}, updated {applied['updated']}, "
+                    f"removed {applied['removed']}, skipped {applied['skipped']}, "
+                    f"failed {applied['failed']}, not applied {applied['not_applied']}, "
+                    f"db updated {applied.get('db_updated', 0)}"
+                )
+                for error in applied['errors']:
+                    self.stderr.write(f"  {error}")
+
+        if not options['apply']:
+            self.stdout.write('Dry run: nothing was changed (use --apply)')
@@ -0,0 +1,56 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mikrotik.outbox import process_outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Send queued MikroTik commands (outbox) to the routers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process one batch and exit'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.MIKROTIK_OUTBOX_BATCH_SIZE,
+            help='Commands claimed per pass (default: MIKROTIK_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.MIKROTIK_OUTBOX_POLL_INTERVAL,
+            help='Seconds to sleep when the outbox is empty'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('MikroTik worker started')
+
+        while True:
+            close_old_connections()
+            try:
+                summary = process_outbox(batch_size=options['batch_size'])
+            except Exception as e:
+                logger.exception(f"Outbox pass failed: {e}")
+                summary = {'claimed': 0}
+
+            if summary['claimed']:
+                self.stdout.write(
+                    f"Processed {summary['claimed']} commands: done {summary['done']}, "
+                    f"retrying {summary['retried']}, failed {summary['failed']}, "
+                    f"superseded {summary['superseded']}, released {summary['released']}"
+                )
+
+            if options['once']:
+                break
+            if not summary['claimed']:
+                time.sleep(options['interval'])
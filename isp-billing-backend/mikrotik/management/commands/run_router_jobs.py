@@ -0,0 +1,47 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from mikrotik.jobs import new_worker_id, run_next_job
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Run queued long-running router jobs (provisioning, ...)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run at most one job and exit'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.MIKROTIK_JOB_POLL_INTERVAL,
+            help='Seconds to sleep when no job is queued'
+        )
+
+    def handle(self, *args, **options):
+        worker_id = new_worker_id()
+        self.stdout.write(f'Router job worker {worker_id} started')
+
+        while True:
+            close_old_connections()
+            try:
+                job = run_next_job(worker_id)
+            except Exception as e:
+                logger.exception(f"Router job pass failed: {e}")
+                job = None
+
+            if job is not None:
+                self.stdout.write(f"Router job #{job.pk} ({job.kind}) {job.status}")
+
+            if options['once']:
+                break
+            if job is None:
+                time.sleep(options['interval'])
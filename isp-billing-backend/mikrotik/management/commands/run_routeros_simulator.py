@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mikrotik.models import MikroTikRouter
+from mikrotik.simulator import RouterOSSimulator
+
+
+class Command(BaseCommand):
+    help = 'Run in-memory RouterOS API simulators for integration and load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8728, help='API port (default: 8728)')
+        parser.add_argument(
+            '--routers',
+            type=int,
+            default=1,
+            help='Number of simulated routers, bound to 127.0.0.1, 127.0.0.2, ... (default: 1)'
+        )
+        parser.add_argument('--secrets', type=int, default=1000, help='PPP secrets per router')
+        parser.add_argument('--active-ratio', type=float, default=0.6, help='Share of secrets with an active session')
+        parser.add_argument('--username', default='admin')
+        parser.add_argument('--password', default='admin')
+        parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every reply')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Random extra latency, up to this many seconds')
+        parser.add_argument('--rtt', type=float, default=0.0, help='Simulated network round trip per reply, in seconds')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of commands answered with a !trap')
+        parser.add_argument('--drop-rate', type=float, default=0.0, help='Share of commands that drop the connection')
+        parser.add_argument(
+            '--register',
+            action='store_true',
+            help='Create/update MikroTikRouter rows pointing at the simulators'
+        )
+
+    def handle(self, *args, **options):
+        if not 1 <= options['routers'] <= 254:
+            raise CommandError('--routers must be between 1 and 254')
+
+        simulators = []
+        for number in range(1, options['routers'] + 1):
+            simulator = RouterOSSimulator(
+                host=f'127.0.0.{number}',
+                port=options['port'],
+                username=options['username'],
+                password=options['password'],
+                identity=f'Simulator {number}',
+                latency=options['latency'],
+                rtt=options['rtt'],
+                jitter=options['jitter'],
+                fail_rate=options['fail_rate'],
+                drop_rate=options['drop_rate'],
+            )
+            simulator.populate(secrets=options['secrets'], active_ratio=options['active_ratio'])
+            simulators.append(simulator.start())
+            self.stdout.write(
+                f"Simulator {number} listening on {simulator.host}:{simulator.port} "
+                f"({options['secrets']} secrets, {len(simulator.tables['/ppp/active'].rows)} active)"
+            )
+
+            if options['register']:
+                MikroTikRouter.objects.update_or_create(
+                    ip_address=simulator.host,
+                    defaults={'name': f'Simulator {number}', 'status': 'active', **simulator.router_kwargs()}
+                )
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping simulators')
+        finally:
+            for simulator in simulators:
+                simulator.stop()
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-16 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0003_remove_package_bandwidth_download_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mikrotikrouter',
+            name='sessions_refreshed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='LiveSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(db_index=True, max_length=100)),
+                ('session_id', models.CharField(blank=True, help_text='MikroTik .id of the active entry', max_length=50, null=True)),
+                ('service', models.CharField(blank=True, max_length=20, null=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('mac_address', models.CharField(blank=True, max_length=17, null=True)),
+                ('uptime', models.CharField(blank=True, max_length=50, null=True)),
+                ('refreshed_at', models.DateTimeField(help_text='When this entry was last seen on the router')),
+                ('router', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='live_sessions', to='mikrotik.mikrotikrouter')),
+            ],
+            options={
+                'verbose_name': 'Live Session',
+                'verbose_name_plural': 'Live Sessions',
+                'db_table': 'mikrotik_live_sessions',
+                'ordering': ['username'],
+                'unique_together': {('router', 'username')},
+            },
+        ),
+    ]
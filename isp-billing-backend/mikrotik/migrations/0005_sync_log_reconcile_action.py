@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-16 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0004_live_sessions'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mikrotiksynclog',
+            name='action',
+            field=models.CharField(choices=[('create_queue', 'Create Queue'), ('update_queue', 'Update Queue'), ('delete_queue', 'Delete Queue'), ('create_user', 'Create PPPoE User'), ('update_user', 'Update PPPoE User'), ('delete_user', 'Delete PPPoE User'), ('enable_user', 'Enable User'), ('disable_user', 'Disable User'), ('reconcile', 'Reconcile Router')], max_length=20),
+        ),
+    ]
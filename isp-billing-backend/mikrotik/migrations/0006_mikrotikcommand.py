@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-16 11:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0005_sync_log_reconcile_action'),
+        ('subscription', '0007_subscription_sync_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MikroTikCommand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(choices=[('create_user', 'Create PPPoE User'), ('update_user', 'Update PPPoE User'), ('enable_user', 'Enable User'), ('disable_user', 'Disable User'), ('delete_user', 'Delete PPPoE User')], max_length=20)),
+                ('username', models.CharField(help_text='PPPoE username the command targets', max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed'), ('superseded', 'Superseded')], default='pending', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('router', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='commands', to='mikrotik.mikrotikrouter')),
+                ('subscription', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mikrotik_commands', to='subscription.subscription')),
+            ],
+            options={
+                'verbose_name': 'MikroTik Command',
+                'verbose_name_plural': 'MikroTik Commands',
+                'db_table': 'mikrotik_commands',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='mikrotik_co_status_9512db_idx'), models.Index(fields=['router', 'username', 'status'], name='mikrotik_co_router__625cd4_idx')],
+            },
+        ),
+    ]
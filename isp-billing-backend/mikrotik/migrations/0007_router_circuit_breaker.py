@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-16 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0006_mikrotikcommand'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mikrotikrouter',
+            name='circuit_failures',
+            field=models.PositiveIntegerField(default=0, help_text='Consecutive connection failures'),
+        ),
+        migrations.AddField(
+            model_name='mikrotikrouter',
+            name='circuit_opened_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mikrotikrouter',
+            name='circuit_retry_at',
+            field=models.DateTimeField(blank=True, help_text='When the next probe is allowed', null=True),
+        ),
+        migrations.AddField(
+            model_name='mikrotikrouter',
+            name='circuit_state',
+            field=models.CharField(choices=[('closed', 'Closed'), ('open', 'Open'), ('half_open', 'Half Open')], default='closed', max_length=10),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0007_router_circuit_breaker'),
+        ('subscription', '0007_subscription_sync_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrafficCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100)),
+                ('upload_bytes', models.BigIntegerField(default=0)),
+                ('download_bytes', models.BigIntegerField(default=0)),
+                ('sampled_at', models.DateTimeField()),
+                ('router', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='traffic_counters', to='mikrotik.mikrotikrouter')),
+            ],
+            options={
+                'verbose_name': 'Traffic Counter',
+                'verbose_name_plural': 'Traffic Counters',
+                'db_table': 'mikrotik_traffic_counters',
+                'unique_together': {('router', 'username')},
+            },
+        ),
+        migrations.CreateModel(
+            name='UsageDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hourly_upload', models.BinaryField(help_text='24 little-endian uint64 byte counts')),
+                ('hourly_download', models.BinaryField(help_text='24 little-endian uint64 byte counts')),
+                ('upload_bytes', models.BigIntegerField(default=0)),
+                ('download_bytes', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_days', to='subscription.subscription')),
+            ],
+            options={
+                'verbose_name': 'Usage Day',
+                'verbose_name_plural': 'Usage Days',
+                'db_table': 'usage_days',
+                'ordering': ['-date'],
+                'unique_together': {('subscription', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='UsageMonth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('upload_bytes', models.BigIntegerField(default=0)),
+                ('download_bytes', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_months', to='subscription.subscription')),
+            ],
+            options={
+                'verbose_name': 'Usage Month',
+                'verbose_name_plural': 'Usage Months',
+                'db_table': 'usage_months',
+                'ordering': ['-year', '-month'],
+                'unique_together': {('subscription', 'year', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.1 on 2026-10-17 00:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0008_traffic_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MikroTikSyncLogSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('action', models.CharField(choices=[('create_queue', 'Create Queue'), ('update_queue', 'Update Queue'), ('delete_queue', 'Delete Queue'), ('create_user', 'Create PPPoE User'), ('update_user', 'Update PPPoE User'), ('delete_user', 'Delete PPPoE User'), ('enable_user', 'Enable User'), ('disable_user', 'Disable User'), ('reconcile', 'Reconcile Router')], max_length=20)),
+                ('status', models.CharField(choices=[('success', 'Success'), ('failed', 'Failed')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'MikroTik Sync Log Summary',
+                'verbose_name_plural': 'MikroTik Sync Log Summaries',
+                'db_table': 'mikrotik_sync_log_summaries',
+                'ordering': ['-date', 'router'],
+            },
+        ),
+        migrations.AddField(
+            model_name='mikrotiksynclog',
+            name='compressed_payload',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mikrotiksynclog',
+            index=models.Index(fields=['-created_at'], name='sync_log_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mikrotiksynclog',
+            index=models.Index(fields=['router', '-created_at'], name='sync_log_router_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mikrotiksynclog',
+            index=models.Index(fields=['status', '-created_at'], name='sync_log_status_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='mikrotiksynclogsummary',
+            name='router',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_log_summaries', to='mikrotik.mikrotikrouter'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='mikrotiksynclogsummary',
+            unique_together={('date', 'router', 'action', 'status')},
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-17 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0009_sync_log_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='package',
+            name='mikrotik_profile_name',
+            field=models.CharField(blank=True, help_text='PPP profile name on the routers', max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='package',
+            name='rate_limit',
+            field=models.CharField(blank=True, help_text='MikroTik rate-limit, e.g. 10M/10M (upload/download)', max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='mikrotiksynclog',
+            name='action',
+            field=models.CharField(choices=[('create_queue', 'Create Queue'), ('update_queue', 'Update Queue'), ('delete_queue', 'Delete Queue'), ('create_user', 'Create PPPoE User'), ('update_user', 'Update PPPoE User'), ('delete_user', 'Delete PPPoE User'), ('enable_user', 'Enable User'), ('disable_user', 'Disable User'), ('create_profile', 'Create PPP Profile'), ('update_profile', 'Update PPP Profile'), ('reconcile', 'Reconcile Router')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='mikrotiksynclogsummary',
+            name='action',
+            field=models.CharField(choices=[('create_queue', 'Create Queue'), ('update_queue', 'Update Queue'), ('delete_queue', 'Delete Queue'), ('create_user', 'Create PPPoE User'), ('update_user', 'Update PPPoE User'), ('delete_user', 'Delete PPPoE User'), ('enable_user', 'Enable User'), ('disable_user', 'Disable User'), ('create_profile', 'Create PPP Profile'), ('update_profile', 'Update PPP Profile'), ('reconcile', 'Reconcile Router')], max_length=20),
+        ),
+    ]
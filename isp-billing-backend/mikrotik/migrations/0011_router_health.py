@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0010_package_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouterHealthSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sampled_at', models.DateTimeField()),
+                ('is_online', models.BooleanField()),
+                ('connect_ms', models.FloatField(blank=True, help_text='TCP connect time to the API port', null=True)),
+                ('rtt_ms', models.FloatField(blank=True, help_text='API round trip (/system/resource print)', null=True)),
+                ('cpu_load', models.PositiveSmallIntegerField(blank=True, help_text='Percent', null=True)),
+                ('memory_used', models.PositiveSmallIntegerField(blank=True, help_text='Percent', null=True)),
+                ('uptime', models.PositiveIntegerField(blank=True, help_text='Seconds', null=True)),
+                ('error', models.CharField(blank=True, max_length=255, null=True)),
+                ('router', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='health_samples', to='mikrotik.mikrotikrouter')),
+            ],
+            options={
+                'verbose_name': 'Router Health Sample',
+                'verbose_name_plural': 'Router Health Samples',
+                'db_table': 'mikrotik_router_health',
+                'ordering': ['-sampled_at'],
+                'indexes': [models.Index(fields=['router', '-sampled_at'], name='router_health_latest_idx'), models.Index(fields=['sampled_at'], name='router_health_sampled_idx')],
+            },
+        ),
+    ]
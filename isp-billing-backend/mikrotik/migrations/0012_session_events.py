@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_connectiontype_code_connectiontype_status'),
+        ('mikrotik', '0011_router_health'),
+        ('subscription', '0007_subscription_sync_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100)),
+                ('event', models.CharField(choices=[('start', 'Session Started'), ('stop', 'Session Stopped')], max_length=10)),
+                ('occurred_at', models.DateTimeField(help_text='Start: estimated from uptime; stop: when the drop was detected')),
+                ('session_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('mac_address', models.CharField(blank=True, max_length=17, null=True)),
+                ('uptime', models.PositiveIntegerField(blank=True, help_text='Session length in seconds (last seen)', null=True)),
+                ('router', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_events', to='mikrotik.mikrotikrouter')),
+                ('subscription', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='session_events', to='subscription.subscription')),
+                ('zone', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='session_events', to='customers.zone')),
+            ],
+            options={
+                'verbose_name': 'Session Event',
+                'verbose_name_plural': 'Session Events',
+                'db_table': 'mikrotik_session_events',
+                'ordering': ['-occurred_at'],
+                'indexes': [models.Index(fields=['subscription', '-occurred_at'], name='session_event_sub_idx'), models.Index(fields=['username', '-occurred_at'], name='session_event_user_idx'), models.Index(fields=['zone', 'occurred_at'], name='session_event_zone_idx'), models.Index(fields=['occurred_at'], name='session_event_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0012_session_events'),
+        ('subscription', '0009_package_migration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mikrotikcommand',
+            name='package_migration',
+            field=models.ForeignKey(blank=True, help_text='Bulk package migration that queued the command', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='commands', to='subscription.packagemigration'),
+        ),
+    ]
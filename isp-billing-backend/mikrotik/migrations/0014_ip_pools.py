@@ -0,0 +1,78 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0006_customer_static_ip_idx'),
+        ('mikrotik', '0013_command_package_migration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IPAllocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.GenericIPAddressField(unique=True)),
+                ('note', models.CharField(blank=True, max_length=255, null=True)),
+                ('allocated_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'IP Allocation',
+                'verbose_name_plural': 'IP Allocations',
+                'db_table': 'mikrotik_ip_allocations',
+                'ordering': ['pool', 'address'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IPPool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('network', models.CharField(help_text='CIDR, e.g. 103.112.10.0/24', max_length=43, unique=True)),
+                ('gateway', models.GenericIPAddressField(blank=True, help_text='Never allocated', null=True)),
+                ('free_ranges', models.JSONField(blank=True, default=list)),
+                ('size', models.PositiveIntegerField(default=0, help_text='Allocatable addresses')),
+                ('free_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'IP Pool',
+                'verbose_name_plural': 'IP Pools',
+                'db_table': 'mikrotik_ip_pools',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='livesession',
+            index=models.Index(fields=['ip_address'], name='live_session_ip_idx'),
+        ),
+        migrations.AddField(
+            model_name='ipallocation',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ip_allocations', to='customers.customer'),
+        ),
+        migrations.AddField(
+            model_name='ippool',
+            name='router',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ip_pools', to='mikrotik.mikrotikrouter'),
+        ),
+        migrations.AddField(
+            model_name='ippool',
+            name='zone',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ip_pools', to='customers.zone'),
+        ),
+        migrations.AddField(
+            model_name='ipallocation',
+            name='pool',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='allocations', to='mikrotik.ippool'),
+        ),
+        migrations.AddIndex(
+            model_name='ipallocation',
+            index=models.Index(fields=['customer'], name='ip_allocation_customer_idx'),
+        ),
+    ]
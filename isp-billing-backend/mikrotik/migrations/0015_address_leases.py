@@ -0,0 +1,71 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_current_leases(apps, schema_editor):
+    """
+    Open a lease for every session in the current snapshot, starting at
+    its recorded start event (or the snapshot time if there is none)
+    """
+    LiveSession = apps.get_model('mikrotik', 'LiveSession')
+    SessionEvent = apps.get_model('mikrotik', 'SessionEvent')
+    Subscription = apps.get_model('subscription', 'Subscription')
+    AddressLease = apps.get_model('mikrotik', 'AddressLease')
+
+    started_at = {
+        (router_id, username, session_id): occurred_at
+        for router_id, username, session_id, occurred_at in SessionEvent.objects.filter(
+            event='start'
+        ).order_by('occurred_at').values_list('router_id', 'username', 'session_id', 'occurred_at')
+    }
+    subscription_ids = dict(Subscription.objects.values_list('mikrotik_username', 'id'))
+
+    AddressLease.objects.bulk_create([
+        AddressLease(
+            router_id=session.router_id,
+            subscription_id=subscription_ids.get(session.username),
+            username=session.username,
+            session_id=session.session_id,
+            ip_address=session.ip_address,
+            mac_address=session.mac_address,
+            started_at=started_at.get(
+                (session.router_id, session.username, session.session_id), session.refreshed_at
+            ),
+        )
+        for session in LiveSession.objects.all()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0014_ip_pools'),
+        ('subscription', '0009_package_migration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('username', models.CharField(max_length=100)),
+                ('session_id', models.CharField(blank=True, max_length=50, null=True)),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                ('mac_address', models.CharField(blank=True, max_length=17, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField(blank=True, help_text='Empty while the session is up', null=True)),
+                ('router', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='address_leases', to='mikrotik.mikrotikrouter')),
+                ('subscription', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='address_leases', to='subscription.subscription')),
+            ],
+            options={
+                'verbose_name': 'Address Lease',
+                'verbose_name_plural': 'Address Leases',
+                'db_table': 'mikrotik_address_leases',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['ip_address', '-started_at'], name='address_lease_ip_idx'), models.Index(fields=['mac_address', '-started_at'], name='address_lease_mac_idx'), models.Index(fields=['subscription', '-started_at'], name='address_lease_sub_idx'), models.Index(condition=models.Q(('ended_at__isnull', True)), fields=['router', 'username'], name='address_lease_open_idx')],
+            },
+        ),
+        migrations.RunPython(open_current_leases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 03:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0015_address_leases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mikrotikrouter',
+            name='pipeline_window',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Commands in flight per API session; empty uses MIKROTIK_PIPELINE_WINDOW', null=True),
+        ),
+    ]
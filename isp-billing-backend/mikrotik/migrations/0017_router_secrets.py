@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0016_router_pipeline_window'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouterSecret',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('secret_id', models.CharField(help_text='MikroTik .id of the secret', max_length=50)),
+                ('profile', models.CharField(blank=True, max_length=100, null=True)),
+                ('disabled', models.BooleanField(default=False)),
+                ('attributes_hash', models.CharField(blank=True, help_text='Hash of the attributes last pushed or read (empty if unknown)', max_length=64, null=True)),
+                ('refreshed_at', models.DateTimeField()),
+                ('router', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='secrets', to='mikrotik.mikrotikrouter')),
+            ],
+            options={
+                'verbose_name': 'Router Secret',
+                'verbose_name_plural': 'Router Secrets',
+                'db_table': 'mikrotik_router_secrets',
+                'ordering': ['name'],
+                'unique_together': {('router', 'name')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0017_router_secrets'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mikrotiksynclog',
+            name='action',
+            field=models.CharField(choices=[('create_queue', 'Create Queue'), ('update_queue', 'Update Queue'), ('delete_queue', 'Delete Queue'), ('create_user', 'Create PPPoE User'), ('update_user', 'Update PPPoE User'), ('delete_user', 'Delete PPPoE User'), ('enable_user', 'Enable User'), ('disable_user', 'Disable User'), ('create_profile', 'Create PPP Profile'), ('update_profile', 'Update PPP Profile'), ('reconcile', 'Reconcile Router'), ('provision', 'Provision Router')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='mikrotiksynclogsummary',
+            name='action',
+            field=models.CharField(choices=[('create_queue', 'Create Queue'), ('update_queue', 'Update Queue'), ('delete_queue', 'Delete Queue'), ('create_user', 'Create PPPoE User'), ('update_user', 'Update PPPoE User'), ('delete_user', 'Delete PPPoE User'), ('enable_user', 'Enable User'), ('disable_user', 'Disable User'), ('create_profile', 'Create PPP Profile'), ('update_profile', 'Update PPP Profile'), ('reconcile', 'Reconcile Router'), ('provision', 'Provision Router')], max_length=20),
+        ),
+    ]
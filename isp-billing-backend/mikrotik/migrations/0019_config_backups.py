@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0018_sync_log_provision_action'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfigBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed size of the configuration in bytes')),
+                ('stored_size', models.PositiveIntegerField(help_text='Bytes stored for this blob')),
+                ('depth', models.PositiveSmallIntegerField(default=0, help_text='Deltas to apply on top of a full blob')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('base', models.ForeignKey(blank=True, help_text='Blob the delta applies to (empty for a full blob)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='deltas', to='mikrotik.configblob')),
+            ],
+            options={
+                'verbose_name': 'Config Blob',
+                'verbose_name_plural': 'Config Blobs',
+                'db_table': 'mikrotik_config_blobs',
+            },
+        ),
+        migrations.CreateModel(
+            name='RouterConfigBackup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(help_text='First backup with this configuration')),
+                ('last_seen_at', models.DateTimeField(help_text='Latest backup with this configuration')),
+                ('lines', models.PositiveIntegerField(default=0)),
+                ('added_lines', models.PositiveIntegerField(default=0)),
+                ('removed_lines', models.PositiveIntegerField(default=0)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='backups', to='mikrotik.configblob')),
+                ('router', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='config_backups', to='mikrotik.mikrotikrouter')),
+            ],
+            options={
+                'verbose_name': 'Router Config Backup',
+                'verbose_name_plural': 'Router Config Backups',
+                'db_table': 'mikrotik_router_config_backups',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['router', '-created_at'], name='config_backup_latest_idx')],
+            },
+        ),
+    ]
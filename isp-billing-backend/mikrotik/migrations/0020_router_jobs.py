@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-17 05:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0019_config_backups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouterJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('provision', 'Provision Router')], max_length=30)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('worker_id', models.CharField(blank=True, help_text='Worker running the job', max_length=100, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, help_text='Refreshed while the worker is alive', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('router', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='mikrotik.mikrotikrouter')),
+            ],
+            options={
+                'verbose_name': 'Router Job',
+                'verbose_name_plural': 'Router Jobs',
+                'db_table': 'mikrotik_router_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'id'], name='router_job_queue_idx')],
+            },
+        ),
+    ]
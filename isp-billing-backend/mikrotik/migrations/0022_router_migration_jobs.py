@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0021_package_migration_jobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='routerjob',
+            name='kind',
+            field=models.CharField(choices=[('provision', 'Provision Router'), ('package_migration', 'Package Migration'), ('router_migration', 'Router Migration')], max_length=30),
+        ),
+    ]
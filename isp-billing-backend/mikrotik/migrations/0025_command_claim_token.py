@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0024_reconcile_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mikrotikcommand',
+            name='claim_token',
+            field=models.CharField(blank=True, help_text='Worker pass that claimed the command; only that pass may record its outcome', max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-17 06:58
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def set_existing_baselines(apps, schema_editor):
+    """
+    Routers that already have counters have had their baseline reading
+    """
+    MikroTikRouter = apps.get_model('mikrotik', 'MikroTikRouter')
+    TrafficCounter = apps.get_model('mikrotik', 'TrafficCounter')
+
+    for router_id, sampled_at in TrafficCounter.objects.values('router_id').annotate(
+        first=Min('sampled_at')
+    ).values_list('router_id', 'first'):
+        MikroTikRouter.objects.filter(pk=router_id).update(usage_baseline_at=sampled_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mikrotik', '0025_command_claim_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mikrotikrouter',
+            name='usage_baseline_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_existing_baselines, migrations.RunPython.noop),
+    ]
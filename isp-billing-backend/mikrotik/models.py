@@ -1,5 +1,9 @@
+import json
+import zlib
+
 from django.db import models
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from customers.models import Zone
 
 
@@ -20,6 +24,20 @@ class Package(models.Model):
     # Description
     description = models.TextField(blank=True, null=True)
     
+    # PPP profile pushed to routers (leave empty when profiles are managed on the router)
+    mikrotik_profile_name = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        help_text='PPP profile name on the routers'
+    )
+    rate_limit = models.CharField(
+        max_length=100,
+        blank=True,
+        null=True,
+        help_text='MikroTik rate-limit, e.g. 10M/10M (upload/download)'
+    )
+    
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -44,6 +62,12 @@ class MikroTikRouter(models.Model):
         ('inactive', 'Inactive'),
     )
     
+    CIRCUIT_STATE_CHOICES = (
+        ('closed', 'Closed'),
+        ('open', 'Open'),
+        ('half_open', 'Half Open'),
+    )
+    
     name = models.CharField(max_length=100)
     ip_address = models.GenericIPAddressField(unique=True)
     api_port = models.IntegerField(default=8728)
@@ -62,10 +86,29 @@ class MikroTikRouter(models.Model):
     
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     
+    # Tagged commands sent ahead of their replies on one session (1 = no pipelining)
+    pipeline_window = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text='Commands in flight per API session; empty uses MIKROTIK_PIPELINE_WINDOW'
+    )
+    
     # Connection tracking
     last_connected_at = models.DateTimeField(null=True, blank=True)
     is_online = models.BooleanField(default=False)
     
+    # Circuit breaker (see mikrotik.circuit): calls fail fast while open
+    circuit_state = models.CharField(max_length=10, choices=CIRCUIT_STATE_CHOICES, default='closed')
+    circuit_failures = models.PositiveIntegerField(default=0, help_text='Consecutive connection failures')
+    circuit_opened_at = models.DateTimeField(null=True, blank=True)
+    circuit_retry_at = models.DateTimeField(null=True, blank=True, help_text='When the next probe is allowed')
+    
+    # Last successful /ppp/active snapshot (see LiveSession)
+    sessions_refreshed_at = models.DateTimeField(null=True, blank=True)
+    
+    # First traffic counter reading (see mikrotik.usage); later readings are deltas
+    usage_baseline_at = models.DateTimeField(null=True, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -128,6 +171,10 @@ class MikroTikSyncLog(models.Model):
         ('delete_user', 'Delete PPPoE User'),
         ('enable_user', 'Enable User'),
         ('disable_user', 'Disable User'),
+        ('create_profile', 'Create PPP Profile'),
+        ('update_profile', 'Update PPP Profile'),
+        ('reconcile', 'Reconcile Router'),
+        ('provision', 'Provision Router'),
     )
     
     STATUS_CHOICES = (
@@ -149,6 +196,9 @@ class MikroTikSyncLog(models.Model):
     
     request_data = models.JSONField(blank=True, null=True)
     response_data = models.JSONField(blank=True, null=True)
+    # Large request/response payloads are moved here (zlib-compressed JSON)
+    # by the retention job; request_data/response_data are then cleared
+    compressed_payload = models.BinaryField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
@@ -158,6 +208,631 @@ class MikroTikSyncLog(models.Model):
         verbose_name = 'MikroTik Sync Log'
         verbose_name_plural = 'MikroTik Sync Logs'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='sync_log_created_idx'),
+            models.Index(fields=['router', '-created_at'], name='sync_log_router_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='sync_log_status_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.action} on {self.router.name} - {self.status}"
+    
+    def compress_payload(self):
+        """
+        Move request/response data into compressed_payload
+        """
+        payload = {'request_data': self.request_data, 'response_data': self.response_data}
+        self.compressed_payload = zlib.compress(json.dumps(payload, separators=(',', ':')).encode())
+        self.request_data = None
+        self.response_data = None
+    
+    def get_payload(self):
+        """
+        (request_data, response_data), decompressing if needed
+        """
+        if self.compressed_payload:
+            payload = json.loads(zlib.decompress(bytes(self.compressed_payload)))
+            return payload['request_data'], payload['response_data']
+        return self.request_data, self.response_data
+    
+    def get_request_data(self):
+        return self.get_payload()[0]
+    
+    def get_response_data(self):
+        return self.get_payload()[1]
+
+
+class MikroTikSyncLogSummary(models.Model):
+    """
+    Per-day counts of sync log entries that were pruned by retention
+    """
+    date = models.DateField()
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        related_name='sync_log_summaries'
+    )
+    action = models.CharField(max_length=20, choices=MikroTikSyncLog.ACTION_CHOICES)
+    status = models.CharField(max_length=10, choices=MikroTikSyncLog.STATUS_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'mikrotik_sync_log_summaries'
+        verbose_name = 'MikroTik Sync Log Summary'
+        verbose_name_plural = 'MikroTik Sync Log Summaries'
+        ordering = ['-date', 'router']
+        unique_together = ['date', 'router', 'action', 'status']
+    
+    def __str__(self):
+        return f"{self.date} {self.action} on {self.router.name} - {self.status}: {self.count}"
+
+
+class LiveSession(models.Model):
+    """
+    Snapshot of active PPP sessions (/ppp/active), refreshed by the
+    session poller so views never have to query the routers
+    """
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        related_name='live_sessions'
+    )
+    username = models.CharField(max_length=100, db_index=True)
+    
+    # Session details from the router
+    session_id = models.CharField(max_length=50, blank=True, null=True, help_text='MikroTik .id of the active entry')
+    service = models.CharField(max_length=20, blank=True, null=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    mac_address = models.CharField(max_length=17, blank=True, null=True)
+    uptime = models.CharField(max_length=50, blank=True, null=True)
+    
+    refreshed_at = models.DateTimeField(help_text='When this entry was last seen on the router')
+    
+    class Meta:
+        db_table = 'mikrotik_live_sessions'
+        verbose_name = 'Live Session'
+        verbose_name_plural = 'Live Sessions'
+        ordering = ['username']
+        unique_together = ['router', 'username']
+        indexes = [
+            models.Index(fields=['ip_address'], name='live_session_ip_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.username} on {self.router.name}"
+
+
+class RouterSecret(models.Model):
+    """
+    Local mirror of a router's /ppp/secret entries (see mikrotik.secret_mirror),
+    so commands can address secrets by .id and skip writes that change nothing
+    """
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        related_name='secrets'
+    )
+    name = models.CharField(max_length=100)
+    secret_id = models.CharField(max_length=50, help_text='MikroTik .id of the secret')
+    profile = models.CharField(max_length=100, blank=True, null=True)
+    disabled = models.BooleanField(default=False)
+    attributes_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        help_text='Hash of the attributes last pushed or read (empty if unknown)'
+    )
+    
+    refreshed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'mikrotik_router_secrets'
+        verbose_name = 'Router Secret'
+        verbose_name_plural = 'Router Secrets'
+        ordering = ['name']
+        unique_together = ['router', 'name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.secret_id}) on router {self.router_id}"
+
+
+class MikroTikCommand(models.Model):
+    """
+    Outbox of router commands. Rows are written in the same transaction as
+    the subscription change and executed by the MikroTik worker
+    (run_mikrotik_worker), so requests never wait on router I/O.
+    """
+    ACTION_CHOICES = (
+        ('create_user', 'Create PPPoE User'),
+        ('update_user', 'Update PPPoE User'),
+        ('enable_user', 'Enable User'),
+        ('disable_user', 'Disable User'),
+        ('delete_user', 'Delete PPPoE User'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+        ('superseded', 'Superseded'),
+    )
+    
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        related_name='commands'
+    )
+    subscription = models.ForeignKey(
+        'subscription.Subscription',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='mikrotik_commands'
+    )
+    package_migration = models.ForeignKey(
+        'subscription.PackageMigration',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='commands',
+        help_text='Bulk package migration that queued the command'
+    )
+    action = models.CharField(max_length=20, choices=ACTION_CHOICES)
+    username = models.CharField(max_length=100, help_text='PPPoE username the command targets')
+    payload = models.JSONField(default=dict, blank=True)
+    
+    # Delivery state
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    claim_token = models.CharField(
+        max_length=32,
+        null=True,
+        blank=True,
+        help_text='Worker pass that claimed the command; only that pass may record its outcome'
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'mikrotik_commands'
+        verbose_name = 'MikroTik Command'
+        verbose_name_plural = 'MikroTik Commands'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['router', 'username', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.action} {self.username} on {self.router.name} - {self.status}"
+
+
+class TrafficCounter(models.Model):
+    """
+    Last raw byte counters read from a router's /queue/simple per user,
+    used to turn counter readings into deltas
+    """
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        related_name='traffic_counters'
+    )
+    username = models.CharField(max_length=100)
+    upload_bytes = models.BigIntegerField(default=0)
+    download_bytes = models.BigIntegerField(default=0)
+    sampled_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'mikrotik_traffic_counters'
+        verbose_name = 'Traffic Counter'
+        verbose_name_plural = 'Traffic Counters'
+        unique_together = ['router', 'username']
+    
+    def __str__(self):
+        return f"{self.username} on {self.router.name}"
+
+
+class UsageDay(models.Model):
+    """
+    One day of traffic for a subscription: 24 hourly buckets packed into
+    binary arrays (see mikrotik.usage) plus the daily totals
+    """
+    subscription = models.ForeignKey(
+        'subscription.Subscription',
+        on_delete=models.CASCADE,
+        related_name='usage_days'
+    )
+    date = models.DateField()
+    
+    hourly_upload = models.BinaryField(help_text='24 little-endian uint64 byte counts')
+    hourly_download = models.BinaryField(help_text='24 little-endian uint64 byte counts')
+    upload_bytes = models.BigIntegerField(default=0)
+    download_bytes = models.BigIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'usage_days'
+        verbose_name = 'Usage Day'
+        verbose_name_plural = 'Usage Days'
+        ordering = ['-date']
+        unique_together = ['subscription', 'date']
+    
+    def __str__(self):
+        return f"Usage {self.subscription_id} on {self.date}"
+
+
+class UsageMonth(models.Model):
+    """
+    Monthly traffic rollup for a subscription
+    """
+    subscription = models.ForeignKey(
+        'subscription.Subscription',
+        on_delete=models.CASCADE,
+        related_name='usage_months'
+    )
+    year = models.IntegerField()
+    month = models.IntegerField()
+    upload_bytes = models.BigIntegerField(default=0)
+    download_bytes = models.BigIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'usage_months'
+        verbose_name = 'Usage Month'
+        verbose_name_plural = 'Usage Months'
+        ordering = ['-year', '-month']
+        unique_together = ['subscription', 'year', 'month']
+    
+    def __str__(self):
+        return f"Usage {self.subscription_id} for {self.month:02d}/{self.year}"
+
+
+class RouterHealthSample(models.Model):
+    """
+    One health probe of a router (written by the probe_router_health job)
+    """
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        related_name='health_samples'
+    )
+    sampled_at = models.DateTimeField()
+    is_online = models.BooleanField()
+    
+    # Latency in milliseconds
+    connect_ms = models.FloatField(null=True, blank=True, help_text='TCP connect time to the API port')
+    rtt_ms = models.FloatField(null=True, blank=True, help_text='API round trip (/system/resource print)')
+    
+    # From /system/resource
+    cpu_load = models.PositiveSmallIntegerField(null=True, blank=True, help_text='Percent')
+    memory_used = models.PositiveSmallIntegerField(null=True, blank=True, help_text='Percent')
+    uptime = models.PositiveIntegerField(null=True, blank=True, help_text='Seconds')
+    
+    error = models.CharField(max_length=255, blank=True, null=True)
+    
+    class Meta:
+        db_table = 'mikrotik_router_health'
+        verbose_name = 'Router Health Sample'
+        verbose_name_plural = 'Router Health Samples'
+        ordering = ['-sampled_at']
+        indexes = [
+            models.Index(fields=['router', '-sampled_at'], name='router_health_latest_idx'),
+            models.Index(fields=['sampled_at'], name='router_health_sampled_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.router.name} at {self.sampled_at} - {'online' if self.is_online else 'offline'}"
+
+
+class SessionEvent(models.Model):
+    """
+    PPP session start/stop, derived from consecutive /ppp/active snapshots
+    """
+    EVENT_CHOICES = (
+        ('start', 'Session Started'),
+        ('stop', 'Session Stopped'),
+    )
+    
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        related_name='session_events'
+    )
+    subscription = models.ForeignKey(
+        'subscription.Subscription',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='session_events'
+    )
+    # Customer zone at the time of the event (for flap statistics)
+    zone = models.ForeignKey(
+        Zone,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='session_events'
+    )
+    username = models.CharField(max_length=100)
+    event = models.CharField(max_length=10, choices=EVENT_CHOICES)
+    occurred_at = models.DateTimeField(help_text='Start: estimated from uptime; stop: when the drop was detected')
+    
+    # Session details
+    session_id = models.CharField(max_length=50, blank=True, null=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    mac_address = models.CharField(max_length=17, blank=True, null=True)
+    uptime = models.PositiveIntegerField(null=True, blank=True, help_text='Session length in seconds (last seen)')
+    
+    class Meta:
+        db_table = 'mikrotik_session_events'
+        verbose_name = 'Session Event'
+        verbose_name_plural = 'Session Events'
+        ordering = ['-occurred_at']
+        indexes = [
+            models.Index(fields=['subscription', '-occurred_at'], name='session_event_sub_idx'),
+            models.Index(fields=['username', '-occurred_at'], name='session_event_user_idx'),
+            models.Index(fields=['zone', 'occurred_at'], name='session_event_zone_idx'),
+            models.Index(fields=['occurred_at'], name='session_event_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.username} {self.event} at {self.occurred_at}"
+
+
+class IPPool(models.Model):
+    """
+    CIDR pool of static addresses for a zone and/or router.
+    Free addresses are kept as sorted [first, last] host offset ranges, so
+    the next free address is the start of the first range.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    network = models.CharField(max_length=43, unique=True, help_text='CIDR, e.g. 103.112.10.0/24')
+    gateway = models.GenericIPAddressField(blank=True, null=True, help_text='Never allocated')
+    zone = models.ForeignKey(
+        Zone,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ip_pools'
+    )
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='ip_pools'
+    )
+    
+    # Allocation state (derived from IPAllocation, see mikrotik.ip_pools)
+    free_ranges = models.JSONField(default=list, blank=True)
+    size = models.PositiveIntegerField(default=0, help_text='Allocatable addresses')
+    free_count = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'mikrotik_ip_pools'
+        verbose_name = 'IP Pool'
+        verbose_name_plural = 'IP Pools'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.network})"
+
+
+class IPAllocation(models.Model):
+    """
+    Address taken from an IP pool: assigned to a customer (static IP) or
+    reserved (customer empty), e.g. found in use by a live session
+    """
+    pool = models.ForeignKey(
+        IPPool,
+        on_delete=models.CASCADE,
+        related_name='allocations'
+    )
+    address = models.GenericIPAddressField(unique=True)
+    customer = models.ForeignKey(
+        'customers.Customer',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='ip_allocations'
+    )
+    note = models.CharField(max_length=255, blank=True, null=True)
+    allocated_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'mikrotik_ip_allocations'
+        verbose_name = 'IP Allocation'
+        verbose_name_plural = 'IP Allocations'
+        ordering = ['pool', 'address']
+        indexes = [
+            models.Index(fields=['customer'], name='ip_allocation_customer_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.address} ({self.customer or 'reserved'})"
+
+
+class AddressLease(models.Model):
+    """
+    Which subscriber used an IP/MAC address and when: one row per PPP
+    session, opened by its start event and closed by its stop event
+    """
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='address_leases'
+    )
+    subscription = models.ForeignKey(
+        'subscription.Subscription',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='address_leases'
+    )
+    username = models.CharField(max_length=100)
+    session_id = models.CharField(max_length=50, blank=True, null=True)
+    ip_address = models.GenericIPAddressField(blank=True, null=True)
+    mac_address = models.CharField(max_length=17, blank=True, null=True)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField(null=True, blank=True, help_text='Empty while the session is up')
+    
+    class Meta:
+        db_table = 'mikrotik_address_leases'
+        verbose_name = 'Address Lease'
+        verbose_name_plural = 'Address Leases'
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['ip_address', '-started_at'], name='address_lease_ip_idx'),
+            models.Index(fields=['mac_address', '-started_at'], name='address_lease_mac_idx'),
+            models.Index(fields=['subscription', '-started_at'], name='address_lease_sub_idx'),
+            models.Index(
+                fields=['router', 'username'],
+                condition=models.Q(ended_at__isnull=True),
+                name='address_lease_open_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.ip_address or self.mac_address} - {self.username} from {self.started_at}"
+
+
+class ConfigBlob(models.Model):
+    """
+    One distinct router configuration (/export), addressed by the SHA-256
+    of its text and stored zlib-compressed: whole, or as a line delta
+    against a base blob (see mikrotik/backups.py)
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    base = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='deltas',
+        help_text='Blob the delta applies to (empty for a full blob)'
+    )
+    data = models.BinaryField()
+    size = models.PositiveIntegerField(help_text='Uncompressed size of the configuration in bytes')
+    stored_size = models.PositiveIntegerField(help_text='Bytes stored for this blob')
+    depth = models.PositiveSmallIntegerField(default=0, help_text='Deltas to apply on top of a full blob')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'mikrotik_config_blobs'
+        verbose_name = 'Config Blob'
+        verbose_name_plural = 'Config Blobs'
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({'delta' if self.base_id else 'full'})"
+
+
+class RouterConfigBackup(models.Model):
+    """
+    A version of a router's configuration. A new row is only written when
+    the configuration changed; unchanged backups move last_seen_at.
+    """
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        related_name='config_backups'
+    )
+    blob = models.ForeignKey(
+        ConfigBlob,
+        on_delete=models.PROTECT,
+        related_name='backups'
+    )
+    created_at = models.DateTimeField(help_text='First backup with this configuration')
+    last_seen_at = models.DateTimeField(help_text='Latest backup with this configuration')
+    lines = models.PositiveIntegerField(default=0)
+    
+    # Against the previous version
+    added_lines = models.PositiveIntegerField(default=0)
+    removed_lines = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'mikrotik_router_config_backups'
+        verbose_name = 'Router Config Backup'
+        verbose_name_plural = 'Router Config Backups'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['router', '-created_at'], name='config_backup_latest_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.router.name} config from {self.created_at}"
+
+
+class RouterJob(models.Model):
+    """
+    Long-running router work started from the API. The view queues the job
+    and answers 202; the job worker (run_router_jobs) runs it and stores
+    the outcome, which callers poll (see mikrotik/jobs.py).
+    """
+    KIND_CHOICES = (
+        ('provision', 'Provision Router'),
+        ('config_backup', 'Config Backup'),
+        ('reconcile', 'Reconcile Routers'),
+        ('package_migration', 'Package Migration'),
+        ('router_migration', 'Router Migration'),
+    )
+    
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    params = models.JSONField(default=dict, blank=True)
+    
+    # Execution state
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, null=True)
+    worker_id = models.CharField(max_length=100, null=True, blank=True, help_text='Worker running the job')
+    heartbeat_at = models.DateTimeField(null=True, blank=True, help_text='Refreshed while the worker is alive')
+    
+    created_by = models.ForeignKey(
+        'accounts.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'mikrotik_router_jobs'
+        verbose_name = 'Router Job'
+        verbose_name_plural = 'Router Jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='router_job_queue_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} - {self.status}"
@@ -0,0 +1,431 @@
+"""
+Transactional outbox for router commands.
+
+Views and signals call enqueue_command() inside their own transaction, so
+the command is stored if and only if the domain change commits. The
+MikroTik worker (run_mikrotik_worker) drains the queue:
+
+- commands for the same router + username run strictly in order
+- redundant commands are collapsed before they reach the router
+  (e.g. enable followed by disable only sends the disable)
+- each router's due commands go out as per-action bulk batches over one
+  pipelined session, and routers are processed in parallel
+- failures are retried with exponential backoff
+
+Every pass claims its commands with a fresh claim_token, and outcomes are
+only stored for commands still claimed by that token. A router batch
+that overruns MIKROTIK_OUTBOX_TIMEOUT stops sending at the next batch
+boundary and puts its unsent commands back. Claims older than
+MIKROTIK_OUTBOX_RELEASE_AFTER are taken to belong to a dead worker and
+are released; a late outcome of such a claim is dropped, not written
+over the newer one.
+"""
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from subscription.models import Subscription
+from .models import MikroTikRouter, MikroTikCommand, MikroTikSyncLog
+from .services import fetch_from_routers
+
+logger = logging.getLogger(__name__)
+
+# Commands that only set the enabled/disabled flag; the last one wins
+TOGGLE_ACTIONS = ('enable_user', 'disable_user')
+
+BULK_ACTIONS = {
+    'enable_user': 'bulk_enable_pppoe_users',
+    'disable_user': 'bulk_disable_pppoe_users',
+    'delete_user': 'bulk_delete_pppoe_users',
+}
+
+
+def enqueue_command(subscription, action, payload=None, router=None):
+    """
+    Queue a router command for a subscription. Call this inside the
+    transaction that makes the corresponding change.
+    """
+    command = MikroTikCommand.objects.create(
+        router=router or subscription.router,
+        subscription=subscription,
+        action=action,
+        username=subscription.mikrotik_username,
+        payload=payload or {},
+    )
+    subscription.sync_status = 'pending'
+    Subscription.objects.filter(pk=subscription.pk).update(sync_status='pending')
+    return command
+
+
+def enqueue_commands(subscriptions, action, package_migration=None):
+    """
+    Bulk version of enqueue_command for subscriptions with a router.
+    Returns the created commands.
+    """
+    subscriptions = [subscription for subscription in subscriptions if subscription.router_id]
+    commands = MikroTikCommand.objects.bulk_create([
+        MikroTikCommand(
+            router_id=subscription.router_id,
+            subscription=subscription,
+            action=action,
+            username=subscription.mikrotik_username,
+            package_migration=package_migration,
+        )
+        for subscription in subscriptions
+    ])
+    for subscription in subscriptions:
+        subscription.sync_status = 'pending'
+    Subscription.objects.filter(pk__in=[s.pk for s in subscriptions]).update(sync_status='pending')
+    return commands
+
+
+def process_outbox(batch_size=None):
+    """
+    Run one pass of the worker: claim due commands, send them to their
+    routers and record the outcome. Returns a summary dict.
+    """
+    batch_size = batch_size or settings.MIKROTIK_OUTBOX_BATCH_SIZE
+    summary = {'claimed': 0, 'done': 0, 'retried': 0, 'failed': 0, 'superseded': 0, 'released': 0}
+
+    _release_stuck_commands()
+    commands = _claim_due_commands(batch_size)
+    if not commands:
+        return summary
+    summary['claimed'] = len(commands)
+
+    commands_by_router = defaultdict(list)
+    for command in commands:
+        commands_by_router[command.router_id].append(command)
+
+    routers = MikroTikRouter.objects.filter(pk__in=commands_by_router.keys())
+    deadline = time.monotonic() + settings.MIKROTIK_OUTBOX_TIMEOUT
+    results, errors = fetch_from_routers(
+        routers,
+        lambda service: run_router_commands(service, commands_by_router[service.router.pk], deadline=deadline),
+        timeout=settings.MIKROTIK_OUTBOX_TIMEOUT
+    )
+
+    for router_summary in results.values():
+        for key, count in router_summary.items():
+            summary[key] += count
+    for router_id, message in errors.items():
+        # The batch stops at its next batch boundary and records what it
+        # sent; unsent commands go back to pending
+        logger.warning(f"Outbox batch for router {router_id} did not finish: {message}")
+
+    return summary
+
+
+def run_router_commands(service, commands, deadline=None):
+    """
+    Execute one router's claimed commands over a single session and store
+    the results. No new batch is sent after `deadline` (time.monotonic());
+    the unsent commands are released. Returns counts by outcome.
+    """
+    commands, superseded = collapse_commands(commands)
+    outcomes = []
+
+    try:
+        if not service.connect():
+            outcomes = [(command, (False, "Failed to connect to router")) for command in commands]
+        else:
+            try:
+                for wave in _waves(commands):
+                    if _past(deadline):
+                        break
+                    outcomes.extend(_run_wave(service, wave, deadline))
+            finally:
+                service.disconnect()
+    except Exception as e:
+        logger.error(f"Error running outbox commands on {service.router.name}: {e}")
+        done = {command.pk for command, _ in outcomes}
+        outcomes.extend(
+            (command, (False, str(e))) for command in commands if command.pk not in done
+        )
+
+    sent = {command.pk for command, _ in outcomes}
+    released = [command for command in commands if command.pk not in sent]
+    if released:
+        logger.warning(f"Outbox batch for {service.router.name} hit its deadline; releasing {len(released)} unsent commands")
+    return _record_outcomes(outcomes, superseded, released)
+
+
+def collapse_commands(commands):
+    """
+    Drop commands made redundant by a later command for the same user.
+    Returns (kept, superseded), both in queue order.
+    """
+    kept_by_key = defaultdict(list)
+    superseded = []
+
+    for command in sorted(commands, key=lambda c: c.pk):
+        kept = kept_by_key[(command.router_id, command.username)]
+        while kept and _supersedes(command.action, kept[-1].action):
+            superseded.append(kept.pop())
+        kept.append(command)
+
+    kept = sorted((c for key_commands in kept_by_key.values() for c in key_commands), key=lambda c: c.pk)
+    return kept, superseded
+
+
+def _supersedes(new_action, old_action):
+    if new_action in TOGGLE_ACTIONS and old_action in TOGGLE_ACTIONS:
+        return True
+    if new_action == 'update_user' and old_action == 'update_user':
+        return True
+    if new_action == 'delete_user' and old_action in TOGGLE_ACTIONS + ('update_user',):
+        return True
+    return False
+
+
+def _waves(commands):
+    """
+    Split commands so each user has at most one command per wave; waves run
+    in order, so per-user ordering holds while a wave can be batched freely.
+    """
+    waves = []
+    depth = defaultdict(int)
+    for command in commands:
+        key = (command.router_id, command.username)
+        if depth[key] == len(waves):
+            waves.append([])
+        waves[depth[key]].append(command)
+        depth[key] += 1
+    return waves
+
+
+def _run_wave(service, wave, deadline=None):
+    """
+    Send one wave as per-action batches, none after `deadline`.
+    Returns [(command, (success, result))] for the commands sent.
+    """
+    by_action = defaultdict(list)
+    for command in wave:
+        by_action[command.action].append(command)
+
+    outcomes = []
+    for action, commands in by_action.items():
+        if _past(deadline):
+            break
+        if action in BULK_ACTIONS:
+            results = getattr(service, BULK_ACTIONS[action])([c.username for c in commands])
+            for command in commands:
+                outcomes.append((command, results.get(command.username, (False, "User not found"))))
+            continue
+
+        with_subscription = [c for c in commands if c.subscription is not None]
+        for command in commands:
+            if command.subscription is None:
+                outcomes.append((command, (False, "Subscription no longer exists")))
+
+        if action == 'update_user':
+            results = service.bulk_update_pppoe_users([c.subscription for c in with_subscription])
+            for command in with_subscription:
+                outcomes.append((
+                    command,
+                    results.get(command.subscription.mikrotik_username, (False, "User not found"))
+                ))
+        elif action == 'create_user':
+            results = service.bulk_create_pppoe_users(
+                [c.subscription for c in with_subscription],
+                force_link={
+                    c.subscription.mikrotik_username for c in with_subscription if c.payload.get('force_link')
+                }
+            )
+            for command in with_subscription:
+                outcomes.append((
+                    command,
+                    results.get(command.subscription.mikrotik_username, (False, "Subscription has no MikroTik username"))
+                ))
+
+    return outcomes
+
+
+def _record_outcomes(outcomes, superseded, released=()):
+    """
+    Persist command results, write sync logs and refresh subscription sync
+    fields. Commands no longer claimed by this pass (released as stuck in
+    the meantime) are left alone.
+    """
+    now = timezone.now()
+    counts = {'done': 0, 'retried': 0, 'failed': 0, 'superseded': 0, 'released': 0}
+    subscriptions = {}
+    logs = []
+
+    with transaction.atomic():
+        claimed = superseded + list(released) + [command for command, _ in outcomes]
+        owned = set(
+            MikroTikCommand.objects.select_for_update()
+            .filter(
+                pk__in=[command.pk for command in claimed],
+                status='processing',
+                claim_token__in={command.claim_token for command in claimed}
+            )
+            .values_list('pk', flat=True)
+        )
+        lost = len(claimed) - len(owned)
+        if lost:
+            logger.warning(f"Dropping the outcome of {lost} MikroTik commands claimed again after release")
+
+        superseded = [command for command in superseded if command.pk in owned]
+        released = [command for command in released if command.pk in owned]
+        outcomes = [(command, result) for command, result in outcomes if command.pk in owned]
+
+        for command in superseded:
+            command.status = 'superseded'
+            command.processed_at = now
+        counts['superseded'] = len(superseded)
+
+        for command in released:
+            command.status = 'pending'
+        counts['released'] = len(released)
+
+        for command, (success, result) in outcomes:
+            message = None if success else str(result)
+            sub = command.subscription
+            if sub is not None:
+                sub = subscriptions.setdefault(sub.pk, sub)
+
+            if success:
+                command.status = 'done'
+                command.processed_at = now
+                command.last_error = None
+                counts['done'] += 1
+            else:
+                command.attempts += 1
+                command.last_error = message
+                if command.attempts >= settings.MIKROTIK_OUTBOX_MAX_ATTEMPTS:
+                    command.status = 'failed'
+                    command.processed_at = now
+                    counts['failed'] += 1
+                else:
+                    command.status = 'pending'
+                    command.next_attempt_at = now + _retry_delay(command.attempts)
+                    counts['retried'] += 1
+
+            if sub is not None:
+                if success:
+                    sub.is_synced_to_mikrotik = command.action != 'delete_user'
+                    sub.last_synced_at = now
+                    sub.sync_error = None
+                    if command.action == 'create_user' and isinstance(result, dict) and 'id' in result:
+                        sub.mikrotik_user_id = result['id']
+                else:
+                    sub.sync_error = message
+                    if command.action == 'create_user' and command.status == 'failed':
+                        sub.is_synced_to_mikrotik = False
+
+            if success or command.status == 'failed':
+                logs.append(MikroTikSyncLog(
+                    router_id=command.router_id,
+                    action=command.action,
+                    status='success' if success else 'failed',
+                    entity_type='pppoe_user',
+                    entity_id=command.username,
+                    request_data={'subscription_id': command.subscription_id, 'command_id': command.pk},
+                    response_data=result if isinstance(result, dict) else {'message': str(result)},
+                    error_message=message
+                ))
+
+        commands = superseded + released + [command for command, _ in outcomes]
+        for command in commands:
+            command.claim_token = None
+        MikroTikCommand.objects.bulk_update(
+            commands, ['status', 'attempts', 'next_attempt_at', 'last_error', 'processed_at', 'claim_token']
+        )
+        MikroTikSyncLog.objects.bulk_create(logs)
+
+        # Subscriptions with commands still queued stay 'pending'
+        still_pending = set(
+            MikroTikCommand.objects.filter(
+                subscription_id__in=subscriptions.keys(), status__in=('pending', 'processing')
+            ).values_list('subscription_id', flat=True)
+        )
+        for sub in subscriptions.values():
+            if sub.pk in still_pending:
+                sub.sync_status = 'pending'
+            else:
+                sub.sync_status = 'failed' if sub.sync_error else 'synced'
+
+        Subscription.objects.bulk_update(
+            subscriptions.values(),
+            ['is_synced_to_mikrotik', 'last_synced_at', 'sync_error', 'sync_status', 'mikrotik_user_id']
+        )
+
+    return counts
+
+
+def _claim_due_commands(limit):
+    """
+    Claim up to `limit` due commands, skipping any whose router + username
+    still has an earlier command waiting (in backoff or being processed).
+    """
+    now = timezone.now()
+    due = list(
+        MikroTikCommand.objects.filter(status='pending', next_attempt_at__lte=now)
+        .order_by('id')
+        .values_list('id', 'router_id', 'username')[:limit]
+    )
+    if not due:
+        return []
+
+    first_blocker = {}
+    blockers = MikroTikCommand.objects.filter(
+        status__in=('pending', 'processing'),
+        username__in={username for _, _, username in due}
+    ).exclude(
+        pk__in=[pk for pk, _, _ in due]
+    ).values_list('router_id', 'username', 'id')
+    for router_id, username, pk in blockers:
+        key = (router_id, username)
+        first_blocker[key] = min(first_blocker.get(key, pk), pk)
+
+    ready = [
+        pk for pk, router_id, username in due
+        if (router_id, username) not in first_blocker or pk < first_blocker[(router_id, username)]
+    ]
+
+    with transaction.atomic():
+        claimed = list(
+            MikroTikCommand.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=ready, status='pending')
+            .values_list('pk', flat=True)
+        )
+        MikroTikCommand.objects.filter(pk__in=claimed).update(
+            status='processing', claimed_at=now, claim_token=uuid.uuid4().hex
+        )
+
+    return list(
+        MikroTikCommand.objects.filter(pk__in=claimed)
+        .select_related('subscription__customer', 'subscription__package')
+        .order_by('id')
+    )
+
+
+def _release_stuck_commands():
+    """
+    Put back commands claimed by a worker that died mid-batch. Live batches
+    stop at MIKROTIK_OUTBOX_TIMEOUT, so a claim this old has no owner left;
+    clearing the token keeps a late outcome from overwriting a newer one.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.MIKROTIK_OUTBOX_RELEASE_AFTER)
+    released = MikroTikCommand.objects.filter(
+        status='processing', claimed_at__lt=cutoff
+    ).update(status='pending', claim_token=None)
+    if released:
+        logger.warning(f"Released {released} stuck MikroTik commands")
+
+
+def _past(deadline):
+    return deadline is not None and time.monotonic() > deadline
+
+
+def _retry_delay(attempts):
+    delay = settings.MIKROTIK_OUTBOX_RETRY_DELAY * (2 ** (attempts - 1))
+    return timedelta(seconds=min(delay, settings.MIKROTIK_OUTBOX_MAX_RETRY_DELAY))
@@ -0,0 +1,250 @@
+"""
+Process-wide pool of authenticated RouterOS API sessions
+"""
+import logging
+import socket
+import threading
+import time
+
+from django.conf import settings
+from routeros_api import RouterOsApiPool
+from routeros_api.exceptions import RouterOsApiConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(RouterOsApiConnectionError):
+    """
+    No free session slot for a router (the router itself may be fine)
+    """
+
+
+def _credentials(router):
+    """
+    Connection parameters a session was opened with; a change in any of
+    them (e.g. password edited in admin) invalidates pooled sessions.
+    """
+    return (str(router.ip_address), router.api_port, router.username, router.password)
+
+
+class RouterSession:
+    """
+    One authenticated API connection to a router.
+
+    `connect_timeout` bounds the TCP connect and login; `read_timeout`
+    bounds every reply afterwards. A read timeout closes the session, since
+    the reply stream is no longer in sync.
+    """
+
+    def __init__(self, router, connect_timeout=15.0, read_timeout=15.0):
+        self.router_id = router.pk
+        self.credentials = _credentials(router)
+        self.connection = RouterOsApiPool(
+            host=str(router.ip_address),
+            username=router.username,
+            password=router.password,
+            port=router.api_port,
+            plaintext_login=True,
+        )
+        self.connection.socket_timeout = connect_timeout
+        try:
+            self.api = self.connection.get_api()
+        except socket.timeout:
+            self.connection.disconnect()
+            raise RouterOsApiConnectionError(f"Router {router.name} did not answer the login in time")
+        self.connection.set_timeout(read_timeout)
+        self._close_on_read_timeout()
+        self.last_used_at = time.monotonic()
+    
+    def _close_on_read_timeout(self):
+        socket_wrapper = self.connection.socket
+        receive = socket_wrapper.receive
+        
+        def receive_with_deadline(length):
+            try:
+                return receive(length)
+            except socket.timeout:
+                self.connection.disconnect()
+                raise RouterOsApiConnectionError(f"Router {self.router_id} did not reply in time")
+        
+        socket_wrapper.receive = receive_with_deadline
+
+    @property
+    def is_connected(self):
+        """
+        routeros_api marks the connection closed on socket/fatal errors
+        """
+        return self.connection.connected
+
+    @property
+    def idle_seconds(self):
+        return time.monotonic() - self.last_used_at
+
+    def ping(self):
+        """
+        Cheap round trip to verify the session is still alive
+        """
+        self.api.get_resource('/system/identity').get()
+
+    def close(self):
+        try:
+            self.connection.disconnect()
+        except Exception as e:
+            logger.debug(f"Error closing session to router {self.router_id}: {e}")
+
+
+class RouterConnectionPool:
+    """
+    Keeps authenticated sessions per router id alive between calls.
+
+    - at most `max_sessions` sessions per router are handed out at once
+    - idle sessions are health-checked before reuse
+    - sessions idle longer than `idle_timeout` are closed
+    - broken sessions are discarded and a fresh one is opened
+    """
+
+    def __init__(self, max_sessions=2, idle_timeout=300, health_check_interval=30, acquire_timeout=30,
+                 connect_timeout=15.0, read_timeout=15.0):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+
+    def acquire(self, router):
+        """
+        Get a live session for router, opening a new one if needed
+        """
+        slots = self._get_slots(router.pk)
+        if not slots.acquire(timeout=self.acquire_timeout):
+            raise PoolTimeoutError(
+                f"Timed out waiting for a free session to router {router.name}"
+            )
+
+        try:
+            self.evict_idle()
+
+            session = self._pop_idle(router)
+            while session is not None:
+                if self._is_healthy(session):
+                    return session
+                session.close()
+                session = self._pop_idle(router)
+
+            session = RouterSession(router, self.connect_timeout, self.read_timeout)
+            logger.info(f"Opened new API session to MikroTik router: {router.name}")
+            return session
+        except Exception:
+            slots.release()
+            raise
+
+    def release(self, session, discard=False):
+        """
+        Return a session to the pool (or close it if it is broken)
+        """
+        try:
+            if discard or not session.is_connected:
+                session.close()
+            else:
+                session.last_used_at = time.monotonic()
+                with self._lock:
+                    self._idle.setdefault(session.router_id, []).append(session)
+        finally:
+            self._get_slots(session.router_id).release()
+
+    def evict_idle(self):
+        """
+        Close sessions that have been idle longer than idle_timeout
+        """
+        expired = []
+        with self._lock:
+            for router_id, sessions in self._idle.items():
+                keep = []
+                for session in sessions:
+                    if session.idle_seconds > self.idle_timeout:
+                        expired.append(session)
+                    else:
+                        keep.append(session)
+                self._idle[router_id] = keep
+
+        for session in expired:
+            session.close()
+
+    def close_router(self, router_id):
+        """
+        Close all idle sessions for a router
+        """
+        with self._lock:
+            sessions = self._idle.pop(router_id, [])
+        for session in sessions:
+            session.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions = [s for router_sessions in self._idle.values() for s in router_sessions]
+            self._idle = {}
+        for session in sessions:
+            session.close()
+
+    def _get_slots(self, router_id):
+        with self._lock:
+            if router_id not in self._slots:
+                self._slots[router_id] = threading.BoundedSemaphore(self.max_sessions)
+            return self._slots[router_id]
+
+    def _pop_idle(self, router):
+        credentials = _credentials(router)
+        stale = []
+        session = None
+        with self._lock:
+            sessions = self._idle.get(router.pk, [])
+            while sessions:
+                candidate = sessions.pop()
+                if candidate.credentials == credentials:
+                    session = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            candidate.close()
+        return session
+
+    def _is_healthy(self, session):
+        if not session.is_connected:
+            return False
+        if session.idle_seconds < self.health_check_interval:
+            return True
+        try:
+            session.ping()
+            return True
+        except Exception as e:
+            logger.info(f"Discarding stale session to router {session.router_id}: {e}")
+            return False
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Return the process-wide connection pool (created lazily, so each
+    gunicorn worker gets its own after fork)
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = RouterConnectionPool(
+                    max_sessions=settings.MIKROTIK_POOL_MAX_SESSIONS,
+                    idle_timeout=settings.MIKROTIK_POOL_IDLE_TIMEOUT,
+                    health_check_interval=settings.MIKROTIK_POOL_HEALTH_CHECK_INTERVAL,
+                    acquire_timeout=settings.MIKROTIK_POOL_ACQUIRE_TIMEOUT,
+                    connect_timeout=settings.MIKROTIK_CONNECT_TIMEOUT,
+                    read_timeout=settings.MIKROTIK_READ_TIMEOUT,
+                )
+    return _pool
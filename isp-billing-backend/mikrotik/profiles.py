@@ -0,0 +1,142 @@
+"""
+Push package PPP profiles to many routers at once.
+
+Each router gets one session that reads its /ppp/profile table and then
+adds or sets only the profiles that are missing or differ. Routers are
+processed in parallel; MikroTikQueueProfile rows and sync logs are written
+in bulk afterwards.
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MikroTikRouter, MikroTikQueueProfile, MikroTikSyncLog
+from .services import fetch_from_routers
+
+logger = logging.getLogger(__name__)
+
+
+def push_packages(packages, routers=None, zone=None):
+    """
+    Push the PPP profiles of `packages` to `routers` (default: all active
+    routers, optionally only those of `zone`).
+
+    Packages without a profile name are skipped. Returns the per-router
+    result matrix.
+    """
+    packages = list(packages)
+    skipped = [package for package in packages if not package.mikrotik_profile_name]
+    packages = [package for package in packages if package.mikrotik_profile_name]
+
+    if routers is None:
+        routers = MikroTikRouter.objects.filter(status='active')
+        if zone is not None:
+            routers = routers.filter(zone=zone)
+    routers = list(routers)
+
+    results, errors = {}, {}
+    if packages:
+        results, errors = fetch_from_routers(
+            routers,
+            lambda service: service.push_ppp_profiles(packages),
+            timeout=settings.MIKROTIK_PROFILE_PUSH_TIMEOUT
+        )
+
+    _record_results(packages, routers, results, errors)
+
+    matrix = {
+        'packages': [
+            {'id': package.pk, 'name': package.name, 'profile': package.mikrotik_profile_name}
+            for package in packages
+        ],
+        'skipped_packages': [
+            {'id': package.pk, 'name': package.name, 'reason': 'No MikroTik profile name set'}
+            for package in skipped
+        ],
+        'routers': [],
+        'summary': {'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'unreachable_routers': 0},
+    }
+
+    for router in routers:
+        row = {'router_id': router.pk, 'router_name': router.name, 'error': None, 'results': {}}
+        if router.pk in errors or not packages:
+            row['error'] = errors.get(router.pk)
+            if row['error']:
+                matrix['summary']['unreachable_routers'] += 1
+        else:
+            for package_id, (success, result) in results.get(router.pk, {}).items():
+                if success:
+                    row['results'][package_id] = {'status': result['action']}
+                    matrix['summary'][result['action']] += 1
+                else:
+                    row['results'][package_id] = {'status': 'failed', 'error': result}
+                    matrix['summary']['failed'] += 1
+        matrix['routers'].append(row)
+
+    logger.info(f"Pushed {len(packages)} package profiles to {len(routers)} routers: {matrix['summary']}")
+    return matrix
+
+
+def _record_results(packages, routers, results, errors):
+    """
+    Upsert MikroTikQueueProfile rows and write sync logs for a push
+    """
+    now = timezone.now()
+    profiles = []
+    logs = []
+
+    for router in routers:
+        router_results = results.get(router.pk)
+        for package in packages:
+            if router_results is None:
+                success, result = False, errors.get(router.pk, 'No result')
+            else:
+                success, result = router_results.get(package.pk, (False, 'No result'))
+
+            profile = MikroTikQueueProfile(
+                package=package,
+                router=router,
+                is_synced=success,
+                last_synced_at=now if success else None,
+                sync_error=None if success else str(result),
+                updated_at=now,
+            )
+            if success:
+                profile.mikrotik_queue_id = result['id']
+            profiles.append(profile)
+
+            if success and result['action'] == 'unchanged':
+                continue
+            logs.append(MikroTikSyncLog(
+                router=router,
+                action='create_profile' if success and result['action'] == 'created' else 'update_profile',
+                status='success' if success else 'failed',
+                entity_type='profile',
+                entity_id=package.mikrotik_profile_name,
+                request_data={'package_id': package.pk},
+                response_data=result if success else {'message': str(result)},
+                error_message=None if success else str(result)
+            ))
+
+    succeeded = [profile for profile in profiles if profile.is_synced]
+    failed = [profile for profile in profiles if not profile.is_synced]
+
+    with transaction.atomic():
+        MikroTikQueueProfile.objects.bulk_create(
+            succeeded,
+            update_conflicts=True,
+            unique_fields=['package', 'router'],
+            update_fields=['mikrotik_queue_id', 'is_synced', 'last_synced_at', 'sync_error', 'updated_at'],
+            batch_size=500,
+        )
+        # A failed push keeps the last known profile id and sync time
+        MikroTikQueueProfile.objects.bulk_create(
+            failed,
+            update_conflicts=True,
+            unique_fields=['package', 'router'],
+            update_fields=['is_synced', 'sync_error', 'updated_at'],
+            batch_size=500,
+        )
+        MikroTikSyncLog.objects.bulk_create(logs, batch_size=500)
@@ -0,0 +1,403 @@
+"""
+Router <-> database reconciliation for PPP secrets.
+
+Each router's /ppp/secret and /ppp/profile tables are downloaded once and
+diffed in memory against the subscriptions assigned to that router. Only
+the differences are pushed back: at most one change per drifted secret,
+pipelined over a single session in batches, with the outcome of each
+written through to the RouterSecret mirror. Routers are reconciled in
+parallel.
+
+Only secrets we created (service pppoe/any with a build_pppoe_comment
+comment) are reported as orphaned and may be removed; other secrets on
+the router (L2TP/OVPN, admin or hand-made ones) are reported as unmanaged
+and left alone.
+
+A router that misses the MIKROTIK_RECONCILE_TIMEOUT deadline is stopped
+before its next batch: apply_actions checks a stop flag between batches,
+and its report counts what was applied and what was not. The API runs
+applying reconciliations as RouterJobs (reconcile_job).
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+from routeros_api.exceptions import RouterOsApiConnectionError
+
+from subscription.models import Subscription
+from .jobs import JobFailed
+from .models import MikroTikRouter, MikroTikSyncLog
+from .secret_mirror import forget_secrets, record_disabled, record_pushed, store_secrets
+from .services import build_pppoe_user_data, fetch_from_routers, is_billing_comment
+
+logger = logging.getLogger(__name__)
+
+# Changes pipelined between two checks of the stop flag
+APPLY_BATCH_SIZE = 200
+
+# Differences reported by the diff
+ISSUE_TYPES = (
+    'missing',          # subscription has no secret on its router
+    'orphaned',         # secret we created with no subscription behind it any more
+    'unmanaged',        # other secret on the router (not ours, never removed)
+    'profile',          # secret uses a different profile
+    'disabled',         # secret enabled/disabled flag does not match status
+    'remote_address',   # static IP differs
+    'comment',          # customer comment is out of date
+    'unknown_profile',  # subscription profile does not exist on the router (not fixable here)
+)
+
+
+def reconcile_routers(routers=None, apply=False, remove_orphans=False):
+    """
+    Reconcile many routers in parallel.
+
+    With apply=False this is a dry run that only reports the differences.
+    Orphaned secrets are only removed when remove_orphans is also set.
+    Returns a list of per-router reports.
+    """
+    if routers is None:
+        routers = MikroTikRouter.objects.filter(status='active')
+    routers = list(routers)
+
+    # Reports are filled in as the routers progress, so a router that
+    # misses the deadline still shows what was applied before it
+    reports = {router.pk: _new_report(router, apply) for router in routers}
+    idle = {router.pk: threading.Event() for router in routers}
+    for event in idle.values():
+        event.set()
+    stop = threading.Event()
+    _, errors = fetch_from_routers(
+        routers,
+        lambda service: reconcile_router(
+            service, apply=apply, remove_orphans=remove_orphans,
+            report=reports[service.router.pk], stop=stop, idle=idle[service.router.pk]
+        ),
+        timeout=settings.MIKROTIK_RECONCILE_TIMEOUT
+    )
+    # Routers still running past the deadline stop before their next change
+    stop.set()
+
+    for router_id, message in errors.items():
+        # Let the command in flight finish, so the counts are final
+        idle[router_id].wait(settings.MIKROTIK_READ_TIMEOUT)
+        reports[router_id]['error'] = message
+    return [reports[router.pk] for router in routers]
+
+
+def reconcile_job(job):
+    """
+    RouterJob handler: reconcile and apply (see mikrotik/jobs.py)
+    """
+    routers = MikroTikRouter.objects.filter(status='active')
+    if job.params.get('router_ids'):
+        routers = MikroTikRouter.objects.filter(pk__in=job.params['router_ids'])
+
+    reports = reconcile_routers(routers, apply=True, remove_orphans=job.params.get('remove_orphans', False))
+    result = {'routers': reports}
+    failed = [report['router_name'] for report in reports if report['error']]
+    if failed:
+        raise JobFailed(f"Reconciliation failed on {', '.join(failed)}", result=result)
+    return result
+
+
+def reconcile_router(service, apply=False, remove_orphans=False, report=None, stop=None, idle=None):
+    """
+    Download, diff and (optionally) fix one router over a single session.
+    Changes are no longer sent once the `stop` event is set; `idle` is
+    cleared while changes are being sent.
+    """
+    router = service.router
+    report = report if report is not None else _new_report(router, apply)
+
+    subscriptions = list(
+        Subscription.objects.filter(router=router).select_related('customer', 'package')
+    )
+
+    if not service.connect():
+        raise RouterOsApiConnectionError("Failed to connect to router")
+
+    try:
+        secret_resource = service.api.get_resource('/ppp/secret')
+        secrets = secret_resource.get()
+        profiles = {
+            profile.get('name')
+            for profile in service.api.get_resource('/ppp/profile').call('print', {'.proplist': 'name'})
+        }
+
+        # The full download doubles as a refresh of the RouterSecret mirror
+        store_secrets(router, secrets, full=True)
+
+        changes, actions = diff_secrets(subscriptions, secrets, profiles)
+        report['changes'] = changes
+        for change in changes:
+            report['summary'][change['issue']] += 1
+
+        if apply:
+            report['applied'] = _new_applied()
+            if idle is not None:
+                idle.clear()
+            try:
+                apply_actions(
+                    service, secret_resource, actions,
+                    remove_orphans=remove_orphans, stop=stop, applied=report['applied']
+                )
+            finally:
+                if idle is not None:
+                    idle.set()
+            # Ids of the secrets just created come back from their add
+            secrets = secrets + [
+                {'name': action['username'], 'id': action['id']}
+                for action in actions
+                if action['action'] == 'add' and action.get('id')
+            ]
+    finally:
+        service.disconnect()
+
+    if apply:
+        applied = report['applied']
+        applied['db_updated'] = _update_subscriptions(subscriptions, secrets)
+        errors = applied['errors'][:50]
+        if applied['not_applied']:
+            errors.insert(0, f"Stopped at the deadline; {applied['not_applied']} changes not applied")
+        MikroTikSyncLog.objects.create(
+            router=router,
+            action='reconcile',
+            status='failed' if applied['failed'] or applied['not_applied'] else 'success',
+            entity_type='router',
+            entity_id=str(router.pk),
+            request_data={'remove_orphans': remove_orphans},
+            response_data={'summary': report['summary'], 'applied': applied},
+            error_message='\n'.join(errors) or None
+        )
+
+    logger.info(
+        f"Reconciled {router.name}: {len(report['changes'])} differences"
+        + (f", applied {report['applied']}" if apply else " (dry run)")
+    )
+    return report
+
+
+def diff_secrets(subscriptions, secrets, profiles):
+    """
+    Compare subscriptions against the router's secrets.
+
+    Returns (changes, actions): changes is the human-readable report, one
+    entry per difference; actions is the minimal command list that fixes
+    them (at most one command per secret).
+    """
+    secrets_by_name = {secret['name']: secret for secret in secrets if secret.get('name')}
+    changes = []
+    actions = []
+    expected_names = set()
+
+    for sub in subscriptions:
+        username = sub.mikrotik_username
+        if not username:
+            continue
+        expected_names.add(username)
+
+        expected = build_pppoe_user_data(sub)
+        profile = expected.get('profile')
+        disabled = sub.status != 'active'
+        secret = secrets_by_name.get(username)
+
+        profile_known = not profile or profile in profiles
+        if not profile_known:
+            changes.append(_change(username, 'unknown_profile', profile, secret.get('profile') if secret else None))
+
+        if secret is None:
+            # Cancelled subscriptions are not recreated
+            if sub.status == 'cancelled':
+                continue
+            changes.append(_change(username, 'missing', username, None))
+            if profile_known:
+                data = {key: value for key, value in expected.items() if value}
+                data['service'] = 'pppoe'
+                data['disabled'] = 'yes' if disabled else 'no'
+                actions.append({'action': 'add', 'username': username, 'data': data})
+            continue
+
+        fields = {}
+        unset = []
+
+        if profile and profile_known and secret.get('profile') != profile:
+            changes.append(_change(username, 'profile', profile, secret.get('profile')))
+            fields['profile'] = profile
+
+        if _is_disabled(secret) != disabled:
+            changes.append(_change(username, 'disabled', disabled, _is_disabled(secret)))
+            fields['disabled'] = 'yes' if disabled else 'no'
+
+        remote_address = expected.get('remote-address')
+        actual_address = secret.get('remote-address') or None
+        if remote_address != actual_address:
+            changes.append(_change(username, 'remote_address', remote_address, actual_address))
+            if remote_address:
+                fields['remote-address'] = remote_address
+            else:
+                unset.append('remote-address')
+
+        if (secret.get('comment') or '') != expected['comment']:
+            changes.append(_change(username, 'comment', expected['comment'], secret.get('comment')))
+            fields['comment'] = expected['comment']
+
+        if fields or unset:
+            # The secret as it will be once the change is applied
+            pushed = {key: value for key, value in secret.items() if key not in unset}
+            pushed.update(fields)
+            actions.append({
+                'action': 'set',
+                'username': username,
+                'id': secret['id'],
+                'data': fields,
+                'unset': unset,
+                'pushed': pushed,
+            })
+
+    for username, secret in secrets_by_name.items():
+        if username in expected_names:
+            continue
+        if _is_ours(secret):
+            changes.append(_change(username, 'orphaned', None, username))
+            actions.append({'action': 'remove', 'username': username, 'id': secret['id']})
+        else:
+            changes.append(_change(username, 'unmanaged', None, username))
+
+    return changes, actions
+
+
+def apply_actions(service, secret_resource, actions, remove_orphans=False, stop=None, applied=None):
+    """
+    Push the diff actions over an open /ppp/secret resource, pipelined in
+    batches of APPLY_BATCH_SIZE, and write each outcome through to the
+    RouterSecret mirror. The `applied` counts are updated after every
+    batch; once the `stop` event is set, the remaining actions are counted
+    as not_applied instead. Created secrets get their new .id in
+    action['id']. Returns counts plus the error messages of failed commands.
+    """
+    applied = applied if applied is not None else _new_applied()
+    router = service.router
+
+    for start in range(0, len(actions), APPLY_BATCH_SIZE):
+        if stop is not None and stop.is_set():
+            applied['not_applied'] = len(actions) - start
+            logger.warning(f"Reconcile apply stopped at the deadline; {applied['not_applied']} changes not applied")
+            break
+        batch = actions[start:start + APPLY_BATCH_SIZE]
+
+        calls = []
+        for index, action in enumerate(batch):
+            if action['action'] == 'add':
+                calls.append(((index, 'add'), 'add', action['data']))
+            elif action['action'] == 'set':
+                if action['data']:
+                    calls.append(((index, 'set'), 'set', {'id': action['id'], **action['data']}))
+                for name in action['unset']:
+                    calls.append(((index, name), 'unset', {'numbers': action['id'], 'value-name': name}))
+            elif remove_orphans:
+                calls.append(((index, 'remove'), 'remove', {'id': action['id']}))
+        results = service.pipeline(secret_resource, calls)
+
+        # An action succeeded if all of its commands did
+        outcomes = {}
+        for (index, _), (success, response) in results.items():
+            if not success:
+                outcomes[index] = (False, response)
+            else:
+                outcomes.setdefault(index, (True, response))
+
+        pushed = {}
+        disabled = {True: [], False: []}
+        removed = []
+        failed = []
+        for index, action in enumerate(batch):
+            username = action['username']
+            if index not in outcomes:
+                applied['skipped'] += 1
+                continue
+            success, response = outcomes[index]
+            if not success:
+                applied['failed'] += 1
+                applied['errors'].append(f"{username}: {response}")
+                failed.append(username)
+            elif action['action'] == 'add':
+                action['id'] = response.done_message.get('ret')
+                pushed[username] = (action['id'], action['data'])
+                disabled[action['data']['disabled'] == 'yes'].append(username)
+                applied['created'] += 1
+            elif action['action'] == 'set':
+                pushed[username] = (action['id'], action['pushed'])
+                if 'disabled' in action['data']:
+                    disabled[action['data']['disabled'] == 'yes'].append(username)
+                applied['updated'] += 1
+            else:
+                removed.append(username)
+                applied['removed'] += 1
+
+        record_pushed(router, pushed)
+        for flag, usernames in disabled.items():
+            record_disabled(router, usernames, flag)
+        # Failed secrets are in an unknown state; they are re-learned on their next command
+        forget_secrets(router, removed + failed)
+
+    return applied
+
+
+def _update_subscriptions(subscriptions, secrets):
+    """
+    Store the router's secret ids and mark subscriptions that now exist on
+    the router as synced. Returns the number of rows updated.
+    """
+    secret_ids = {secret['name']: secret['id'] for secret in secrets if secret.get('name')}
+    now = timezone.now()
+
+    changed = []
+    for sub in subscriptions:
+        user_id = secret_ids.get(sub.mikrotik_username)
+        if not user_id:
+            continue
+        if sub.mikrotik_user_id == user_id and sub.is_synced_to_mikrotik and not sub.sync_error:
+            continue
+        sub.mikrotik_user_id = user_id
+        sub.is_synced_to_mikrotik = True
+        sub.last_synced_at = now
+        sub.sync_error = None
+        changed.append(sub)
+
+    Subscription.objects.bulk_update(
+        changed, ['mikrotik_user_id', 'is_synced_to_mikrotik', 'last_synced_at', 'sync_error'], batch_size=500
+    )
+    return len(changed)
+
+
+def _new_report(router, apply):
+    return {
+        'router_id': router.pk,
+        'router_name': router.name,
+        'dry_run': not apply,
+        'summary': {issue: 0 for issue in ISSUE_TYPES},
+        'changes': [],
+        'applied': None,
+        'error': None,
+    }
+
+
+def _new_applied():
+    return {
+        'created': 0, 'updated': 0, 'removed': 0, 'skipped': 0, 'failed': 0, 'not_applied': 0, 'errors': []
+    }
+
+
+def _change(username, issue, expected, actual):
+    return {'username': username, 'issue': issue, 'expected': expected, 'actual': actual}
+
+
+def _is_disabled(secret):
+    return str(secret.get('disabled', 'false')).lower() in ('true', 'yes')
+
+
+def _is_ours(secret):
+    # PPPoE secrets carrying the comment build_pppoe_comment writes
+    return secret.get('service', 'any') in ('pppoe', 'any') and is_billing_comment(secret.get('comment'))
@@ -0,0 +1,140 @@
+"""
+Local mirror of each router's /ppp/secret table (RouterSecret).
+
+Keeping .id, profile, disabled and a hash of the pushed attributes per
+secret lets bulk commands address secrets by .id instead of looking each
+name up on the router, and skip updates that would not change anything.
+
+The mirror is maintained incrementally:
+- commands write through what they changed (ids of created secrets, new
+  attribute hashes, disabled flags, removals)
+- reconciliation diffs the full table it downloads anyway and only writes
+  the rows that differ
+- an id the router no longer knows ("no such item") drops the row; the
+  command falls back to a lookup by name and is retried once
+"""
+import hashlib
+
+from django.utils import timezone
+
+from .models import RouterSecret
+
+# Attributes pushed by build_pppoe_user_data(); their hash detects no-op updates
+HASHED_FIELDS = ('name', 'password', 'profile', 'comment', 'remote-address')
+
+
+def secret_hash(data):
+    """
+    Hash of the pushed attributes of a secret (from our data or a router print)
+    """
+    values = [str(data.get(field) or '') for field in HASHED_FIELDS]
+    return hashlib.sha256('\x00'.join(values).encode()).hexdigest()
+
+
+def is_stale_id_error(message):
+    return 'no such item' in str(message)
+
+
+def is_disabled(secret):
+    return str(secret.get('disabled', 'false')).lower() in ('true', 'yes')
+
+
+def cached_secrets(router, usernames):
+    """
+    {name: RouterSecret} for the given usernames
+    """
+    return {
+        secret.name: secret
+        for secret in RouterSecret.objects.filter(router=router, name__in=set(usernames))
+    }
+
+
+def store_secrets(router, secrets, full=False):
+    """
+    Bring the mirror in line with secrets read from the router (rows with
+    at least id and name). Only rows that differ are written. With full,
+    `secrets` is the router's whole table and other mirrored names are
+    dropped. Returns the number of rows written.
+    """
+    secrets = {secret['name']: secret for secret in secrets if secret.get('name') and secret.get('id')}
+    existing = RouterSecret.objects.filter(router=router)
+    if not full:
+        existing = existing.filter(name__in=secrets.keys())
+    existing = {row.name: row for row in existing}
+    now = timezone.now()
+
+    to_create = []
+    to_update = []
+    for name, secret in secrets.items():
+        row = existing.get(name)
+        # Fields the print did not include are kept only if it is the same secret
+        same = row is not None and row.secret_id == secret['id']
+        values = {
+            'secret_id': secret['id'],
+            'profile': secret['profile'] if 'profile' in secret else (row.profile if same else None),
+            'disabled': is_disabled(secret) if 'disabled' in secret else (row.disabled if same else False),
+            'attributes_hash': (
+                secret_hash(secret) if 'password' in secret else (row.attributes_hash if same else None)
+            ),
+        }
+        if row is None:
+            to_create.append(RouterSecret(router=router, name=name, refreshed_at=now, **values))
+        elif any(getattr(row, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(row, field, value)
+            row.refreshed_at = now
+            to_update.append(row)
+
+    RouterSecret.objects.bulk_create(to_create, batch_size=1000)
+    RouterSecret.objects.bulk_update(
+        to_update, ['secret_id', 'profile', 'disabled', 'attributes_hash', 'refreshed_at'], batch_size=1000
+    )
+
+    removed = 0
+    if full:
+        removed, _ = RouterSecret.objects.filter(
+            router=router, name__in=set(existing) - set(secrets)
+        ).delete()
+    return len(to_create) + len(to_update) + removed
+
+
+def record_pushed(router, pushed):
+    """
+    Write through secrets we just created or updated:
+    pushed is {name: (secret_id, pushed attributes)}
+    """
+    now = timezone.now()
+    RouterSecret.objects.bulk_create(
+        [
+            RouterSecret(
+                router=router,
+                name=name,
+                secret_id=secret_id,
+                profile=data.get('profile'),
+                attributes_hash=secret_hash(data),
+                refreshed_at=now,
+            )
+            for name, (secret_id, data) in pushed.items()
+            if secret_id
+        ],
+        update_conflicts=True,
+        unique_fields=['router', 'name'],
+        update_fields=['secret_id', 'profile', 'attributes_hash', 'refreshed_at'],
+        batch_size=1000,
+    )
+
+
+def record_disabled(router, usernames, disabled):
+    """
+    Write through an enable/disable
+    """
+    RouterSecret.objects.filter(router=router, name__in=set(usernames)).update(
+        disabled=disabled, refreshed_at=timezone.now()
+    )
+
+
+def forget_secrets(router, usernames):
+    """
+    Drop mirrored secrets (removed, or their id went stale)
+    """
+    RouterSecret.objects.filter(router=router, name__in=set(usernames)).delete()
@@ -1,5 +1,11 @@
 from rest_framework import serializers
-from .models import Package, MikroTikRouter, MikroTikQueueProfile, MikroTikSyncLog
+from customers.models import Zone
+from .models import (
+    Package, MikroTikRouter, MikroTikQueueProfile, MikroTikSyncLog, MikroTikSyncLogSummary,
+    RouterHealthSample, SessionEvent, IPPool, IPAllocation, RouterConfigBackup, RouterJob
+)
+from .health import latest_health
+from .ip_pools import PoolError, parse_network, find_overlapping_pool, next_free_address
 
 
 class PackageSerializer(serializers.ModelSerializer):
@@ -11,6 +17,7 @@ class PackageSerializer(serializers.ModelSerializer):
         model = Package
         fields = [
             'id', 'name', 'price', 'description',
+            'mikrotik_profile_name', 'rate_limit',
             'status', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
@@ -23,7 +30,8 @@ class PackageCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Package
         fields = [
-            'name', 'price', 'description', 'status'
+            'name', 'price', 'description',
+            'mikrotik_profile_name', 'rate_limit', 'status'
         ]
 
 
@@ -44,18 +52,27 @@ class MikroTikRouterSerializer(serializers.ModelSerializer):
     Serializer for MikroTik Router
     """
     zone_name = serializers.CharField(source='zone.name', read_only=True)
+    health = serializers.SerializerMethodField()
     
     class Meta:
         model = MikroTikRouter
         fields = [
             'id', 'name', 'ip_address', 'api_port', 'username', 'password',
-            'zone', 'zone_name', 'status', 'is_online', 'last_connected_at',
+            'zone', 'zone_name', 'status', 'pipeline_window', 'is_online', 'last_connected_at',
+            'circuit_state', 'circuit_failures', 'circuit_retry_at', 'health',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'is_online', 'last_connected_at',
+            'circuit_state', 'circuit_failures', 'circuit_retry_at',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'is_online', 'last_connected_at', 'created_at', 'updated_at']
         extra_kwargs = {
             'password': {'write_only': True}
         }
+    
+    def get_health(self, obj):
+        return latest_health(obj)
 
 
 class MikroTikRouterListSerializer(serializers.ModelSerializer):
@@ -63,13 +80,78 @@ class MikroTikRouterListSerializer(serializers.ModelSerializer):
     Lightweight serializer for router list
     """
     zone_name = serializers.CharField(source='zone.name', read_only=True)
+    health = serializers.SerializerMethodField()
     
     class Meta:
         model = MikroTikRouter
         fields = [
             'id', 'name', 'ip_address', 'api_port', 'zone_name',
-            'status', 'is_online', 'last_connected_at'
+            'status', 'is_online', 'last_connected_at',
+            'circuit_state', 'circuit_retry_at', 'health'
+        ]
+    
+    def get_health(self, obj):
+        return latest_health(obj)
+
+
+class SessionEventSerializer(serializers.ModelSerializer):
+    """
+    Serializer for PPP session start/stop events
+    """
+    router_name = serializers.CharField(source='router.name', read_only=True)
+    
+    class Meta:
+        model = SessionEvent
+        fields = [
+            'id', 'event', 'occurred_at', 'username', 'subscription', 'router', 'router_name',
+            'session_id', 'ip_address', 'mac_address', 'uptime'
+        ]
+        read_only_fields = fields
+
+
+class RouterHealthSampleSerializer(serializers.ModelSerializer):
+    """
+    Serializer for router health samples
+    """
+    class Meta:
+        model = RouterHealthSample
+        fields = [
+            'sampled_at', 'is_online', 'connect_ms', 'rtt_ms',
+            'cpu_load', 'memory_used', 'uptime', 'error'
         ]
+        read_only_fields = fields
+
+
+class RouterConfigBackupSerializer(serializers.ModelSerializer):
+    """
+    Serializer for router configuration backup versions
+    """
+    sha256 = serializers.CharField(source='blob.sha256', read_only=True)
+    size = serializers.IntegerField(source='blob.size', read_only=True)
+    stored_size = serializers.IntegerField(source='blob.stored_size', read_only=True)
+    
+    class Meta:
+        model = RouterConfigBackup
+        fields = [
+            'id', 'router', 'created_at', 'last_seen_at', 'lines',
+            'added_lines', 'removed_lines', 'sha256', 'size', 'stored_size'
+        ]
+        read_only_fields = fields
+
+
+class RouterJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for queued long-running router jobs
+    """
+    router_name = serializers.CharField(source='router.name', read_only=True, default=None)
+    
+    class Meta:
+        model = RouterJob
+        fields = [
+            'id', 'kind', 'router', 'router_name', 'params', 'status', 'result', 'error',
+            'created_by', 'created_at', 'started_at', 'finished_at', 'heartbeat_at'
+        ]
+        read_only_fields = fields
 
 
 class MikroTikQueueProfileSerializer(serializers.ModelSerializer):
@@ -78,7 +160,7 @@ class MikroTikQueueProfileSerializer(serializers.ModelSerializer):
     """
     package_name = serializers.CharField(source='package.name', read_only=True)
     router_name = serializers.CharField(source='router.name', read_only=True)
-    name = serializers.CharField(source='package.mikrotik_queue_name', read_only=True)
+    name = serializers.CharField(source='package.mikrotik_profile_name', read_only=True)
     
     class Meta:
         model = MikroTikQueueProfile
@@ -100,6 +182,8 @@ class MikroTikSyncLogSerializer(serializers.ModelSerializer):
     router_name = serializers.CharField(source='router.name', read_only=True)
     action_display = serializers.CharField(source='get_action_display', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
+    request_data = serializers.JSONField(source='get_request_data', read_only=True)
+    response_data = serializers.JSONField(source='get_response_data', read_only=True)
     
     class Meta:
         model = MikroTikSyncLog
@@ -109,3 +193,139 @@ class MikroTikSyncLogSerializer(serializers.ModelSerializer):
             'request_data', 'response_data', 'error_message', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
+
+
+class MikroTikSyncLogSummarySerializer(serializers.ModelSerializer):
+    """
+    Serializer for MikroTik Sync Log daily summaries
+    """
+    router_name = serializers.CharField(source='router.name', read_only=True)
+    
+    class Meta:
+        model = MikroTikSyncLogSummary
+        fields = ['id', 'date', 'router', 'router_name', 'action', 'status', 'count']
+        read_only_fields = fields
+
+
+class RouterReconcileSerializer(serializers.Serializer):
+    """
+    Input for router reconciliation (dry run unless apply is set)
+    """
+    router_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        help_text='Routers to reconcile (default: all active routers)'
+    )
+    apply = serializers.BooleanField(default=False)
+    remove_orphans = serializers.BooleanField(default=False)
+    
+    def validate(self, attrs):
+        if attrs['remove_orphans'] and not attrs['apply']:
+            raise serializers.ValidationError({'remove_orphans': 'Orphans can only be removed when apply is set'})
+        return attrs
+
+
+class PackageBulkSyncSerializer(serializers.Serializer):
+    """
+    Input for pushing package profiles to routers
+    """
+    package_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    router_ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False,
+        help_text='Routers to push to (default: all active routers)'
+    )
+    zone = serializers.PrimaryKeyRelatedField(
+        queryset=Zone.objects.all(), required=False,
+        help_text='Only push to the active routers of this zone'
+    )
+    
+    def validate(self, attrs):
+        if attrs.get('router_ids') and attrs.get('zone'):
+            raise serializers.ValidationError('Use either router_ids or zone, not both')
+        return attrs
+
+
+class IPPoolSerializer(serializers.ModelSerializer):
+    """
+    Serializer for static IP pools
+    """
+    zone_name = serializers.CharField(source='zone.name', read_only=True)
+    router_name = serializers.CharField(source='router.name', read_only=True)
+    allocated_count = serializers.SerializerMethodField()
+    next_free = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = IPPool
+        fields = [
+            'id', 'name', 'network', 'gateway', 'zone', 'zone_name', 'router', 'router_name',
+            'size', 'free_count', 'allocated_count', 'next_free', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'size', 'free_count', 'created_at', 'updated_at']
+    
+    def get_allocated_count(self, obj):
+        return obj.size - obj.free_count
+    
+    def get_next_free(self, obj):
+        return next_free_address(obj)
+    
+    def validate_network(self, value):
+        try:
+            network = parse_network(value)
+        except PoolError as e:
+            raise serializers.ValidationError(str(e))
+        
+        if self.instance and self.instance.network != str(network) and self.instance.allocations.exists():
+            raise serializers.ValidationError('Release all allocations before changing the network')
+        
+        overlapping = find_overlapping_pool(network, exclude=self.instance)
+        if overlapping:
+            raise serializers.ValidationError(f"Overlaps pool {overlapping.name} ({overlapping.network})")
+        return str(network)
+    
+    def validate(self, attrs):
+        network = attrs.get('network') or (self.instance and self.instance.network)
+        gateway = attrs.get('gateway')
+        if gateway and network and not parse_network(gateway).subnet_of(parse_network(network)):
+            raise serializers.ValidationError({'gateway': 'Gateway is not inside the pool network'})
+        return attrs
+
+
+class IPAllocationSerializer(serializers.ModelSerializer):
+    """
+    Serializer for IP pool allocations
+    """
+    customer_id_display = serializers.CharField(source='customer.customer_id', read_only=True)
+    customer_name = serializers.CharField(source='customer.name', read_only=True)
+    
+    class Meta:
+        model = IPAllocation
+        fields = ['id', 'pool', 'address', 'customer', 'customer_id_display', 'customer_name', 'note', 'allocated_at']
+        read_only_fields = fields
+
+
+class IPPoolAllocateSerializer(serializers.Serializer):
+    """
+    Input for allocating pool addresses to customers
+    """
+    customer_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    address = serializers.IPAddressField(
+        protocol='IPv4', required=False,
+        help_text='Specific address (only with a single customer)'
+    )
+    
+    def validate(self, attrs):
+        if attrs.get('address') and len(attrs['customer_ids']) != 1:
+            raise serializers.ValidationError('A specific address can only go to one customer')
+        return attrs
+
+
+class IPPoolReleaseSerializer(serializers.Serializer):
+    """
+    Input for returning addresses to a pool
+    """
+    addresses = serializers.ListField(child=serializers.IPAddressField(protocol='IPv4'), required=False)
+    customer_ids = serializers.ListField(child=serializers.IntegerField(), required=False)
+    
+    def validate(self, attrs):
+        if not attrs.get('addresses') and not attrs.get('customer_ids'):
+            raise serializers.ValidationError('Give addresses or customer_ids')
+        return attrs
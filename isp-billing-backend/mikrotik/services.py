@@ -2,12 +2,105 @@
 MikroTik API Service for router communication
 """
 import logging
-from routeros_api import RouterOsApiPool
-from routeros_api.exceptions import RouterOsApiConnectionError, RouterOsApiCommunicationError
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from routeros_api.exceptions import (
+    RouterOsApiConnectionError, RouterOsApiCommunicationError, RouterOsApiFatalCommunicationError
+)
+from django.conf import settings
+from django.db import connection
 from django.utils import timezone
 
+from . import circuit
+from .pool import PoolTimeoutError, get_pool
+from .secret_mirror import (
+    cached_secrets, forget_secrets, is_disabled, is_stale_id_error, record_disabled, record_pushed, secret_hash,
+    store_secrets
+)
+
 logger = logging.getLogger(__name__)
 
+# Errors after which the session is unusable for the rest of a batch
+BROKEN_SESSION_ERRORS = (RouterOsApiConnectionError, RouterOsApiFatalCommunicationError)
+
+# Batches up to this size look secrets up by name; larger ones fetch the whole map
+SECRET_LOOKUP_BATCH_THRESHOLD = 20
+
+# Secret fields read on lookups, enough to refresh the RouterSecret mirror
+SECRET_LOOKUP_PROPLIST = '.id,name,profile,disabled'
+
+# Shape of the comments written by build_pppoe_comment
+BILLING_COMMENT = re.compile(r'ID: \S+ \| Name: .* \| Package: ')
+
+PPP_SECRET_ACTIONS = {
+    'enable': ('enabling', 'enabled'),
+    'disable': ('disabling', 'disabled'),
+    'delete': ('deleting', 'deleted'),
+}
+
+
+def build_pppoe_comment(subscription):
+    """
+    Detailed PPP secret comment with customer information
+    """
+    customer = subscription.customer
+    comment_parts = [
+        f"ID: {customer.customer_id}",
+        f"Name: {customer.name}",
+        f"Phone: {customer.phone}",
+        f"Package: {subscription.package.name}",
+        f"Expiry Day: {subscription.billing_day}"
+    ]
+    
+    # Add address if available
+    if customer.address:
+        comment_parts.append(f"Address: {customer.address[:50]}")  # Limit to 50 chars
+    
+    return " | ".join(comment_parts)
+
+
+def is_billing_comment(comment):
+    """
+    Whether a secret comment was written by build_pppoe_comment
+    """
+    return bool(BILLING_COMMENT.match(comment or ''))
+
+
+def _collision_message(username):
+    return (
+        f"User '{username}' already exists in MikroTik. "
+        "Please delete it from router or use a different username."
+    )
+
+
+def build_ppp_profile_data(package):
+    """
+    PPP profile attributes for a package
+    """
+    profile_data = {'name': package.mikrotik_profile_name}
+    if package.rate_limit:
+        profile_data['rate-limit'] = package.rate_limit
+    return profile_data
+
+
+def build_pppoe_user_data(subscription):
+    """
+    PPP secret attributes for a subscription
+    """
+    user_data = {
+        'name': subscription.mikrotik_username,
+        'password': subscription.mikrotik_password,
+        'profile': subscription.mikrotik_profile_name,  # Use selected profile
+        'comment': build_pppoe_comment(subscription)
+    }
+    
+    # Add static IP if customer has one
+    if subscription.customer.static_ip:
+        user_data['remote-address'] = str(subscription.customer.static_ip)
+    
+    return user_data
+
 
 class MikroTikService:
     """
@@ -19,35 +112,41 @@ class MikroTikService:
         Initialize MikroTik service with router instance
         """
         self.router = router
-        self.connection = None
+        self.session = None
         self.api = None
+        self._depth = 0
     
     def connect(self):
         """
-        Connect to MikroTik router
+        Check out a pooled session to the MikroTik router.
+        Nested connect()/disconnect() pairs share the same session.
+        Fails fast without touching the network while the router's circuit
+        breaker is open.
         """
+        if self.session is not None:
+            self._depth += 1
+            return True
+        
+        if not circuit.allow_request(self.router):
+            logger.info(f"Circuit open for {self.router.name}, skipping connection")
+            return False
+        
         try:
-            self.connection = RouterOsApiPool(
-                host=self.router.ip_address,
-                username=self.router.username,
-                password=self.router.password,
-                port=self.router.api_port,
-                plaintext_login=True,
-            )
-            self.api = self.connection.get_api()
-            
-            # Update router status
-            self.router.is_online = True
-            self.router.last_connected_at = timezone.now()
-            self.router.save(update_fields=['is_online', 'last_connected_at'])
+            self.session = get_pool().acquire(self.router)
+            self.api = self.session.api
+            self._depth = 1
             
-            logger.info(f"Connected to MikroTik router: {self.router.name}")
+            circuit.record_success(self.router)
+            self._mark_online()
             return True
             
+        except PoolTimeoutError as e:
+            logger.error(f"Failed to connect to {self.router.name}: {str(e)}")
+            return False
         except (RouterOsApiConnectionError, RouterOsApiCommunicationError) as e:
             logger.error(f"Failed to connect to {self.router.name}: {str(e)}")
-            self.router.is_online = False
-            self.router.save(update_fields=['is_online'])
+            circuit.record_failure(self.router)
+            self._mark_offline()
             return False
         except Exception as e:
             logger.error(f"Unexpected error connecting to {self.router.name}: {str(e)}")
@@ -55,14 +154,54 @@ class MikroTikService:
     
     def disconnect(self):
         """
-        Disconnect from MikroTik router
+        Return the session to the pool (broken sessions are closed)
         """
+        if self.session is None:
+            return
+        
+        self._depth -= 1
+        if self._depth > 0:
+            return
+        
+        # The session broke mid-call (e.g. a read deadline passed)
+        if not self.session.is_connected:
+            circuit.record_failure(self.router)
+        
         try:
-            if self.connection:
-                self.connection.disconnect()
-                logger.info(f"Disconnected from MikroTik router: {self.router.name}")
+            get_pool().release(self.session)
         except Exception as e:
-            logger.error(f"Error disconnecting from {self.router.name}: {str(e)}")
+            logger.error(f"Error releasing session to {self.router.name}: {str(e)}")
+        finally:
+            self.session = None
+            self.api = None
+    
+    def _mark_online(self):
+        """
+        Record a successful connection. Writes are coalesced: the router row
+        is only updated when it flips online or the last write is stale.
+        """
+        now = timezone.now()
+        last_connected_at = self.router.last_connected_at
+        if (
+            self.router.is_online
+            and last_connected_at
+            and (now - last_connected_at).total_seconds() < settings.MIKROTIK_STATUS_UPDATE_INTERVAL
+        ):
+            return
+        
+        self.router.is_online = True
+        self.router.last_connected_at = now
+        self.router.save(update_fields=['is_online', 'last_connected_at'])
+    
+    def _mark_offline(self):
+        """
+        Record a failed connection (only written when the router flips offline)
+        """
+        if not self.router.is_online:
+            return
+        
+        self.router.is_online = False
+        self.router.save(update_fields=['is_online'])
     
     def create_queue_profile(self, package):
         """
@@ -217,26 +356,19 @@ class MikroTikService:
         try:
             profile_resource = self.api.get_resource('/ppp/profile')
             
-            rate_limit = f"{package.bandwidth_upload}M/{package.bandwidth_download}M"
-            
-            profile_data = {
-                'name': package.mikrotik_queue_name,
-                'rate-limit': rate_limit,
-            }
-            
             # Create profile
-            result = profile_resource.add(**profile_data)
+            result = profile_resource.add(**build_ppp_profile_data(package))
             
-            logger.info(f"Created PPP profile: {package.mikrotik_queue_name}")
+            logger.info(f"Created PPP profile: {package.mikrotik_profile_name}")
             return True, result
             
         except Exception as e:
             error_msg = str(e)
             if "already have such name" in error_msg:
-                logger.info(f"PPP Profile {package.mikrotik_queue_name} already exists")
+                logger.info(f"PPP Profile {package.mikrotik_profile_name} already exists")
                 # Try to get ID
                 try:
-                    existing = profile_resource.get(name=package.mikrotik_queue_name)
+                    existing = profile_resource.get(name=package.mikrotik_profile_name)
                     if existing:
                         return True, existing[0]
                 except:
@@ -258,18 +390,10 @@ class MikroTikService:
         try:
             profile_resource = self.api.get_resource('/ppp/profile')
             
-            rate_limit = f"{package.bandwidth_upload}M/{package.bandwidth_download}M"
-            
-            update_data = {
-                '.id': profile_id,
-                'name': package.mikrotik_queue_name,
-                'rate-limit': rate_limit,
-            }
-            
             # Update profile
-            profile_resource.set(**update_data)
+            profile_resource.set(id=profile_id, **build_ppp_profile_data(package))
             
-            logger.info(f"Updated PPP profile: {package.mikrotik_queue_name}")
+            logger.info(f"Updated PPP profile: {package.mikrotik_profile_name}")
             return True, "Profile updated successfully"
             
         except Exception as e:
@@ -279,222 +403,485 @@ class MikroTikService:
         finally:
             self.disconnect()
 
-    # ==================== PPPoE User Management ====================
-    
-    def create_pppoe_user(self, subscription, force_link=False):
+    def push_ppp_profiles(self, packages):
         """
-        Create PPPoE user for subscription.
-        If force_link is True, it will try to link to an existing user if a name collision occurs.
+        Create or update the PPP profiles of many packages over one session.
+        Profiles that already match are left alone.
+        Returns {package_id: (success, {'action': ..., 'id': ...} or error)};
+        raises if the router cannot be reached.
         """
         if not self.connect():
-            return False, "Failed to connect to router"
+            raise RouterOsApiConnectionError("Failed to connect to router")
         
+        results = {}
         try:
-            pppoe_resource = self.api.get_resource('/ppp/secret')
-            
-            # Prepare detailed comment with customer information
-            customer = subscription.customer
-            comment_parts = [
-                f"ID: {customer.customer_id}",
-                f"Name: {customer.name}",
-                f"Phone: {customer.phone}",
-                f"Package: {subscription.package.name}",
-                f"Expiry Day: {subscription.billing_day}"
-            ]
-            
-            # Add address if available
-            if customer.address:
-                comment_parts.append(f"Address: {customer.address[:50]}")  # Limit to 50 chars
-            
-            comment = " | ".join(comment_parts)
-            
-            # Prepare PPPoE user data
-            user_data = {
-                'name': subscription.mikrotik_username,
-                'password': subscription.mikrotik_password,
-                'service': 'pppoe',
-                'profile': subscription.mikrotik_profile_name,  # Use selected profile
-                'comment': comment
+            profile_resource = self.api.get_resource('/ppp/profile')
+            existing = {
+                profile.get('name'): profile
+                for profile in profile_resource.call('print', {'.proplist': '.id,name,rate-limit'})
             }
             
-            # Add static IP if customer has one
-            if subscription.customer.static_ip:
-                user_data['remote-address'] = str(subscription.customer.static_ip)
-            
-            # Create user
-            result = pppoe_resource.add(**user_data)
-            
-            logger.info(f"Created PPPoE user: {subscription.mikrotik_username}")
-            return True, result
-            
-        except Exception as e:
-            error_str = str(e)
-            
-            if "already have such name" in error_str or "already exists" in error_str:
-                 # Check if force link is requested
-                 if force_link:
-                    logger.info(f"Force linking existing PPPoE user {subscription.mikrotik_username}")
-                    try:
-                        existing = pppoe_resource.get(name=subscription.mikrotik_username)
-                        if existing:
-                            # If found, return success with existing ID
-                            return True, existing[0]
-                    except Exception as inner_e:
-                        logger.error(f"Failed to fetch existing user for linking: {inner_e}")
-                        # Fall through to error
-                 
-                 logger.warning(f"PPPoE user {subscription.mikrotik_username} collision in MikroTik")
-                 return False, f"User '{subscription.mikrotik_username}' already exists in MikroTik. Please delete it from router or use a different username."
-            
-            error_msg = f"Error creating PPPoE user: {error_str}"
-            logger.error(error_msg)
-            return False, error_msg
+            for package in packages:
+                profile_data = build_ppp_profile_data(package)
+                profile = existing.get(profile_data['name'])
+                try:
+                    if profile is None:
+                        response = profile_resource.add(**profile_data)
+                        profile_id = response.done_message.get('ret')
+                        results[package.pk] = (True, {'action': 'created', 'id': profile_id})
+                        continue
+                    
+                    changed = {
+                        key: value for key, value in profile_data.items()
+                        if profile.get(key) != value
+                    }
+                    if changed:
+                        profile_resource.set(id=profile['id'], **changed)
+                    results[package.pk] = (
+                        True, {'action': 'updated' if changed else 'unchanged', 'id': profile['id']}
+                    )
+                except BROKEN_SESSION_ERRORS:
+                    raise
+                except Exception as e:
+                    results[package.pk] = (False, str(e))
         finally:
             self.disconnect()
+        
+        pushed = sum(1 for success, _ in results.values() if success)
+        logger.info(f"Pushed {pushed}/{len(results)} PPP profiles to {self.router.name}")
+        return results
+
+    # ==================== Pipelining ====================
+    
+    @property
+    def pipeline_window(self):
+        return max(1, self.router.pipeline_window or settings.MIKROTIK_PIPELINE_WINDOW)
+    
+    def pipeline(self, resource, calls):
+        """
+        Run many commands on one session without waiting for each reply:
+        every command is sent with its own .tag and up to pipeline_window
+        commands are in flight; replies are matched back by tag.
+        
+        `calls` yields (key, command, arguments[, queries]). Returns
+        {key: (True, response) or (False, error message)}. An error only
+        fails its own command; a broken session raises. RouterOS may run
+        tagged commands concurrently, so keys must not depend on each other.
+        """
+        results = {}
+        in_flight = deque()
+        
+        def collect():
+            key, promise = in_flight.popleft()
+            try:
+                results[key] = (True, promise.get())
+            except BROKEN_SESSION_ERRORS:
+                raise
+            except Exception as e:
+                results[key] = (False, str(e))
+        
+        window = self.pipeline_window
+        for key, *request in calls:
+            try:
+                in_flight.append((key, resource.call_async(*request)))
+            except BROKEN_SESSION_ERRORS:
+                raise
+            except Exception as e:
+                results[key] = (False, str(e))
+                continue
+            if len(in_flight) >= window:
+                collect()
+        
+        while in_flight:
+            collect()
+        return results
+
+    # ==================== PPPoE User Management ====================
+    
+    def create_pppoe_user(self, subscription, force_link=False):
+        """
+        Create PPPoE user for subscription.
+        If force_link is True, it will try to link to an existing user if a name collision occurs.
+        """
+        results = self.bulk_create_pppoe_users(
+            [subscription], force_link={subscription.mikrotik_username} if force_link else ()
+        )
+        return results.get(subscription.mikrotik_username, (False, "Subscription has no MikroTik username"))
     
     def update_pppoe_user(self, subscription, user_id):
         """
         Update existing PPPoE user
         """
+        results = self.bulk_update_pppoe_users(
+            [subscription], user_ids={subscription.mikrotik_username: user_id}
+        )
+        return results.get(subscription.mikrotik_username, (False, "User not found"))
+    
+    def enable_pppoe_user(self, username):
+        """
+        Enable PPPoE user (activate subscription)
+        """
+        return self.bulk_enable_pppoe_users([username]).get(username, (False, "User not found"))
+    
+    def disable_pppoe_user(self, username):
+        """
+        Disable PPPoE user (suspend subscription)
+        """
+        return self.bulk_disable_pppoe_users([username]).get(username, (False, "User not found"))
+    
+    def delete_pppoe_user(self, username):
+        """
+        Delete PPPoE user (cancel subscription)
+        """
+        return self.bulk_delete_pppoe_users([username]).get(username, (False, "User not found"))
+
+    # ==================== Bulk PPPoE User Management ====================
+    
+    def bulk_create_pppoe_users(self, subscriptions, force_link=()):
+        """
+        Create PPP secrets for many subscriptions over one pipelined session.
+        Usernames in force_link that already exist on the router are linked
+        to the existing secret instead of failing.
+        Returns {username: (success, {'id': ...} or message)}
+        """
+        subscriptions = [sub for sub in subscriptions if sub.mikrotik_username]
+        if not subscriptions:
+            return {}
+        
         if not self.connect():
-            return False, "Failed to connect to router"
+            return {sub.mikrotik_username: (False, "Failed to connect to router") for sub in subscriptions}
         
+        results = {}
         try:
             pppoe_resource = self.api.get_resource('/ppp/secret')
             
-            # Prepare detailed comment with customer information
-            customer = subscription.customer
-            comment_parts = [
-                f"ID: {customer.customer_id}",
-                f"Name: {customer.name}",
-                f"Phone: {customer.phone}",
-                f"Package: {subscription.package.name}",
-                f"Expiry Day: {subscription.billing_day}"
-            ]
-            
-            # Add address if available
-            if customer.address:
-                comment_parts.append(f"Address: {customer.address[:50]}")  # Limit to 50 chars
-            
-            comment = " | ".join(comment_parts)
-            
-            # Prepare update data
-            update_data = {
-                '.id': user_id,
-                'name': subscription.mikrotik_username,
-                'password': subscription.mikrotik_password,
-                'profile': subscription.mikrotik_profile_name,  # Use selected profile
-                'comment': comment
+            create_data = {
+                sub.mikrotik_username: {**build_pppoe_user_data(sub), 'service': 'pppoe'} for sub in subscriptions
             }
-            
-            # Update static IP if available
-            if subscription.customer.static_ip:
-                update_data['remote-address'] = str(subscription.customer.static_ip)
-            
-            # Update user
-            pppoe_resource.set(**update_data)
-            
-            logger.info(f"Updated PPPoE user: {subscription.mikrotik_username}")
-            return True, "PPPoE user updated successfully"
+            created = self.pipeline(pppoe_resource, (
+                (username, 'add', data) for username, data in create_data.items()
+            ))
+            
+            collisions = []
+            pushed = {}
+            for username, (success, response) in created.items():
+                if success:
+                    secret_id = response.done_message.get('ret')
+                    pushed[username] = (secret_id, create_data[username])
+                    results[username] = (True, {'id': secret_id})
+                elif "already have such name" in response or "already exists" in response:
+                    if username in force_link:
+                        collisions.append(username)
+                        continue
+                    logger.warning(f"PPPoE user {username} collision in MikroTik")
+                    results[username] = (False, _collision_message(username))
+                else:
+                    results[username] = (False, f"Error creating PPPoE user: {response}")
+            
+            if collisions:
+                existing = self.pipeline(pppoe_resource, (
+                    (username, 'print', {}, {'name': username}) for username in collisions
+                ))
+                for username in collisions:
+                    success, rows = existing[username]
+                    if success and rows:
+                        logger.info(f"Force linking existing PPPoE user {username}")
+                        results[username] = (True, rows[0])
+                    else:
+                        results[username] = (False, _collision_message(username))
+                store_secrets(self.router, [rows[0] for success, rows in existing.values() if success and rows])
+            
+            record_pushed(self.router, pushed)
+            self._log_bulk_result('Created', results)
             
         except Exception as e:
-            error_msg = f"Error updating PPPoE user: {str(e)}"
+            error_msg = f"Error creating PPPoE user: {str(e)}"
             logger.error(error_msg)
-            return False, error_msg
+            for sub in subscriptions:
+                results.setdefault(sub.mikrotik_username, (False, error_msg))
         finally:
             self.disconnect()
+        
+        return results
     
-    def enable_pppoe_user(self, username):
+    def bulk_enable_pppoe_users(self, usernames):
         """
-        Enable PPPoE user (activate subscription)
+        Enable many PPPoE users over one router session.
+        Returns {username: (success, message)}
+        """
+        return self._bulk_secret_action(usernames, 'enable')
+    
+    def bulk_disable_pppoe_users(self, usernames):
+        """
+        Disable many PPPoE users over one router session.
+        Returns {username: (success, message)}
+        """
+        return self._bulk_secret_action(usernames, 'disable')
+    
+    def bulk_delete_pppoe_users(self, usernames):
+        """
+        Delete many PPPoE users over one router session.
+        Returns {username: (success, message)}
         """
+        return self._bulk_secret_action(usernames, 'delete')
+    
+    def bulk_update_pppoe_users(self, subscriptions, user_ids=None):
+        """
+        Push name/password/profile/comment/remote-address for many
+        subscriptions over one pipelined router session.
+        
+        The secret is addressed by user_ids[username] if given, then by the
+        stored mikrotik_user_id, then by the RouterSecret mirror, then by
+        looking the name up on the router. Secrets whose mirrored attribute
+        hash already matches are not written.
+        Returns {username: (success, message)}
+        """
+        subscriptions = [sub for sub in subscriptions if sub.mikrotik_username]
+        if not subscriptions:
+            return {}
+        
         if not self.connect():
-            return False, "Failed to connect to router"
+            return {sub.mikrotik_username: (False, "Failed to connect to router") for sub in subscriptions}
         
+        # Explicit ids first, then the ids stored on the subscriptions
+        user_ids = {
+            **{sub.mikrotik_username: sub.mikrotik_user_id for sub in subscriptions if sub.mikrotik_user_id},
+            **{username: user_id for username, user_id in (user_ids or {}).items() if user_id},
+        }
+        results = {}
         try:
             pppoe_resource = self.api.get_resource('/ppp/secret')
             
-            # Find user by name
-            users = pppoe_resource.get(name=username)
-            
-            if users:
-                user_id = users[0]['id']
-                pppoe_resource.set(id=user_id, disabled='no')
-                logger.info(f"Enabled PPPoE user: {username}")
-                return True, "User enabled successfully"
-            else:
-                return False, "User not found"
+            # Skip secrets whose mirrored attributes already match
+            mirrored = cached_secrets(self.router, [sub.mikrotik_username for sub in subscriptions])
+            update_data = {}
+            for sub in subscriptions:
+                username = sub.mikrotik_username
+                data = build_pppoe_user_data(sub)
+                secret = mirrored.get(username)
+                if (
+                    secret is not None
+                    and secret.attributes_hash == secret_hash(data)
+                    and user_ids.get(username, secret.secret_id) == secret.secret_id
+                ):
+                    results[username] = (True, "PPPoE user already up to date")
+                    continue
+                update_data[username] = data
+            
+            pushed, secret_ids = self._pipeline_by_id(
+                pppoe_resource,
+                list(update_data),
+                lambda username, secret_id: ('set', {**update_data[username], '.id': secret_id}),
+                user_ids=user_ids
+            )
+            for username, (success, response) in pushed.items():
+                if success:
+                    results[username] = (True, "PPPoE user updated successfully")
+                elif username not in secret_ids:
+                    results[username] = (False, "User not found")
+                else:
+                    results[username] = (False, f"Error updating PPPoE user: {response}")
+            record_pushed(self.router, {
+                username: (secret_ids[username], update_data[username])
+                for username, (success, _) in pushed.items() if success
+            })
+            
+            self._log_bulk_result('Updated', results)
             
         except Exception as e:
-            error_msg = f"Error enabling PPPoE user: {str(e)}"
+            error_msg = f"Error updating PPPoE user: {str(e)}"
             logger.error(error_msg)
-            return False, error_msg
+            for sub in subscriptions:
+                results.setdefault(sub.mikrotik_username, (False, error_msg))
         finally:
             self.disconnect()
+        
+        return results
     
-    def disable_pppoe_user(self, username):
+    def verify_pppoe_users(self, subscriptions):
         """
-        Disable PPPoE user (suspend subscription)
+        Read the PPP secrets of many subscriptions back from the router
+        (pipelined prints by name) and check that their attributes and
+        disabled flag match the database. Refreshes their mirror rows.
+        Returns {username: (matches, {'id': ...} or message)}
         """
+        subscriptions = [sub for sub in subscriptions if sub.mikrotik_username]
+        if not subscriptions:
+            return {}
+        
         if not self.connect():
-            return False, "Failed to connect to router"
+            return {sub.mikrotik_username: (False, "Failed to connect to router") for sub in subscriptions}
         
+        results = {}
         try:
             pppoe_resource = self.api.get_resource('/ppp/secret')
-            
-            # Find user by name
-            users = pppoe_resource.get(name=username)
-            
-            if users:
-                user_id = users[0]['id']
-                pppoe_resource.set(id=user_id, disabled='yes')
-                logger.info(f"Disabled PPPoE user: {username}")
-                return True, "User disabled successfully"
-            else:
-                return False, "User not found"
-            
+            found = self.pipeline(pppoe_resource, (
+                (sub.mikrotik_username, 'print', {}, {'name': sub.mikrotik_username}) for sub in subscriptions
+            ))
+            store_secrets(self.router, [rows[0] for success, rows in found.values() if success and rows])
+            
+            for sub in subscriptions:
+                username = sub.mikrotik_username
+                success, rows = found[username]
+                if not success:
+                    results[username] = (False, f"Error reading PPPoE user: {rows}")
+                elif not rows:
+                    results[username] = (False, "User not found")
+                elif secret_hash(rows[0]) != secret_hash(build_pppoe_user_data(sub)):
+                    results[username] = (False, "PPPoE user attributes differ")
+                elif is_disabled(rows[0]) != (sub.status != 'active'):
+                    results[username] = (False, "PPPoE user disabled flag differs")
+                else:
+                    results[username] = (True, {'id': rows[0]['id']})
+            
+            self._log_bulk_result('Verified', results)
+        
         except Exception as e:
-            error_msg = f"Error disabling PPPoE user: {str(e)}"
+            error_msg = f"Error verifying PPPoE user: {str(e)}"
             logger.error(error_msg)
-            return False, error_msg
+            for sub in subscriptions:
+                results.setdefault(sub.mikrotik_username, (False, error_msg))
         finally:
             self.disconnect()
-    
-    def delete_pppoe_user(self, username):
+        
+        return results
+
+    def _bulk_secret_action(self, usernames, action):
         """
-        Delete PPPoE user (cancel subscription)
+        Enable/disable/delete PPP secrets for many users: take their .id
+        from the RouterSecret mirror (looking up only unknown names), then
+        pipeline set/remove commands over a single session.
         """
+        usernames = list(dict.fromkeys(username for username in usernames if username))
+        if not usernames:
+            return {}
+        
+        verb, past = PPP_SECRET_ACTIONS[action]
+        
         if not self.connect():
-            return False, "Failed to connect to router"
+            return {username: (False, "Failed to connect to router") for username in usernames}
         
+        results = {}
         try:
             pppoe_resource = self.api.get_resource('/ppp/secret')
             
-            # Find user by name
-            users = pppoe_resource.get(name=username)
-            
-            if users:
-                user_id = users[0]['id']
-                pppoe_resource.remove(id=user_id)
-                logger.info(f"Deleted PPPoE user: {username}")
-                return True, "User deleted successfully"
+            def build(username, secret_id):
+                if action == 'delete':
+                    return 'remove', {'id': secret_id}
+                return 'set', {'id': secret_id, 'disabled': 'yes' if action == 'disable' else 'no'}
+            
+            outcomes, secret_ids = self._pipeline_by_id(pppoe_resource, usernames, build)
+            for username, (success, response) in outcomes.items():
+                if success:
+                    results[username] = (True, f"User {past} successfully")
+                elif username not in secret_ids:
+                    results[username] = (False, "User not found")
+                else:
+                    results[username] = (False, f"Error {verb} PPPoE user: {response}")
+            
+            done = [username for username, (success, _) in outcomes.items() if success]
+            if action == 'delete':
+                forget_secrets(self.router, done)
             else:
-                return False, "User not found"
+                record_disabled(self.router, done, action == 'disable')
+            
+            self._log_bulk_result(past.capitalize(), results)
             
         except Exception as e:
-            error_msg = f"Error deleting PPPoE user: {str(e)}"
+            error_msg = f"Error {verb} PPPoE user: {str(e)}"
             logger.error(error_msg)
-            return False, error_msg
+            for username in usernames:
+                results.setdefault(username, (False, error_msg))
         finally:
             self.disconnect()
+        
+        return results
+    
+    def _pipeline_by_id(self, pppoe_resource, usernames, build, user_ids=None):
+        """
+        Pipeline one command per username, addressed by secret .id: ids come
+        from user_ids, then the RouterSecret mirror, then a lookup on the
+        router. Commands that fail on a stale id are retried once after a
+        fresh lookup. build(username, secret_id) returns (command, arguments).
+        Returns ({username: (success, response)}, {username: secret_id})
+        """
+        secret_ids = dict(user_ids or {})
+        mirrored = cached_secrets(self.router, [username for username in usernames if username not in secret_ids])
+        secret_ids.update({username: secret.secret_id for username, secret in mirrored.items()})
+        
+        missing = [username for username in usernames if username not in secret_ids]
+        if missing:
+            secret_ids.update(self._lookup_secret_ids(pppoe_resource, missing))
+        
+        results = {username: (False, "User not found") for username in usernames if username not in secret_ids}
+        results.update(self.pipeline(pppoe_resource, (
+            (username, *build(username, secret_ids[username]))
+            for username in usernames if username in secret_ids
+        )))
+        
+        stale = [
+            username for username, (success, response) in results.items()
+            if not success and is_stale_id_error(response)
+        ]
+        if stale:
+            logger.info(f"{len(stale)} stale secret ids on {self.router.name}, looking them up again")
+            forget_secrets(self.router, stale)
+            fresh = self._lookup_secret_ids(pppoe_resource, stale)
+            for username in stale:
+                if username in fresh:
+                    secret_ids[username] = fresh[username]
+                else:
+                    secret_ids.pop(username, None)
+                    results[username] = (False, "User not found")
+            results.update(self.pipeline(pppoe_resource, (
+                (username, *build(username, secret_ids[username])) for username in stale if username in fresh
+            )))
+        
+        return results, secret_ids
+    
+    def _lookup_secret_ids(self, pppoe_resource, usernames):
+        """
+        Resolve PPP secret ids by name on the router and refresh their
+        mirror rows. A handful of names are looked up by pipelined prints;
+        larger batches download the whole table in one print.
+        """
+        if len(usernames) <= SECRET_LOOKUP_BATCH_THRESHOLD:
+            found = self.pipeline(pppoe_resource, (
+                (username, 'print', {'.proplist': SECRET_LOOKUP_PROPLIST}, {'name': username})
+                for username in usernames
+            ))
+            secrets = [rows[0] for success, rows in found.values() if success and rows]
+            store_secrets(self.router, secrets)
+        else:
+            secrets = pppoe_resource.call('print', {'.proplist': SECRET_LOOKUP_PROPLIST})
+            store_secrets(self.router, secrets, full=True)
+        
+        wanted = set(usernames)
+        return {
+            secret['name']: secret['id']
+            for secret in secrets
+            if secret.get('name') in wanted
+        }
+    
+    def _log_bulk_result(self, label, results):
+        succeeded = sum(1 for success, _ in results.values() if success)
+        if len(results) == 1:
+            username, (success, _) = next(iter(results.items()))
+            if success:
+                logger.info(f"{label} PPPoE user: {username}")
+            return
+        logger.info(f"{label} {succeeded}/{len(results)} PPPoE users on {self.router.name}")
 
     # ==================== Live Status ====================
 
-    def get_active_connections(self):
+    def get_active_connections(self, raise_errors=False):
         """
-        Fetch all active PPP connections
+        Fetch all active PPP connections.
+        With raise_errors=True failures raise instead of returning [].
         """
         if not self.connect():
+            if raise_errors:
+                raise RouterOsApiConnectionError("Failed to connect to router")
             return []
             
         try:
@@ -503,10 +890,39 @@ class MikroTikService:
             return active_connections
         except Exception as e:
             logger.error(f"Error fetching active connections: {e}")
+            if raise_errors:
+                raise
             return []
         finally:
             self.disconnect()
 
+    def get_queue_counters(self):
+        """
+        Byte counters of the per-user simple queues.
+        Returns {username: (upload_bytes, download_bytes)}; raises on failure.
+        """
+        if not self.connect():
+            raise RouterOsApiConnectionError("Failed to connect to router")
+        
+        try:
+            queue_resource = self.api.get_resource('/queue/simple')
+            queues = queue_resource.call('print', {'.proplist': 'name,bytes'})
+        finally:
+            self.disconnect()
+        
+        counters = {}
+        for queue in queues:
+            name = queue.get('name') or ''
+            # Dynamic PPPoE queues are named <pppoe-username>
+            if name.startswith('<pppoe-') and name.endswith('>'):
+                name = name[len('<pppoe-'):-1]
+            try:
+                upload, download = (int(value) for value in queue.get('bytes', '').split('/'))
+            except ValueError:
+                continue
+            counters[name] = (upload, download)
+        return counters
+
     def get_ppp_profiles(self):
         """
         Fetch all PPP profiles from router
@@ -523,3 +939,55 @@ class MikroTikService:
             return []
         finally:
             self.disconnect()
+
+
+# ==================== Multi-Router Fan-out ====================
+
+def fetch_from_routers(routers, fetch, timeout=None, max_workers=None):
+    """
+    Run fetch(service) for every router concurrently on a bounded thread pool.
+    
+    Routers that fail or do not answer within `timeout` seconds do not block
+    the others; they are reported in the errors dict instead.
+    Returns (results, errors), both keyed by router id.
+    """
+    routers = list(routers)
+    if not routers:
+        return {}, {}
+    
+    if timeout is None:
+        timeout = settings.MIKROTIK_ROUTER_DEADLINE
+    if max_workers is None:
+        max_workers = settings.MIKROTIK_FANOUT_MAX_WORKERS
+    
+    executor = ThreadPoolExecutor(max_workers=min(len(routers), max_workers))
+    futures = {
+        executor.submit(_fetch_from_router, router, fetch): router
+        for router in routers
+    }
+    done, not_done = wait(futures, timeout=timeout)
+    # Do not wait for stragglers; they finish (or time out) in the background
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    results = {}
+    errors = {}
+    for future in done:
+        router = futures[future]
+        try:
+            results[router.pk] = future.result()
+        except Exception as e:
+            errors[router.pk] = str(e) or type(e).__name__
+    for future in not_done:
+        router = futures[future]
+        logger.warning(f"Router {router.name} did not respond within {timeout}s")
+        errors[router.pk] = f"Timed out after {timeout}s"
+    
+    return results, errors
+
+
+def _fetch_from_router(router, fetch):
+    try:
+        return fetch(MikroTikService(router))
+    finally:
+        # Worker threads get their own DB connection; don't leak it
+        connection.close()
@@ -0,0 +1,677 @@
+"""
+In-memory RouterOS API simulator for integration and load testing.
+
+Speaks the binary RouterOS API on a local TCP port (plain-text login,
+tagged replies) and keeps /ppp/secret, /ppp/profile, /ppp/active,
+/queue/simple, /file, /system/identity and /system/resource in memory, so MikroTikService can be
+driven without real routers:
+
+    with run_simulator(secrets=100_000, latency=0.005) as simulator:
+        router = MikroTikRouter(name='sim', **simulator.router_kwargs())
+        MikroTikService(router).get_active_connections()
+
+Latency and failures can be changed while it runs (simulator.latency,
+simulator.rtt, simulator.fail_rate, simulator.drop_rate, simulator.hang).
+`latency` is processing time per command; `rtt` delays each reply like a
+network round trip without holding up the commands behind it, so tagged
+(pipelined) commands overlap as they would on a remote router. `listen` on a
+table streams its changes until `/cancel`, like RouterOS. `/import` runs
+the subset of RouterOS script that provisioning scripts use on a file added
+with add_file(), and `/export file=` writes the configuration tables to a
+file (there is no FTP server; read simulator.tables['/file']).
+
+This module has no Django dependency; see the run_routeros_simulator
+management command and the routeros_simulator pytest fixture.
+"""
+import logging
+import queue
+import random
+import re
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+
+from routeros_api.base_api import decode_length, encode_length
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILES = ('default', '5M', '10M', '20M', '50M')
+
+# Script words: quoted strings (with escapes), key="value" pairs and bare words
+SCRIPT_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s"]+(?:"(?:[^"\\]|\\.)*")?')
+SCRIPT_HEX_ESCAPE = re.compile(r'[0-9A-F]{2}')
+# Values written without quotes by /export
+SCRIPT_PLAIN_VALUE = re.compile(r'[\w.,:/*+@-]+', re.ASCII)
+
+# Configuration tables included in /export (sessions are runtime state)
+EXPORTED_TABLES = ('/ppp/profile', '/ppp/secret', '/queue/simple')
+
+
+class SimulatedTable:
+    """
+    One RouterOS menu (e.g. /ppp/secret): rows keyed by .id, with a name
+    index so `?name=` lookups stay O(1) at 100k rows
+    """
+
+    def __init__(self, unique_name=True, defaults=None):
+        self.unique_name = unique_name
+        self.defaults = defaults or {}
+        self.rows = {}
+        self.by_name = {}
+        # Callbacks of open `listen` commands, called with each changed row
+        self.listeners = []
+        self._next_id = 1
+
+    def add(self, attributes):
+        name = attributes.get('name')
+        if self.unique_name and name in self.by_name:
+            raise SimulatorError('failure: already have such name')
+        row_id = f'*{self._next_id:X}'
+        self._next_id += 1
+        row = dict(self.defaults)
+        row.update(attributes)
+        row['.id'] = row_id
+        self.rows[row_id] = row
+        if name is not None:
+            self.by_name[name] = row_id
+        self._notify(row)
+        return row_id
+
+    def set(self, row_id, attributes):
+        row = self._get(row_id)
+        name = attributes.get('name')
+        if name is not None and name != row.get('name'):
+            if self.unique_name and name in self.by_name:
+                raise SimulatorError('failure: already have such name')
+            self.by_name.pop(row.get('name'), None)
+            self.by_name[name] = row_id
+        row.update(attributes)
+        self._notify(row)
+
+    def unset(self, row_id, field):
+        row = self._get(row_id)
+        row.pop(field, None)
+        self._notify(row)
+
+    def remove(self, row_id):
+        row = self.rows.pop(self._resolve(row_id), None)
+        if row is None:
+            raise SimulatorError('no such item')
+        if self.by_name.get(row.get('name')) == row['.id']:
+            del self.by_name[row['name']]
+        self._notify({'.id': row['.id'], '.dead': 'yes'})
+
+    def find(self, queries):
+        """
+        Rows matching all `?key=value` / `?key` queries
+        """
+        if 'name' in queries and queries['name'] is not None:
+            row_id = self.by_name.get(queries['name'])
+            candidates = [self.rows[row_id]] if row_id else []
+        elif '.id' in queries and queries['.id'] is not None:
+            row = self.rows.get(queries['.id'])
+            candidates = [row] if row else []
+        else:
+            candidates = self.rows.values()
+
+        for row in candidates:
+            if all(
+                (key in row) if value is None else row.get(key) == value
+                for key, value in queries.items()
+            ):
+                yield row
+
+    def _notify(self, row):
+        for listener in list(self.listeners):
+            listener(dict(row))
+
+    def _resolve(self, row_id):
+        # Like RouterOS, items can also be addressed by name
+        if row_id in self.rows:
+            return row_id
+        return self.by_name.get(row_id, row_id)
+
+    def _get(self, row_id):
+        row = self.rows.get(self._resolve(row_id))
+        if row is None:
+            raise SimulatorError('no such item')
+        return row
+
+
+class SimulatorError(Exception):
+    """
+    Returned to the client as a !trap
+    """
+
+
+class RouterOSSimulator:
+    """
+    A simulated router listening on (host, port). Use port=0 for a free port.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, username='admin', password='admin',
+                 identity='Simulator', latency=0.0, jitter=0.0, rtt=0.0, fail_rate=0.0,
+                 drop_rate=0.0, seed=None):
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.rtt = rtt
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.hang = False
+        self.commands_received = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+
+        self.identity = {'name': identity}
+        # Reported by /system/resource; uptime is computed from _started_at
+        self.resource = {
+            'cpu-load': '3', 'free-memory': str(200 * 1024 * 1024), 'total-memory': str(256 * 1024 * 1024),
+            'version': '7.14 (stable)', 'board-name': 'Simulator',
+        }
+        self._started_at = time.monotonic()
+        self.tables = {
+            '/ppp/secret': SimulatedTable(defaults={
+                'service': 'any', 'profile': 'default', 'disabled': 'false',
+            }),
+            '/ppp/profile': SimulatedTable(),
+            '/ppp/active': SimulatedTable(unique_name=False, defaults={
+                'service': 'pppoe', 'uptime': '0s', 'encoding': '', 'radius': 'false',
+            }),
+            '/queue/simple': SimulatedTable(defaults={
+                'bytes': '0/0', 'packets': '0/0', 'max-limit': '0/0', 'disabled': 'false',
+            }),
+            '/file': SimulatedTable(defaults={'type': 'script'}),
+        }
+        for profile in DEFAULT_PROFILES:
+            self.tables['/ppp/profile'].add({'name': profile})
+
+        self._server = _SimulatorServer((host, port), _SimulatorHandler)
+        self._server.simulator = self
+        self._thread = None
+
+    @property
+    def host(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def router_kwargs(self):
+        """
+        Fields for a MikroTikRouter pointing at this simulator
+        """
+        return {
+            'ip_address': self.host,
+            'api_port': self.port,
+            'username': self.username,
+            'password': self.password,
+        }
+
+    # ==================== Lifecycle ====================
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name=f'routeros-simulator-{self.port}', daemon=True
+        )
+        self._thread.start()
+        logger.info(f"RouterOS simulator listening on {self.host}:{self.port}")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # ==================== Data ====================
+
+    def populate(self, secrets=0, active_ratio=0.0, prefix='simuser'):
+        """
+        Bulk-load `secrets` PPP secrets; `active_ratio` of them get an
+        /ppp/active session and a dynamic queue
+        """
+        profiles = [row['name'] for row in self.tables['/ppp/profile'].rows.values()]
+        width = max(len(str(secrets)), 6)
+        with self._lock:
+            for number in range(1, secrets + 1):
+                name = f'{prefix}{number:0{width}d}'
+                self.tables['/ppp/secret'].add({
+                    'name': name,
+                    'password': f'pw{number}',
+                    'service': 'pppoe',
+                    'profile': profiles[number % len(profiles)],
+                })
+                if self._random.random() < active_ratio:
+                    self.connect_user(name)
+
+    def add_file(self, name, contents):
+        """
+        Put a file on the simulated router (stands in for an FTP upload)
+        """
+        with self._lock:
+            self.tables['/file'].add({'name': name, 'contents': contents, 'size': str(len(contents.encode()))})
+
+    def connect_user(self, name, address=None, caller_id=None):
+        """
+        Open a simulated PPP session (and its dynamic queue) for a user
+        """
+        with self._lock:
+            number = len(self.tables['/ppp/active'].rows) + 1
+            address = address or f'10.{(number >> 16) & 255}.{(number >> 8) & 255}.{number & 255}'
+            caller_id = caller_id or ':'.join(f'{self._random.randrange(256):02X}' for _ in range(6))
+            self.tables['/ppp/active'].add({
+                'name': name, 'address': address, 'caller-id': caller_id,
+            })
+            queue_name = f'<pppoe-{name}>'
+            if queue_name not in self.tables['/queue/simple'].by_name:
+                self.tables['/queue/simple'].add({'name': queue_name, 'target': f'{address}/32', 'dynamic': 'true'})
+
+    def disconnect_user(self, name):
+        with self._lock:
+            active = self.tables['/ppp/active']
+            for row in list(active.find({'name': name})):
+                active.remove(row['.id'])
+            queue_name = f'<pppoe-{name}>'
+            if queue_name in self.tables['/queue/simple'].by_name:
+                self.tables['/queue/simple'].remove(queue_name)
+
+    def add_traffic(self, name, upload=0, download=0):
+        """
+        Advance a user's queue byte counters (upload/download in bytes)
+        """
+        with self._lock:
+            queue = self.tables['/queue/simple']
+            row_id = queue.by_name.get(f'<pppoe-{name}>')
+            if row_id is None:
+                return
+            row = queue.rows[row_id]
+            tx, rx = (int(value) for value in row['bytes'].split('/'))
+            row['bytes'] = f'{tx + upload}/{rx + download}'
+
+    # ==================== Command execution ====================
+
+    def execute(self, command, attributes, queries):
+        """
+        Run one API command and return (rows, done_attributes)
+        """
+        path, _, verb = command.rpartition('/')
+        with self._lock:
+            if path == '/system/identity':
+                return self._execute_identity(verb, attributes)
+            if path == '/system/resource':
+                return self._execute_resource(verb, attributes)
+            if command == '/import':
+                return self._import(attributes.get('file-name'))
+            if command == '/export':
+                return self._export(attributes.get('file'), 'show-sensitive' in attributes)
+
+            table = self.tables.get(path)
+            if table is None:
+                raise SimulatorError('no such command prefix')
+
+            if verb in ('print', 'getall'):
+                rows = list(table.find(queries))
+                proplist = attributes.get('.proplist')
+                if proplist:
+                    fields = proplist.split(',')
+                    rows = [{key: row[key] for key in fields if key in row} for row in rows]
+                else:
+                    rows = [dict(row) for row in rows]
+                return rows, {}
+            if verb == 'add':
+                return [], {'ret': table.add(attributes)}
+            if verb == 'set':
+                row_id = attributes.pop('.id', None) or attributes.pop('numbers', None)
+                for item in (row_id or '').split(','):
+                    table.set(item, attributes)
+                return [], {}
+            if verb == 'unset':
+                for item in attributes.get('numbers', '').split(','):
+                    table.unset(item, attributes.get('value-name'))
+                return [], {}
+            if verb == 'remove':
+                row_id = attributes.get('.id') or attributes.get('numbers', '')
+                for item in row_id.split(','):
+                    table.remove(item)
+                return [], {}
+
+        raise SimulatorError('no such command')
+
+    def _execute_identity(self, verb, attributes):
+        if verb in ('print', 'getall'):
+            return [dict(self.identity)], {}
+        if verb == 'set':
+            self.identity['name'] = attributes.get('name', self.identity['name'])
+            return [], {}
+        raise SimulatorError('no such command')
+
+    def _execute_resource(self, verb, attributes):
+        if verb not in ('print', 'getall'):
+            raise SimulatorError('no such command')
+        row = dict(self.resource, uptime=f'{int(time.monotonic() - self._started_at)}s')
+        proplist = attributes.get('.proplist')
+        if proplist:
+            row = {key: row[key] for key in proplist.split(',') if key in row}
+        return [row], {}
+
+    def _import(self, file_name):
+        """
+        Run a script file. Supports menu lines and statements whose effect
+        is "add, or set the row with the same name": plain `add`,
+        `:do { add } on-error={ set [find name=X] }` and
+        `:if ([:len [find name=X]] = 0) do={ add } else={ set [find name=X] }`.
+        """
+        files = self.tables['/file']
+        row_id = files.by_name.get(file_name)
+        if row_id is None:
+            raise SimulatorError('no such file')
+
+        table = None
+        for number, line in enumerate(files.rows[row_id]['contents'].splitlines(), 1):
+            line = line.strip()
+            if not line or line.startswith('#') or line.startswith(':log'):
+                continue
+            if line.startswith('/'):
+                table = self.tables.get('/' + '/'.join(line[1:].split()))
+                continue
+
+            tokens = SCRIPT_TOKEN.findall(line)
+            if table is None or 'add' not in tokens:
+                raise SimulatorError(f'Script Error: syntax error (line {number} column 1)')
+            attributes = {}
+            for token in tokens[tokens.index('add') + 1:]:
+                if token == '}':
+                    break
+                key, _, value = token.partition('=')
+                attributes[key] = _unquote(value)
+
+            existing = table.by_name.get(attributes.get('name'))
+            if existing is None:
+                table.add(attributes)
+            else:
+                table.set(existing, attributes)
+        return [], {}
+
+    def _export(self, file_name, show_sensitive=False):
+        """
+        Write the configuration tables as an export script to <file_name>.rsc.
+        Like RouterOS 7, passwords are left out unless show-sensitive is
+        given; RouterOS 6 always includes them and rejects the flag.
+        """
+        if not file_name:
+            raise SimulatorError('missing file name')
+        version_7 = not self.resource['version'].startswith(('6.', '5.'))
+        if show_sensitive and not version_7:
+            raise SimulatorError('unknown parameter show-sensitive')
+        hidden = ('password',) if version_7 and not show_sensitive else ()
+
+        lines = [
+            f"# {time.strftime('%Y-%m-%d %H:%M:%S')} by RouterOS {self.resource['version']}",
+            f"# model = {self.resource['board-name']}",
+            "/system identity",
+            f"set name={_quote(self.identity['name'])}",
+        ]
+        for path in EXPORTED_TABLES:
+            rows = self.tables[path].rows.values()
+            if not rows:
+                continue
+            lines.append(' '.join(path.split('/')))
+            for row in rows:
+                attributes = ' '.join(
+                    f'{key}={_quote(value)}' for key, value in row.items() if key != '.id' and key not in hidden
+                )
+                lines.append(f'add {attributes}')
+
+        name = f'{file_name}.rsc'
+        contents = '\n'.join(lines) + '\n'
+        existing = self.tables['/file'].by_name.get(name)
+        if existing is not None:
+            self.tables['/file'].remove(existing)
+        self.add_file(name, contents)
+        return [], {}
+
+    def _delay(self):
+        delay = self.latency
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class _SimulatorServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _SimulatorHandler(socketserver.StreamRequestHandler):
+    """
+    One API connection: read sentences, reply with !re/!done/!trap
+    """
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # Listen streams write from other threads
+        self._write_lock = threading.Lock()
+        self._listens = {}
+        # Replies held back by the simulated round trip, sent in order
+        self._delayed = queue.Queue()
+        self._sender = threading.Thread(target=self._send_delayed, daemon=True)
+        self._sender.start()
+
+    def finish(self):
+        simulator = self.server.simulator
+        with simulator._lock:
+            for table, callback in self._listens.values():
+                table.listeners.remove(callback)
+        self._listens.clear()
+        self._delayed.put(None)
+        super().finish()
+
+    def handle(self):
+        simulator = self.server.simulator
+        authenticated = False
+
+        while not simulator._stopped.is_set():
+            try:
+                words = self._read_sentence()
+            except (ConnectionError, EOFError, OSError):
+                return
+            if not words:
+                continue
+
+            command, attributes, queries, tag = self._parse(words)
+            simulator.commands_received += 1
+
+            if simulator.hang:
+                # Accept but never answer (deadline/circuit breaker tests)
+                simulator._stopped.wait()
+                return
+            if simulator.drop_rate and simulator._random.random() < simulator.drop_rate:
+                return
+            simulator._delay()
+
+            if command == '/login':
+                if attributes.get('name') == simulator.username and attributes.get('password') == simulator.password:
+                    authenticated = True
+                    self._reply('!done', {}, tag)
+                else:
+                    self._reply('!trap', {'message': 'invalid user name or password (6)'}, tag)
+                    self._reply('!done', {}, tag)
+                continue
+
+            if not authenticated:
+                self._reply('!trap', {'message': 'not logged in'}, tag)
+                self._reply('!done', {}, tag)
+                continue
+
+            if simulator.fail_rate and simulator._random.random() < simulator.fail_rate:
+                self._reply('!trap', {'message': 'simulated failure'}, tag)
+                self._reply('!done', {}, tag)
+                continue
+
+            path, _, verb = command.rpartition('/')
+            if verb == 'listen':
+                self._listen(simulator, path, tag)
+                continue
+            if command == '/cancel':
+                self._cancel(simulator, attributes.get('tag'), tag)
+                continue
+
+            try:
+                rows, done = simulator.execute(command, attributes, queries)
+            except SimulatorError as e:
+                self._reply('!trap', {'message': str(e)}, tag)
+                self._reply('!done', {}, tag)
+                continue
+
+            # One write per command keeps 100k-row prints fast
+            self._write(b''.join(
+                [self._encode('!re', row, tag) for row in rows] + [self._encode('!done', done, tag)]
+            ))
+
+    def _read_sentence(self):
+        words = []
+        while True:
+            length = decode_length(self._read_exact)
+            if length == 0:
+                return words
+            words.append(self._read_exact(length).decode('utf-8', 'replace'))
+
+    def _read_exact(self, length):
+        data = self.rfile.read(length)
+        if len(data) < length:
+            raise EOFError
+        return data
+
+    @staticmethod
+    def _parse(words):
+        command = words[0]
+        attributes = {}
+        queries = {}
+        tag = None
+        for word in words[1:]:
+            if word.startswith('.tag='):
+                tag = word[len('.tag='):]
+            elif word.startswith('='):
+                key, _, value = word[1:].partition('=')
+                attributes[key] = value
+            elif word.startswith('?') and not word.startswith('?#'):
+                key, sep, value = word[1:].partition('=')
+                queries[key] = value if sep else None
+        return command, attributes, queries, tag
+
+    def _listen(self, simulator, path, tag):
+        """
+        Stream changes of a table as !re replies until /cancel
+        """
+        table = simulator.tables.get(path)
+        if table is None:
+            self._reply('!trap', {'message': 'no such command prefix'}, tag)
+            self._reply('!done', {}, tag)
+            return
+
+        def send_change(row):
+            try:
+                self._reply('!re', row, tag)
+            except OSError:
+                pass
+
+        with simulator._lock:
+            table.listeners.append(send_change)
+        self._listens[tag] = (table, send_change)
+
+    def _cancel(self, simulator, listen_tag, tag):
+        entry = self._listens.pop(listen_tag, None)
+        if entry is not None:
+            table, callback = entry
+            with simulator._lock:
+                table.listeners.remove(callback)
+            self._reply('!trap', {'category': '2', 'message': 'interrupted'}, listen_tag)
+            self._reply('!done', {}, listen_tag)
+        self._reply('!done', {}, tag)
+
+    def _reply(self, reply_type, attributes, tag):
+        self._write(self._encode(reply_type, attributes, tag))
+
+    def _write(self, data):
+        rtt = self.server.simulator.rtt
+        if rtt > 0:
+            self._delayed.put((time.monotonic() + rtt, data))
+            return
+        with self._write_lock:
+            self.wfile.write(data)
+
+    def _send_delayed(self):
+        while True:
+            item = self._delayed.get()
+            if item is None:
+                return
+            due, data = item
+            time.sleep(max(0.0, due - time.monotonic()))
+            try:
+                with self._write_lock:
+                    self.wfile.write(data)
+            except (OSError, ValueError):
+                return
+
+    @staticmethod
+    def _encode(reply_type, attributes, tag):
+        words = [reply_type]
+        words.extend(f'={key}={value}' for key, value in attributes.items())
+        if tag is not None:
+            words.append(f'.tag={tag}')
+        data = b''.join(encode_length(len(word)) + word for word in (w.encode() for w in words))
+        return data + encode_length(0)
+
+
+def _quote(value):
+    value = str(value)
+    if value and SCRIPT_PLAIN_VALUE.fullmatch(value):
+        return value
+    return '"' + re.sub(r'[\\"$?]', lambda match: '\\' + match.group(), value) + '"'
+
+
+def _unquote(value):
+    """
+    Value of a RouterOS script word (\\XX byte escapes and \\char escapes)
+    """
+    if not value.startswith('"'):
+        return value
+    value = value[1:-1]
+    data = bytearray()
+    position = 0
+    while position < len(value):
+        char = value[position]
+        if char != '\\':
+            data += char.encode()
+            position += 1
+        elif SCRIPT_HEX_ESCAPE.fullmatch(value, position + 1, position + 3):
+            data.append(int(value[position + 1:position + 3], 16))
+            position += 3
+        else:
+            escaped = value[position + 1:position + 2]
+            data += {'n': b'\n', 'r': b'\r', 't': b'\t'}.get(escaped, escaped.encode())
+            position += 2
+    return data.decode('utf-8', 'replace')
+
+
+@contextmanager
+def run_simulator(secrets=0, active_ratio=0.0, **options):
+    """
+    Start a simulator for the duration of a with-block
+    """
+    simulator = RouterOSSimulator(**options)
+    simulator.populate(secrets=secrets, active_ratio=active_ratio)
+    simulator.start()
+    try:
+        yield simulator
+    finally:
+        simulator.stop()
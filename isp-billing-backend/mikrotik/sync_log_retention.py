@@ -0,0 +1,173 @@
+"""
+Retention for MikroTikSyncLog.
+
+One row is written per router action, so the table grows without bound.
+The retention pass (prune_sync_logs job) keeps it in check:
+
+- rows older than MIKROTIK_SYNC_LOG_RETENTION_DAYS are deleted, and
+  beyond MIKROTIK_SYNC_LOG_MAX_ROWS the oldest rows go as well
+- before deletion, rows are rolled into MikroTikSyncLogSummary (counts per
+  day/router/action/status) so long-term statistics survive
+- deletes run in primary key batches, each its own short transaction, so
+  the table is never locked for long
+- large request/response payloads of rows older than a day are stored
+  zlib-compressed
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, IntegerField, TextField, Value
+from django.db.models.functions import Cast, Coalesce, Length, TruncDate
+from django.utils import timezone
+
+from .models import MikroTikSyncLog, MikroTikSyncLogSummary
+
+logger = logging.getLogger(__name__)
+
+
+def prune_sync_logs(retention_days=None, max_rows=None, summarize=None, batch_size=None):
+    """
+    Apply the age and row limits. Returns a summary dict.
+    """
+    retention_days = settings.MIKROTIK_SYNC_LOG_RETENTION_DAYS if retention_days is None else retention_days
+    max_rows = settings.MIKROTIK_SYNC_LOG_MAX_ROWS if max_rows is None else max_rows
+    summarize = settings.MIKROTIK_SYNC_LOG_SUMMARIZE if summarize is None else summarize
+    batch_size = batch_size or settings.MIKROTIK_SYNC_LOG_BATCH_SIZE
+
+    result = {'deleted_by_age': 0, 'deleted_by_count': 0}
+
+    if retention_days:
+        cutoff = timezone.now() - timedelta(days=retention_days)
+        result['deleted_by_age'] = _delete_batches(
+            MikroTikSyncLog.objects.filter(created_at__lt=cutoff).order_by('created_at'),
+            summarize, batch_size
+        )
+
+    if max_rows:
+        boundary = list(
+            MikroTikSyncLog.objects.order_by('-id').values_list('id', flat=True)[max_rows:max_rows + 1]
+        )
+        if boundary:
+            result['deleted_by_count'] = _delete_batches(
+                MikroTikSyncLog.objects.filter(id__lte=boundary[0]).order_by('id'),
+                summarize, batch_size
+            )
+
+    logger.info(
+        f"Sync log retention: deleted {result['deleted_by_age']} by age, "
+        f"{result['deleted_by_count']} by row limit"
+    )
+    return result
+
+
+def compress_sync_log_payloads(since=None, threshold=None, batch_size=None):
+    """
+    Compress request/response payloads larger than `threshold` bytes for
+    rows older than a day (and newer than `since`, if given).
+    Returns the number of rows compressed.
+    """
+    threshold = settings.MIKROTIK_SYNC_LOG_COMPRESS_THRESHOLD if threshold is None else threshold
+    batch_size = batch_size or settings.MIKROTIK_SYNC_LOG_BATCH_SIZE
+    if not threshold:
+        return 0
+
+    queryset = MikroTikSyncLog.objects.filter(
+        compressed_payload__isnull=True,
+        created_at__lt=timezone.now() - timedelta(days=1)
+    )
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+
+    queryset = queryset.annotate(
+        payload_size=_json_length('request_data') + _json_length('response_data')
+    ).filter(payload_size__gt=threshold)
+
+    compressed = 0
+    last_id = 0
+    while True:
+        logs = list(
+            queryset.filter(id__gt=last_id).order_by('id')
+            .only('id', 'request_data', 'response_data')[:batch_size]
+        )
+        if not logs:
+            break
+        last_id = logs[-1].id
+
+        for log in logs:
+            log.compress_payload()
+        MikroTikSyncLog.objects.bulk_update(logs, ['request_data', 'response_data', 'compressed_payload'])
+        compressed += len(logs)
+
+    if compressed:
+        logger.info(f"Compressed payloads of {compressed} sync logs")
+    return compressed
+
+
+def _delete_batches(queryset, summarize, batch_size):
+    """
+    Delete the rows of an ordered queryset in batches; each batch is picked
+    through the index the ordering uses
+    """
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+
+        with transaction.atomic():
+            if summarize:
+                _summarize(ids)
+            count, _ = MikroTikSyncLog.objects.filter(id__in=ids).delete()
+        deleted += count
+
+    return deleted
+
+
+def _summarize(ids):
+    """
+    Add the given sync logs to the per-day summary rows
+    """
+    rows = (
+        MikroTikSyncLog.objects.filter(id__in=ids)
+        .annotate(date=TruncDate('created_at'))
+        .values('date', 'router_id', 'action', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    counts = {
+        (row['date'], row['router_id'], row['action'], row['status']): row['count']
+        for row in rows
+    }
+    if not counts:
+        return
+
+    existing = {
+        (summary.date, summary.router_id, summary.action, summary.status): summary
+        for summary in MikroTikSyncLogSummary.objects.select_for_update().filter(
+            date__in={key[0] for key in counts},
+            router_id__in={key[1] for key in counts}
+        )
+    }
+
+    now = timezone.now()
+    new, changed = [], []
+    for key, count in counts.items():
+        summary = existing.get(key)
+        if summary is None:
+            date, router_id, action, status = key
+            new.append(MikroTikSyncLogSummary(
+                date=date, router_id=router_id, action=action, status=status, count=count
+            ))
+        else:
+            summary.count += count
+            summary.updated_at = now
+            changed.append(summary)
+
+    MikroTikSyncLogSummary.objects.bulk_create(new)
+    MikroTikSyncLogSummary.objects.bulk_update(changed, ['count', 'updated_at'])
+
+
+def _json_length(field):
+    return Coalesce(Length(Cast(field, TextField())), Value(0), output_field=IntegerField())
@@ -1,3 +1,533 @@
-from django.test import TestCase
+"""
+Tests for the mikrotik app. Code that talks to routers is driven against
+the RouterOS API simulator (the routeros_simulator fixture in conftest.py)
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+from django.utils import timezone
+
+from customers.models import Customer
+from subscription.models import Subscription
+from .backups import apply_delta, config_hash, config_text, encode_delta, normalize_export, store_config
+from .ip_pools import FreeRanges, PoolError, allocate_address, allocate_addresses, rebuild_pool, release_addresses
+from .models import (
+    ConfigBlob, IPAllocation, IPPool, LiveSession, MikroTikCommand, MikroTikRouter, Package, RouterConfigBackup,
+    RouterSecret, SessionEvent, TrafficCounter, UsageDay, UsageMonth
+)
+from .live_sessions import store_router_sessions
+from .outbox import _claim_due_commands, enqueue_command, process_outbox, run_router_commands
+from .provisioning import SCRIPT_FILE_NAME, provision_router, render_router_script
+from .reconciliation import reconcile_router
+from .services import MikroTikService, build_pppoe_user_data
+from .usage import add_usage, get_usage_curve, pack_hours, record_counters, unpack_hours
+
+
+@pytest.fixture
+def router(routeros_simulator):
+    return MikroTikRouter.objects.create(name='sim', **routeros_simulator.router_kwargs())
+
+
+@pytest.fixture
+def offline_router():
+    # For code that only works on stored data
+    return MikroTikRouter.objects.create(name='offline', ip_address='192.0.2.1', username='admin', password='admin')
+
+
+def make_subscriptions(router, count, status='active'):
+    package = Package.objects.create(
+        name='10M', price=Decimal('500'), mikrotik_profile_name='10M', rate_limit='10M/10M'
+    )
+    subscriptions = []
+    for number in range(1, count + 1):
+        customer = Customer.objects.create(name=f'Customer {number}', phone='+8801711000000', address='Dhaka')
+        subscriptions.append(Subscription.objects.create(
+            customer=customer,
+            package=package,
+            router=router,
+            start_date=timezone.now().date(),
+            billing_day=1,
+            status=status,
+            protocol='pppoe',
+            mikrotik_profile_name='10M',
+            mikrotik_username=f'user{number:03d}',
+            mikrotik_password=f'pw{number}',
+        ))
+    return subscriptions
+
+
+def secret(simulator, name):
+    table = simulator.tables['/ppp/secret']
+    return table.rows[table.by_name[name]] if name in table.by_name else None
+
+
+# ==================== Bulk Secret Commands ====================
+
+@pytest.mark.django_db
+def test_bulk_create_pipelines_secrets_and_mirrors_ids(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 30)
+    routeros_simulator.tables['/ppp/secret'].add({'name': 'user001', 'password': 'old'})
+    routeros_simulator.tables['/ppp/secret'].add({'name': 'user002', 'password': 'old'})
+
+    results = MikroTikService(router).bulk_create_pppoe_users(subscriptions, force_link={'user002'})
+
+    assert results['user001'][0] is False
+    assert 'already exists' in results['user001'][1]
+    assert results['user002'] == (True, results['user002'][1])
+    assert all(results[f'user{number:03d}'][0] for number in range(2, 31))
+    assert secret(routeros_simulator, 'user030')['password'] == 'pw30'
+    assert secret(routeros_simulator, 'user030')['profile'] == '10M'
+
+    mirrored = dict(RouterSecret.objects.filter(router=router).values_list('name', 'secret_id'))
+    assert mirrored['user030'] == results['user030'][1]['id']
+    assert mirrored['user002'] == secret(routeros_simulator, 'user002')['.id']
+
+
+@pytest.mark.django_db
+def test_bulk_disable_enable_delete(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 10)
+    MikroTikService(router).bulk_create_pppoe_users(subscriptions)
+    usernames = [sub.mikrotik_username for sub in subscriptions]
+
+    results = MikroTikService(router).bulk_disable_pppoe_users(usernames + ['nobody'])
+    assert results['nobody'] == (False, "User not found")
+    assert all(results[username][0] for username in usernames)
+    assert all(secret(routeros_simulator, username)['disabled'] == 'yes' for username in usernames)
+    assert RouterSecret.objects.filter(router=router, disabled=True).count() == 10
+
+    results = MikroTikService(router).bulk_enable_pppoe_users(usernames[:5])
+    assert all(success for success, _ in results.values())
+    assert [secret(routeros_simulator, username)['disabled'] for username in usernames[4:6]] == ['no', 'yes']
+
+    results = MikroTikService(router).bulk_delete_pppoe_users(usernames[:3])
+    assert all(success for success, _ in results.values())
+    assert secret(routeros_simulator, 'user001') is None
+    assert not RouterSecret.objects.filter(router=router, name__in=usernames[:3]).exists()
+
+
+@pytest.mark.django_db
+def test_bulk_action_retries_stale_secret_id(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 3)
+    MikroTikService(router).bulk_create_pppoe_users(subscriptions)
+    # Recreated on the router behind our back: the mirrored .id is gone
+    table = routeros_simulator.tables['/ppp/secret']
+    table.remove(table.by_name['user002'])
+    table.add({'name': 'user002', 'password': 'pw2'})
+
+    results = MikroTikService(router).bulk_disable_pppoe_users(['user001', 'user002'])
+
+    assert results['user002'] == (True, "User disabled successfully")
+    assert secret(routeros_simulator, 'user002')['disabled'] == 'yes'
+    assert RouterSecret.objects.get(router=router, name='user002').secret_id == table.by_name['user002']
+
+
+# ==================== Live Sessions ====================
+
+@pytest.mark.django_db
+def test_store_router_sessions_records_start_and_stop_events(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 3)
+    service = MikroTikService(router)
+    routeros_simulator.connect_user('user001')
+    routeros_simulator.connect_user('user002')
+
+    first = timezone.now()
+    assert store_router_sessions(router, service.get_active_connections(), first) == 2
+    events = SessionEvent.objects.filter(router=router)
+    assert sorted(events.values_list('username', 'event')) == [('user001', 'start'), ('user002', 'start')]
+    assert events.get(username='user001').subscription_id == subscriptions[0].pk
+
+    # user001 drops, user002 reconnects (new session id), user003 connects
+    routeros_simulator.disconnect_user('user001')
+    routeros_simulator.disconnect_user('user002')
+    routeros_simulator.connect_user('user002')
+    routeros_simulator.connect_user('user003')
+    store_router_sessions(router, service.get_active_connections(), first + timedelta(minutes=1))
+
+    later = SessionEvent.objects.filter(router=router, occurred_at__gt=first)
+    assert sorted(later.values_list('username', 'event')) == [
+        ('user001', 'stop'), ('user002', 'start'), ('user002', 'stop'), ('user003', 'start')
+    ]
+    assert sorted(LiveSession.objects.filter(router=router).values_list('username', flat=True)) == [
+        'user002', 'user003'
+    ]
+
+    # An unchanged snapshot records nothing
+    count = SessionEvent.objects.count()
+    store_router_sessions(router, service.get_active_connections(), first + timedelta(minutes=2))
+    assert SessionEvent.objects.count() == count
+
+
+# ==================== Outbox ====================
+
+@pytest.mark.django_db(transaction=True)
+def test_process_outbox_collapses_and_applies_commands(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 5)
+    MikroTikService(router).bulk_create_pppoe_users(subscriptions)
+    for sub in subscriptions:
+        enqueue_command(sub, 'disable_user')
+    enqueue_command(subscriptions[0], 'enable_user')
+    enqueue_command(subscriptions[4], 'delete_user')
+
+    summary = process_outbox()
+
+    # disable+enable only sends the enable, disable+delete only the delete
+    assert summary['claimed'] == 7
+    assert summary['superseded'] == 2
+    assert summary['done'] == 5
+    assert summary['failed'] == summary['retried'] == 0
+    assert secret(routeros_simulator, 'user001')['disabled'] == 'no'
+    assert secret(routeros_simulator, 'user002')['disabled'] == 'yes'
+    assert secret(routeros_simulator, 'user005') is None
+    assert not MikroTikCommand.objects.exclude(status__in=('done', 'superseded')).exists()
+    assert set(Subscription.objects.values_list('sync_status', flat=True)) == {'synced'}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_outbox_drops_outcome_of_released_claim(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 2)
+    MikroTikService(router).bulk_create_pppoe_users(subscriptions)
+    for sub in subscriptions:
+        enqueue_command(sub, 'disable_user')
+
+    commands = _claim_due_commands(10)
+    # Released as stuck and claimed again by another pass meanwhile
+    MikroTikCommand.objects.filter(pk=commands[0].pk).update(claim_token='another-pass')
+
+    counts = run_router_commands(MikroTikService(router), commands)
+
+    assert counts['done'] == 1
+    first, second = MikroTikCommand.objects.order_by('id')
+    assert (first.status, first.claim_token) == ('processing', 'another-pass')
+    assert (second.status, second.claim_token) == ('done', None)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_outbox_releases_unsent_commands_at_deadline(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 3)
+    for sub in subscriptions:
+        enqueue_command(sub, 'disable_user')
+
+    commands = _claim_due_commands(10)
+    counts = run_router_commands(MikroTikService(router), commands, deadline=0)
+
+    assert counts['released'] == 3
+    assert set(MikroTikCommand.objects.values_list('status', 'claim_token')) == {('pending', None)}
+
+
+# ==================== Reconciliation ====================
+
+@pytest.mark.django_db
+def test_reconcile_applies_drift_and_keeps_unmanaged_secrets(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 6)
+    MikroTikService(router).bulk_create_pppoe_users(subscriptions[:4])
+    table = routeros_simulator.tables['/ppp/secret']
+    table.set(table.by_name['user001'], {'disabled': 'yes'})
+    table.set(table.by_name['user002'], {'profile': '5M'})
+    table.set(table.by_name['user003'], {'remote-address': '10.9.9.9'})
+    comment = build_pppoe_user_data(subscriptions[0])['comment'].replace('user001', 'gone')
+    table.add({'name': 'gone', 'service': 'pppoe', 'comment': comment})
+    table.add({'name': 'site-link', 'service': 'l2tp', 'comment': comment})
+    table.add({'name': 'admin-test', 'service': 'pppoe'})
+
+    report = reconcile_router(MikroTikService(router), apply=True, remove_orphans=True)
+
+    summary = report['summary']
+    assert (summary['missing'], summary['disabled'], summary['profile'], summary['remote_address']) == (2, 1, 1, 1)
+    assert (summary['orphaned'], summary['unmanaged']) == (1, 2)
+    applied = report['applied']
+    assert (applied['created'], applied['updated'], applied['removed'], applied['failed']) == (2, 3, 1, 0)
+
+    assert secret(routeros_simulator, 'user001')['disabled'] == 'no'
+    assert secret(routeros_simulator, 'user002')['profile'] == '10M'
+    assert 'remote-address' not in secret(routeros_simulator, 'user003')
+    assert secret(routeros_simulator, 'gone') is None
+    assert secret(routeros_simulator, 'site-link') and secret(routeros_simulator, 'admin-test')
+
+    # The mirror follows the applied changes without a second download
+    mirrored = {row.name: row for row in RouterSecret.objects.filter(router=router)}
+    assert mirrored['user006'].secret_id == table.by_name['user006']
+    assert mirrored['user002'].profile == '10M'
+    assert mirrored['user001'].disabled is False
+    assert 'gone' not in mirrored
+    assert Subscription.objects.get(mikrotik_username='user006').mikrotik_user_id == table.by_name['user006']
+
+    report = reconcile_router(MikroTikService(router), apply=True, remove_orphans=True)
+    assert [change['issue'] for change in report['changes']] == ['unmanaged', 'unmanaged']
+
+
+# ==================== IP Pools ====================
+
+def test_free_ranges_take_splits_and_trims_at_edges():
+    ranges = FreeRanges([[1, 10], [20, 20]])
+
+    assert ranges.take(5) and ranges.ranges == [[1, 4], [6, 10], [20, 20]]
+    assert ranges.take(1) and ranges.take(10) and ranges.ranges == [[2, 4], [6, 9], [20, 20]]
+    assert ranges.take(20) and ranges.ranges == [[2, 4], [6, 9]]
+    assert not ranges.take(5)
+    assert not ranges.take(20)
+    assert not ranges.take(0)
+    assert len(ranges) == 7 and ranges.first() == 2
+
+
+def test_free_ranges_give_merges_at_edges():
+    ranges = FreeRanges([[2, 4], [6, 9]])
+
+    assert ranges.give(5) and ranges.ranges == [[2, 9]]
+    assert ranges.give(1) and ranges.give(10) and ranges.ranges == [[1, 10]]
+    assert ranges.give(20) and ranges.ranges == [[1, 10], [20, 20]]
+    assert ranges.give(19) and ranges.ranges == [[1, 10], [19, 20]]
+    assert not ranges.give(5)
+    assert not ranges.give(20)
+    assert ranges.contains(19) and not ranges.contains(15)
+
+
+@pytest.fixture
+def pool():
+    pool = IPPool.objects.create(name='Static', network='10.20.0.0/29', gateway='10.20.0.1')
+    rebuild_pool(pool)
+    pool.refresh_from_db()
+    return pool
+
+
+def make_customers(count):
+    return [
+        Customer.objects.create(name=f'Customer {number}', phone='+8801711000000', address='Dhaka')
+        for number in range(1, count + 1)
+    ]
+
+
+@pytest.mark.django_db
+def test_allocate_addresses_until_the_pool_runs_out(pool):
+    # A /29 has six hosts; the gateway is never handed out
+    assert (pool.size, pool.free_count, pool.free_ranges) == (5, 5, [[2, 6]])
+    customers = make_customers(6)
+
+    allocated = allocate_addresses(pool, customers[:5])
+
+    assert sorted(allocated.values()) == [f'10.20.0.{host}' for host in range(2, 7)]
+    assert Customer.objects.get(pk=customers[0].pk).static_ip == allocated[customers[0].pk]
+    # Customers that already hold an address keep it
+    assert allocate_addresses(pool, customers[:1]) == {customers[0].pk: allocated[customers[0].pk]}
+    with pytest.raises(PoolError):
+        allocate_addresses(pool, customers[5:])
+    pool.refresh_from_db()
+    assert (pool.free_count, pool.free_ranges) == (0, [])
+
+    release_addresses(pool, customers=customers[1:3])
+    pool.refresh_from_db()
+    assert pool.free_ranges == [[3, 4]]
+    assert allocate_addresses(pool, customers[5:]) == {customers[5].pk: '10.20.0.3'}
+
+
+@pytest.mark.django_db
+def test_allocate_addresses_skips_addresses_in_use(pool, offline_router):
+    LiveSession.objects.create(
+        router=offline_router, username='someone', ip_address='10.20.0.2', refreshed_at=timezone.now()
+    )
+    # Set after the pool was built, so the pool still counts it as free
+    holder = make_customers(1)[0]
+    Customer.objects.filter(pk=holder.pk).update(static_ip='10.20.0.3')
+    customer = make_customers(1)[0]
+
+    assert allocate_address(pool, customer) == '10.20.0.4'
+
+    allocations = dict(IPAllocation.objects.filter(pool=pool).values_list('address', 'customer_id'))
+    assert allocations == {'10.20.0.2': None, '10.20.0.3': holder.pk, '10.20.0.4': customer.pk}
+    assert IPAllocation.objects.get(address='10.20.0.2').note == 'Reserved: in use by session someone'
+    pool.refresh_from_db()
+    assert pool.free_ranges == [[5, 6]]
+
+
+@pytest.mark.django_db
+def test_rebuild_pool_adopts_static_ips(pool):
+    customer = make_customers(1)[0]
+    Customer.objects.filter(pk=customer.pk).update(static_ip='10.20.0.5')
+
+    assert rebuild_pool(pool) == 1
+
+    pool.refresh_from_db()
+    assert pool.free_ranges == [[2, 4], [6, 6]]
+    assert IPAllocation.objects.get(address='10.20.0.5').customer_id == customer.pk
+    assert rebuild_pool(pool) == 0
+
+
+# ==================== Config Backups ====================
+
+def make_export(secrets, timestamp='2026-10-17 03:00:02'):
+    lines = [f'# {timestamp} by RouterOS 7.15.3', '/ppp profile', 'add name=10M rate-limit=10M/10M', '/ppp secret']
+    lines += [f'add name={name} password="{password}" profile=10M service=pppoe' for name, password in secrets]
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def test_encode_delta_round_trip():
+    base = ['a', 'b', 'c', 'd', 'e']
+    lines = ['a', 'x', 'c', 'd', 'y', 'e', 'z']
+
+    ops, added, removed = encode_delta(base, lines)
+
+    assert apply_delta(base, ops) == lines
+    assert (added, removed) == (3, 1)
+
+
+@pytest.mark.django_db
+def test_store_config_delta_chain_reads_back_identical(offline_router, settings):
+    settings.MIKROTIK_BACKUP_MAX_DELTA_CHAIN = 3
+    secrets = [(f'user{number:03d}', f'pw{number}') for number in range(200)]
+    versions = []
+    for version in range(6):
+        secrets[version * 7] = (secrets[version * 7][0], f'rotated-{version}')
+        secrets.append((f'new{version}', 'p $"\\'))
+        versions.append(make_export(secrets))
+
+    backups = [store_config(offline_router, text)[0] for text in versions]
+
+    blobs = [backup.blob for backup in backups]
+    assert [blob.depth for blob in blobs] == [0, 1, 2, 3, 0, 1]
+    assert blobs[1].base_id == blobs[0].pk and blobs[4].base_id is None
+    assert all(blob.stored_size < blob.size for blob in blobs)
+    for backup, text in zip(backups, versions):
+        stored = config_text(ConfigBlob.objects.get(pk=backup.blob_id))
+        assert stored.encode() == normalize_export(text).encode()
+    assert (backups[1].added_lines, backups[1].removed_lines) == (2, 1)
+
+
+@pytest.mark.django_db
+def test_store_config_falls_back_to_a_full_blob(offline_router):
+    store_config(offline_router, make_export([('user1', 'pw1')]))
+    # Incompressible lines: as a delta they only gain JSON quoting
+    rewritten = ''.join(f'add comment={config_hash(str(number))}\n' for number in range(50))
+
+    backup, changed = store_config(offline_router, rewritten)
+
+    # Nothing in common: the delta would not be smaller than the text
+    assert changed and backup.blob.base_id is None and backup.blob.depth == 0
+    assert config_text(backup.blob) == normalize_export(rewritten)
+
+
+@pytest.mark.django_db
+def test_store_config_unchanged_export_and_shared_blobs(offline_router):
+    text = make_export([('user1', 'pw1'), ('user2', 'pw2')])
+    first, changed = store_config(offline_router, text, seen_at=timezone.now() - timedelta(days=1))
+    assert changed
+
+    # Only the export time in the header differs
+    again, changed = store_config(
+        offline_router, make_export([('user1', 'pw1'), ('user2', 'pw2')], timestamp='2026-10-18 03:00:00')
+    )
+    assert not changed and again.pk == first.pk
+    assert RouterConfigBackup.objects.filter(router=offline_router).count() == 1
+    first.refresh_from_db()
+    assert first.last_seen_at > first.created_at
+
+    other_router = MikroTikRouter.objects.create(name='other', ip_address='192.0.2.2', username='a', password='b')
+    shared, changed = store_config(other_router, text)
+    assert changed and shared.blob_id == first.blob_id
+    assert ConfigBlob.objects.count() == 1
+
+
+# ==================== Usage ====================
+
+def month_usage(subscription):
+    usage = UsageMonth.objects.filter(subscription=subscription).first()
+    return (usage.upload_bytes, usage.download_bytes) if usage else (0, 0)
+
+
+def test_pack_hours_round_trip():
+    values = [0] * 23 + [2 ** 64 - 1]
+
+    assert len(pack_hours(values)) == 24 * 8
+    assert unpack_hours(pack_hours(values)) == values
+    assert unpack_hours(None) == [0] * 24
+
+
+def local_time(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+def add_sample_usage(subscription):
+    add_usage({subscription.pk: (100, 1000)}, local_time(2026, 10, 16, 10, 30))
+    add_usage({subscription.pk: (50, 500)}, local_time(2026, 10, 16, 10, 45))
+    add_usage({subscription.pk: (10, 20)}, local_time(2026, 10, 16, 11, 5))
+    add_usage({subscription.pk: (5, 5)}, local_time(2026, 10, 17, 0, 10))
+    add_usage({subscription.pk: (7, 7)}, local_time(2026, 9, 30, 23, 0))
+
+
+@pytest.mark.django_db
+def test_add_usage_fills_hours_and_rolls_up_days_and_months(offline_router):
+    subscription = make_subscriptions(offline_router, 1)[0]
+    add_sample_usage(subscription)
+
+    day = UsageDay.objects.get(subscription=subscription, date=date(2026, 10, 16))
+    uploads, downloads = unpack_hours(day.hourly_upload), unpack_hours(day.hourly_download)
+    assert (uploads[10], downloads[10], uploads[11], downloads[11]) == (150, 1500, 10, 20)
+    assert sum(uploads) == day.upload_bytes == 160
+    assert sum(downloads) == day.download_bytes == 1520
+
+    months = UsageMonth.objects.filter(subscription=subscription).order_by('year', 'month')
+    assert list(months.values_list('month', 'upload_bytes', 'download_bytes')) == [(9, 7, 7), (10, 165, 1525)]
+
+    hourly = get_usage_curve(subscription.pk, 'hourly', date(2026, 10, 16), date(2026, 10, 16))
+    assert len(hourly) == 24
+    assert hourly[10] == {'period': '2026-10-16T10:00', 'upload': 150, 'download': 1500}
+    assert hourly[0] == {'period': '2026-10-16T00:00', 'upload': 0, 'download': 0}
+
+    assert get_usage_curve(subscription.pk, 'daily', date(2026, 9, 30), date(2026, 10, 17)) == [
+        {'period': '2026-09-30', 'upload': 7, 'download': 7},
+        {'period': '2026-10-16', 'upload': 160, 'download': 1520},
+        {'period': '2026-10-17', 'upload': 5, 'download': 5},
+    ]
+    assert get_usage_curve(subscription.pk, 'monthly', date(2026, 10, 1), date(2026, 10, 31)) == [
+        {'period': '2026-10', 'upload': 165, 'download': 1525},
+    ]
+
+
+@pytest.mark.django_db
+def test_record_counters_baseline_reset_new_queue_and_empty_poll(offline_router):
+    router = offline_router
+    first, second = make_subscriptions(router, 2)
+    sampled_at = timezone.now()
+
+    # The first reading is only a baseline
+    assert record_counters(router, {'user001': (1000, 5000)}, sampled_at) == 0
+    assert router.usage_baseline_at == sampled_at
+    assert month_usage(first) == (0, 0)
+
+    # Deltas, and a new queue counting from zero
+    record_counters(router, {'user001': (1500, 7000), 'user002': (300, 400)}, sampled_at + timedelta(minutes=5))
+    assert month_usage(first) == (500, 2000)
+    assert month_usage(second) == (300, 400)
+
+    # A counter that went backwards was reset: the new reading is the delta
+    record_counters(router, {'user001': (100, 200), 'user002': (350, 450)}, sampled_at + timedelta(minutes=10))
+    assert month_usage(first) == (600, 2200)
+    assert month_usage(second) == (350, 450)
+
+    # Everyone offline: the next reading is not taken as a new baseline
+    assert record_counters(router, {}, sampled_at + timedelta(minutes=15)) == 0
+    assert not TrafficCounter.objects.filter(router=router).exists()
+    router.refresh_from_db()
+    record_counters(router, {'user001': (40, 60)}, sampled_at + timedelta(minutes=20))
+    assert month_usage(first) == (640, 2260)
+    assert router.usage_baseline_at == sampled_at
+
+
+# ==================== Provisioning ====================
+
+@pytest.mark.django_db
+def test_provision_router_imports_script(routeros_simulator, router):
+    subscriptions = make_subscriptions(router, 20)
+    subscriptions[0].status = 'suspended'
+    subscriptions[0].save()
+    routeros_simulator.tables['/ppp/secret'].add({'name': 'user002', 'password': 'stale'})
+    routeros_simulator.add_file(SCRIPT_FILE_NAME, '\n'.join(render_router_script(router)) + '\n')
+
+    report = provision_router(router, upload=False)
+
+    assert report['error'] is None
+    assert report['differences'] == 0
+    assert len(routeros_simulator.tables['/ppp/secret'].rows) == 20
+    assert secret(routeros_simulator, 'user001')['disabled'] == 'yes'
+    assert secret(routeros_simulator, 'user002')['password'] == 'pw2'
+    assert '10M' in routeros_simulator.tables['/ppp/profile'].by_name
+    assert SCRIPT_FILE_NAME not in routeros_simulator.tables['/file'].by_name
@@ -3,9 +3,15 @@ from .views import (
     PackageListView, PackageCreateView, PackageDetailView,
     PackageUpdateView, PackageDeleteView,
     MikroTikRouterListView, MikroTikRouterCreateView, MikroTikRouterDetailView,
-    MikroTikRouterTestConnectionView, MikroTikRouterProfilesView,
+    MikroTikRouterTestConnectionView, MikroTikRouterProfilesView, MikroTikRouterHealthView,
+    MikroTikRouterReconcileView, MikroTikRouterScriptView, MikroTikRouterProvisionView,
+    RouterConfigBackupListView, RouterConfigBackupDetailView, RouterConfigBackupDiffView,
+    RouterJobListView, RouterJobDetailView,
     SyncPackageToRouterView,
-    MikroTikQueueProfileListView, MikroTikSyncLogListView
+    MikroTikQueueProfileListView, MikroTikSyncLogListView, MikroTikSyncLogSummaryListView,
+    PackageBulkSyncView, ZoneSessionFlapView,
+    IPPoolListCreateView, IPPoolDetailView, IPPoolAllocationListView,
+    IPPoolAllocateView, IPPoolReleaseView, IPPoolConflictsView, AddressLookupView
 )
 
 app_name = 'mikrotik'
@@ -24,11 +30,38 @@ urlpatterns = [
     path('routers/<int:pk>/', MikroTikRouterDetailView.as_view(), name='router_detail'),
     path('routers/<int:pk>/test/', MikroTikRouterTestConnectionView.as_view(), name='router_test'),
     path('routers/<int:pk>/profiles/', MikroTikRouterProfilesView.as_view(), name='router_profiles'),
+    path('routers/<int:pk>/health/', MikroTikRouterHealthView.as_view(), name='router_health'),
+    path('routers/reconcile/', MikroTikRouterReconcileView.as_view(), name='router_reconcile'),
+    path('routers/<int:pk>/script/', MikroTikRouterScriptView.as_view(), name='router_script'),
+    path('routers/<int:pk>/provision/', MikroTikRouterProvisionView.as_view(), name='router_provision'),
+    path('routers/<int:pk>/backups/', RouterConfigBackupListView.as_view(), name='router_backup_list'),
+    path('routers/<int:pk>/backups/diff/', RouterConfigBackupDiffView.as_view(), name='router_backup_diff'),
+    path('routers/<int:pk>/backups/<int:backup_id>/', RouterConfigBackupDetailView.as_view(), name='router_backup_detail'),
+    
+    # Background router jobs
+    path('jobs/', RouterJobListView.as_view(), name='router_job_list'),
+    path('jobs/<int:pk>/', RouterJobDetailView.as_view(), name='router_job_detail'),
     
     # Queue Profile Sync endpoints
     path('sync/package/<int:package_id>/router/<int:router_id>/', SyncPackageToRouterView.as_view(), name='sync_package'),
+    path('sync/packages/', PackageBulkSyncView.as_view(), name='sync_packages'),
     path('queue-profiles/', MikroTikQueueProfileListView.as_view(), name='queue_profile_list'),
     
     # Sync Logs
     path('sync-logs/', MikroTikSyncLogListView.as_view(), name='sync_log_list'),
+    path('sync-logs/summary/', MikroTikSyncLogSummaryListView.as_view(), name='sync_log_summary_list'),
+    
+    # Session Events
+    path('session-events/flaps/', ZoneSessionFlapView.as_view(), name='session_flaps'),
+    
+    # Address Lookup
+    path('address-lookup/', AddressLookupView.as_view(), name='address_lookup'),
+    
+    # IP Pools
+    path('ip-pools/', IPPoolListCreateView.as_view(), name='ip_pool_list_create'),
+    path('ip-pools/<int:pk>/', IPPoolDetailView.as_view(), name='ip_pool_detail'),
+    path('ip-pools/<int:pk>/allocations/', IPPoolAllocationListView.as_view(), name='ip_pool_allocations'),
+    path('ip-pools/<int:pk>/allocate/', IPPoolAllocateView.as_view(), name='ip_pool_allocate'),
+    path('ip-pools/<int:pk>/release/', IPPoolReleaseView.as_view(), name='ip_pool_release'),
+    path('ip-pools/<int:pk>/conflicts/', IPPoolConflictsView.as_view(), name='ip_pool_conflicts'),
 ]
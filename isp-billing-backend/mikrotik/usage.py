@@ -0,0 +1,247 @@
+"""
+Per-subscriber traffic usage collection.
+
+Each run reads the /queue/simple byte counters of every router (in
+parallel), turns them into deltas against the previous reading and adds
+them to compact per-day blocks:
+
+- UsageDay: one row per subscription per day, with 24 hourly buckets
+  packed into binary arrays and the daily totals
+- UsageMonth: running monthly totals
+
+Counter resets (router reboot, PPP reconnect recreating the dynamic queue)
+are detected when a counter goes backwards; the new reading is then the
+delta. Only the first reading of a router (usage_baseline_at unset) is
+taken as a baseline; afterwards a queue without a stored counter is new
+and counts from zero.
+"""
+import logging
+import struct
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from subscription.models import Subscription
+from .models import MikroTikRouter, TrafficCounter, UsageDay, UsageMonth
+from .services import fetch_from_routers
+
+logger = logging.getLogger(__name__)
+
+HOURS = 24
+HOURLY_FORMAT = f'<{HOURS}Q'
+
+
+def pack_hours(values):
+    return struct.pack(HOURLY_FORMAT, *values)
+
+
+def unpack_hours(data):
+    if not data:
+        return [0] * HOURS
+    return list(struct.unpack(HOURLY_FORMAT, bytes(data)))
+
+
+def collect_usage(routers=None):
+    """
+    Poll byte counters from all active routers and record the deltas.
+    Returns a summary dict.
+    """
+    if routers is None:
+        routers = MikroTikRouter.objects.filter(status='active')
+    routers = {router.pk: router for router in routers}
+
+    results, errors = fetch_from_routers(
+        routers.values(),
+        lambda service: service.get_queue_counters(),
+        timeout=settings.MIKROTIK_COLLECT_TIMEOUT
+    )
+
+    summary = {'routers': len(routers), 'collected': 0, 'subscriptions': 0, 'errors': {}}
+    for router_id, counters in results.items():
+        try:
+            summary['subscriptions'] += record_counters(routers[router_id], counters)
+            summary['collected'] += 1
+        except Exception as e:
+            logger.error(f"Error recording usage for router {routers[router_id].name}: {e}")
+            errors[router_id] = str(e)
+
+    for router_id, message in errors.items():
+        summary['errors'][routers[router_id].name] = message
+
+    logger.info(
+        f"Usage collection: {summary['collected']}/{summary['routers']} routers, "
+        f"{summary['subscriptions']} subscriptions with traffic"
+    )
+    return summary
+
+
+def record_counters(router, counters, sampled_at=None):
+    """
+    Store one reading of {username: (upload, download)} for a router and
+    add the deltas to the usage tables. Returns the number of
+    subscriptions that had traffic.
+    """
+    sampled_at = sampled_at or timezone.now()
+    previous = {counter.username: counter for counter in TrafficCounter.objects.filter(router=router)}
+    # The very first reading of a router is only a baseline. This is stored
+    # on the router: an empty poll (everyone offline) also leaves no counters.
+    first_reading = router.usage_baseline_at is None
+
+    deltas = {}
+    for username, (upload, download) in counters.items():
+        counter = previous.get(username)
+        if counter is None:
+            if not first_reading:
+                # A new queue (user just connected) starts from zero
+                deltas[username] = (upload, download)
+            continue
+        deltas[username] = (
+            _delta(counter.upload_bytes, upload),
+            _delta(counter.download_bytes, download),
+        )
+
+    deltas = {username: delta for username, delta in deltas.items() if any(delta)}
+    subscription_ids = dict(
+        Subscription.objects.filter(mikrotik_username__in=deltas.keys()).values_list('mikrotik_username', 'id')
+    )
+    usage = {
+        subscription_ids[username]: delta
+        for username, delta in deltas.items()
+        if username in subscription_ids
+    }
+
+    with transaction.atomic():
+        TrafficCounter.objects.bulk_create(
+            [
+                TrafficCounter(
+                    router=router, username=username,
+                    upload_bytes=upload, download_bytes=download, sampled_at=sampled_at
+                )
+                for username, (upload, download) in counters.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['router', 'username'],
+            update_fields=['upload_bytes', 'download_bytes', 'sampled_at'],
+            batch_size=1000,
+        )
+        # Queues that disappeared (user disconnected) start from zero next time
+        TrafficCounter.objects.filter(router=router, sampled_at__lt=sampled_at).delete()
+        if first_reading:
+            router.usage_baseline_at = sampled_at
+            MikroTikRouter.objects.filter(pk=router.pk).update(usage_baseline_at=sampled_at)
+
+        if usage:
+            add_usage(usage, sampled_at)
+
+    return len(usage)
+
+
+def add_usage(usage, sampled_at):
+    """
+    Add {subscription_id: (upload, download)} to the hour/day/month of sampled_at.
+
+    Missing rows are inserted first (ignoring conflicts) and all rows are
+    then locked in subscription order, so concurrent collectors add up
+    instead of overwriting each other's hourly blocks and totals.
+    """
+    local = timezone.localtime(sampled_at)
+    day, hour = local.date(), local.hour
+    subscription_ids = sorted(usage.keys())
+    empty = pack_hours([0] * HOURS)
+
+    with transaction.atomic():
+        UsageDay.objects.bulk_create(
+            [
+                UsageDay(subscription_id=subscription_id, date=day, hourly_upload=empty, hourly_download=empty)
+                for subscription_id in subscription_ids
+            ],
+            ignore_conflicts=True,
+            batch_size=500
+        )
+        UsageMonth.objects.bulk_create(
+            [
+                UsageMonth(subscription_id=subscription_id, year=day.year, month=day.month)
+                for subscription_id in subscription_ids
+            ],
+            ignore_conflicts=True,
+            batch_size=500
+        )
+
+        days = list(
+            UsageDay.objects.select_for_update()
+            .filter(date=day, subscription_id__in=subscription_ids)
+            .order_by('subscription_id')
+        )
+        months = list(
+            UsageMonth.objects.select_for_update()
+            .filter(year=day.year, month=day.month, subscription_id__in=subscription_ids)
+            .order_by('subscription_id')
+        )
+
+        for usage_day in days:
+            upload, download = usage[usage_day.subscription_id]
+            hourly_upload = unpack_hours(usage_day.hourly_upload)
+            hourly_download = unpack_hours(usage_day.hourly_download)
+            hourly_upload[hour] += upload
+            hourly_download[hour] += download
+            usage_day.hourly_upload = pack_hours(hourly_upload)
+            usage_day.hourly_download = pack_hours(hourly_download)
+            usage_day.upload_bytes = sum(hourly_upload)
+            usage_day.download_bytes = sum(hourly_download)
+            usage_day.updated_at = sampled_at
+
+        for usage_month in months:
+            upload, download = usage[usage_month.subscription_id]
+            usage_month.upload_bytes += upload
+            usage_month.download_bytes += download
+            usage_month.updated_at = sampled_at
+
+        UsageDay.objects.bulk_update(
+            days,
+            ['hourly_upload', 'hourly_download', 'upload_bytes', 'download_bytes', 'updated_at'],
+            batch_size=500
+        )
+        UsageMonth.objects.bulk_update(months, ['upload_bytes', 'download_bytes', 'updated_at'], batch_size=500)
+
+
+def get_usage_curve(subscription_id, granularity, start, end):
+    """
+    Usage points for a subscription between two dates (inclusive):
+    hourly points from the day blocks, daily totals, or monthly rollups.
+    """
+    if granularity == 'monthly':
+        rows = UsageMonth.objects.filter(
+            subscription_id=subscription_id,
+            year__gte=start.year, year__lte=end.year
+        ).order_by('year', 'month').values_list('year', 'month', 'upload_bytes', 'download_bytes')
+        return [
+            {'period': f'{year}-{month:02d}', 'upload': upload, 'download': download}
+            for year, month, upload, download in rows
+            if (start.year, start.month) <= (year, month) <= (end.year, end.month)
+        ]
+
+    days = UsageDay.objects.filter(subscription_id=subscription_id, date__range=(start, end)).order_by('date')
+
+    if granularity == 'daily':
+        return [
+            {'period': day.isoformat(), 'upload': upload, 'download': download}
+            for day, upload, download in days.values_list('date', 'upload_bytes', 'download_bytes')
+        ]
+
+    points = []
+    for day, hourly_upload, hourly_download in days.values_list('date', 'hourly_upload', 'hourly_download'):
+        uploads = unpack_hours(hourly_upload)
+        downloads = unpack_hours(hourly_download)
+        for hour in range(HOURS):
+            points.append({
+                'period': f'{day.isoformat()}T{hour:02d}:00',
+                'upload': uploads[hour],
+                'download': downloads[hour],
+            })
+    return points
+
+
+def _delta(previous, current):
+    # A counter that went backwards was reset; everything since is new
+    return current - previous if current >= previous else current
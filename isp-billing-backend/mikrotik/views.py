@@ -3,16 +3,41 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
+from django.db.models import Avg, Count, Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from datetime import timedelta
 
-from .models import Package, MikroTikRouter, MikroTikQueueProfile, MikroTikSyncLog
+from .models import (
+    Package, MikroTikRouter, MikroTikQueueProfile, MikroTikSyncLog, MikroTikSyncLogSummary,
+    RouterHealthSample, SessionEvent, IPPool, IPAllocation, RouterConfigBackup, RouterJob
+)
+from customers.models import Customer
 from .serializers import (
     PackageSerializer, PackageCreateSerializer, PackageListSerializer,
     MikroTikRouterSerializer, MikroTikRouterListSerializer,
-    MikroTikQueueProfileSerializer, MikroTikSyncLogSerializer
+    MikroTikQueueProfileSerializer, MikroTikSyncLogSerializer, MikroTikSyncLogSummarySerializer,
+    RouterReconcileSerializer, PackageBulkSyncSerializer, RouterHealthSampleSerializer,
+    IPPoolSerializer, IPAllocationSerializer, IPPoolAllocateSerializer, IPPoolReleaseSerializer,
+    RouterConfigBackupSerializer, RouterJobSerializer
 )
 from .services import MikroTikService
+from .reconciliation import reconcile_routers
+from .provisioning import SCRIPT_FILE_NAME, render_router_script
+from .jobs import enqueue_job, find_active_job
+from .backups import config_text, diff_backups
+from .profiles import push_packages
+from .health import with_latest_health
+from .ip_pools import (
+    PoolError, rebuild_pool, allocate_address, allocate_addresses, release_addresses, find_conflicts
+)
+from .address_index import address_index, lookup_history, normalize_ip, normalize_mac, with_customers
 from utils.permissions import IsAdminOrManager, IsAdmin
+from utils.pagination import EstimatedCountPagination
+
+# Longest look-back accepted by the history endpoints (`hours` query param)
+MAX_HISTORY_HOURS = 24 * 90
 
 
 # ==================== Package Views ====================
@@ -110,7 +135,8 @@ class MikroTikRouterListView(generics.ListAPIView):
     """
     API endpoint to list all MikroTik routers
     """
-    queryset = MikroTikRouter.objects.select_related('zone').all()
+    # Latest health comes from the probe_router_health samples
+    queryset = with_latest_health(MikroTikRouter.objects.select_related('zone'))
     serializer_class = MikroTikRouterListSerializer
     permission_classes = [IsAdminOrManager]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -145,11 +171,34 @@ class MikroTikRouterDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint to get, update, or delete MikroTik router
     """
-    queryset = MikroTikRouter.objects.all()
+    queryset = with_latest_health(MikroTikRouter.objects.all())
     serializer_class = MikroTikRouterSerializer
     permission_classes = [IsAdmin]
 
 
+@extend_schema(tags=['MikroTik'])
+class MikroTikRouterHealthView(generics.ListAPIView):
+    """
+    API endpoint to get the health history of a router
+
+    Query params:
+    - hours: how far back to look (default 24, clamped to 1..MAX_HISTORY_HOURS)
+    """
+    serializer_class = RouterHealthSampleSerializer
+    permission_classes = [IsAdminOrManager]
+    
+    def get_queryset(self):
+        try:
+            hours = int(self.request.query_params.get('hours', 24))
+        except ValueError:
+            hours = 24
+        hours = min(max(hours, 1), MAX_HISTORY_HOURS)
+        since = timezone.now() - timedelta(hours=hours)
+        return RouterHealthSample.objects.filter(
+            router_id=self.kwargs.get('pk'), sampled_at__gte=since
+        ).order_by('-sampled_at')
+
+
 @extend_schema(tags=['MikroTik'])
 class MikroTikRouterTestConnectionView(APIView):
     """
@@ -216,6 +265,235 @@ class MikroTikRouterProfilesView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+# ==================== Reconciliation Views ====================
+
+@extend_schema(tags=['MikroTik'], request=RouterReconcileSerializer)
+class MikroTikRouterReconcileView(APIView):
+    """
+    API endpoint to diff router PPP secrets against subscriptions and
+    optionally push the differences (dry run by default)
+
+    A dry run answers with the reports; with apply set, the run is queued
+    as a background job (202) whose result holds the reports.
+    """
+    permission_classes = [IsAdmin]
+    
+    def post(self, request):
+        serializer = RouterReconcileSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        if data['apply']:
+            job = enqueue_job(
+                'reconcile',
+                params={'router_ids': data.get('router_ids') or [], 'remove_orphans': data['remove_orphans']},
+                created_by=request.user
+            )
+            return Response({
+                'message': 'Reconciliation queued',
+                'job': RouterJobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        routers = MikroTikRouter.objects.filter(status='active')
+        if data.get('router_ids'):
+            routers = MikroTikRouter.objects.filter(pk__in=data['router_ids'])
+        
+        reports = reconcile_routers(routers)
+        
+        differences = sum(len(report['changes']) for report in reports)
+        failed = [report for report in reports if report['error']]
+        
+        return Response({
+            'message': f"Found {differences} differences on {len(reports) - len(failed)} routers (dry run)",
+            'dry_run': True,
+            'routers': reports
+        }, status=status.HTTP_200_OK)
+
+
+# ==================== Provisioning Views ====================
+
+@extend_schema(tags=['MikroTik'])
+class MikroTikRouterScriptView(APIView):
+    """
+    API endpoint to download the router's provisioning script (.rsc) for a
+    manual /import
+    """
+    permission_classes = [IsAdmin]
+    
+    def get(self, request, pk):
+        try:
+            router = MikroTikRouter.objects.get(pk=pk)
+        except MikroTikRouter.DoesNotExist:
+            return Response({'error': 'Router not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        response = StreamingHttpResponse(
+            (line + '\r\n' for line in render_router_script(router)),
+            content_type='text/plain; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{SCRIPT_FILE_NAME}"'
+        return response
+
+
+@extend_schema(tags=['MikroTik'])
+class MikroTikRouterProvisionView(APIView):
+    """
+    API endpoint to provision all PPP profiles and secrets of a router
+    through an uploaded script and /import, verified by one secret print
+
+    The import runs as a background job; poll /jobs/<id>/ for the report.
+
+    Body:
+    - upload: set to false when the script was put on the router by hand
+    """
+    permission_classes = [IsAdmin]
+    
+    def post(self, request, pk):
+        try:
+            router = MikroTikRouter.objects.get(pk=pk)
+        except MikroTikRouter.DoesNotExist:
+            return Response({'error': 'Router not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        active = find_active_job('provision', router=router)
+        if active is not None:
+            return Response({
+                'error': 'Router is already being provisioned',
+                'job': RouterJobSerializer(active).data
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = enqueue_job(
+            'provision',
+            router=router,
+            params={'upload': request.data.get('upload', True) not in (False, 'false', '0')},
+            created_by=request.user
+        )
+        return Response({
+            'message': 'Provisioning queued',
+            'job': RouterJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+# ==================== Config Backup Views ====================
+
+@extend_schema(tags=['MikroTik'])
+class RouterConfigBackupListView(generics.ListAPIView):
+    """
+    API endpoint to list the configuration versions of a router (newest
+    first) or queue a backup now (POST, answers 202 with the job)
+    """
+    serializer_class = RouterConfigBackupSerializer
+    permission_classes = [IsAdmin]
+    
+    def get_queryset(self):
+        return RouterConfigBackup.objects.filter(
+            router_id=self.kwargs.get('pk')
+        ).select_related('blob').order_by('-created_at')
+    
+    def post(self, request, pk):
+        try:
+            router = MikroTikRouter.objects.get(pk=pk)
+        except MikroTikRouter.DoesNotExist:
+            return Response({'error': 'Router not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        active = find_active_job('config_backup', router=router)
+        if active is not None:
+            return Response({
+                'error': 'A backup of this router is already queued or running',
+                'job': RouterJobSerializer(active).data
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = enqueue_job('config_backup', router=router, created_by=request.user)
+        return Response({
+            'message': 'Backup queued',
+            'job': RouterJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+@extend_schema(tags=['MikroTik'])
+class RouterConfigBackupDetailView(APIView):
+    """
+    API endpoint to download one configuration version as an .rsc file
+    """
+    permission_classes = [IsAdmin]
+    
+    def get(self, request, pk, backup_id):
+        try:
+            backup = RouterConfigBackup.objects.select_related('router', 'blob').get(pk=backup_id, router_id=pk)
+        except RouterConfigBackup.DoesNotExist:
+            return Response({'error': 'Backup not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        response = HttpResponse(config_text(backup.blob), content_type='text/plain; charset=utf-8')
+        filename = f"{backup.router.name}-{backup.created_at:%Y%m%d-%H%M%S}.rsc"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+@extend_schema(tags=['MikroTik'])
+class RouterConfigBackupDiffView(APIView):
+    """
+    API endpoint to diff two configuration versions of a router
+
+    Query params:
+    - to: backup id (default: latest)
+    - from: backup id (default: the version before `to`)
+    - context: lines of context (default 3)
+    """
+    permission_classes = [IsAdmin]
+    
+    def get(self, request, pk):
+        backups = RouterConfigBackup.objects.filter(router_id=pk).select_related('router', 'blob')
+        try:
+            context = int(request.query_params.get('context', 3))
+            new = backups.get(pk=request.query_params['to']) if request.query_params.get('to') else backups.latest('created_at')
+            if request.query_params.get('from'):
+                old = backups.get(pk=request.query_params['from'])
+            else:
+                old = backups.filter(created_at__lt=new.created_at).latest('created_at')
+        except ValueError:
+            return Response({'error': 'Invalid backup id or context'}, status=status.HTTP_400_BAD_REQUEST)
+        except RouterConfigBackup.DoesNotExist:
+            return Response({'error': 'Backup not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        diff = diff_backups(old, new, context=context)
+        return Response({
+            'from': RouterConfigBackupSerializer(old).data,
+            'to': RouterConfigBackupSerializer(new).data,
+            'added_lines': sum(1 for line in diff if line.startswith('+') and not line.startswith('+++')),
+            'removed_lines': sum(1 for line in diff if line.startswith('-') and not line.startswith('---')),
+            'diff': '\n'.join(diff)
+        })
+
+
+# ==================== Router Job Views ====================
+
+@extend_schema(tags=['MikroTik'])
+class RouterJobListView(generics.ListAPIView):
+    """
+    API endpoint to list queued and finished router jobs
+    """
+    queryset = RouterJob.objects.select_related('router')
+    serializer_class = RouterJobSerializer
+    permission_classes = [IsAdmin]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['kind', 'status', 'router']
+    ordering = ['-created_at']
+
+
+@extend_schema(tags=['MikroTik'])
+class RouterJobDetailView(APIView):
+    """
+    API endpoint to poll a router job for its status and result
+    """
+    permission_classes = [IsAdmin]
+    
+    def get(self, request, pk):
+        try:
+            job = RouterJob.objects.select_related('router').get(pk=pk)
+        except RouterJob.DoesNotExist:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({'job': RouterJobSerializer(job).data})
+
+
 # ==================== Queue Profile Sync Views ====================
 
 @extend_schema(tags=['MikroTik'])
@@ -234,61 +512,50 @@ class SyncPackageToRouterView(APIView):
         except MikroTikRouter.DoesNotExist:
             return Response({'error': 'Router not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Create MikroTik service
-        service = MikroTikService(router)
-        
-        # Check if queue profile already exists
-        queue_profile, created = MikroTikQueueProfile.objects.get_or_create(
-            package=package,
-            router=router
-        )
-        
-        # Sync to router
-        if queue_profile.mikrotik_queue_id:
-            # Update existing profile
-            success, result = service.update_ppp_profile(package, queue_profile.mikrotik_queue_id)
-            action = 'update_profile'
-        else:
-            # Create new profile
-            success, result = service.create_ppp_profile(package)
-            action = 'create_profile'
-        
-        # Log sync operation
-        MikroTikSyncLog.objects.create(
-            router=router,
-            action=action,
-            status='success' if success else 'failed',
-            entity_type='profile',
-            entity_id=package.mikrotik_queue_name,
-            request_data={'package_id': package.id},
-            response_data=result if isinstance(result, dict) else {'message': str(result)},
-            error_message=None if success else str(result)
-        )
-        
-        # Update queue profile (keeping the model name same for now, but storing profile ID)
-        if success:
-            queue_profile.is_synced = True
-            queue_profile.last_synced_at = timezone.now()
-            queue_profile.sync_error = None
-            if isinstance(result, dict) and 'id' in result:
-                queue_profile.mikrotik_queue_id = result['id']
-        else:
-            queue_profile.is_synced = False
-            queue_profile.sync_error = str(result)
+        if not package.mikrotik_profile_name:
+            return Response(
+                {'error': 'Package has no MikroTik profile name'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        queue_profile.save()
+        matrix = push_packages([package], routers=[router])
+        row = matrix['routers'][0]
+        result = row['results'].get(package.pk) or {'status': 'failed', 'error': row['error']}
+        queue_profile = MikroTikQueueProfile.objects.get(package=package, router=router)
         
-        if success:
+        if result['status'] != 'failed':
             return Response({
                 'message': f'Package synced successfully to {router.name}',
                 'queue_profile': MikroTikQueueProfileSerializer(queue_profile).data
             }, status=status.HTTP_200_OK)
         else:
             return Response({
-                'error': f'Failed to sync package: {result}'
+                'error': f"Failed to sync package: {result['error']}"
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+@extend_schema(tags=['MikroTik'])
+class PackageBulkSyncView(APIView):
+    """
+    API endpoint to push package PPP profiles to many routers in parallel
+    """
+    permission_classes = [IsAdmin]
+    
+    @extend_schema(request=PackageBulkSyncSerializer)
+    def post(self, request):
+        serializer = PackageBulkSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        packages = Package.objects.filter(pk__in=serializer.validated_data['package_ids'])
+        
+        routers = None
+        if serializer.validated_data.get('router_ids'):
+            routers = MikroTikRouter.objects.filter(pk__in=serializer.validated_data['router_ids'])
+        
+        matrix = push_packages(packages, routers=routers, zone=serializer.validated_data.get('zone'))
+        return Response(matrix, status=status.HTTP_200_OK)
+
+
 @extend_schema(tags=['MikroTik'])
 class MikroTikQueueProfileListView(generics.ListAPIView):
     """
@@ -309,6 +576,286 @@ class MikroTikSyncLogListView(generics.ListAPIView):
     queryset = MikroTikSyncLog.objects.select_related('router').all()
     serializer_class = MikroTikSyncLogSerializer
     permission_classes = [IsAdminOrManager]
+    pagination_class = EstimatedCountPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['router', 'action', 'status']
     ordering = ['-created_at']
+
+
+@extend_schema(tags=['MikroTik'])
+class MikroTikSyncLogSummaryListView(generics.ListAPIView):
+    """
+    API endpoint to list per-day counts of pruned sync logs
+    """
+    queryset = MikroTikSyncLogSummary.objects.select_related('router').all()
+    serializer_class = MikroTikSyncLogSummarySerializer
+    permission_classes = [IsAdminOrManager]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = {
+        'router': ['exact'],
+        'action': ['exact'],
+        'status': ['exact'],
+        'date': ['gte', 'lte'],
+    }
+    ordering = ['-date']
+
+
+# ==================== Session Event Views ====================
+
+@extend_schema(tags=['MikroTik'])
+class ZoneSessionFlapView(APIView):
+    """
+    API endpoint to get PPP session flap statistics per zone
+
+    Query params:
+    - hours: how far back to look (default 24, at most MAX_HISTORY_HOURS)
+    """
+    permission_classes = [IsAdminOrManager]
+    
+    def get(self, request):
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            return Response(
+                {'error': 'hours must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not 1 <= hours <= MAX_HISTORY_HOURS:
+            return Response(
+                {'error': f'hours must be between 1 and {MAX_HISTORY_HOURS}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        since = timezone.now() - timedelta(hours=hours)
+        
+        stops = Q(event='stop')
+        zones = (
+            SessionEvent.objects.filter(occurred_at__gte=since)
+            .values('zone_id', 'zone__name')
+            .annotate(
+                disconnects=Count('id', filter=stops),
+                connects=Count('id', filter=Q(event='start')),
+                affected_users=Count('username', filter=stops, distinct=True),
+                avg_session_seconds=Avg('uptime', filter=stops),
+            )
+            .order_by('-disconnects')
+        )
+        
+        return Response({
+            'since': since,
+            'zones': [
+                {
+                    'zone_id': row['zone_id'],
+                    'zone_name': row['zone__name'],
+                    'disconnects': row['disconnects'],
+                    'connects': row['connects'],
+                    'affected_users': row['affected_users'],
+                    'disconnects_per_user': (
+                        round(row['disconnects'] / row['affected_users'], 2)
+                        if row['affected_users'] else 0
+                    ),
+                    'avg_session_seconds': (
+                        round(row['avg_session_seconds']) if row['avg_session_seconds'] is not None else None
+                    ),
+                }
+                for row in zones
+            ]
+        })
+
+
+# ==================== IP Pool Views ====================
+
+@extend_schema(tags=['IP Pools'])
+class IPPoolListCreateView(generics.ListCreateAPIView):
+    """
+    API endpoint to list or create static IP pools.
+    Existing customer static IPs inside a new pool are adopted.
+    """
+    queryset = IPPool.objects.select_related('zone', 'router')
+    serializer_class = IPPoolSerializer
+    permission_classes = [IsAdminOrManager]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filterset_fields = ['zone', 'router']
+    search_fields = ['name', 'network']
+    
+    def perform_create(self, serializer):
+        pool = serializer.save()
+        rebuild_pool(pool)
+        pool.refresh_from_db()
+
+
+@extend_schema(tags=['IP Pools'])
+class IPPoolDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    API endpoint to get, update or delete an IP pool
+    """
+    queryset = IPPool.objects.select_related('zone', 'router')
+    serializer_class = IPPoolSerializer
+    permission_classes = [IsAdminOrManager]
+    
+    def perform_update(self, serializer):
+        pool = serializer.save()
+        rebuild_pool(pool)
+        pool.refresh_from_db()
+    
+    def destroy(self, request, *args, **kwargs):
+        pool = self.get_object()
+        if pool.allocations.filter(customer__isnull=False).exists():
+            return Response(
+                {'error': 'Pool still has addresses allocated to customers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        pool.delete()
+        return Response({'message': 'IP pool deleted successfully'}, status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=['IP Pools'])
+class IPPoolAllocationListView(generics.ListAPIView):
+    """
+    API endpoint to list the allocations of an IP pool
+    """
+    serializer_class = IPAllocationSerializer
+    permission_classes = [IsAdminOrManager]
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['address', 'customer__customer_id', 'customer__name']
+    
+    def get_queryset(self):
+        return IPAllocation.objects.filter(pool_id=self.kwargs['pk']).select_related('customer')
+
+
+@extend_schema(tags=['IP Pools'])
+class IPPoolAllocateView(APIView):
+    """
+    API endpoint to allocate pool addresses to customers (next free
+    address each, or one specific address). Sets Customer.static_ip.
+    """
+    permission_classes = [IsAdminOrManager]
+    
+    @extend_schema(request=IPPoolAllocateSerializer)
+    def post(self, request, pk):
+        try:
+            pool = IPPool.objects.get(pk=pk)
+        except IPPool.DoesNotExist:
+            return Response({'error': 'IP pool not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = IPPoolAllocateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        customer_ids = serializer.validated_data['customer_ids']
+        customers = {customer.pk: customer for customer in Customer.objects.filter(pk__in=customer_ids)}
+        missing = [customer_id for customer_id in customer_ids if customer_id not in customers]
+        if missing:
+            return Response({'error': f'Customers not found: {missing}'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            if serializer.validated_data.get('address'):
+                customer = customers[customer_ids[0]]
+                allocated = {customer.pk: allocate_address(pool, customer, serializer.validated_data['address'])}
+            else:
+                allocated = allocate_addresses(pool, [customers[customer_id] for customer_id in dict.fromkeys(customer_ids)])
+        except PoolError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        pool.refresh_from_db()
+        return Response({
+            'message': f'Allocated {len(allocated)} addresses',
+            'allocations': allocated,
+            'pool': IPPoolSerializer(pool).data
+        }, status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=['IP Pools'])
+class IPPoolReleaseView(APIView):
+    """
+    API endpoint to return addresses to a pool. Clears Customer.static_ip.
+    """
+    permission_classes = [IsAdminOrManager]
+    
+    @extend_schema(request=IPPoolReleaseSerializer)
+    def post(self, request, pk):
+        try:
+            pool = IPPool.objects.get(pk=pk)
+        except IPPool.DoesNotExist:
+            return Response({'error': 'IP pool not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = IPPoolReleaseSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        released = release_addresses(
+            pool,
+            addresses=serializer.validated_data.get('addresses'),
+            customers=serializer.validated_data.get('customer_ids'),
+        )
+        
+        pool.refresh_from_db()
+        return Response({
+            'message': f'Released {len(released)} addresses',
+            'released': released,
+            'pool': IPPoolSerializer(pool).data
+        }, status=status.HTTP_200_OK)
+
+
+@extend_schema(tags=['IP Pools'])
+class IPPoolConflictsView(APIView):
+    """
+    API endpoint to list address conflicts of a pool against customer
+    static IPs and the live PPP sessions
+    """
+    permission_classes = [IsAdminOrManager]
+    
+    def get(self, request, pk):
+        try:
+            pool = IPPool.objects.get(pk=pk)
+        except IPPool.DoesNotExist:
+            return Response({'error': 'IP pool not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        conflicts = find_conflicts(pool)
+        return Response({'count': len(conflicts), 'conflicts': conflicts})
+
+
+# ==================== Address Lookup ====================
+
+@extend_schema(tags=['MikroTik'])
+class AddressLookupView(APIView):
+    """
+    API endpoint to find the subscriber behind an IP or MAC address
+
+    Query params:
+    - ip or mac: the address to look up
+    - at: ISO datetime; returns who had the address at that moment instead
+      of the current owners
+    """
+    permission_classes = [IsAdminOrManager]
+    
+    def get(self, request):
+        ip = request.query_params.get('ip')
+        mac = request.query_params.get('mac')
+        if bool(ip) == bool(mac):
+            return Response(
+                {'error': 'Provide either ip or mac'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if ip and normalize_ip(ip) is None:
+            return Response({'error': 'Invalid IP address'}, status=status.HTTP_400_BAD_REQUEST)
+        if mac and normalize_mac(mac) is None:
+            return Response({'error': 'Invalid MAC address'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        address = {'ip': normalize_ip(ip)} if ip else {'mac': normalize_mac(mac)}
+        
+        at = request.query_params.get('at')
+        if at:
+            at = parse_datetime(at)
+            if at is None:
+                return Response(
+                    {'error': 'at must be an ISO datetime'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+            return Response({**address, 'at': at, 'leases': lookup_history(**address, at=at)})
+        
+        return Response({
+            **address,
+            'current': with_customers(address_index.lookup(**address)),
+            'index_age_seconds': round(address_index.age or 0, 1),
+            'recent_leases': lookup_history(**address, limit=5),
+        })
@@ -51,6 +51,36 @@ def seed_schedules(sender, **kwargs):
             'cron_hour': '0',
             'cron_day': '1', # 1st day of month
             'enabled': False # Default disabled for safety
+        },
+        'poll_active_sessions': {
+            'trigger_type': 'interval',
+            'interval_value': 30,
+            'interval_unit': 'seconds',
+            'enabled': True
+        },
+        'collect_usage': {
+            'trigger_type': 'interval',
+            'interval_value': 5,
+            'interval_unit': 'minutes',
+            'enabled': True
+        },
+        'probe_router_health': {
+            'trigger_type': 'interval',
+            'interval_value': 1,
+            'interval_unit': 'minutes',
+            'enabled': True
+        },
+        'prune_sync_logs': {
+            'trigger_type': 'cron',
+            'cron_minute': '30',
+            'cron_hour': '2',
+            'enabled': True
+        },
+        'backup_router_configs': {
+            'trigger_type': 'cron',
+            'cron_minute': '0',
+            'cron_hour': '3',
+            'enabled': True
         }
     }
     
@@ -3,62 +3,21 @@ from django.utils import timezone
 from datetime import date, timedelta
 from zenpulse_scheduler.registry import zenpulse_job
 from zenpulse_scheduler.models import JobExecutionLog
-from subscription.models import Subscription
-from billing.models import Bill
+from billing import services as billing_services
+from mikrotik import live_sessions, usage, sync_log_retention, health, backups
 
 logger = logging.getLogger(__name__)
 
 @zenpulse_job("check_expired_subscriptions")
 def check_and_disable_expired_subscriptions():
     """
-    Check all active subscriptions and disable those with unpaid bills past expiry day
-    Logic: If today's date > expiry_day, check if current month's bill is paid.
-    If unpaid, disable the subscription.
+    Suspend active subscriptions whose billing day has passed with an
+    unpaid bill for the current month, and queue their router disables.
     """
-    logger.info("Starting expired subscription check...")
+    summary = billing_services.suspend_overdue_subscriptions()
     
-    today = date.today()
-    current_month = today.month
-    current_year = today.year
-    
-    # 1. Get all active subscriptions
-    active_subs = Subscription.objects.filter(
-        status='active',
-        customer__isnull=False
-    ).select_related('customer', 'package')
-    
-    count = 0
-    for sub in active_subs:
-        try:
-            # Skip if no expiry date set (shouldn't happen for active subs usually)
-            if not sub.expiry_date:
-                continue
-                
-            expiry_day = sub.expiry_date.day
-            
-            # If today is past the expiry day
-            if today.day > expiry_day:
-                # Check for paid bill this month
-                has_paid_bill = Bill.objects.filter(
-                    customer=sub.customer,
-                    billing_month__month=current_month,
-                    billing_month__year=current_year,
-                    status='paid'
-                ).exists()
-                
-                if not has_paid_bill:
-                    logger.info(f"Disabling subscription for {sub.customer.username} (Expiry: {expiry_day}, Today: {today.day})")
-                    # Disable logic here - calling service or model method
-                    # Assuming basic status update for now to keep it simple/safe
-                    # In real app: sub.disable_subscription() or similar
-                    sub.status = 'inactive'
-                    sub.save(update_fields=['status'])
-                    count += 1
-                    
-        except Exception as e:
-            logger.error(f"Error checking sub {sub.id}: {e}")
-            
-    logger.info(f"Expired subscription check completed. Disabled {count} subscriptions.")
+    for error in summary['errors']:
+        logger.error(f"Error suspending expired subscriptions: {error}")
 
 @zenpulse_job("delete_old_job_executions")
 def delete_old_job_executions(**kwargs):
@@ -77,41 +36,63 @@ def generate_monthly_bills():
     logger.info("Starting automated monthly bill generation...")
     
     today = date.today()
-    current_month = today.month
-    current_year = today.year
     
-    # Logic similar to GenerateMonthlyBillsView
-    active_subscriptions = Subscription.objects.filter(status='active')
-    generated_count = 0
-    skipped_count = 0
+    # Automated bills have no generated_by user
+    summary = billing_services.generate_monthly_bills(today.year, today.month, generated_by=None)
     
-    for sub in active_subscriptions:
-        try:
-            # Check if bill exists for this month/year
-            if Bill.objects.filter(subscription=sub, billing_year=current_year, billing_month=current_month).exists():
-                skipped_count += 1
-                continue
-                
-            amount = sub.package.price
-            
-            # Create bill
-            # Note: automated bills have no generated_by user
-            Bill.objects.create(
-                subscription=sub,
-                billing_month=current_month,
-                billing_year=current_year,
-                billing_date=today,
-                package_price=amount,
-                total_amount=amount,
-                due_amount=amount,
-                paid_amount=0,
-                status='pending',
-                is_auto_generated=True,
-                generated_by=None 
-            )
-            generated_count += 1
-            
-        except Exception as e:
-            logger.error(f"Error generating auto-bill for sub {sub.id}: {e}")
+    for error in summary['errors']:
+        logger.error(f"Error generating auto-bills: {error}")
             
-    logger.info(f"Monthly bill generation completed. Created: {generated_count}, Skipped: {skipped_count}")
+    logger.info(
+        f"Monthly bill generation completed. Created: {summary['generated_count']}, "
+        f"Skipped: {summary['skipped_count']}, Free: {summary['free_count']}"
+    )
+
+@zenpulse_job("poll_active_sessions")
+def poll_active_sessions():
+    """
+    Refresh the active PPP session snapshot (mikrotik.LiveSession) that
+    the subscription views read live status from. Routers kept current by
+    the session listener are skipped.
+    """
+    summary = live_sessions.poll_active_sessions(only_stale=True)
+    
+    for router_name, error in summary['errors'].items():
+        logger.warning(f"Session poll failed for router {router_name}: {error}")
+
+@zenpulse_job("collect_usage")
+def collect_usage():
+    """
+    Collect per-subscriber byte counters from all routers into the usage tables.
+    """
+    summary = usage.collect_usage()
+    
+    for router_name, error in summary['errors'].items():
+        logger.warning(f"Usage collection failed for router {router_name}: {error}")
+
+@zenpulse_job("prune_sync_logs")
+def prune_sync_logs():
+    """
+    Apply MikroTik sync log retention and compress large payloads of recent rows.
+    """
+    sync_log_retention.prune_sync_logs()
+    # The job runs daily; a week's window also covers missed runs
+    sync_log_retention.compress_sync_log_payloads(since=timezone.now() - timedelta(days=7))
+
+@zenpulse_job("probe_router_health")
+def probe_router_health():
+    """
+    Probe all routers and store a health sample for each; old samples are pruned.
+    """
+    health.probe_routers()
+    health.prune_health_samples()
+
+@zenpulse_job("backup_router_configs")
+def backup_router_configs():
+    """
+    Back up the configuration (/export) of all routers; unchanged configs store nothing new.
+    """
+    summary = backups.backup_routers()
+    
+    for router_name, error in summary['errors'].items():
+        logger.warning(f"Config backup failed for router {router_name}: {error}")
@@ -134,9 +134,14 @@ class ScheduleConfigSerializer(serializers.ModelSerializer):
     def get_description(self, obj):
         # Static descriptions mapping
         DESCRIPTIONS = {
-            'check_expired_subscriptions': 'Checks for subscriptions with unpaid bills past their expiry date and disables them',
+            'check_expired_subscriptions': 'Suspends subscriptions without a paid bill past their billing day and disables them on the router',
             'delete_old_job_executions': 'Cleans up old job execution records from the database',
             'generate_monthly_bills': 'Automatically generates bills for all active subscriptions for the current month',
+            'poll_active_sessions': 'Refreshes the snapshot of active PPP sessions from all routers',
+            'collect_usage': 'Collects per-subscriber traffic counters from all routers into hourly/daily/monthly usage',
+            'prune_sync_logs': 'Applies MikroTik sync log retention: summarizes and deletes old rows, compresses large payloads',
+            'probe_router_health': 'Probes all routers in parallel and records latency, CPU, memory and uptime',
+            'backup_router_configs': 'Backs up every router configuration (/export) with deduplicated, compressed storage',
         }
         return DESCRIPTIONS.get(obj.job_key, f"Schedule configuration for {obj.job_key}")
 
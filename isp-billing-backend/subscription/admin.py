@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Subscription, SubscriptionHistory, ConnectionFee
+from .models import Subscription, SubscriptionHistory, ConnectionFee, PackageMigration, RouterMigration
 
 
 class ConnectionFeeInline(admin.TabularInline):
@@ -103,3 +103,31 @@ class SubscriptionHistoryAdmin(admin.ModelAdmin):
     
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(PackageMigration)
+class PackageMigrationAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'source_package', 'target_package', 'target_profile',
+        'status', 'processed', 'total', 'queued', 'created_at'
+    ]
+    list_filter = ['status', 'created_at']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'status', 'total', 'processed', 'queued', 'last_subscription_id',
+        'profile_push', 'error', 'created_by', 'created_at', 'started_at', 'finished_at'
+    ]
+
+
+@admin.register(RouterMigration)
+class RouterMigrationAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'source_router', 'target_router', 'zone', 'package',
+        'status', 'processed', 'total', 'moved', 'failed', 'left_on_source', 'created_at'
+    ]
+    list_filter = ['status', 'created_at']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'status', 'total', 'processed', 'moved', 'failed', 'left_on_source', 'last_subscription_id',
+        'profile_push', 'failures', 'error', 'created_by', 'created_at', 'started_at', 'finished_at'
+    ]
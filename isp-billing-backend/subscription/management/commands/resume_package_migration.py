@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from subscription.models import PackageMigration
+from subscription.package_migration import run_package_migration, migration_progress
+
+
+class Command(BaseCommand):
+    help = 'Run or resume a bulk package migration'
+
+    def add_arguments(self, parser):
+        parser.add_argument('migration_id', type=int, help='PackageMigration id')
+
+    def handle(self, *args, **options):
+        try:
+            migration = PackageMigration.objects.get(pk=options['migration_id'])
+        except PackageMigration.DoesNotExist:
+            raise CommandError(f"Package migration {options['migration_id']} not found")
+
+        if migration.status == 'completed':
+            self.stdout.write(f"Package migration #{migration.pk} is already completed")
+            return
+
+        run_package_migration(migration)
+
+        progress = migration_progress(migration)
+        self.stdout.write(
+            f"Package migration #{migration.pk} {progress['status']}: "
+            f"{progress['processed']}/{progress['total']} subscriptions, "
+            f"{progress['queued']} router updates queued, "
+            f"{progress['router_updates_outstanding']} outstanding"
+        )
+        if migration.error:
+            raise CommandError(migration.error)
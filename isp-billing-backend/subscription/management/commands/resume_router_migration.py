@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from subscription.models import RouterMigration
+from subscription.router_migration import run_router_migration, router_migration_progress
+
+
+class Command(BaseCommand):
+    help = 'Run or resume a bulk router migration'
+
+    def add_arguments(self, parser):
+        parser.add_argument('migration_id', type=int, help='RouterMigration id')
+
+    def handle(self, *args, **options):
+        try:
+            migration = RouterMigration.objects.select_related('source_router', 'target_router').get(
+                pk=options['migration_id']
+            )
+        except RouterMigration.DoesNotExist:
+            raise CommandError(f"Router migration {options['migration_id']} not found")
+
+        if migration.status == 'completed':
+            self.stdout.write(f"Router migration #{migration.pk} is already completed")
+            return
+
+        run_router_migration(migration)
+
+        progress = router_migration_progress(migration)
+        self.stdout.write(
+            f"Router migration #{migration.pk} {progress['status']}: "
+            f"{progress['processed']}/{progress['total']} subscriptions, "
+            f"{progress['moved']} moved, {progress['failed']} failed, "
+            f"{progress['left_on_source']} left on {migration.source_router.name}"
+        )
+        if migration.error:
+            raise CommandError(migration.error)
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-16 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscription', '0006_connectionfee_payment_method_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subscription',
+            name='sync_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('synced', 'Synced'), ('failed', 'Failed')], help_text='State of the queued router commands for this subscription', max_length=10, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('subscription', '0007_subscription_sync_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['status', 'billing_day'], name='subscriptio_status_a42884_idx'),
+        ),
+    ]
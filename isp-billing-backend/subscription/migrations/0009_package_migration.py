@@ -0,0 +1,51 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0005_connectiontype_code_connectiontype_status'),
+        ('mikrotik', '0012_session_events'),
+        ('subscription', '0008_subscription_status_billing_day_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='subscriptionhistory',
+            name='action',
+            field=models.CharField(choices=[('created', 'Created'), ('activated', 'Activated'), ('suspended', 'Suspended'), ('cancelled', 'Cancelled'), ('package_changed', 'Package Changed'), ('profile_changed', 'Profile Changed'), ('router_changed', 'Router Changed')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='PackageMigration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_profile', models.CharField(blank=True, help_text='PPP profile to set (default: the target package profile)', max_length=100, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('queued', models.PositiveIntegerField(default=0, help_text='Router updates queued')),
+                ('last_subscription_id', models.PositiveIntegerField(default=0)),
+                ('profile_push', models.JSONField(blank=True, help_text='Summary of the target profile push', null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='package_migrations', to=settings.AUTH_USER_MODEL)),
+                ('router', models.ForeignKey(blank=True, help_text='Only subscriptions on this router', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='package_migrations', to='mikrotik.mikrotikrouter')),
+                ('source_package', models.ForeignKey(blank=True, help_text='Only subscriptions on this package', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mikrotik.package')),
+                ('target_package', models.ForeignKey(blank=True, help_text='Package to move the subscriptions to', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='mikrotik.package')),
+                ('zone', models.ForeignKey(blank=True, help_text='Only customers of this zone', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='package_migrations', to='customers.zone')),
+            ],
+            options={
+                'verbose_name': 'Package Migration',
+                'verbose_name_plural': 'Package Migrations',
+                'db_table': 'package_migrations',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-17 04:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0006_customer_static_ip_idx'),
+        ('mikrotik', '0018_sync_log_provision_action'),
+        ('subscription', '0009_package_migration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouterMigration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('processed', models.PositiveIntegerField(default=0)),
+                ('moved', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0, help_text='Not moved: secret could not be created or verified')),
+                ('left_on_source', models.PositiveIntegerField(default=0, help_text='Moved, but the secret could not be removed from the source router')),
+                ('last_subscription_id', models.PositiveIntegerField(default=0)),
+                ('profile_push', models.JSONField(blank=True, help_text='Summary of the profile push to the target', null=True)),
+                ('failures', models.JSONField(blank=True, default=dict, help_text='{username: error} of failed and left-over secrets')),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='router_migrations', to=settings.AUTH_USER_MODEL)),
+                ('package', models.ForeignKey(blank=True, help_text='Only subscriptions on this package', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='mikrotik.package')),
+                ('source_router', models.ForeignKey(help_text='Router the subscriptions are moved off', on_delete=django.db.models.deletion.PROTECT, related_name='+', to='mikrotik.mikrotikrouter')),
+                ('target_router', models.ForeignKey(help_text='Router the subscriptions are moved to', on_delete=django.db.models.deletion.PROTECT, related_name='+', to='mikrotik.mikrotikrouter')),
+                ('zone', models.ForeignKey(blank=True, help_text='Only customers of this zone', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='router_migrations', to='customers.zone')),
+            ],
+            options={
+                'verbose_name': 'Router Migration',
+                'verbose_name_plural': 'Router Migrations',
+                'db_table': 'router_migrations',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
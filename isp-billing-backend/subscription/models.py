@@ -108,9 +108,22 @@ class Subscription(models.Model):
     )
     
     # Sync Status
+    SYNC_STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('synced', 'Synced'),
+        ('failed', 'Failed'),
+    )
+    
     is_synced_to_mikrotik = models.BooleanField(default=False)
     last_synced_at = models.DateTimeField(null=True, blank=True)
     sync_error = models.TextField(blank=True, null=True)
+    sync_status = models.CharField(
+        max_length=10,
+        choices=SYNC_STATUS_CHOICES,
+        null=True,
+        blank=True,
+        help_text='State of the queued router commands for this subscription'
+    )
     
 
     # Cancellation
@@ -136,6 +149,7 @@ class Subscription(models.Model):
             models.Index(fields=['customer']),
             models.Index(fields=['status']),
             models.Index(fields=['billing_day']),
+            models.Index(fields=['status', 'billing_day']),
         ]
     
     def __str__(self):
@@ -285,6 +299,7 @@ class SubscriptionHistory(models.Model):
         ('suspended', 'Suspended'),
         ('cancelled', 'Cancelled'),
         ('package_changed', 'Package Changed'),
+        ('profile_changed', 'Profile Changed'),
         ('router_changed', 'Router Changed'),
     )
     
@@ -314,3 +329,163 @@ class SubscriptionHistory(models.Model):
     
     def __str__(self):
         return f"{self.subscription} - {self.action} at {self.created_at}"
+
+
+class PackageMigration(models.Model):
+    """
+    Bulk move of subscriptions to another package and/or PPP profile.
+    Subscriptions are processed in primary key order and last_subscription_id
+    is advanced with every chunk, so an interrupted run resumes where it stopped.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    
+    # Filters
+    source_package = models.ForeignKey(
+        Package,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='Only subscriptions on this package'
+    )
+    zone = models.ForeignKey(
+        'customers.Zone',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='package_migrations',
+        help_text='Only customers of this zone'
+    )
+    router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='package_migrations',
+        help_text='Only subscriptions on this router'
+    )
+    
+    # Target
+    target_package = models.ForeignKey(
+        Package,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='Package to move the subscriptions to'
+    )
+    target_profile = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        help_text='PPP profile to set (default: the target package profile)'
+    )
+    
+    # Progress
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    queued = models.PositiveIntegerField(default=0, help_text='Router updates queued')
+    last_subscription_id = models.PositiveIntegerField(default=0)
+    profile_push = models.JSONField(blank=True, null=True, help_text='Summary of the target profile push')
+    error = models.TextField(blank=True, null=True)
+    
+    # Metadata
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='package_migrations'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'package_migrations'
+        verbose_name = 'Package Migration'
+        verbose_name_plural = 'Package Migrations'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Package migration #{self.pk} ({self.status})"
+
+
+class RouterMigration(models.Model):
+    """
+    Bulk move of subscriptions from one router to another. Secrets are
+    created and verified on the target before they are removed from the
+    source; progress is tracked like PackageMigration (last_subscription_id).
+    """
+    STATUS_CHOICES = PackageMigration.STATUS_CHOICES
+    
+    source_router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.PROTECT,
+        related_name='+',
+        help_text='Router the subscriptions are moved off'
+    )
+    target_router = models.ForeignKey(
+        MikroTikRouter,
+        on_delete=models.PROTECT,
+        related_name='+',
+        help_text='Router the subscriptions are moved to'
+    )
+    
+    # Filters
+    zone = models.ForeignKey(
+        'customers.Zone',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='router_migrations',
+        help_text='Only customers of this zone'
+    )
+    package = models.ForeignKey(
+        Package,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        help_text='Only subscriptions on this package'
+    )
+    
+    # Progress
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    moved = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0, help_text='Not moved: secret could not be created or verified')
+    left_on_source = models.PositiveIntegerField(
+        default=0,
+        help_text='Moved, but the secret could not be removed from the source router'
+    )
+    last_subscription_id = models.PositiveIntegerField(default=0)
+    profile_push = models.JSONField(blank=True, null=True, help_text='Summary of the profile push to the target')
+    failures = models.JSONField(default=dict, blank=True, help_text='{username: error} of failed and left-over secrets')
+    error = models.TextField(blank=True, null=True)
+    
+    # Metadata
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='router_migrations'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'router_migrations'
+        verbose_name = 'Router Migration'
+        verbose_name_plural = 'Router Migrations'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Router migration #{self.pk} ({self.status})"
@@ -0,0 +1,236 @@
+"""
+Bulk package/profile migration.
+
+Retiring a plan, re-speeding a zone or renaming profiles moves many
+subscriptions at once. A PackageMigration selects subscriptions by
+source package, zone and/or router and moves them to a target package
+and/or PPP profile:
+
+- the target package profile is pushed to the affected routers first; if
+  any of them did not take it, the run stops before a subscription is
+  moved (a resume pushes again)
+- subscriptions are updated in primary key chunks: one UPDATE, bulk
+  SubscriptionHistory rows and queued update_user commands per chunk, all
+  in the chunk's transaction together with the progress cursor
+- the MikroTik worker sends the queued updates as batched /ppp/secret set
+  commands per router session
+
+An interrupted run is resumed by calling run_package_migration() again;
+it continues after last_subscription_id. The API runs migrations as
+RouterJobs (package_migration_job) on the job worker.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from mikrotik.jobs import JobFailed
+from mikrotik.models import MikroTikRouter, MikroTikCommand
+from mikrotik.outbox import enqueue_commands
+from mikrotik.profiles import push_packages
+from .models import Subscription, SubscriptionHistory, PackageMigration
+
+logger = logging.getLogger(__name__)
+
+# Subscriptions updated per transaction
+MIGRATION_CHUNK_SIZE = 500
+
+MIGRATABLE_STATUSES = ('active', 'suspended')
+
+
+def migration_queryset(migration):
+    """
+    Subscriptions matched by the migration filters
+    """
+    subscriptions = Subscription.objects.filter(status__in=MIGRATABLE_STATUSES)
+    if migration.source_package_id:
+        subscriptions = subscriptions.filter(package_id=migration.source_package_id)
+    if migration.zone_id:
+        subscriptions = subscriptions.filter(customer__zone_id=migration.zone_id)
+    if migration.router_id:
+        subscriptions = subscriptions.filter(router_id=migration.router_id)
+    return subscriptions
+
+
+def target_profile(migration):
+    """
+    PPP profile the subscriptions end up with (None keeps their current one)
+    """
+    if migration.target_profile:
+        return migration.target_profile
+    if migration.target_package_id:
+        return migration.target_package.mikrotik_profile_name or None
+    return None
+
+
+def run_package_migration(migration, chunk_size=MIGRATION_CHUNK_SIZE):
+    """
+    Run (or resume) a migration to completion. Returns the migration.
+    """
+    if migration.status == 'completed':
+        return migration
+
+    subscriptions = migration_queryset(migration)
+
+    if migration.status == 'pending':
+        migration.total = subscriptions.count()
+        migration.started_at = timezone.now()
+    if migration.status == 'pending' or _push_failed(migration):
+        # Nothing was moved yet, so the push can simply be repeated
+        migration.profile_push = _push_target_profile(migration, subscriptions)
+    if _push_failed(migration):
+        migration.status = 'failed'
+        migration.error = (
+            f"Target profile could not be pushed to {', '.join(migration.profile_push['failed_routers'])}; "
+            f"no subscriptions were moved"
+        )
+        migration.save(update_fields=['status', 'total', 'started_at', 'profile_push', 'error'])
+        logger.error(f"Package migration #{migration.pk} stopped: {migration.error}")
+        return migration
+    migration.status = 'running'
+    migration.error = None
+    migration.save(update_fields=['status', 'total', 'started_at', 'profile_push', 'error'])
+
+    try:
+        while True:
+            ids = list(
+                subscriptions.filter(pk__gt=migration.last_subscription_id)
+                .order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            _migrate_chunk(migration, ids)
+            logger.info(f"Package migration #{migration.pk}: {migration.processed}/{migration.total}")
+    except Exception as e:
+        logger.error(f"Package migration #{migration.pk} stopped: {e}")
+        migration.status = 'failed'
+        migration.error = str(e)
+        migration.save(update_fields=['status', 'error'])
+        return migration
+
+    migration.status = 'completed'
+    migration.finished_at = timezone.now()
+    migration.save(update_fields=['status', 'finished_at'])
+    logger.info(
+        f"Package migration #{migration.pk} completed: {migration.processed} subscriptions, "
+        f"{migration.queued} router updates queued"
+    )
+    return migration
+
+
+def package_migration_job(job):
+    """
+    RouterJob handler: run or resume the job's package migration (see mikrotik/jobs.py)
+    """
+    migration = run_package_migration(PackageMigration.objects.get(pk=job.params['migration_id']))
+    if migration.status == 'failed':
+        raise JobFailed(migration.error, result=migration_progress(migration))
+    return migration_progress(migration)
+
+
+def migration_progress(migration):
+    """
+    Database and router progress of a migration
+    """
+    commands = dict(
+        MikroTikCommand.objects.filter(package_migration=migration)
+        .values('status').annotate(count=Count('id')).values_list('status', 'count')
+    )
+    router_updates = {status: commands.get(status, 0) for status, _ in MikroTikCommand.STATUS_CHOICES}
+
+    return {
+        'status': migration.status,
+        'total': migration.total,
+        'processed': migration.processed,
+        'percent': round(migration.processed * 100 / migration.total, 1) if migration.total else 100.0,
+        'queued': migration.queued,
+        'router_updates': router_updates,
+        'router_updates_outstanding': router_updates['pending'] + router_updates['processing'],
+    }
+
+
+def _migrate_chunk(migration, ids):
+    """
+    Move one chunk of subscriptions and advance the cursor in the same transaction
+    """
+    profile = target_profile(migration)
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Another run of the same migration may have taken this chunk
+        cursor = PackageMigration.objects.select_for_update().values_list(
+            'last_subscription_id', flat=True
+        ).get(pk=migration.pk)
+        if cursor != migration.last_subscription_id:
+            migration.refresh_from_db(fields=['processed', 'queued', 'last_subscription_id'])
+            return
+
+        subscriptions = list(
+            Subscription.objects.select_for_update().filter(pk__in=ids)
+            .only('id', 'package_id', 'mikrotik_profile_name', 'router_id',
+                  'mikrotik_username', 'is_synced_to_mikrotik', 'sync_status')
+        )
+
+        changes = {}
+        if migration.target_package_id:
+            changes['package_id'] = migration.target_package_id
+        if profile:
+            changes['mikrotik_profile_name'] = profile
+
+        changed = [
+            subscription for subscription in subscriptions
+            if any(getattr(subscription, field) != value for field, value in changes.items())
+        ]
+
+        if changed:
+            Subscription.objects.filter(pk__in=[s.pk for s in changed]).update(updated_at=now, **changes)
+
+            SubscriptionHistory.objects.bulk_create([
+                SubscriptionHistory(
+                    subscription=subscription,
+                    action='package_changed' if 'package_id' in changes else 'profile_changed',
+                    old_value={field: getattr(subscription, field) for field in changes},
+                    new_value=changes,
+                    notes=f'Package migration #{migration.pk}',
+                    performed_by_id=migration.created_by_id,
+                )
+                for subscription in changed
+            ])
+
+            # Only users that exist (or are about to be created) on the router
+            on_router = [
+                subscription for subscription in changed
+                if subscription.router_id
+                and (subscription.is_synced_to_mikrotik or subscription.sync_status == 'pending')
+            ]
+            commands = enqueue_commands(on_router, 'update_user', package_migration=migration)
+            migration.queued += len(commands)
+
+        migration.processed += len(subscriptions)
+        migration.last_subscription_id = ids[-1]
+        migration.save(update_fields=['processed', 'queued', 'last_subscription_id'])
+
+
+def _push_target_profile(migration, subscriptions):
+    """
+    Make sure the target package profile exists on the affected routers
+    before any secret is pointed at it. Returns the push summary with the
+    names of the routers that did not take the profile.
+    """
+    if not migration.target_package_id or migration.target_profile:
+        return None
+    if not migration.target_package.mikrotik_profile_name:
+        return None
+
+    router_ids = subscriptions.exclude(router__isnull=True).values_list('router_id', flat=True).distinct()
+    routers = MikroTikRouter.objects.filter(pk__in=router_ids, status='active')
+    matrix = push_packages([migration.target_package], routers=routers)
+    return dict(matrix['summary'], failed_routers=[
+        row['router_name'] for row in matrix['routers']
+        if row['error'] or any(result['status'] == 'failed' for result in row['results'].values())
+    ])
+
+
+def _push_failed(migration):
+    return bool(migration.profile_push and migration.profile_push.get('failed_routers'))
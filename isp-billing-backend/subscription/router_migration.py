@@ -0,0 +1,272 @@
+"""
+Bulk router migration.
+
+Re-homing the customers of an OLT or retiring a router moves many
+subscriptions to another router at once. A RouterMigration selects the
+source router's subscriptions (optionally by zone and/or package) and, in
+primary key chunks:
+
+- creates their PPP secrets on the target over one pipelined session
+  (existing secrets of the same name are linked and updated), with the
+  disabled flag matching the subscription status
+- reads the secrets back from the target and verifies them
+- removes the verified secrets from the source router
+- moves the verified subscriptions in one UPDATE, with bulk
+  SubscriptionHistory (router_changed) rows and their pending outbox
+  commands, in the chunk's transaction together with the progress cursor
+
+Subscriptions whose secret could not be created or verified stay on the
+source router and are listed in `failures`; another migration with the
+same filters picks them up again. Secrets that could not be removed from
+the source (e.g. the router is already offline) do not hold the move
+back; they are counted in left_on_source.
+
+Every step is idempotent, so an interrupted run is resumed by calling
+run_router_migration() again; it continues after last_subscription_id.
+The API runs migrations as RouterJobs (router_migration_job) on the job
+worker.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from mikrotik.jobs import JobFailed
+from mikrotik.models import MikroTikCommand, Package
+from mikrotik.profiles import push_packages
+from mikrotik.secret_mirror import cached_secrets
+from mikrotik.services import MikroTikService
+from .models import Subscription, SubscriptionHistory, RouterMigration
+
+logger = logging.getLogger(__name__)
+
+# Subscriptions moved per chunk (one target session, one source session, one transaction)
+ROUTER_MIGRATION_CHUNK_SIZE = 500
+
+
+class RouterMigrationError(Exception):
+    """
+    The target router cannot be reached; the run stops and can be resumed
+    """
+
+
+def router_migration_queryset(migration):
+    """
+    Subscriptions still on the source router that match the migration filters
+    """
+    subscriptions = Subscription.objects.filter(router_id=migration.source_router_id).exclude(status='cancelled')
+    if migration.zone_id:
+        subscriptions = subscriptions.filter(customer__zone_id=migration.zone_id)
+    if migration.package_id:
+        subscriptions = subscriptions.filter(package_id=migration.package_id)
+    return subscriptions
+
+
+def run_router_migration(migration, chunk_size=ROUTER_MIGRATION_CHUNK_SIZE):
+    """
+    Run (or resume) a router migration to completion. Returns the migration.
+    """
+    if migration.status == 'completed':
+        return migration
+
+    subscriptions = router_migration_queryset(migration)
+
+    if migration.status == 'pending':
+        migration.total = subscriptions.count()
+        migration.started_at = timezone.now()
+        migration.profile_push = _push_profiles(migration, subscriptions)
+    migration.status = 'running'
+    migration.error = None
+    migration.save(update_fields=['status', 'total', 'started_at', 'profile_push', 'error'])
+
+    try:
+        while True:
+            ids = list(
+                subscriptions.filter(pk__gt=migration.last_subscription_id)
+                .order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            _migrate_chunk(migration, ids)
+            logger.info(
+                f"Router migration #{migration.pk}: {migration.processed}/{migration.total} "
+                f"({migration.moved} moved, {migration.failed} failed)"
+            )
+    except Exception as e:
+        logger.error(f"Router migration #{migration.pk} stopped: {e}")
+        migration.status = 'failed'
+        migration.error = str(e)
+        migration.save(update_fields=['status', 'error'])
+        return migration
+
+    migration.status = 'completed'
+    migration.finished_at = timezone.now()
+    migration.save(update_fields=['status', 'finished_at'])
+    logger.info(
+        f"Router migration #{migration.pk} completed: {migration.moved} moved, {migration.failed} failed, "
+        f"{migration.left_on_source} secrets left on {migration.source_router.name}"
+    )
+    return migration
+
+
+def router_migration_job(job):
+    """
+    RouterJob handler: run or resume the job's router migration (see mikrotik/jobs.py)
+    """
+    migration = run_router_migration(
+        RouterMigration.objects.select_related('source_router', 'target_router').get(pk=job.params['migration_id'])
+    )
+    if migration.status == 'failed':
+        raise JobFailed(migration.error, result=router_migration_progress(migration))
+    return router_migration_progress(migration)
+
+
+def router_migration_progress(migration):
+    """
+    Progress counters of a router migration
+    """
+    return {
+        'status': migration.status,
+        'total': migration.total,
+        'processed': migration.processed,
+        'percent': round(migration.processed * 100 / migration.total, 1) if migration.total else 100.0,
+        'moved': migration.moved,
+        'failed': migration.failed,
+        'left_on_source': migration.left_on_source,
+    }
+
+
+def _migrate_chunk(migration, ids):
+    """
+    Create and verify one chunk on the target, remove it from the source,
+    then move the verified subscriptions and advance the cursor
+    """
+    subscriptions = list(
+        Subscription.objects.filter(pk__in=ids, router_id=migration.source_router_id)
+        .select_related('customer', 'package')
+    )
+    verified, failures = _create_on_target(migration, subscriptions)
+    moved = [sub for sub in subscriptions if sub.mikrotik_username in verified]
+    removed = MikroTikService(migration.source_router).bulk_delete_pppoe_users(
+        [sub.mikrotik_username for sub in moved]
+    )
+    left_on_source = {
+        username: f"Not removed from {migration.source_router.name}: {message}"
+        for username, (success, message) in removed.items()
+        if not success and message != "User not found"
+    }
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Another run of the same migration may have taken this chunk
+        cursor = RouterMigration.objects.select_for_update().values_list(
+            'last_subscription_id', flat=True
+        ).get(pk=migration.pk)
+        if cursor != migration.last_subscription_id:
+            migration.refresh_from_db(fields=[
+                'processed', 'moved', 'failed', 'left_on_source', 'failures', 'last_subscription_id'
+            ])
+            return
+
+        if moved:
+            for sub in moved:
+                sub.router_id = migration.target_router_id
+                sub.mikrotik_user_id = verified[sub.mikrotik_username]
+                sub.is_synced_to_mikrotik = True
+                sub.last_synced_at = now
+                sub.sync_error = None
+                sub.updated_at = now
+            Subscription.objects.bulk_update(
+                moved,
+                ['router', 'mikrotik_user_id', 'is_synced_to_mikrotik', 'last_synced_at', 'sync_error', 'updated_at'],
+                batch_size=len(moved)
+            )
+
+            SubscriptionHistory.objects.bulk_create([
+                SubscriptionHistory(
+                    subscription=sub,
+                    action='router_changed',
+                    old_value={'router_id': migration.source_router_id},
+                    new_value={'router_id': migration.target_router_id},
+                    notes=f'Router migration #{migration.pk}',
+                    performed_by_id=migration.created_by_id,
+                )
+                for sub in moved
+            ])
+
+            # Queued commands follow the subscription to its new router
+            MikroTikCommand.objects.filter(
+                router_id=migration.source_router_id,
+                username__in=[sub.mikrotik_username for sub in moved],
+                status='pending'
+            ).update(router_id=migration.target_router_id)
+
+        migration.failures.update(failures)
+        migration.failures.update(left_on_source)
+        migration.processed += len(subscriptions)
+        migration.moved += len(moved)
+        migration.failed += len(failures)
+        migration.left_on_source += len(left_on_source)
+        migration.last_subscription_id = ids[-1]
+        migration.save(update_fields=[
+            'processed', 'moved', 'failed', 'left_on_source', 'failures', 'last_subscription_id'
+        ])
+
+
+def _create_on_target(migration, subscriptions):
+    """
+    Create, update and verify the chunk's secrets on the target router over
+    one session. Returns ({username: secret_id} verified, {username: error}).
+    """
+    target = MikroTikService(migration.target_router)
+    if not target.connect():
+        raise RouterMigrationError(f"Failed to connect to {migration.target_router.name}")
+
+    failures = {}
+    try:
+        usernames = {sub.mikrotik_username for sub in subscriptions}
+        created = target.bulk_create_pppoe_users(subscriptions, force_link=usernames)
+        failures.update({username: message for username, (success, message) in created.items() if not success})
+        on_target = [sub for sub in subscriptions if sub.mikrotik_username not in failures]
+
+        # Linked secrets get our attributes; freshly created ones already match their mirror hash
+        target.bulk_update_pppoe_users(on_target, user_ids={
+            sub.mikrotik_username: created[sub.mikrotik_username][1].get('id') for sub in on_target
+        })
+
+        mirrored = cached_secrets(migration.target_router, usernames)
+        disabled = {username for username, secret in mirrored.items() if secret.disabled}
+        to_disable = [
+            sub.mikrotik_username for sub in on_target
+            if sub.status != 'active' and sub.mikrotik_username not in disabled
+        ]
+        to_enable = [
+            sub.mikrotik_username for sub in on_target
+            if sub.status == 'active' and sub.mikrotik_username in disabled
+        ]
+        target.bulk_disable_pppoe_users(to_disable)
+        target.bulk_enable_pppoe_users(to_enable)
+
+        checked = target.verify_pppoe_users(on_target)
+    finally:
+        target.disconnect()
+
+    verified = {}
+    for username, (success, response) in checked.items():
+        if success:
+            verified[username] = response['id']
+        else:
+            failures[username] = response
+    return verified, failures
+
+
+def _push_profiles(migration, subscriptions):
+    """
+    Make sure the PPP profiles of the moved packages exist on the target
+    before any secret is created there
+    """
+    packages = Package.objects.filter(pk__in=subscriptions.values('package_id'))
+    if not any(package.mikrotik_profile_name for package in packages):
+        return None
+    matrix = push_packages(packages, routers=[migration.target_router])
+    return matrix['summary']
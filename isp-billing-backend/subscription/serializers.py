@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Subscription, SubscriptionHistory, ConnectionFee
+from .models import Subscription, SubscriptionHistory, ConnectionFee, PackageMigration, RouterMigration
 from customers.serializers import CustomerSerializer
 from mikrotik.serializers import PackageSerializer
 
@@ -50,7 +50,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             'router', 'router_name', 'protocol', 'mikrotik_profile_name',
             'mikrotik_username', 'mikrotik_password',
             'mikrotik_user_id', 'is_synced_to_mikrotik', 'last_synced_at',
-            'sync_error', 
+            'sync_error', 'sync_status',
             'framed_ip_address', 'mac_address',
             'connection_fees',
             'cancelled_at', 'cancellation_reason',
@@ -58,7 +58,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             'id', 'mikrotik_user_id', 'is_synced_to_mikrotik',
-            'last_synced_at', 'sync_error', 'cancelled_at',
+            'last_synced_at', 'sync_error', 'sync_status', 'cancelled_at',
             'created_by', 'created_at', 'updated_at'
         ]
         extra_kwargs = {
@@ -153,9 +153,9 @@ class SubscriptionListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'customer_id_display', 'customer_name', 'package_name', 'package_price',
             'start_date', 'billing_day', 'next_billing_date', 'status', 'status_display',
-            'router_name', 'protocol', 'mikrotik_profile_name',
+            'router', 'router_name', 'protocol', 'mikrotik_profile_name',
             'mikrotik_username', 'framed_ip_address', 'mac_address',
-            'is_synced_to_mikrotik', 'sync_error', 'created_at',
+            'is_synced_to_mikrotik', 'sync_error', 'sync_status', 'created_at',
             'customer_advance_balance'
         ]
 
@@ -176,3 +176,67 @@ class SubscriptionHistorySerializer(serializers.ModelSerializer):
             'performed_by', 'performed_by_name', 'created_at'
         ]
         read_only_fields = ['id', 'created_at']
+
+
+class PackageMigrationSerializer(serializers.ModelSerializer):
+    """
+    Serializer for bulk package/profile migrations
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    source_package_name = serializers.CharField(source='source_package.name', read_only=True)
+    target_package_name = serializers.CharField(source='target_package.name', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True)
+    
+    class Meta:
+        model = PackageMigration
+        fields = [
+            'id', 'source_package', 'source_package_name', 'zone', 'router',
+            'target_package', 'target_package_name', 'target_profile',
+            'status', 'status_display', 'total', 'processed', 'queued',
+            'profile_push', 'error', 'created_by', 'created_by_name',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'total', 'processed', 'queued', 'profile_push', 'error',
+            'created_by', 'created_at', 'started_at', 'finished_at'
+        ]
+    
+    def validate(self, attrs):
+        if not any(attrs.get(field) for field in ('source_package', 'zone', 'router')):
+            raise serializers.ValidationError('Give at least one of source_package, zone or router')
+        if not attrs.get('target_package') and not attrs.get('target_profile'):
+            raise serializers.ValidationError('Give target_package and/or target_profile')
+        same_package = attrs.get('target_package') is not None and attrs['target_package'] == attrs.get('source_package')
+        if same_package and not attrs.get('target_profile'):
+            raise serializers.ValidationError('Target package is the same as the source package')
+        return attrs
+
+
+class RouterMigrationSerializer(serializers.ModelSerializer):
+    """
+    Serializer for bulk router migrations
+    """
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    source_router_name = serializers.CharField(source='source_router.name', read_only=True)
+    target_router_name = serializers.CharField(source='target_router.name', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.username', read_only=True)
+    
+    class Meta:
+        model = RouterMigration
+        fields = [
+            'id', 'source_router', 'source_router_name', 'target_router', 'target_router_name',
+            'zone', 'package', 'status', 'status_display', 'total', 'processed', 'moved',
+            'failed', 'left_on_source', 'profile_push', 'failures', 'error',
+            'created_by', 'created_by_name', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = [
+            'id', 'status', 'total', 'processed', 'moved', 'failed', 'left_on_source',
+            'profile_push', 'failures', 'error', 'created_by', 'created_at', 'started_at', 'finished_at'
+        ]
+    
+    def validate(self, attrs):
+        if attrs['source_router'] == attrs['target_router']:
+            raise serializers.ValidationError('Target router is the same as the source router')
+        if attrs['target_router'].status != 'active':
+            raise serializers.ValidationError('Target router is not active')
+        return attrs
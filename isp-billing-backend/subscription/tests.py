@@ -1,3 +1,62 @@
-from django.test import TestCase
+from datetime import date, datetime
+from decimal import Decimal
 
-# Create your tests here.
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from customers.models import Customer
+from mikrotik.models import Package
+from mikrotik.usage import add_usage
+from .models import Subscription
+
+
+@pytest.fixture
+def client():
+    client = APIClient(HTTP_HOST='localhost')
+    client.force_authenticate(User.objects.create_user(username='manager', password='x', role='manager'))
+    return client
+
+
+@pytest.fixture
+def subscription():
+    customer = Customer.objects.create(name='Customer', phone='+8801711000000', address='Dhaka')
+    package = Package.objects.create(name='10M', price=Decimal('500'))
+    return Subscription.objects.create(customer=customer, package=package, start_date=date(2026, 1, 1), billing_day=5)
+
+
+# ==================== Usage ====================
+
+@pytest.mark.django_db
+def test_usage_curve_endpoint(client, subscription):
+    for sampled_at, traffic in (
+        (datetime(2026, 9, 30, 23, 0), (7, 70)),
+        (datetime(2026, 10, 16, 10, 30), (100, 1000)),
+        (datetime(2026, 10, 16, 11, 5), (10, 20)),
+    ):
+        add_usage({subscription.pk: traffic}, timezone.make_aware(sampled_at))
+    url = f'/api/subscriptions/{subscription.pk}/usage/'
+
+    response = client.get(url, {'granularity': 'hourly', 'start': '2026-10-16', 'end': '2026-10-16'})
+    assert response.status_code == 200
+    points = response.json()['points']
+    assert len(points) == 24
+    assert points[10] == {'period': '2026-10-16T10:00', 'upload': 100, 'download': 1000}
+    assert (response.json()['total_upload'], response.json()['total_download']) == (110, 1020)
+
+    response = client.get(url, {'start': '2026-09-01', 'end': '2026-10-31'})
+    assert response.json()['granularity'] == 'daily'
+    assert [(point['period'], point['upload']) for point in response.json()['points']] == [
+        ('2026-09-30', 7), ('2026-10-16', 110)
+    ]
+
+    response = client.get(url, {'granularity': 'monthly', 'start': '2026-01-01', 'end': '2026-12-31'})
+    assert response.json()['points'] == [
+        {'period': '2026-09', 'upload': 7, 'download': 70},
+        {'period': '2026-10', 'upload': 110, 'download': 1020},
+    ]
+
+    assert client.get(url, {'granularity': 'weekly'}).status_code == 400
+    assert client.get(url, {'start': '2026-10-17', 'end': '2026-10-16'}).status_code == 400
+    assert client.get('/api/subscriptions/999999/usage/').status_code == 404
@@ -3,7 +3,10 @@ from .views import (
     SubscriptionListView, SubscriptionCreateView, SubscriptionDetailView,
     SubscriptionUpdateView, SubscriptionDeleteView,
     SubscriptionSyncToMikroTikView, SubscriptionSuspendView,
-    SubscriptionActivateView, SubscriptionHistoryView,
+    SubscriptionActivateView, SubscriptionHistoryView, SubscriptionUsageView,
+    SubscriptionSessionsView,
+    PackageMigrationListCreateView, PackageMigrationDetailView, PackageMigrationResumeView,
+    RouterMigrationListCreateView, RouterMigrationDetailView, RouterMigrationResumeView,
     ConnectionFeeListCreateView, ConnectionFeeDetailView
 )
 
@@ -24,6 +27,18 @@ urlpatterns = [
     
     # Subscription History
     path('subscriptions/<int:pk>/history/', SubscriptionHistoryView.as_view(), name='subscription_history'),
+    path('subscriptions/<int:pk>/sessions/', SubscriptionSessionsView.as_view(), name='subscription_sessions'),
+    path('subscriptions/<int:pk>/usage/', SubscriptionUsageView.as_view(), name='subscription_usage'),
+
+    # Package Migrations
+    path('package-migrations/', PackageMigrationListCreateView.as_view(), name='package_migration_list_create'),
+    path('package-migrations/<int:pk>/', PackageMigrationDetailView.as_view(), name='package_migration_detail'),
+    path('package-migrations/<int:pk>/resume/', PackageMigrationResumeView.as_view(), name='package_migration_resume'),
+
+    # Router Migrations
+    path('router-migrations/', RouterMigrationListCreateView.as_view(), name='router_migration_list_create'),
+    path('router-migrations/<int:pk>/', RouterMigrationDetailView.as_view(), name='router_migration_detail'),
+    path('router-migrations/<int:pk>/resume/', RouterMigrationResumeView.as_view(), name='router_migration_resume'),
 
     # Connection Fees
     path('connection-fees/', ConnectionFeeListCreateView.as_view(), name='connection_fee_list_create'),
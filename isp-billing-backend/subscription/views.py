@@ -2,19 +2,27 @@ from rest_framework import generics, filters, status, serializers, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 import time
+from datetime import date, timedelta
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 from django.utils import timezone
 from django.db import transaction
 
-from .models import Subscription, SubscriptionHistory, ConnectionFee
+from .models import Subscription, SubscriptionHistory, ConnectionFee, PackageMigration, RouterMigration
 from .serializers import (
     SubscriptionSerializer, SubscriptionCreateSerializer,
     SubscriptionUpdateSerializer, SubscriptionListSerializer,
-    SubscriptionHistorySerializer, ConnectionFeeSerializer
+    SubscriptionHistorySerializer, ConnectionFeeSerializer, PackageMigrationSerializer,
+    RouterMigrationSerializer
 )
+from .package_migration import migration_progress
+from .router_migration import router_migration_progress
 from mikrotik.services import MikroTikService
-from mikrotik.models import MikroTikSyncLog, MikroTikQueueProfile
+from mikrotik.outbox import enqueue_command
+from mikrotik.jobs import enqueue_job, find_active_job
+from mikrotik.usage import get_usage_curve
+from mikrotik.serializers import SessionEventSerializer, RouterJobSerializer
+from mikrotik.models import MikroTikSyncLog, MikroTikQueueProfile, SessionEvent
 from utils.permissions import IsAdminOrManager, IsAdmin
 
 
@@ -42,39 +50,23 @@ class SubscriptionListView(generics.ListAPIView):
         """
         response = super().list(request, *args, **kwargs)
         
-        # Fetch active connections from all routers
-        from mikrotik.models import MikroTikRouter
-        from mikrotik.services import MikroTikService
+        # Live status comes from the background-polled session snapshot
+        from mikrotik.live_sessions import get_live_status, is_stale
         
-        active_map = {}
-        try:
-            routers = MikroTikRouter.objects.filter(status='active')
-            for router in routers:
-                try:
-                    service = MikroTikService(router)
-                    conns = service.get_active_connections()
-                    for c in conns:
-                        name = c.get('name')
-                        if name:
-                            active_map[name] = {
-                                'online': True,
-                                'ip_address': c.get('address'),
-                                'mac_address': c.get('caller-id'),
-                                'uptime': c.get('uptime')
-                            }
-                except Exception as e:
-                    print(f"Error fetching from router {router.name}: {e}")
-        except Exception as e:
-            print(f"Error initializing router fetch: {e}")
-
-        # Inject into results
         if isinstance(response.data, dict) and 'results' in response.data:
-            for sub in response.data['results']:
+            results = response.data['results']
+            active_map, refreshed_at_by_router = get_live_status(
+                [sub.get('mikrotik_username') for sub in results],
+                [sub.get('router') for sub in results if sub.get('router')]
+            )
+            
+            for sub in results:
                 username = sub.get('mikrotik_username')
-                if username and username in active_map:
-                    sub['live_status'] = active_map[username]
-                else:
-                    sub['live_status'] = None
+                sub['live_status'] = active_map.get(username) if username else None
+                # When the router's snapshot was taken (also tells how old "offline" is)
+                refreshed_at = refreshed_at_by_router.get(sub.get('router'))
+                sub['live_status_refreshed_at'] = refreshed_at
+                sub['live_status_stale'] = is_stale(refreshed_at)
                     
         return response
 
@@ -114,51 +106,25 @@ class SubscriptionCreateView(generics.CreateAPIView):
                     # Log error but don't fail the subscription creation
                     print(f"Error creating fee for subscription {subscription.id}: {e}")
 
-        # Auto-sync to MikroTik if router and profile are selected
+        # Queue the PPPoE user creation; the MikroTik worker pushes it to the router
         if subscription.router and subscription.mikrotik_profile_name:
-            service = MikroTikService(subscription.router)
-            
-            # Create PPPoE User with selected profile
-            force_link = request.data.get('force_link', False)
-            success, result = service.create_pppoe_user(subscription, force_link=force_link)
-            
-            # Log user sync
-            MikroTikSyncLog.objects.create(
-                router=subscription.router,
-                action='create_user',
-                status='success' if success else 'failed',
-                entity_type='pppoe_user',
-                entity_id=subscription.mikrotik_username,
-                request_data={'subscription_id': subscription.id},
-                response_data=result if isinstance(result, dict) else {'message': str(result)},
-                error_message=None if success else str(result)
+            enqueue_command(
+                subscription, 'create_user',
+                payload={'force_link': bool(request.data.get('force_link', False))}
             )
-            
-            if success:
-                subscription.is_synced_to_mikrotik = True
-                subscription.last_synced_at = timezone.now()
-                subscription.sync_error = None
-                if isinstance(result, dict) and 'id' in result:
-                    subscription.mikrotik_user_id = result['id']
-                subscription.save()
-            else:
-                # CRITICAL: If MikroTik sync fails, rollback the subscription creation
-                # This will rollback the transaction including fees
-                raise serializers.ValidationError({
-                    'mikrotik_error': f"Failed to create user in MikroTik: {result}. Subscription creation rolled back."
-                })
         
         # Create subscription history
         SubscriptionHistory.objects.create(
             subscription=subscription,
             action='created',
             new_value={'status': subscription.status},
-            notes='Subscription created and synced',
+            notes='Subscription created',
             performed_by=request.user
         )
         
         return Response({
-            'message': 'Subscription created and synced successfully',
+            'message': 'Subscription created successfully',
+            'sync_status': subscription.sync_status,
             'subscription': SubscriptionSerializer(subscription).data
         }, status=status.HTTP_201_CREATED)
 
@@ -341,38 +307,29 @@ class SubscriptionSuspendView(APIView):
         if subscription.status == 'suspended':
             return Response({'error': 'Subscription is already suspended'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Disable in MikroTik
-        if subscription.router and subscription.is_synced_to_mikrotik:
-            service = MikroTikService(subscription.router)
-            success, message = service.disable_pppoe_user(subscription.mikrotik_username)
+        with transaction.atomic():
+            # Update subscription status
+            old_status = subscription.status
+            subscription.status = 'suspended'
+            subscription.save()
+            
+            # Disable in MikroTik (sent by the MikroTik worker)
+            if subscription.router and (subscription.is_synced_to_mikrotik or subscription.sync_status == 'pending'):
+                enqueue_command(subscription, 'disable_user')
             
-            # Log sync operation
-            MikroTikSyncLog.objects.create(
-                router=subscription.router,
-                action='disable_user',
-                status='success' if success else 'failed',
-                entity_type='pppoe_user',
-                entity_id=subscription.mikrotik_username,
-                error_message=None if success else message
+            # Create history
+            SubscriptionHistory.objects.create(
+                subscription=subscription,
+                action='suspended',
+                old_value={'status': old_status},
+                new_value={'status': 'suspended'},
+                notes=request.data.get('reason', 'Suspended by admin'),
+                performed_by=request.user
             )
         
-        # Update subscription status
-        old_status = subscription.status
-        subscription.status = 'suspended'
-        subscription.save()
-        
-        # Create history
-        SubscriptionHistory.objects.create(
-            subscription=subscription,
-            action='suspended',
-            old_value={'status': old_status},
-            new_value={'status': 'suspended'},
-            notes=request.data.get('reason', 'Suspended by admin'),
-            performed_by=request.user
-        )
-        
         return Response({
             'message': 'Subscription suspended successfully',
+            'sync_status': subscription.sync_status,
             'subscription': SubscriptionSerializer(subscription).data
         }, status=status.HTTP_200_OK)
 
@@ -393,38 +350,29 @@ class SubscriptionActivateView(APIView):
         if subscription.status == 'active':
             return Response({'error': 'Subscription is already active'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Enable in MikroTik
-        if subscription.router and subscription.is_synced_to_mikrotik:
-            service = MikroTikService(subscription.router)
-            success, message = service.enable_pppoe_user(subscription.mikrotik_username)
+        with transaction.atomic():
+            # Update subscription status
+            old_status = subscription.status
+            subscription.status = 'active'
+            subscription.save()
+            
+            # Enable in MikroTik (sent by the MikroTik worker)
+            if subscription.router and (subscription.is_synced_to_mikrotik or subscription.sync_status == 'pending'):
+                enqueue_command(subscription, 'enable_user')
             
-            # Log sync operation
-            MikroTikSyncLog.objects.create(
-                router=subscription.router,
-                action='enable_user',
-                status='success' if success else 'failed',
-                entity_type='pppoe_user',
-                entity_id=subscription.mikrotik_username,
-                error_message=None if success else message
+            # Create history
+            SubscriptionHistory.objects.create(
+                subscription=subscription,
+                action='activated',
+                old_value={'status': old_status},
+                new_value={'status': 'active'},
+                notes='Activated by admin',
+                performed_by=request.user
             )
         
-        # Update subscription status
-        old_status = subscription.status
-        subscription.status = 'active'
-        subscription.save()
-        
-        # Create history
-        SubscriptionHistory.objects.create(
-            subscription=subscription,
-            action='activated',
-            old_value={'status': old_status},
-            new_value={'status': 'active'},
-            notes='Activated by admin',
-            performed_by=request.user
-        )
-        
         return Response({
             'message': 'Subscription activated successfully',
+            'sync_status': subscription.sync_status,
             'subscription': SubscriptionSerializer(subscription).data
         }, status=status.HTTP_200_OK)
 
@@ -443,3 +391,262 @@ class SubscriptionHistoryView(generics.ListAPIView):
             subscription_id=subscription_id
         ).select_related('performed_by')
 
+
+@extend_schema(tags=['Subscriptions'])
+class SubscriptionSessionsView(generics.ListAPIView):
+    """
+    API endpoint to get the PPP session start/stop history of a subscription
+    """
+    serializer_class = SessionEventSerializer
+    permission_classes = [IsAdminOrManager]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = {
+        'event': ['exact'],
+        'occurred_at': ['gte', 'lte'],
+    }
+    
+    def get_queryset(self):
+        return SessionEvent.objects.filter(
+            subscription_id=self.kwargs.get('pk')
+        ).select_related('router').order_by('-occurred_at')
+
+
+@extend_schema(tags=['Subscriptions'])
+class SubscriptionUsageView(APIView):
+    """
+    API endpoint to get the traffic usage curve of a subscription
+
+    Query params:
+    - granularity: hourly | daily (default) | monthly
+    - start, end: YYYY-MM-DD (defaults: today for hourly, last 30 days for
+      daily, last 12 months for monthly)
+    """
+    permission_classes = [IsAdminOrManager]
+    
+    GRANULARITIES = ('hourly', 'daily', 'monthly')
+    
+    def get(self, request, pk):
+        try:
+            subscription = Subscription.objects.get(pk=pk)
+        except Subscription.DoesNotExist:
+            return Response(
+                {'error': 'Subscription not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        granularity = request.query_params.get('granularity', 'daily')
+        if granularity not in self.GRANULARITIES:
+            return Response(
+                {'error': f"granularity must be one of: {', '.join(self.GRANULARITIES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            end = self._parse_date(request.query_params.get('end')) or timezone.localdate()
+            start = self._parse_date(request.query_params.get('start')) or self._default_start(granularity, end)
+        except ValueError:
+            return Response(
+                {'error': 'start and end must be dates in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if start > end:
+            return Response(
+                {'error': 'start must be before end'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        points = get_usage_curve(subscription.pk, granularity, start, end)
+        return Response({
+            'subscription_id': subscription.pk,
+            'granularity': granularity,
+            'start': start,
+            'end': end,
+            'points': points,
+            'total_upload': sum(point['upload'] for point in points),
+            'total_download': sum(point['download'] for point in points),
+        })
+    
+    @staticmethod
+    def _parse_date(value):
+        return date.fromisoformat(value) if value else None
+    
+    @staticmethod
+    def _default_start(granularity, end):
+        if granularity == 'hourly':
+            return end
+        if granularity == 'monthly':
+            return date(end.year, 1, 1) if end.month == 12 else date(end.year - 1, end.month + 1, 1)
+        return end - timedelta(days=29)
+
+
+# ==================== Package Migration Views ====================
+
+@extend_schema(tags=['Subscriptions'])
+class PackageMigrationListCreateView(generics.ListCreateAPIView):
+    """
+    API endpoint to list package migrations or start a new one
+
+    A new migration moves every active/suspended subscription matching the
+    filters (source_package, zone, router) to target_package and/or
+    target_profile. The migration runs as a background job (202); poll the
+    migration for progress. Router updates are queued for the MikroTik worker.
+    """
+    queryset = PackageMigration.objects.select_related('source_package', 'target_package', 'created_by')
+    serializer_class = PackageMigrationSerializer
+    permission_classes = [IsAdmin]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'source_package', 'target_package', 'zone', 'router']
+    ordering = ['-created_at']
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        migration = serializer.save(created_by=request.user)
+        job = enqueue_job('package_migration', params={'migration_id': migration.pk}, created_by=request.user)
+        
+        return Response({
+            'message': 'Package migration queued',
+            'migration': PackageMigrationSerializer(migration).data,
+            'progress': migration_progress(migration),
+            'job': RouterJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+@extend_schema(tags=['Subscriptions'])
+class PackageMigrationDetailView(APIView):
+    """
+    API endpoint to get a package migration with its progress
+    """
+    permission_classes = [IsAdminOrManager]
+    
+    def get(self, request, pk):
+        try:
+            migration = PackageMigration.objects.select_related('source_package', 'target_package').get(pk=pk)
+        except PackageMigration.DoesNotExist:
+            return Response({'error': 'Package migration not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'migration': PackageMigrationSerializer(migration).data,
+            'progress': migration_progress(migration)
+        })
+
+
+@extend_schema(tags=['Subscriptions'])
+class PackageMigrationResumeView(APIView):
+    """
+    API endpoint to resume an interrupted or failed package migration in
+    the background
+    """
+    permission_classes = [IsAdmin]
+    
+    def post(self, request, pk):
+        try:
+            migration = PackageMigration.objects.get(pk=pk)
+        except PackageMigration.DoesNotExist:
+            return Response({'error': 'Package migration not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if migration.status == 'completed':
+            return Response({'error': 'Package migration is already completed'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        active = find_active_job('package_migration', migration_id=migration.pk)
+        if active is not None:
+            return Response({
+                'error': 'Package migration is already queued or running',
+                'job': RouterJobSerializer(active).data
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = enqueue_job('package_migration', params={'migration_id': migration.pk}, created_by=request.user)
+        
+        return Response({
+            'message': 'Package migration queued',
+            'migration': PackageMigrationSerializer(migration).data,
+            'progress': migration_progress(migration),
+            'job': RouterJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+# ==================== Router Migration Views ====================
+
+@extend_schema(tags=['Subscriptions'])
+class RouterMigrationListCreateView(generics.ListCreateAPIView):
+    """
+    API endpoint to list router migrations or start a new one
+
+    A new migration moves the subscriptions of source_router (optionally
+    only those of zone and/or package) to target_router: their secrets are
+    created and verified on the target, then removed from the source. The
+    migration runs as a background job (202); poll the migration for progress.
+    """
+    queryset = RouterMigration.objects.select_related('source_router', 'target_router', 'created_by')
+    serializer_class = RouterMigrationSerializer
+    permission_classes = [IsAdmin]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['status', 'source_router', 'target_router', 'zone', 'package']
+    ordering = ['-created_at']
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        migration = serializer.save(created_by=request.user)
+        job = enqueue_job('router_migration', params={'migration_id': migration.pk}, created_by=request.user)
+        
+        return Response({
+            'message': 'Router migration queued',
+            'migration': RouterMigrationSerializer(migration).data,
+            'progress': router_migration_progress(migration),
+            'job': RouterJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+@extend_schema(tags=['Subscriptions'])
+class RouterMigrationDetailView(APIView):
+    """
+    API endpoint to get a router migration with its progress
+    """
+    permission_classes = [IsAdminOrManager]
+    
+    def get(self, request, pk):
+        try:
+            migration = RouterMigration.objects.select_related('source_router', 'target_router').get(pk=pk)
+        except RouterMigration.DoesNotExist:
+            return Response({'error': 'Router migration not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'migration': RouterMigrationSerializer(migration).data,
+            'progress': router_migration_progress(migration)
+        })
+
+
+@extend_schema(tags=['Subscriptions'])
+class RouterMigrationResumeView(APIView):
+    """
+    API endpoint to resume an interrupted or failed router migration in
+    the background
+    """
+    permission_classes = [IsAdmin]
+    
+    def post(self, request, pk):
+        try:
+            migration = RouterMigration.objects.select_related('source_router', 'target_router').get(pk=pk)
+        except RouterMigration.DoesNotExist:
+            return Response({'error': 'Router migration not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if migration.status == 'completed':
+            return Response({'error': 'Router migration is already completed'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        active = find_active_job('router_migration', migration_id=migration.pk)
+        if active is not None:
+            return Response({
+                'error': 'Router migration is already queued or running',
+                'job': RouterJobSerializer(active).data
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = enqueue_job('router_migration', params={'migration_id': migration.pk}, created_by=request.user)
+        
+        return Response({
+            'message': 'Router migration queued',
+            'migration': RouterMigrationSerializer(migration).data,
+            'progress': router_migration_progress(migration),
+            'job': RouterJobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class DocumentSequence(models.Model):
+    """
+    Counter for auto-generated document numbers (one row per prefix,
+    e.g. BILL-2026-02-, PAY-2026-, ISP-2026-)
+    """
+    key = models.CharField(max_length=50, unique=True)
+    last_value = models.BigIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_sequences'
+        verbose_name = 'Document Sequence'
+        verbose_name_plural = 'Document Sequences'
+        ordering = ['key']
+    
+    def __str__(self):
+        return f"{self.key} ({self.last_value})"
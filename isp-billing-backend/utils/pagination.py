@@ -0,0 +1,54 @@
+"""
+Pagination for very large tables.
+
+PageNumberPagination runs an exact COUNT(*) over the filtered queryset on
+every request, which gets slow once a table holds millions of rows. The
+paginator here counts at most MAX_EXACT_COUNT rows; for unfiltered
+querysets on PostgreSQL it uses the planner's row estimate instead.
+"""
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator with a bounded (or estimated) count
+    """
+    MAX_EXACT_COUNT = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = _estimated_row_count(queryset)
+            if estimate is not None and estimate > self.MAX_EXACT_COUNT:
+                return estimate
+        # COUNT over a LIMIT subquery stops after MAX_EXACT_COUNT rows
+        return queryset[:self.MAX_EXACT_COUNT].count()
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    PageNumberPagination using EstimatedCountPaginator
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+
+def _estimated_row_count(queryset):
+    """
+    Row estimate from pg_class (PostgreSQL only, kept fresh by autovacuum)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if not row or row[0] < 0:
+        return None
+    return row[0]
@@ -0,0 +1,101 @@
+"""
+Concurrency-safe document number allocation.
+
+Each number prefix (BILL-2026-02-, PAY-2026-, ...) has a counter row in
+DocumentSequence. Allocating N numbers is a single atomic UPDATE on that
+row, so concurrent inserts never hand out the same number and bulk
+generators can reserve thousands of numbers in one round-trip.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentSequence
+
+
+def allocate(key, count=1, seed=None):
+    """
+    Reserve `count` consecutive values for `key` and return the first one.
+
+    `seed` is an optional callable returning the last value already in use;
+    it is only called once, when the counter row for `key` is created.
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    with transaction.atomic():
+        last_value = _increment(key, count)
+        if last_value is None:
+            start = seed() if seed else 0
+            try:
+                with transaction.atomic():
+                    DocumentSequence.objects.create(key=key, last_value=start + count)
+                last_value = start + count
+            except IntegrityError:
+                # Another process created the counter first
+                last_value = _increment(key, count)
+
+    return last_value - count + 1
+
+
+def document_numbers(model, field, prefix, count=1, width=4):
+    """
+    Allocate `count` document numbers like f'{prefix}{n:04d}' for `model.field`.
+
+    The counter is seeded from the highest number already stored with this
+    prefix, so existing data keeps its numbering.
+    """
+    first = allocate(prefix, count, seed=lambda: _last_used_number(model, field, prefix))
+    return [f'{prefix}{number:0{width}d}' for number in range(first, first + count)]
+
+
+def next_document_number(model, field, prefix, width=4):
+    """
+    Allocate a single document number for `model.field`
+    """
+    return document_numbers(model, field, prefix, count=1, width=width)[0]
+
+
+def _increment(key, count):
+    """
+    Atomically add `count` to the counter and return the new value,
+    or None if the counter does not exist yet.
+    """
+    now = timezone.now()
+
+    if connection.vendor in ('postgresql', 'sqlite') and connection.features.can_return_columns_from_insert:
+        # Single round-trip: UPDATE ... RETURNING
+        qn = connection.ops.quote_name
+        table = qn(DocumentSequence._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET {qn('last_value')} = {qn('last_value')} + %s, "
+                f"{qn('updated_at')} = %s WHERE {qn('key')} = %s RETURNING {qn('last_value')}",
+                [count, now, key]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    updated = DocumentSequence.objects.filter(key=key).update(
+        last_value=F('last_value') + count, updated_at=now
+    )
+    if not updated:
+        return None
+    # The row stays locked by the UPDATE until the transaction ends
+    return DocumentSequence.objects.filter(key=key).values_list('last_value', flat=True).get()
+
+
+def _last_used_number(model, field, prefix):
+    """
+    Highest number already stored for a prefix (used to seed new counters)
+    """
+    numbers = model.objects.filter(
+        **{f'{field}__startswith': prefix}
+    ).values_list(field, flat=True)
+
+    last_number = 0
+    for value in numbers.iterator():
+        suffix = value[len(prefix):]
+        if suffix.isdigit():
+            last_number = max(last_number, int(suffix))
+    return last_number
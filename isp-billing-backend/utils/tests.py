@@ -0,0 +1,96 @@
+import threading
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+from billing.models import Bill
+from customers.models import Customer
+from mikrotik.models import Package
+from subscription.models import Subscription
+from .models import DocumentSequence
+from .sequences import allocate, document_numbers, next_document_number
+
+
+@pytest.fixture
+def subscription():
+    customer = Customer.objects.create(name='Customer', phone='+8801711000000', address='Dhaka')
+    package = Package.objects.create(name='10M', price=Decimal('500'))
+    return Subscription.objects.create(customer=customer, package=package, start_date=date(2026, 1, 1), billing_day=5)
+
+
+def make_bill(subscription, month, bill_number=''):
+    return Bill.objects.create(
+        subscription=subscription, billing_year=2026, billing_month=month, billing_date=date(2026, month, 1),
+        package_price=Decimal('500'), bill_number=bill_number
+    )
+
+
+@pytest.mark.django_db
+def test_counter_is_seeded_from_existing_numbers(subscription):
+    # Numbers written before the counter existed (or by hand)
+    make_bill(subscription, 1, 'BILL-2026-01-0007')
+    make_bill(subscription, 2, 'BILL-2026-01-0003')
+
+    assert next_document_number(Bill, 'bill_number', 'BILL-2026-01-') == 'BILL-2026-01-0008'
+    assert DocumentSequence.objects.get(key='BILL-2026-01-').last_value == 8
+
+
+@pytest.mark.django_db
+def test_block_allocation_is_contiguous_and_not_reused_by_save(subscription):
+    numbers = document_numbers(Bill, 'bill_number', 'BILL-2026-03-', count=5)
+    assert numbers == [f'BILL-2026-03-{number:04d}' for number in range(1, 6)]
+
+    # Bill.save() allocates from the same counter, after the block
+    assert make_bill(subscription, 3).bill_number == 'BILL-2026-03-0006'
+    assert document_numbers(Bill, 'bill_number', 'BILL-2026-03-', count=2) == [
+        'BILL-2026-03-0007', 'BILL-2026-03-0008'
+    ]
+
+
+@pytest.mark.django_db
+def test_prefixes_roll_over_per_month_and_year(subscription):
+    assert make_bill(subscription, 4).bill_number == 'BILL-2026-04-0001'
+    assert make_bill(subscription, 5).bill_number == 'BILL-2026-05-0001'
+    assert next_document_number(Bill, 'bill_number', 'BILL-2026-04-') == 'BILL-2026-04-0002'
+
+    assert document_numbers(Bill, 'bill_number', 'PAY-2026-', count=2) == ['PAY-2026-0001', 'PAY-2026-0002']
+    assert document_numbers(Bill, 'bill_number', 'PAY-2027-') == ['PAY-2027-0001']
+    assert document_numbers(Bill, 'bill_number', 'PAY-2026-') == ['PAY-2026-0003']
+
+
+@pytest.mark.django_db
+def test_allocate_rejects_empty_blocks():
+    with pytest.raises(ValueError):
+        allocate('EMPTY-', count=0)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_interleaved_allocations_never_overlap():
+    allocate('INV-2026-')
+    blocks = []
+    errors = []
+    start = threading.Barrier(4)
+
+    def allocate_blocks(count):
+        try:
+            start.wait()
+            for _ in range(25):
+                first = allocate('INV-2026-', count)
+                blocks.append(range(first, first + count))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=allocate_blocks, args=(count,)) for count in (1, 3, 7, 10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    numbers = [number for block in blocks for number in block]
+    assert len(numbers) == len(set(numbers)) == 25 * (1 + 3 + 7 + 10)
+    assert sorted(numbers) == list(range(2, 2 + len(numbers)))